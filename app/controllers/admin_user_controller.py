@@ -1,4 +1,4 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from app.services import admin_user_service
 
 
@@ -6,7 +6,9 @@ async def get_all_users(
     user_type: Optional[str] = None,
     search: Optional[str] = None,
     limit: int = 50,
-    offset: int = 0
+    offset: int = 0,
+    cursors: Optional[List[str]] = None,
+    count_mode: str = "exact"
 ) -> Dict[str, Any]:
     """
     Admin tarafından tüm kullanıcıları getirir
@@ -15,7 +17,9 @@ async def get_all_users(
         user_type=user_type,
         search=search,
         limit=limit,
-        offset=offset
+        offset=offset,
+        cursors=cursors,
+        count_mode=count_mode
     )
     
     if not success:
@@ -94,7 +98,8 @@ async def set_user_commission_rate(user_id: str, commission_rate: float, descrip
 async def get_all_users_commissions(
     limit: int = 50,
     offset: int = 0,
-    user_type: Optional[str] = None
+    user_type: Optional[str] = None,
+    cursor: Optional[str] = None
 ) -> Dict[str, Any]:
     """
     Admin tarafından tüm kullanıcıların (Corporate ve Dealer) komisyon oranlarını getirir
@@ -102,7 +107,8 @@ async def get_all_users_commissions(
     success, result = await admin_user_service.get_all_users_commissions(
         limit=limit,
         offset=offset,
-        user_type=user_type
+        user_type=user_type,
+        cursor=cursor
     )
     
     if not success:
@@ -118,3 +124,37 @@ async def get_all_users_commissions(
         "data": result
     }
 
+
+
+async def search_users(
+    search: Optional[str] = None,
+    roles: Optional[List[str]] = None,
+    status: Optional[str] = None,
+    include_deleted: bool = False,
+    limit: int = 50,
+    cursor: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Tüm rollerde birleşik kullanıcı arama
+    """
+    success, result = await admin_user_service.search_users(
+        search=search,
+        roles=roles,
+        status=status,
+        include_deleted=include_deleted,
+        limit=limit,
+        cursor=cursor
+    )
+
+    if not success:
+        return {
+            "success": False,
+            "message": result if isinstance(result, str) else "Failed to search users",
+            "data": {}
+        }
+
+    return {
+        "success": True,
+        "message": "Users fetched successfully",
+        "data": result
+    }
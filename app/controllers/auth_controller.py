@@ -1,19 +1,27 @@
 from fastapi import Depends, HTTPException, status, status,Security
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from ..utils.security import decode_jwt
+from ..utils.security import decode_jwt_cached
 from ..services import auth_service
 from ..services import support_permission_service as support_perm_svc
+from ..services.token_revocation_service import revocation_list, revoke_access_token
+from uuid import UUID
 
 http_bearer = HTTPBearer(auto_error=False)
 
+
+def verify_access_token(token: str) -> dict:
+    """İmza/exp doğrulaması (önbellekli) + iptal listesi kontrolü; DB'ye gidilmez"""
+    payload = decode_jwt_cached(token)
+    if not payload or revocation_list.is_revoked(payload):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired token")
+    return payload
+
 def require_roles(allowed: list[str]):
     def _dep(credentials: HTTPAuthorizationCredentials = Security(http_bearer)):
         if not credentials or not credentials.credentials:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing bearer token")
         token = credentials.credentials
-        payload = decode_jwt(token)
-        if not payload:
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired token")
+        payload = verify_access_token(token)
 
         roles = payload.get("role") or payload.get("roles") or []
         if isinstance(roles, str):
@@ -42,18 +50,19 @@ async def get_current_driver(credentials: HTTPAuthorizationCredentials = Securit
     if not credentials or not credentials.credentials:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing bearer token")
     token = credentials.credentials
-    payload = decode_jwt(token)  
-    if not payload:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired token")
-    driver_id = payload.get("sub")
-    driver = await auth_service.get_driver(driver_id)
-    if not driver:
+    payload = verify_access_token(token)
+
+    # Silinen/banlanan kuryeler iptal listesiyle düşer; her istekte drivers tablosuna gidilmez
+    roles = payload.get("role") or payload.get("roles") or []
+    if isinstance(roles, str):
+        roles = [roles]
+    if "Courier" not in roles:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    return driver
+    return {"id": UUID(payload["sub"]), "email": payload.get("email")}
 
 
 async def refresh(refresh_token: str):
@@ -65,7 +74,13 @@ async def refresh(refresh_token: str):
     return {"success": True, "message": "Token refreshed", "data": tokens}
 
 
-async def logout(refresh_token: str):
+async def logout(refresh_token: str, access_token: str | None = None):
+    # Access token da verildiyse süresi dolana kadar iptal listesine alınır
+    if access_token:
+        try:
+            await revoke_access_token(decode_jwt_cached(access_token))
+        except HTTPException:
+            pass
     ok = await auth_service.revoke_refresh_token(refresh_token)
     if not ok:
         return {"success": False, "message": "Refresh token already invalid or not found", "data": {}}
@@ -93,9 +108,7 @@ def require_support_module(module_number: int):
         if not credentials or not credentials.credentials:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing bearer token")
         token = credentials.credentials
-        payload = decode_jwt(token)
-        if not payload:
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired token")
+        payload = verify_access_token(token)
 
         # Support rolü kontrolü
         roles = payload.get("role") or payload.get("roles") or []
@@ -135,7 +135,7 @@ async def get_dealers_by_state(state_id: int):
     dealers = await svc.get_dealers_by_state(state_id)
     return {"success": True, "message": "Dealers list", "data": dealers}
 
-async def get_courier_history(_claims: dict, date: str = None, page: int = 1, page_size: int = 25):
+async def get_courier_history(_claims: dict, date: str = None, page: int = 1, page_size: int = 25, cursor: str = None):
     roles = _claims.get("role") or _claims.get("roles") or []
     if isinstance(roles, str):
         roles = [roles]
@@ -160,7 +160,8 @@ async def get_courier_history(_claims: dict, date: str = None, page: int = 1, pa
         courier_id=user_id,
         date=date,
         page=page,
-        page_size=page_size
+        page_size=page_size,
+        cursor=cursor
     )
 
 async def change_courier_order_status(_claims: dict, order_id: str, req: CourierOrderStatusChangeReq):
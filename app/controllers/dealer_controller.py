@@ -70,9 +70,9 @@ async def get_dealer_couriers_gps(dealer_id: str) -> Dict[str, Any]:
     }
 
 
-async def list_carriers(dealer_id: UUID, limit: int, offset: int) -> Dict[str, Any]:
+async def list_carriers(dealer_id: UUID, limit: int, offset: int, current_location: bool = False) -> Dict[str, Any]:
     """Bayi'nin şehrindeki taşıyıcıları listeler controller"""
-    success, result = await dealer_service.list_carriers_by_dealer_state(dealer_id, limit, offset)
+    success, result = await dealer_service.list_carriers_by_dealer_state(dealer_id, limit, offset, current_location)
     
     if not success:
         return {
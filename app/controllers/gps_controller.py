@@ -18,8 +18,9 @@ async def upsert_location(req: GPSUpdateRequest):
     
     # GPS güncellemesi başarılı oldu, arka planda rota hesapla (non-blocking)
     # Background task olarak çalıştır ki GPS response gecikmesin
+    # Yeni yazılan konum rota hesabına verilir, gps_table tekrar okunmaz
     try:
-        asyncio.create_task(calculate_and_push_route(req.driver_id))
+        asyncio.create_task(calculate_and_push_route(req.driver_id, result))
     except Exception as e:
         logger.error(f"Error triggering route calculation for courier {req.driver_id}: {e}")
     
@@ -1,6 +1,6 @@
 from fastapi import HTTPException
 from ..services import map_service
-from ..models.map_model import Coordinate
+from ..models.map_model import Coordinate, MultiStopRouteRequest, MatrixRequest
 
 async def create_route(driver, order_id: str):
     route = await map_service.create_route(driver["id"], order_id)
@@ -15,4 +15,18 @@ async def create_courier_route_serpapi(driver, order_id: str):
     route = await map_service.create_courier_route_serpapi(driver["id"], order_id)
     if not route:
         raise HTTPException(status_code=400, detail="Could not create route with SerpAPI")
-    return route
\ No newline at end of file
+    return route
+
+async def create_multi_stop_route(driver, req: MultiStopRouteRequest):
+    """
+    Kurye konumundan başlayan çok duraklı rota oluşturur.
+    """
+    return await map_service.create_multi_stop_route(driver["id"], req.stops)
+
+async def get_travel_matrix(req: MatrixRequest):
+    """
+    Kaynak x hedef süre/mesafe matrisi döner.
+    """
+    if len(req.sources) * len(req.destinations) > 2500:
+        raise HTTPException(status_code=400, detail="Matrix too large (max 2500 cells)")
+    return await map_service.get_travel_matrix(req.sources, req.destinations)
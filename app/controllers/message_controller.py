@@ -27,6 +27,6 @@ async def mark_as_read(user_id,user_type,chat_id):
         raise HTTPException(status_code=400, detail="Failed to mark messages as read")
     return {"success": True, "message": "Messages marked as read"}
 
-async def fetch_history(chat_id, user_id, user_type, limit=50):
-    data = await message_service.get_chat_history(chat_id, user_id, user_type, limit)
-    return {"success": True, "message": "ok", "data": {"messages": data}}
\ No newline at end of file
+async def fetch_history(chat_id, user_id, user_type, limit=50, before=None, after=None):
+    data = await message_service.get_chat_history(chat_id, user_id, user_type, limit, before, after)
+    return {"success": True, "message": "ok", "data": data}
\ No newline at end of file
@@ -1,5 +1,6 @@
 from app.services import notification_service as service
 from app.services.notification_service import list_notifications_for_user
+from app.services.mail_dispatch_service import get_job_progress
 
 
 async def send(req):
@@ -9,19 +10,53 @@ async def send(req):
             return {"success": False, "message": info, "data": {}}
         return {"success": True, "message": "Notification sent", "data": {"id": nid}}
     else:
-        ok, info, nid = await service.send_bulk(req.user_type, req.subject, req.message)
+        ok, info, nid, job_id = await service.send_bulk(req.user_type, req.subject, req.message)
         if not ok:
             return {"success": False, "message": info, "data": {}}
-        return {"success": True, "message": "Notification sent", "data": {"id": nid}}
+        return {"success": True, "message": "Notification queued", "data": {"id": nid, "job_id": job_id}}
+
+async def get_send_job(job_id: str):
+    progress = await get_job_progress(job_id)
+    if not progress:
+        return {"success": False, "message": "Job not found", "data": {}}
+    return {"success": True, "message": "Job progress", "data": progress}
+
+def _decode_before(before: str | None):
+    """Geçersiz cursor ValueError fırlatır"""
+    return service.decode_inbox_cursor(before) if before else None
 
-async def list_notifications(claims):
-    data = await service.list_notifications_for_user(claims)
+async def list_notifications(claims, limit: int = 50, before: str | None = None):
+    try:
+        cursor = _decode_before(before)
+    except ValueError:
+        return {"success": False, "message": "Geçersiz cursor", "data": []}
+    data = await service.list_notifications_for_user(claims, limit, cursor)
     return {
         "success": True,
         "message": "Notifications fetched",
         "data": data
     }
 
+async def get_inbox(claims, limit: int = 50, before: str | None = None):
+    try:
+        cursor = _decode_before(before)
+    except ValueError:
+        return {"success": False, "message": "Geçersiz cursor", "data": {}}
+    data = await service.get_inbox(claims, limit, cursor)
+    return {"success": True, "message": "Inbox fetched", "data": data}
+
+async def get_unread_count(claims):
+    count = await service.get_unread_count(claims)
+    return {"success": True, "message": "Unread count", "data": {"unread_count": count}}
+
+async def mark_read(claims, notification_ids: list[int] | None = None):
+    marked = await service.mark_as_read(claims, notification_ids)
+    return {
+        "success": True,
+        "message": "Notifications marked as read",
+        "data": {"marked": marked, "unread_count": await service.get_unread_count(claims)}
+    }
+
 
 async def delete_notification(notification_id: int, claims):
     user_id = claims.get("sub")
@@ -1,5 +1,5 @@
 # app/controllers/order_controller.py
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from ..services import order_service as svc
 from ..models.order_model import (
     OrderCreateReq, OrderUpdateReq, OrderResponse, OrderHistoryItem, OrderListResponse
@@ -27,16 +27,16 @@ async def accept_order_by_courier(
 async def get_courier_orders_log(
     courier_id: str,
     limit: int = 50,
-    offset: int = 0
+    offset: int = 0,
+    cursor: Optional[str] = None
     ) -> Dict[str, Any]:
-    logs, total_count = await svc.get_courier_orders_log(courier_id, limit, offset)
+    result, error = await svc.get_courier_orders_log(courier_id, limit, offset, cursor)
+    if error:
+        return {"success": False, "message": error, "data": {}}
     return {
         "success": True,
         "message": "Courier orders log retrieved successfully",
-        "data": {
-            "logs": logs,
-            "total_count": total_count
-        }
+        "data": result
     }
 
 
@@ -4,7 +4,7 @@ from fastapi import Request
 from app.models.paytr_models import PaytrConfig, PaymentRequest, CallbackData
 from app.services.paytr_service import paytr_service
 import logging
-from app.utils.database import db_cursor
+from app.services.job_queue_service import enqueue
 from datetime import datetime, date, time, timedelta
 from zoneinfo import ZoneInfo
 from fastapi import Response
@@ -52,56 +52,18 @@ async def handle_callback(request: Request):
             # ya da loglayıp OK dönebilirsin (saldırı ise log kirlenmesin diye).
             return Response(content="OK", media_type="text/plain") 
 
-        # Sadece SUCCESS durumunda işlem yap
+        # Sadece SUCCESS durumunda işlem yap. Abonelik aktivasyonu kalıcı kuyruğa yazılır:
+        # PayTR'a hemen OK dönülür, DB hatasında iş kendi kendine tekrar denenir.
+        # merchant_oid ile dedupe edildiği için bekleyen iş varken gelen tekrar callback ikinci iş
+        # üretmez; iş öldüyse (dead) sonraki PayTR denemesi yeni iş açar (handler idempotent).
         if callback.status == "success":
             sub_id = callback.merchant_oid.removeprefix("SUB")
-
-            with db_cursor(dict_cursor=True) as cur:
-                # 1) Request kaydını çek
-                cur.execute("""
-                    SELECT * FROM courier_subscription_requests
-                    WHERE id = %(id)s
-                """, {"id": sub_id})
-                row = cur.fetchone()
-
-                # --- KRİTİK DÜZELTME BURADA ---
-                if not row:
-                    logging.error(f"FATAL: Ödeme başarılı ama Request ID DB'de bulunamadı: {sub_id}")
-                    # Kayıt yoksa yapacak bir şey yok, PayTR'a OK dönüp döngüyü kıralım.
-                    return Response(content="OK", media_type="text/plain")
-
-                # Kayıt varsa işleme devam et
-                try:
-                    # 2) Yeni subscription INSERT
-                    cur.execute("""
-                        INSERT INTO courier_package_subscriptions
-                        (id,courier_id, package_id, start_date, end_date, is_active)
-                        VALUES
-                        (%(sub_id)s,%(courier_id)s, %(package_id)s, %(start)s, %(end)s, TRUE)
-                        RETURNING id;
-                    """, {
-                        "sub_id": sub_id,
-                        "courier_id": row["courier_id"],
-                        "package_id": row["package_id"],
-                        "start": row["start_date"],
-                        "end": row["end_date"],
-                    })
-
-                    # 3) Ödeme durumunu güncelle
-                    cur.execute("""
-                        UPDATE courier_subscription_requests
-                        SET payment_status = 'completed', is_active = TRUE
-                        WHERE id = %(id)s
-                    """, {"id": sub_id})
-                    
-                    logging.info(f"Payment processed successfully for ID: {sub_id}")
-
-                except Exception as db_err:
-                    logging.error(f"DB Transaction Error for {sub_id}: {str(db_err)}")
-                    # Veritabanı hatası varsa 500 fırlatabiliriz ki PayTR sonra tekrar denesin.
-                    # VEYA manuel düzeltme yapacaksan 'OK' dönüp loga bakarsın.
-                    # Şimdilik sonsuz döngüden çıkmak için OK dönüyoruz:
-                    return Response(content="OK", media_type="text/plain")
+            await enqueue(
+                "paytr.subscription_paid",
+                {"subscription_request_id": sub_id},
+                dedupe_key=f"paytr:{callback.merchant_oid}",
+            )
+            logging.info(f"Payment queued for processing: {sub_id}")
 
         else:
             # Ödeme başarısız (status != success)
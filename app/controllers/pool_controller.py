@@ -1,6 +1,7 @@
 from fastapi import HTTPException, status
-from ..models.pool_model import PoolPushReq
+from ..models.pool_model import PoolPushReq, BatchAcceptReq
 from ..services import pool_service as svc
+from ..services import order_batching_service as batch_svc
 
 async def get_nearby_pool_orders(claims: dict, page: int, size: int):
     roles = claims.get("role") or claims.get("roles") or []
@@ -64,3 +65,35 @@ async def delete_pool_order(order_id: str, claims: dict):
             )    
     
     return await svc.delete_pool_order(order_id)
+
+
+async def get_batch_offers(claims: dict):
+    roles = claims.get("role") or claims.get("roles") or []
+    if isinstance(roles, str):
+        roles = [roles]
+
+    if "Admin" not in roles and "Courier" not in roles:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Unauthorized to access batch offers"
+        )
+
+    driver_id = claims.get("userId")
+
+    return await batch_svc.get_batch_offers_for_courier(driver_id)
+
+
+async def accept_batch(req: BatchAcceptReq, claims: dict):
+    roles = claims.get("role") or claims.get("roles") or []
+    if isinstance(roles, str):
+        roles = [roles]
+
+    if "Courier" not in roles:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only couriers can accept batches"
+        )
+
+    courier_id = claims.get("userId")
+
+    return await batch_svc.accept_batch(courier_id, req.order_ids)
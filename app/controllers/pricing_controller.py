@@ -0,0 +1,23 @@
+from typing import Any, Dict, List
+from app.services import job_price_service as service
+
+
+async def quote(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Tek fiyat teklifi"""
+    results, error = await service.calculate_job_prices([item])
+    if error:
+        return {"success": False, "message": error, "data": {}}
+
+    result = results[0]
+    if result.get("error"):
+        return {"success": False, "message": result["error"], "data": {}}
+    result.pop("error", None)
+    return {"success": True, "message": "Fiyat hesaplandı", "data": result}
+
+
+async def quote_batch(items: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Toplu fiyat teklifi (sonuçlar istek sırasıyla)"""
+    results, error = await service.calculate_job_prices(items)
+    if error:
+        return {"success": False, "message": error, "data": []}
+    return {"success": True, "message": "Fiyatlar hesaplandı", "data": results}
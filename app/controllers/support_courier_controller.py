@@ -5,7 +5,9 @@ from app.services import support_courier_service as svc
 async def get_support_couriers(
     limit: int = 50,
     offset: int = 0,
-    search: Optional[str] = None
+    search: Optional[str] = None,
+    state_id: Optional[int] = None,
+    city_id: Optional[int] = None
 ) -> Dict[str, Any]:
     """
     Çağrı merkezi için kurye listesi controller'ı
@@ -13,7 +15,9 @@ async def get_support_couriers(
     success, result = await svc.get_support_couriers(
         limit=limit,
         offset=offset,
-        search=search
+        search=search,
+        state_id=state_id,
+        city_id=city_id
     )
     
     if not success:
@@ -4,9 +4,10 @@ from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from app.routes import contact, general_setting,dealer ,notification, package, restaurant_menu, vehicle
 from .routes import (auth,admin,campaign,company_package,extra_service, admin_job,driver,courier_package ,jobs, city_price,payments, system,restaurant_package_price,support_ticket,support,support_module,courier,carrier_type, geo, file, restaurant, subsection, 
-                     cargotype, banner,company, paytr_route,order, gps_route, courier_rating,courier_package_subscriptions, map, restaurant_job, dealer_job, dealer_restaurant, dealer_company, dealer_profile, message_route, pool, user, corporate, corporate_job, corporate_profile, vehicle_product, user_job, websocket)
+                     cargotype, banner,company, paytr_route,order, gps_route, courier_rating,courier_package_subscriptions, map, restaurant_job, dealer_job, dealer_restaurant, dealer_company, dealer_profile, message_route, pool, user, corporate, corporate_job, corporate_profile, vehicle_product, user_job, websocket, pricing)
 from .utils.init_db import init_db
 from app.utils.config import APP_ENV, get_database_url
+import os
 import logging
 import asyncio
 from fastapi.staticfiles import StaticFiles
@@ -72,6 +73,38 @@ async def on_startup():
         print(f"[BOOT][ERROR] init_db başarısız: {e}")
         raise
     
+    # Konfigürasyon önbelleği versiyon senkronizasyonu (banner, kampanya, ayarlar, fiyatlar)
+    try:
+        from app.utils.config_cache import start_config_cache_sync
+        asyncio.create_task(start_config_cache_sync())
+        print("[BOOT] Config cache sync started")
+    except Exception as e:
+        print(f"[BOOT][WARNING] Config cache sync failed to start: {e}")
+
+    # Geo referans verisini belleğe al (ülke / il / ilçe listeleri DB'ye gitmez)
+    try:
+        from app.services.geo_reference_cache import geo_reference_cache
+        await geo_reference_cache.ensure_loaded()
+        print(f"[BOOT] Geo reference cache loaded: {geo_reference_cache.stats()}")
+    except Exception as e:
+        print(f"[BOOT][WARNING] Geo reference cache failed to load: {e}")
+
+    # Koordinat -> şehir/il çözümleyici (sınır poligonları + şehir merkezleri)
+    try:
+        from app.services.geo_resolver import geo_resolver
+        await geo_resolver.ensure_loaded()
+        print(f"[BOOT] Geo resolver loaded: {geo_resolver.stats()}")
+    except Exception as e:
+        print(f"[BOOT][WARNING] Geo resolver failed to load: {e}")
+
+    # Fiyatlama motoru (şehir ızgarası + city_prices + araç ürünleri bellekte)
+    try:
+        from app.services.pricing_engine import pricing_engine
+        await pricing_engine.ensure_fresh()
+        print(f"[BOOT] Pricing engine loaded: {pricing_engine.stats()}")
+    except Exception as e:
+        print(f"[BOOT][WARNING] Pricing engine failed to load: {e}")
+
     # Periyodik rota kontrolü task'ını başlat (yedek mekanizma)
     try:
         from app.services.periodic_route_check import start_periodic_check
@@ -79,6 +112,73 @@ async def on_startup():
         print("[BOOT] Periodic route check started")
     except Exception as e:
         print(f"[BOOT][WARNING] Periodic route check failed to start: {e}")
+
+    # Sipariş teklif dalgalarının zaman aşımı kontrolü
+    try:
+        from app.services.order_watch_service import start_periodic_wave_check
+        asyncio.create_task(start_periodic_wave_check(interval_seconds=15))
+        print("[BOOT] Periodic order offer wave check started")
+    except Exception as e:
+        print(f"[BOOT][WARNING] Periodic wave check failed to start: {e}")
+
+    # Access token iptal listesi (ban / silme / logout) - worker'lar arası senkron
+    try:
+        from app.services.token_revocation_service import start_periodic_revocation_sync
+        asyncio.create_task(start_periodic_revocation_sync())
+        print("[BOOT] Token revocation sync started")
+    except Exception as e:
+        print(f"[BOOT][WARNING] Token revocation sync failed to start: {e}")
+
+    # Süresi dolmuş / revoke edilmiş refresh token temizliği
+    try:
+        from app.services.auth_service import start_periodic_refresh_token_purge
+        asyncio.create_task(start_periodic_refresh_token_purge())
+        print("[BOOT] Refresh token purge started")
+    except Exception as e:
+        print(f"[BOOT][WARNING] Refresh token purge failed to start: {e}")
+
+    # Mail outbox gönderici (toplu bildirimler)
+    try:
+        from app.services.mail_dispatch_service import start_mail_dispatcher
+        asyncio.create_task(start_mail_dispatcher())
+        print("[BOOT] Mail dispatcher started")
+    except Exception as e:
+        print(f"[BOOT][WARNING] Mail dispatcher failed to start: {e}")
+
+    # Kurye günlük istatistiklerinin ilk backfill'i tamamlanmadıysa işi kuyruğa al
+    # (iş ölürse tamamlanma kaydı yazılmaz, sonraki açılışta yeniden kuyruğa girer)
+    try:
+        from app.services.courier_stats_service import is_backfill_done
+        from app.services.job_queue_service import enqueue
+        if not await is_backfill_done():
+            await enqueue("courier_stats.rebuild", {}, dedupe_key="courier_stats.rebuild:initial")
+            print("[BOOT] Courier stats backfill enqueued")
+    except Exception as e:
+        print(f"[BOOT][WARNING] Courier stats backfill failed to enqueue: {e}")
+
+    # Çevrimiçi event compaction işi (günde bir; kendini yeniden kuyruğa alır)
+    try:
+        from app.services.presence_service import next_compaction_dedupe_key
+        from app.services.job_queue_service import enqueue
+        await enqueue("presence.compact", {}, dedupe_key=next_compaction_dedupe_key())
+    except Exception as e:
+        print(f"[BOOT][WARNING] Presence compaction failed to enqueue: {e}")
+
+    # Kalıcı iş kuyruğu worker'ı (ayrı process için: python -m app.worker)
+    if os.getenv("JOB_WORKER_IN_PROCESS", "true").lower() == "true":
+        try:
+            from app.services.job_queue_service import run_worker
+            asyncio.create_task(run_worker())
+            print("[BOOT] Job queue worker started")
+        except Exception as e:
+            print(f"[BOOT][WARNING] Job queue worker failed to start: {e}")
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    from app.services.mail_service import close_client
+    await close_client()
+
 app.mount(
     "/paytr",
     StaticFiles(directory=str(PAYTR_DIR), html=True),
@@ -126,6 +226,7 @@ app.include_router(package.router)
 app.include_router(payments.router)
 app.include_router(paytr_route.router)
 app.include_router(pool.router)
+app.include_router(pricing.router)
 app.include_router(restaurant.router)
 app.include_router(restaurant_job.router)
 app.include_router(restaurant_menu.router)
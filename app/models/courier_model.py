@@ -182,6 +182,7 @@ class CourierHistoryRes(BaseModel):
     success: bool
     message: str
     data: List[CourierHistory] = Field(default_factory=list)
+    next_cursor: Optional[str] = None
 
 class CourierOrderStatusChangeReq(BaseModel):
     new_status: OrderStatus
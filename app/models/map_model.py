@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Tuple, Optional, List
 
 class Coordinate(BaseModel):
@@ -17,6 +17,7 @@ class RouteResponse(BaseModel):
     driver: Coordinate
     pickup: Coordinate
     dropoff: Coordinate
+    provider: Optional[str] = None  # Rotayı üreten sağlayıcı (osrm, serpapi, offline)
 
 class CourierRouteResponse(BaseModel):
     """SerpAPI Google Maps Directions için kurye rota response modeli"""
@@ -27,4 +28,33 @@ class CourierRouteResponse(BaseModel):
     driver: Coordinate
     pickup: Coordinate
     dropoff: Coordinate
-    steps: Optional[List[dict]] = None  # Turn-by-turn talimatlar (isteğe bağlı)
\ No newline at end of file
+    steps: Optional[List[dict]] = None  # Turn-by-turn talimatlar (isteğe bağlı)
+    provider: Optional[str] = None  # Rotayı üreten sağlayıcı (osrm, serpapi, offline)
+
+class MultiStopRouteRequest(BaseModel):
+    """Kurye konumundan başlayarak sırayla gidilecek duraklar (en fazla 25)"""
+    stops: List[Coordinate] = Field(..., min_length=1, max_length=25)
+
+class RouteLeg(BaseModel):
+    distance: float  # metre
+    duration: float  # saniye
+    polyline: Optional[str] = None
+
+class MultiStopRouteResponse(BaseModel):
+    route_polyline: Optional[str] = None
+    distance: float
+    duration: float
+    driver: Coordinate
+    stops: List[Coordinate]
+    legs: List[RouteLeg]
+    steps: Optional[List[dict]] = None
+    provider: Optional[str] = None
+
+class MatrixRequest(BaseModel):
+    sources: List[Coordinate]
+    destinations: List[Coordinate]
+
+class MatrixResponse(BaseModel):
+    durations: List[List[Optional[float]]]  # saniye, satır = kaynak
+    distances: List[List[Optional[float]]]  # metre
+    provider: Optional[str] = None  # "cache" = tüm hücreler cache'ten geldi
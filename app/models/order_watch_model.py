@@ -7,5 +7,9 @@ class OrderWatch(BaseModel):
     restaurant_id: UUID
     avalible_drivers: list[UUID] | None = None
     rejected_drivers: list[UUID] | None = None
+    offered_drivers: list[UUID] | None = None
+    offer_wave: int = 0
+    wave_started_at: datetime | None = None
     last_check: datetime | None = None
     closed: bool = False
+    exhausted: bool = False
@@ -25,4 +25,30 @@ class PoolOrderRes(BaseModel):
     amount: Decimal
     restaurant_name: str
     restaurant_address: str
-    restaurant_phone: str
\ No newline at end of file
+    restaurant_phone: str
+
+class BatchStop(BaseModel):
+    order_id: UUID
+    kind: str  # pickup | dropoff
+    lat: float
+    lng: float
+
+class BatchOfferRes(BaseModel):
+    order_ids: list[UUID]
+    order_codes: list[str]
+    restaurant_names: list[str]
+    total_amount: Decimal
+    stops: list[BatchStop]
+    duration: float
+    distance: float
+
+class BatchAcceptReq(BaseModel):
+    order_ids: list[UUID]
+
+class BatchTripRes(BaseModel):
+    trip_id: UUID
+    order_ids: list[UUID]
+    stops: list[BatchStop]
+    duration: float
+    distance: float
+    created_at: datetime
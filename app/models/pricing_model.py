@@ -0,0 +1,40 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List, Literal
+from uuid import UUID
+
+
+class QuoteRequest(BaseModel):
+    """Tek fiyat teklifi isteği"""
+    vehicleProductId: Optional[UUID] = Field(None, description="Araç ürün ID'si")
+    vehicleTemplate: Optional[Literal["motorcycle", "minivan", "panelvan", "kamyonet", "kamyon"]] = Field(
+        None, description="Araç kalıbı (vehicleProductId yoksa)"
+    )
+    pickupCoordinates: Optional[List[float]] = Field(None, min_length=2, max_length=2, description="[lat, lng]")
+    dropoffCoordinates: Optional[List[float]] = Field(None, min_length=2, max_length=2, description="[lat, lng]")
+    cityId: Optional[int] = Field(None, description="Şehir ID'si (yoksa alış noktasından bulunur)")
+    extraServicesTotal: float = Field(0.0, ge=0, description="Ek hizmetler toplamı")
+
+    def to_engine_item(self) -> dict:
+        return {
+            "vehicle_product_id": self.vehicleProductId,
+            "vehicle_template": self.vehicleTemplate,
+            "pickup_coords": self.pickupCoordinates,
+            "dropoff_coords": self.dropoffCoordinates,
+            "city_id": self.cityId,
+            "extra_services_total": self.extraServicesTotal,
+        }
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "vehicleTemplate": "minivan",
+                "pickupCoordinates": [41.0082, 28.9784],
+                "dropoffCoordinates": [41.0422, 29.0083],
+                "extraServicesTotal": 0
+            }
+        }
+
+
+class BatchQuoteRequest(BaseModel):
+    """Toplu fiyat teklifi isteği (ör. adres formu önizlemesi)"""
+    items: List[QuoteRequest] = Field(..., min_length=1, description="Teklif listesi")
@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Query, Depends, HTTPException, Path, Body
-from typing import Literal, Optional
+from typing import List, Literal, Optional
 from uuid import UUID
 from app.models.admin_model import AdminRegisterReq
 from app.models.corporate_user_model import CommissionRateSet
@@ -23,6 +23,8 @@ async def get_all_users(
     search: Optional[str] = Query(None, description="Arama: Email, name, phone üzerinde arama yapar"),
     limit: int = Query(50, ge=1, le=200, description="Her tip için maksimum kayıt sayısı"),
     offset: int = Query(0, ge=0, description="Her tip için offset"),
+    cursor: Optional[List[str]] = Query(None, description="Önceki yanıttaki nextCursors değerleri (tip bazlı keyset sayfalama, offset yerine)"),
+    count: Literal["exact", "estimated", "none"] = Query("exact", description="Toplam sayılar: exact (COUNT), estimated (istatistik / sınırlı sayım), none"),
     claims: dict = Depends(require_roles(["Admin"]))
 ):
     """
@@ -40,7 +42,9 @@ async def get_all_users(
         user_type=type,
         search=search,
         limit=limit,
-        offset=offset
+        offset=offset,
+        cursors=cursor,
+        count_mode=count
     )
 
 
@@ -119,7 +123,8 @@ async def update_user_commission_rate(
 async def get_all_users_commissions(
     limit: int = Query(50, ge=1, le=200, description="Maksimum kayıt sayısı"),
     offset: int = Query(0, ge=0, description="Offset değeri"),
-    user_type: Optional[str] = Query(None, description="Filtreleme: 'corporate', 'dealer' veya None (hepsi)")
+    user_type: Optional[str] = Query(None, description="Filtreleme: 'corporate', 'dealer' veya None (hepsi)"),
+    cursor: Optional[str] = Query(None, description="Önceki yanıttaki nextCursor (offset yerine)")
 ):
     """
     Tüm kullanıcıların komisyon oranlarını getirir.
@@ -128,7 +133,32 @@ async def get_all_users_commissions(
     return await admin_user_controller.get_all_users_commissions(
         limit=limit,
         offset=offset,
-        user_type=user_type
+        user_type=user_type,
+        cursor=cursor
+    )
+
+
+@router.get(
+    "/users/directory",
+    summary="Kullanıcı Dizini Arama (Admin)",
+    description="Tüm rollerde (courier, restaurant, admin, dealer, support, corporate) tek sorgu ile arama. Sayfalama nextCursor ile yapılır. SADECE ADMIN ERİŞEBİLİR.",
+    dependencies=[Depends(require_roles(["Admin"]))],
+)
+async def search_user_directory(
+    search: Optional[str] = Query(None, description="İsim, email, telefon üzerinde arama"),
+    role: Optional[List[Literal["courier", "restaurant", "admin", "dealer", "support", "corporate"]]] = Query(None, description="Rol filtresi (birden fazla verilebilir)"),
+    status: Optional[str] = Query(None, description="Durum filtresi: active, inactive, deleted veya bayi durumu"),
+    include_deleted: bool = Query(False, description="Silinmiş kullanıcıları da getir"),
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="Önceki yanıttaki nextCursor")
+):
+    return await admin_user_controller.search_users(
+        search=search,
+        roles=role,
+        status=status,
+        include_deleted=include_deleted or status == "deleted",
+        limit=limit,
+        cursor=cursor
     )
 
 @router.get(
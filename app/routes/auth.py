@@ -1,4 +1,5 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Security
+from fastapi.security import HTTPAuthorizationCredentials
 from pydantic import BaseModel
 from ..models.auth_model import RegisterReq, LoginReq, RefreshReq, LogoutReq
 from ..controllers import auth_controller
@@ -16,8 +17,9 @@ async def login(req: LoginReq):
     return await auth_controller.login(req.email,req.password)
 
 @router.post("/logout")
-async def logout(req: LogoutReq):
-    return await auth_controller.logout(req.refreshToken)
+async def logout(req: LogoutReq, credentials: HTTPAuthorizationCredentials = Security(auth_controller.http_bearer)):
+    access_token = credentials.credentials if credentials else None
+    return await auth_controller.logout(req.refreshToken, access_token)
 
 @router.get("/me")
 async def me(driver=auth_controller.get_current_driver):
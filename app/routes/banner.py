@@ -1,12 +1,13 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
 from ..models.banner_model import BannerReq, UpdateBannerReq
 from ..controllers import banner_controller
+from ..utils.config_cache import config_response
 
 router = APIRouter(prefix="/api/Banner", tags=["Banners"])
 
 @router.get("/get-banners")
-async def get_all_banners():
-    return await banner_controller.get_all_banners()
+async def get_all_banners(request: Request):
+    return await config_response(request, "banners", banner_controller.get_all_banners, private=False)
 
 @router.post("/set-banner")
 async def add_banner(req: BannerReq):
@@ -1,14 +1,15 @@
-from fastapi import APIRouter, Depends, Path
+from fastapi import APIRouter, Depends, Path, Request
 from app.controllers.campaign_controller import *
 from app.models.campaign_model import CampaignCreate, CampaignUpdate
 from app.controllers.auth_controller import require_roles
+from app.utils.config_cache import config_response
 
 router = APIRouter(prefix="/api/admin/campaigns", tags=["Campaigns"])
 
 
 @router.get("", dependencies=[Depends(require_roles(["Admin"]))])
-async def list_route():
-    return await list_campaigns()
+async def list_route(request: Request):
+    return await config_response(request, "campaigns", list_campaigns)
 
 
 @router.get("/{id}", dependencies=[Depends(require_roles(["Admin"]))])
@@ -1,14 +1,15 @@
-from fastapi import APIRouter, Path, Depends
+from fastapi import APIRouter, Path, Depends, Request
 from app.models.city_price_model import CityPriceBase
 from app.controllers.city_price_controller import *
 from app.controllers.auth_controller import require_roles
+from app.utils.config_cache import config_response
 
 router = APIRouter(prefix="/api/admin/city-prices", tags=["City Prices"])
 
 
 @router.get("", dependencies=[Depends(require_roles(["Admin", "Restaurant", "Dealer", "Corporate"]))])
-async def list_route():
-    return await list_prices()
+async def list_route(request: Request):
+    return await config_response(request, "city_prices", list_prices)
 
 
 @router.get("/{price_id}", dependencies=[Depends(require_roles(["Admin"]))])
@@ -874,9 +874,10 @@ async def get_courier_history(
     date : str = Query(None, description="Tarih filtresi (YYYY-MM-DD formatında)"),
     page : int = Query(1, ge=1, description="Sayfa numarası"),
     page_size : int = Query(25, ge=1, le=100, description="Sayfa başına kayıt sayısı"),
+    cursor : str = Query(None, description="Önceki yanıttaki next_cursor (page yerine)"),
     _claims = Depends(auth_controller.require_roles(["Courier"]))
 ):
-    return await ctrl.get_courier_history(_claims, date, page, page_size)
+    return await ctrl.get_courier_history(_claims, date, page, page_size, cursor)
 
 @router.put(
     "/{order_id}/update-status",
@@ -69,6 +69,7 @@ async def get_dealer_couriers_gps(
 async def list_carriers(
     limit: int = Query(50, ge=1, le=200, description="Maksimum kayıt sayısı"),
     offset: int = Query(0, ge=0, description="Sayfalama offset"),
+    current_location: bool = Query(False, description="True ise kayıtlı il yerine taşıyıcının şu an bulunduğu il (GPS) kullanılır"),
     claims: dict = Depends(require_roles(["Dealer", "Admin"]))
 ):
     """Bayi'nin şehrindeki taşıyıcıları listeler endpoint"""
@@ -76,4 +77,4 @@ async def list_carriers(
     if not dealer_id:
         raise HTTPException(status_code=403, detail="Token'da bayi ID bulunamadı")
     
-    return await ctrl.list_carriers(UUID(dealer_id), limit, offset)
+    return await ctrl.list_carriers(UUID(dealer_id), limit, offset, current_location)
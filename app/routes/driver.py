@@ -1,6 +1,7 @@
-from fastapi import APIRouter, UploadFile, File, Depends
+from fastapi import APIRouter, UploadFile, File, Depends, Request
 from ..models.driver_model import VehicleReq
 from ..controllers import auth_controller, driver_controller
+from ..utils.config_cache import config_response
 
 router = APIRouter(prefix="/driver", tags=["Driver"])
 
@@ -43,5 +44,5 @@ async def earnings(driver=Depends(auth_controller.get_current_driver)):
     return await driver_controller.earnings(driver)
 
 @router.get("/banners")
-async def banners():
-    return await driver_controller.banners()
+async def banners(request: Request):
+    return await config_response(request, "banners", driver_controller.banners, key="driver", private=False)
@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 from app.controllers import general_setting_controller as ctrl
 from app.models.general_setting_model import GeneralSettingCreate, GeneralSettingUpdate
 from app.controllers.auth_controller import require_roles
+from app.utils.config_cache import config_response
 
 router = APIRouter(prefix="/api/GeneralSetting", tags=["GeneralSetting"])
 
@@ -12,8 +13,8 @@ async def create(req: GeneralSettingCreate):
 
 # ✅ SADECE ADMIN OKUYABİLİR
 @router.get("/get", dependencies=[Depends(require_roles(["Admin"]))])
-async def get():
-    return await ctrl.get()
+async def get(request: Request):
+    return await config_response(request, "general_settings", ctrl.get)
 
 # ✅ SADECE ADMIN GÜNCELLEYEBİLİR
 @router.patch("/update", dependencies=[Depends(require_roles(["Admin"]))])
@@ -1,36 +1,54 @@
-from fastapi import APIRouter, Query, HTTPException
+from fastapi import APIRouter, Query, HTTPException, Request, Depends
 from typing import Optional, List
 from app.services.geo_service import (
     list_countries, list_states_by_country, list_cities_by_state,
-    get_country_by_id, get_state_by_id
+    get_country_by_id, get_state_by_id, geo_data_version, reload_geo_cache
 )
 from app.models.geo_model import CountryOut, StateOut, CityOut
+from app.controllers.auth_controller import require_roles
+from app.utils.http_cache import make_etag, cached_json_response
 
 
 router = APIRouter(prefix="/geo", tags=["Geo"])
 
+# Referans veri nadiren değişir; istemci bir gün boyunca tekrar sormadan kullanabilir
+GEO_CACHE_MAX_AGE = 86400
+
+
+def _respond(request: Request, data):
+    etag = make_etag("geo", geo_data_version(), request.url.path, request.url.query)
+    return cached_json_response(request, data, etag, max_age=GEO_CACHE_MAX_AGE)
+
 @router.get("/countries", response_model=List[CountryOut], summary="Ülkeleri listele")
-async def get_countries(q: Optional[str] = Query(None, description="İsme göre arama"),
+async def get_countries(request: Request,
+                  q: Optional[str] = Query(None, description="İsme göre arama"),
                   limit: int = Query(50, ge=1, le=200),
                   offset: int = Query(0, ge=0)):
-    return await list_countries(q=q, limit=limit, offset=offset)
+    return _respond(request, await list_countries(q=q, limit=limit, offset=offset))
 
 @router.get("/states", response_model=List[StateOut], summary="Bir ülkenin eyalet/illerini listele")
-async def get_states(country_id: int = Query(..., description="Country ID"),
+async def get_states(request: Request,
+               country_id: int = Query(..., description="Country ID"),
                q: Optional[str] = Query(None),
                limit: int = Query(100, ge=1, le=500),
                offset: int = Query(0, ge=0)):
     # ülke var mı?
     if not await get_country_by_id(country_id):
         raise HTTPException(status_code=404, detail="Country not found")
-    return await list_states_by_country(country_id, q=q, limit=limit, offset=offset)
+    return _respond(request, await list_states_by_country(country_id, q=q, limit=limit, offset=offset))
 
 @router.get("/cities", response_model=List[CityOut], summary="Bir ilin şehirlerini/ilçelerini listele")
-async def get_cities(state_id: int = Query(..., description="State ID"),
+async def get_cities(request: Request,
+               state_id: int = Query(..., description="State ID"),
                q: Optional[str] = Query(None),
                limit: int = Query(100, ge=1, le=1000),
                offset: int = Query(0, ge=0)):
     # state var mı?
     if not await get_state_by_id(state_id):
         raise HTTPException(status_code=404, detail="State not found")
-    return await list_cities_by_state(state_id, q=q, limit=limit, offset=offset)
+    return _respond(request, await list_cities_by_state(state_id, q=q, limit=limit, offset=offset))
+
+@router.post("/reload", summary="Geo önbelleğini yeniden yükle (Admin)")
+async def reload_geo(_claims = Depends(require_roles(["Admin"]))):
+    stats = await reload_geo_cache()
+    return {"success": True, "message": "Geo cache reloaded", "data": stats}
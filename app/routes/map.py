@@ -1,6 +1,9 @@
 from fastapi import APIRouter, Depends
 from ..controllers import map_controller, auth_controller
-from ..models.map_model import RouteResponse, CourierRouteResponse
+from ..models.map_model import (
+    RouteResponse, CourierRouteResponse,
+    MultiStopRouteRequest, MultiStopRouteResponse, MatrixRequest, MatrixResponse
+)
 
 router = APIRouter(prefix="/map", tags=["Map"])
 
@@ -20,4 +23,28 @@ async def create_courier_route_serpapi(
     - Order'dan pickup ve dropoff noktaları alınır
     - SerpAPI ile Google Maps'ten rota hesaplanır
     """
-    return await map_controller.create_courier_route_serpapi(driver, order_id)
\ No newline at end of file
+    return await map_controller.create_courier_route_serpapi(driver, order_id)
+
+@router.post("/route/multi", response_model=MultiStopRouteResponse)
+async def create_multi_stop_route(
+    req: MultiStopRouteRequest,
+    driver=Depends(auth_controller.get_current_driver)
+):
+    """
+    Kurye konumundan başlayıp durakları sırayla dolaşan rota.
+
+    - Leg polyline'ları tek polyline'da birleştirilir
+    - Her leg için mesafe/süre ayrıca döner
+    """
+    return await map_controller.create_multi_stop_route(driver, req)
+
+@router.post("/matrix", response_model=MatrixResponse)
+async def get_travel_matrix(
+    req: MatrixRequest,
+    _claims=Depends(auth_controller.require_roles(["Admin", "Restaurant", "Dealer"]))
+):
+    """
+    Kaynaklardan hedeflere yol süresi (saniye) ve mesafe (metre) matrisi.
+    Dispatch kararları için N kuryeden pickup noktasına tek çağrıda ETA hesaplar.
+    """
+    return await map_controller.get_travel_matrix(req)
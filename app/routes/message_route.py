@@ -30,6 +30,11 @@ async def mark_read(request: ReadMessagesReq, user=Depends(get_current_driver)):
 async def history(
     chat_id: UUID,
     limit: int = Query(50, ge=1, le=200),
+    before: UUID | None = Query(None, description="Bu mesajdan daha eski mesajlar"),
+    after: UUID | None = Query(None, description="Bu mesajdan daha yeni mesajlar"),
     user = Depends(get_current_driver),
 ):
-    return await message_controller.fetch_history(str(chat_id), user["id"], "driver", limit)
\ No newline at end of file
+    return await message_controller.fetch_history(
+        str(chat_id), user["id"], "driver", limit,
+        str(before) if before else None, str(after) if after else None,
+    )
\ No newline at end of file
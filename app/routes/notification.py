@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from app.models.notification_model import NotificationRequest
 from app.controllers import notification_controller as ctrl
 from app.controllers import auth_controller
@@ -15,9 +15,46 @@ async def send_notification(
 ):
     return await ctrl.send(req)
 
+@router.get("/jobs/{job_id}")
+async def get_send_job(
+    job_id: str,
+    _claims = Depends(auth_controller.require_roles(["Admin"])),
+):
+    """Toplu gönderim ilerlemesi (toplam / gönderilen / başarısız / bekleyen)"""
+    return await ctrl.get_send_job(job_id)
+
 @router.get("/list", dependencies=[Depends(require_roles(["Admin", "Courier", "Restaurant"]))])
-async def list_notifications_route(claims=Depends(require_roles(["Admin", "Courier", "Restaurant"]))):
-    return await ctrl.list_notifications(claims)
+async def list_notifications_route(
+    limit: int = Query(50, ge=1, le=200),
+    before: str | None = Query(None, description="Önceki sayfanın son kaydının cursor değeri"),
+    claims=Depends(require_roles(["Admin", "Courier", "Restaurant"])),
+):
+    return await ctrl.list_notifications(claims, limit, before)
+
+
+@router.get("/inbox")
+async def inbox_route(
+    limit: int = Query(50, ge=1, le=200),
+    before: str | None = Query(None, description="Önceki sayfanın next_cursor değeri"),
+    claims=Depends(require_roles(["Admin", "Courier", "Restaurant"])),
+):
+    """Bildirim kutusu: okuma durumu + okunmamış sayısı, keyset sayfalı"""
+    return await ctrl.get_inbox(claims, limit, before)
+
+
+@router.get("/unread-count")
+async def unread_count_route(claims=Depends(require_roles(["Admin", "Courier", "Restaurant"]))):
+    return await ctrl.get_unread_count(claims)
+
+
+@router.post("/read-all")
+async def mark_all_read_route(claims=Depends(require_roles(["Admin", "Courier", "Restaurant"]))):
+    return await ctrl.mark_read(claims)
+
+
+@router.post("/{id}/read")
+async def mark_read_route(id: int, claims=Depends(require_roles(["Admin", "Courier", "Restaurant"]))):
+    return await ctrl.mark_read(claims, [id])
 
 
 @router.delete("/delete/{id}")
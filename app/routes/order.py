@@ -159,9 +159,10 @@ async def accept_order_by_courier(
 async def get_courier_orders_log(
     courier_id: str = Path(..., description="Courier ID"),
     limit: int = Query(50, ge=1, le=100, description="Page size"),
-    offset: int = Query(0, ge=0, description="Page offset")
+    offset: int = Query(0, ge=0, description="Page offset"),
+    cursor: Optional[str] = Query(None, description="Önceki yanıttaki next_cursor (offset yerine)")
 ):
-    return await ctrl.get_courier_orders_log(courier_id, limit, offset)
+    return await ctrl.get_courier_orders_log(courier_id, limit, offset, cursor)
 
 # order.py'nin sonuna ekle
 
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends
 from typing import List
-from ..models.pool_model import PoolPushReq, PoolOrderRes
+from ..models.pool_model import PoolPushReq, PoolOrderRes, BatchOfferRes, BatchAcceptReq, BatchTripRes
 from ..controllers import pool_controller as ctrl
 from ..controllers.auth_controller import require_roles
 
@@ -40,6 +40,24 @@ async def get_pool_orders(
 ):
     return await ctrl.get_nearby_pool_orders(claims, page=page, size=size)
 
+@router.get(
+    "/batches",
+    summary="Get Batch Offers",
+    description="Compatible pool orders grouped into single-trip offers (same restaurant or nearby pickups, similar direction) with an optimized stop sequence",
+    response_model=List[BatchOfferRes],
+)
+async def get_batch_offers(claims: dict = Depends(require_roles(["Admin", "Courier"]))):
+    return await ctrl.get_batch_offers(claims)
+
+@router.post(
+    "/batches/accept",
+    summary="Accept Batch",
+    description="Accept several pool orders as one trip; the route WebSocket then pushes the multi-stop route",
+    response_model=BatchTripRes,
+)
+async def accept_batch(req: BatchAcceptReq, claims: dict = Depends(require_roles(["Courier"]))):
+    return await ctrl.accept_batch(req, claims)
+
 @router.delete(
     "/{order_id}",
     summary="Delete Pool Order",
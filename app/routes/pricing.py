@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Depends
+from app.models.pricing_model import QuoteRequest, BatchQuoteRequest
+from app.controllers import pricing_controller as ctrl
+from app.controllers.auth_controller import require_roles
+
+router = APIRouter(prefix="/api/pricing", tags=["Pricing"])
+
+QUOTE_ROLES = ["Admin", "Dealer", "Corporate", "Restaurant", "Default"]
+
+
+@router.post(
+    "/quote",
+    summary="Fiyat teklifi",
+    description="Araç tipi ve alış/teslimat koordinatlarına göre yük fiyatı (bellek içi hesaplama).",
+    dependencies=[Depends(require_roles(QUOTE_ROLES))],
+)
+async def quote_route(body: QuoteRequest):
+    return await ctrl.quote(body.to_engine_item())
+
+
+@router.post(
+    "/quote/batch",
+    summary="Toplu fiyat teklifi",
+    description="Birden fazla alış/teslimat çifti için tek istekte fiyat hesaplar. Sonuçlar istek sırasıyla döner.",
+    dependencies=[Depends(require_roles(QUOTE_ROLES))],
+)
+async def quote_batch_route(body: BatchQuoteRequest):
+    return await ctrl.quote_batch([item.to_engine_item() for item in body.items])
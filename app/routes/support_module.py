@@ -20,6 +20,8 @@ async def get_support_couriers(
     limit: int = Query(50, ge=1, le=200, description="Maksimum kayıt sayısı"),
     offset: int = Query(0, ge=0, description="Sayfalama offset"),
     search: Optional[str] = Query(None, description="Arama terimi (ad, soyad, email, telefon)"),
+    state_id: Optional[int] = Query(None, description="Kuryenin şu an bulunduğu il (güncel konuma göre)"),
+    city_id: Optional[int] = Query(None, description="Kuryenin şu an bulunduğu şehir (güncel konuma göre)"),
     claims: dict = Depends(require_support_module(1))
 ):
     """
@@ -35,7 +37,9 @@ async def get_support_couriers(
     return await support_courier_controller.get_support_couriers(
         limit=limit,
         offset=offset,
-        search=search
+        search=search,
+        state_id=state_id,
+        city_id=city_id
     )
 
 
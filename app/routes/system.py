@@ -1,7 +1,25 @@
 from fastapi import APIRouter
+from ..services.routing_service import routing_service
+from ..utils.security import password_hasher
+from ..services.job_queue_service import job_queue_stats
 
 router = APIRouter(tags=["System"])
 
 @router.get("/health")
 async def health():
     return {"status": "ok"}
+
+@router.get("/health/routing")
+async def routing_health():
+    """Rota sağlayıcılarının circuit breaker durumları"""
+    return {"status": "ok", "providers": routing_service.status()}
+
+@router.get("/health/password-hasher")
+async def password_hasher_health():
+    """bcrypt thread havuzu: kuyruk derinliği, işlenen/reddedilen iş sayıları"""
+    return {"status": "ok", "hasher": password_hasher.stats()}
+
+@router.get("/health/jobs")
+async def jobs_health():
+    """Kalıcı iş kuyruğu: kuyruk bazlı bekleyen/çalışan/dead iş sayıları ve worker sayaçları"""
+    return {"status": "ok", "jobs": await job_queue_stats()}
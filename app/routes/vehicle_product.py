@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, Query, Path, Body
+from fastapi import APIRouter, Depends, Query, Path, Body, Request
 from uuid import UUID
 from typing import Optional
 from app.controllers import vehicle_product_controller as ctrl
@@ -9,6 +9,7 @@ from app.models.vehicle_product_model import (
     VehicleProductListResponse
 )
 from app.controllers.auth_controller import require_roles
+from app.utils.config_cache import config_response
 
 router = APIRouter(prefix="/api/admin/vehicles", tags=["Vehicle Products"])
 
@@ -35,6 +36,7 @@ async def create_vehicle_product(
     response_model=dict
 )
 async def list_vehicle_products(
+    request: Request,
     template: Optional[str] = Query(
         None,
         description="Araç tipi filtresi: motorcycle, minivan, panelvan, kamyonet, kamyon"
@@ -45,7 +47,11 @@ async def list_vehicle_products(
     )
 ):
     """Araç ürünleri listesi endpoint'i"""
-    return await ctrl.list_vehicle_products(template, isActive)
+    return await config_response(
+        request, "vehicle_products",
+        lambda: ctrl.list_vehicle_products(template, isActive),
+        key=(template, isActive),
+    )
 
 
 @router.get(
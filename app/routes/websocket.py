@@ -5,6 +5,7 @@ from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query
 from app.utils.websocket_manager import websocket_manager
 from app.services.courier_route_websocket_service import calculate_and_push_route
 from app.utils.security import decode_jwt
+from app.services.token_revocation_service import revocation_list
 import logging
 import asyncio
 
@@ -42,12 +43,19 @@ async def websocket_courier_route(
             "steps": [...]
         }
     }
+
+    Aynı bağlantı üzerinden sohbet mesajları da gelir (delivered_at push anında set edilir):
+    {
+        "type": "chat_message",
+        "chat_id": "uuid",
+        "data": {"message_id": "uuid", "sender_id": "uuid", "content": "...", "sent_at": "..."}
+    }
     """
     try:
         # JWT token kontrolü
         try:
             payload = decode_jwt(token)
-            if not payload:
+            if not payload or revocation_list.is_revoked(payload):
                 await websocket.close(code=1008, reason="Invalid token")
                 return
             
@@ -1,5 +1,5 @@
 from typing import Any, Dict, Literal, Optional, Tuple
-from ..utils.security import hash_pwd
+from ..utils.security import hash_pwd_async
 import app.utils.database_async as db
 
 JOB_TYPE_FILTERS = {
@@ -11,7 +11,7 @@ JOB_TYPE_FILTERS = {
 async def register_admin(first_name: str, last_name: str, email: str, password: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
     """Yeni admin kaydı oluşturur (birden fazla admin eklenebilir)"""
     try:
-        pwd_hash = hash_pwd(password)
+        pwd_hash = await hash_pwd_async(password)
 
         query = """
             INSERT INTO system_admins (first_name, last_name, email, password_hash)
@@ -1,539 +1,418 @@
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, List, Optional, Tuple, Callable
+from dataclasses import dataclass
+from datetime import datetime
+import asyncio
+import base64
+import os
 from app.utils.database_async import fetch_all, fetch_one, execute
+from app.services.user_directory_service import search_directory
+
+# Arama varken count="estimated" modunda en fazla bu kadar satır sayılır
+ADMIN_USER_COUNT_CAP = int(os.getenv("ADMIN_USER_COUNT_CAP", "1000"))
+# get_all_users'ta aynı anda sorgulanan kullanıcı tipi sayısı (havuz max_size=5; hepsini tüketmesin)
+ADMIN_USER_QUERY_CONCURRENCY = int(os.getenv("ADMIN_USER_QUERY_CONCURRENCY", "2"))
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+def _float(value):
+    return float(value) if value is not None else None
+
+
+def _hhmm(value):
+    return value.strftime("%H:%M") if value else None
+
+
+@dataclass
+class UserTypeSpec:
+    """Admin kullanıcı dizinindeki bir kullanıcı tipi (tablo + kolonlar + satır dönüşümü)"""
+    user_type: str
+    key: str
+    table: str
+    alias: str
+    select: str
+    joins: str
+    base_where: Optional[str]
+    search_columns: List[str]
+    to_dict: Callable[[Any], Dict[str, Any]]
+
+
+_USER_TYPE_SPECS: List[UserTypeSpec] = [
+    UserTypeSpec(
+        user_type="courier",
+        key="couriers",
+        table="drivers",
+        alias="d",
+        select="""
+            d.id AS userId, d.first_name AS firstName, d.last_name AS lastName,
+            d.email, d.phone, d.is_active AS isActive, d.deleted, d.deleted_at AS deletedAt,
+            d.created_at AS createdAt,
+            ob.country_id AS countryId, c.name AS countryName,
+            ob.state_id AS stateId, s.name AS stateName,
+            ob.working_type AS workingType, ob.vehicle_type AS vehicleType,
+            ob.vehicle_capacity AS vehicleCapacity, ob.vehicle_year AS vehicleYear
+        """,
+        joins="""
+            LEFT JOIN driver_onboarding ob ON ob.driver_id = d.id
+            LEFT JOIN countries c ON c.id = ob.country_id
+            LEFT JOIN states s ON s.id = ob.state_id
+        """,
+        base_where=None,
+        search_columns=["d.email", "d.first_name", "d.last_name", "d.phone"],
+        to_dict=lambda r: {
+            "userId": str(r["userid"]),
+            "firstName": r.get("firstname"),
+            "lastName": r.get("lastname"),
+            "email": r.get("email"),
+            "phone": r.get("phone"),
+            "isActive": r.get("isactive"),
+            "deleted": r.get("deleted"),
+            "deletedAt": _iso(r.get("deletedat")),
+            "createdAt": _iso(r.get("createdat")),
+            "countryId": r.get("countryid"),
+            "countryName": r.get("countryname"),
+            "stateId": r.get("stateid"),
+            "stateName": r.get("statename"),
+            "workingType": r.get("workingtype"),
+            "vehicleType": r.get("vehicletype"),
+            "vehicleCapacity": r.get("vehiclecapacity"),
+            "vehicleYear": r.get("vehicleyear"),
+        },
+    ),
+    UserTypeSpec(
+        user_type="restaurant",
+        key="restaurants",
+        table="restaurants",
+        alias="r",
+        select="""
+            r.id AS userId, r.email, r.name, r.contact_person AS contactPerson,
+            r.tax_number AS taxNumber, r.phone,
+            r.address_line1 AS addressLine1, r.address_line2 AS addressLine2,
+            r.latitude, r.longitude,
+            r.opening_hour AS openingHour, r.closing_hour AS closingHour,
+            r.created_at AS createdAt
+        """,
+        joins="",
+        base_where="(r.deleted IS NULL OR r.deleted = FALSE)",
+        search_columns=["r.email", "r.name", "r.phone", "r.contact_person"],
+        to_dict=lambda r: {
+            "userId": str(r["userid"]),
+            "email": r.get("email"),
+            "name": r.get("name"),
+            "contactPerson": r.get("contactperson"),
+            "taxNumber": r.get("taxnumber"),
+            "phone": r.get("phone"),
+            "addressLine1": r.get("addressline1"),
+            "addressLine2": r.get("addressline2"),
+            "fullAddress": f"{r.get('addressline1') or ''} {r.get('addressline2') or ''}".strip(),
+            "latitude": _float(r.get("latitude")),
+            "longitude": _float(r.get("longitude")),
+            "openingHour": _hhmm(r.get("openinghour")),
+            "closingHour": _hhmm(r.get("closinghour")),
+            "createdAt": _iso(r.get("createdat")),
+        },
+    ),
+    UserTypeSpec(
+        user_type="admin",
+        key="admins",
+        table="system_admins",
+        alias="a",
+        select="""
+            a.id AS userId, a.first_name AS firstName, a.last_name AS lastName,
+            a.email, a.created_at AS createdAt
+        """,
+        joins="",
+        base_where=None,
+        search_columns=["a.email", "a.first_name", "a.last_name"],
+        to_dict=lambda r: {
+            "userId": str(r["userid"]),
+            "firstName": r.get("firstname"),
+            "lastName": r.get("lastname"),
+            "email": r.get("email"),
+            "createdAt": _iso(r.get("createdat")),
+        },
+    ),
+    UserTypeSpec(
+        user_type="dealer",
+        key="dealers",
+        table="dealers",
+        alias="d",
+        select="""
+            d.id AS userId, d.name, d.surname, d.email, d.phone, d.address,
+            d.account_type AS accountType,
+            d.country_id AS countryId, c.name AS countryName,
+            d.city_id AS cityId, ci.name AS cityName,
+            d.state_id AS stateId, s.name AS stateName,
+            d.tax_office AS taxOffice, d.tax_number AS taxNumber,
+            d.iban, d.resume, d.status, d.created_at AS createdAt
+        """,
+        joins="""
+            LEFT JOIN countries c ON c.id = d.country_id
+            LEFT JOIN cities ci ON ci.id = d.city_id
+            LEFT JOIN states s ON s.id = d.state_id
+        """,
+        base_where=None,
+        search_columns=["d.email", "d.name", "d.surname", "d.phone"],
+        to_dict=lambda r: {
+            "userId": str(r["userid"]),
+            "name": r.get("name"),
+            "surname": r.get("surname"),
+            "email": r.get("email"),
+            "phone": r.get("phone"),
+            "address": r.get("address"),
+            "accountType": r.get("accounttype"),
+            "countryId": r.get("countryid"),
+            "countryName": r.get("countryname"),
+            "cityId": r.get("cityid"),
+            "cityName": r.get("cityname"),
+            "stateId": r.get("stateid"),
+            "stateName": r.get("statename"),
+            "taxOffice": r.get("taxoffice"),
+            "taxNumber": r.get("taxnumber"),
+            "iban": r.get("iban"),
+            "resume": r.get("resume"),
+            "status": r.get("status"),
+            "createdAt": _iso(r.get("createdat")),
+        },
+    ),
+    UserTypeSpec(
+        user_type="support",
+        key="supports",
+        table="support_users",
+        alias="su",
+        select="""
+            su.id AS userId, su.first_name AS firstName, su.last_name AS lastName,
+            su.email, su.phone, su.is_active AS isActive, su.access,
+            su.created_at AS createdAt
+        """,
+        joins="",
+        base_where="(su.deleted IS NULL OR su.deleted = FALSE)",
+        search_columns=["su.email", "su.first_name", "su.last_name", "su.phone"],
+        to_dict=lambda r: {
+            "userId": str(r["userid"]),
+            "firstName": r.get("firstname"),
+            "lastName": r.get("lastname"),
+            "fullName": f"{r.get('firstname') or ''} {r.get('lastname') or ''}".strip(),
+            "email": r.get("email"),
+            "phone": r.get("phone"),
+            "isActive": r.get("isactive"),
+            "access": r.get("access"),
+            "createdAt": _iso(r.get("createdat")),
+        },
+    ),
+    UserTypeSpec(
+        user_type="corporate",
+        key="corporates",
+        table="corporate_users",
+        alias="cu",
+        select="""
+            cu.id AS userId, cu.email, cu.phone,
+            cu.first_name AS firstName, cu.last_name AS lastName,
+            cu.is_active AS isActive, cu.commission_rate AS commissionRate,
+            cu.country_id AS countryId, cu.state_id AS stateId, cu.city_id AS cityId,
+            cu.address_line1 AS addressLine1, cu.address_line2 AS addressLine2,
+            cu.latitude, cu.longitude,
+            cu.tax_office AS taxOffice, cu.tax_number AS taxNumber,
+            cu.iban, cu.resume, cu.created_at AS createdAt
+        """,
+        joins="",
+        base_where="(cu.deleted IS NULL OR cu.deleted = FALSE)",
+        search_columns=["cu.email", "cu.first_name", "cu.last_name", "cu.phone"],
+        to_dict=lambda r: {
+            "userId": str(r["userid"]),
+            "email": r.get("email"),
+            "phone": r.get("phone"),
+            "firstName": r.get("firstname"),
+            "lastName": r.get("lastname"),
+            "isActive": r.get("isactive"),
+            "commissionRate": _float(r.get("commissionrate")),
+            "countryId": r.get("countryid"),
+            "stateId": r.get("stateid"),
+            "cityId": r.get("cityid"),
+            "addressLine1": r.get("addressline1"),
+            "addressLine2": r.get("addressline2"),
+            "fullAddress": f"{r.get('addressline1') or ''} {r.get('addressline2') or ''}".strip(),
+            "latitude": _float(r.get("latitude")),
+            "longitude": _float(r.get("longitude")),
+            "taxOffice": r.get("taxoffice"),
+            "taxNumber": r.get("taxnumber"),
+            "iban": r.get("iban"),
+            "resume": r.get("resume"),
+            "createdAt": _iso(r.get("createdat")),
+        },
+    ),
+]
+
+
+def encode_user_cursor(user_type: str, created_at: datetime, user_id: str) -> str:
+    raw = f"{user_type}|{created_at.isoformat()}|{user_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_user_cursor(cursor: str) -> Tuple[str, datetime, str]:
+    """'courier|2024-01-01T00:00:00+00:00|uuid' (base64) -> (tip, created_at, id)"""
+    user_type, created_at, user_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+    return user_type, datetime.fromisoformat(created_at), user_id
+
+
+async def _count_users(spec: UserTypeSpec, where: str, params: List[Any], count_mode: str) -> Tuple[Optional[int], bool]:
+    """(sayı, kesin mi) döner. count_mode: exact | estimated | none"""
+    if count_mode == "none":
+        return None, False
+
+    if count_mode == "estimated":
+        if not params:
+            # İstatistiklerden tahmini satır sayısı (reltuples < 0: tablo hiç analiz edilmemiş)
+            row = await fetch_one(
+                "SELECT reltuples::bigint AS estimate FROM pg_class WHERE oid = to_regclass($1);",
+                spec.table,
+            )
+            if row and row["estimate"] is not None and row["estimate"] >= 0:
+                return int(row["estimate"]), False
+
+        row = await fetch_one(
+            f"""
+            SELECT COUNT(*) AS count FROM (
+                SELECT 1 FROM {spec.table} {spec.alias} {where} LIMIT {ADMIN_USER_COUNT_CAP + 1}
+            ) t
+            """,
+            *params,
+        )
+        count = int(row["count"]) if row else 0
+        return min(count, ADMIN_USER_COUNT_CAP), count <= ADMIN_USER_COUNT_CAP
+
+    row = await fetch_one(f"SELECT COUNT(*) AS count FROM {spec.table} {spec.alias} {where}", *params)
+    return (int(row["count"]) if row else 0), True
+
+
+async def _fetch_user_type(
+    spec: UserTypeSpec,
+    search: Optional[str],
+    limit: int,
+    offset: int,
+    cursor: Optional[Tuple[datetime, str]],
+    count_mode: str,
+) -> Dict[str, Any]:
+    """Tek kullanıcı tipi için liste + sayım (sırayla; aynı anda tek bağlantı tutar)"""
+    conditions = [spec.base_where] if spec.base_where else []
+    params: List[Any] = []
+
+    if search:
+        params.append(f"%{search.lower()}%")
+        conditions.append("(" + " OR ".join(f"LOWER({c}) LIKE $1" for c in spec.search_columns) + ")")
+
+    count_where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    count_params = list(params)
+
+    list_params = list(params)
+    if cursor:
+        list_params.extend(cursor)
+        conditions.append(
+            f"({spec.alias}.created_at, {spec.alias}.id) < (${len(list_params) - 1}, ${len(list_params)}::uuid)"
+        )
+    list_where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    list_params.extend([limit + 1, 0 if cursor else offset])
+    list_query = f"""
+        SELECT {spec.select}
+        FROM {spec.table} {spec.alias}
+        {spec.joins}
+        {list_where}
+        ORDER BY {spec.alias}.created_at DESC, {spec.alias}.id DESC
+        LIMIT ${len(list_params) - 1} OFFSET ${len(list_params)}
+    """
+
+    rows = list(await fetch_all(list_query, *list_params) or [])
+    count, exact = await _count_users(spec, count_where, count_params, count_mode)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = None
+    if has_more and rows[-1]["createdat"]:
+        next_cursor = encode_user_cursor(spec.user_type, rows[-1]["createdat"], str(rows[-1]["userid"]))
+
+    return {
+        "items": [spec.to_dict(r) for r in rows],
+        "count": count,
+        "exact": exact,
+        "next_cursor": next_cursor,
+    }
 
 
 async def get_all_users(
     user_type: Optional[str] = None,
     search: Optional[str] = None,
     limit: int = 50,
-    offset: int = 0
+    offset: int = 0,
+    cursors: Optional[List[str]] = None,
+    count_mode: str = "exact",
 ) -> Tuple[bool, Dict[str, Any] | str]:
     """
-    Admin tarafından tüm kullanıcıları getirir (Courier, Restaurant, Admin, Dealer)
+    Admin tarafından tüm kullanıcıları getirir (Courier, Restaurant, Admin, Dealer, Support, Corporate)
     
     Args:
         user_type: 'courier', 'restaurant', 'admin', 'dealer', 'support', 'corporate' 'all' (varsayılan: 'all')
         search: Email, name, phone üzerinde arama
         limit: Her tip için maksimum kayıt sayısı
-        offset: Her tip için offset
+        offset: Her tip için offset (cursor verilen tipte kullanılmaz)
+        cursors: Önceki yanıttaki nextCursors değerleri (tip bazlı keyset sayfalama)
+        count_mode: 'exact' (COUNT), 'estimated' (pg_class.reltuples / ADMIN_USER_COUNT_CAP ile sınırlı sayım), 'none'
+    
+    Tipler en fazla ADMIN_USER_QUERY_CONCURRENCY kadar eşzamanlı sorgulanır (havuz tükenmesin).
     
     Returns:
         Tuple[bool, Dict[str, Any] | str]: (success, data veya error message)
     """
     try:
-        result = {
-            "couriers": [],
-            "restaurants": [],
-            "admins": [],
-            "dealers": [],
-            "supports":[],
-            "corporates":[]
-        }
-        totals = {
-            "couriers": 0,
-            "restaurants": 0,
-            "admins": 0,
-            "dealers": 0,
-            "supports":0,
-            "corporates":0,
-            "total": 0
-        }
-
-        # Search için WHERE clause hazırla
-        search_clause = ""
-        search_params = []
-        if search:
-            search_term = f"%{search.lower()}%"
-            # Her tip için farklı search alanları
-            # Courier: email, first_name, last_name, phone
-            # Restaurant: email, name, phone
-            # Admin: email, first_name, last_name
-            # Dealer: email, name, surname, phone
-
-        # Couriers
-        if not user_type or user_type == "all" or user_type == "courier":
-            courier_query = """
-                SELECT
-                    d.id AS userId,
-                    d.first_name AS firstName,
-                    d.last_name AS lastName,
-                    d.email,
-                    d.phone,
-                    d.is_active AS isActive,
-                    d.deleted,
-                    d.deleted_at AS deletedAt,
-                    d.created_at AS createdAt,
-                    ob.country_id AS countryId,
-                    c.name AS countryName,
-                    ob.state_id AS stateId,
-                    s.name AS stateName,
-                    ob.working_type AS workingType,
-                    ob.vehicle_type AS vehicleType,
-                    ob.vehicle_capacity AS vehicleCapacity,
-                    ob.vehicle_year AS vehicleYear
-                FROM drivers d
-                LEFT JOIN driver_onboarding ob ON ob.driver_id = d.id
-                LEFT JOIN countries c ON c.id = ob.country_id
-                LEFT JOIN states s ON s.id = ob.state_id
-            """
-            params = []
-            
-            if search:
-                courier_query += """
-                    WHERE (
-                        LOWER(d.email) LIKE $1 OR
-                        LOWER(d.first_name) LIKE $1 OR
-                        LOWER(d.last_name) LIKE $1 OR
-                        LOWER(d.phone) LIKE $1
-                    )
-                """
-                params.append(f"%{search.lower()}%")
-                courier_query += f" ORDER BY d.created_at DESC LIMIT ${len(params) + 1} OFFSET ${len(params) + 2}"
-                params.extend([limit, offset])
-            else:
-                courier_query += " ORDER BY d.created_at DESC LIMIT $1 OFFSET $2"
-                params = [limit, offset]
-            
-            courier_rows = await fetch_all(courier_query, *params)
-            
-            result["couriers"] = [
-                {
-                    "userId": str(r["userid"]),
-                    "firstName": r.get("firstname"),
-                    "lastName": r.get("lastname"),
-                    "email": r.get("email"),
-                    "phone": r.get("phone"),
-                    "isActive": r.get("isactive"),
-                    "deleted": r.get("deleted"),
-                    "deletedAt": r.get("deletedat").isoformat() if r.get("deletedat") else None,
-                    "createdAt": r.get("createdat").isoformat() if r.get("createdat") else None,
-                    "countryId": r.get("countryid"),
-                    "countryName": r.get("countryname"),
-                    "stateId": r.get("stateid"),
-                    "stateName": r.get("statename"),
-                    "workingType": r.get("workingtype"),
-                    "vehicleType": r.get("vehicletype"),
-                    "vehicleCapacity": r.get("vehiclecapacity"),
-                    "vehicleYear": r.get("vehicleyear")
-                }
-                for r in (courier_rows or [])
-            ]
-            
-            # Count query for couriers
-            count_query = "SELECT COUNT(*) AS count FROM drivers d"
-            if search:
-                count_query += """
-                    WHERE (
-                        LOWER(d.email) LIKE $1 OR
-                        LOWER(d.first_name) LIKE $1 OR
-                        LOWER(d.last_name) LIKE $1 OR
-                        LOWER(d.phone) LIKE $1
-                    )
-                """
-                count_params = [f"%{search.lower()}%"]
-                count_row = await fetch_one(count_query, *count_params)
-            else:
-                count_row = await fetch_one("SELECT COUNT(*) AS count FROM drivers")
-            
-            totals["couriers"] = count_row.get("count", 0) if count_row else 0
-
-        # Restaurants
-        if not user_type or user_type == "all" or user_type == "restaurant":
-            restaurant_query = """
-                SELECT
-                    id AS userId,
-                    email,
-                    name,
-                    contact_person AS contactPerson,
-                    tax_number AS taxNumber,
-                    phone,
-                    address_line1 AS addressLine1,
-                    address_line2 AS addressLine2,
-                    latitude,
-                    longitude,
-                    opening_hour AS openingHour,
-                    closing_hour AS closingHour,
-                    created_at AS createdAt
-                FROM restaurants
-                WHERE (deleted IS NULL OR deleted = FALSE)
-            """
-            params = []
-            
-            if search:
-                restaurant_query += """
-                    AND (
-                        LOWER(email) LIKE $1 OR
-                        LOWER(name) LIKE $1 OR
-                        LOWER(phone) LIKE $1 OR
-                        LOWER(contact_person) LIKE $1
-                    )
-                """
-                params.append(f"%{search.lower()}%")
-                restaurant_query += f" ORDER BY created_at DESC LIMIT ${len(params) + 1} OFFSET ${len(params) + 2}"
-                params.extend([limit, offset])
-            else:
-                restaurant_query += " ORDER BY created_at DESC LIMIT $1 OFFSET $2"
-                params = [limit, offset]
-            
-            restaurant_rows = await fetch_all(restaurant_query, *params)
-            
-            result["restaurants"] = [
-                {
-                    "userId": str(r["userid"]),
-                    "email": r.get("email"),
-                    "name": r.get("name"),
-                    "contactPerson": r.get("contactperson"),
-                    "taxNumber": r.get("taxnumber"),
-                    "phone": r.get("phone"),
-                    "addressLine1": r.get("addressline1"),
-                    "addressLine2": r.get("addressline2"),
-                    "fullAddress": f"{r.get('addressline1') or ''} {r.get('addressline2') or ''}".strip(),
-                    "latitude": float(r["latitude"]) if r.get("latitude") is not None else None,
-                    "longitude": float(r["longitude"]) if r.get("longitude") is not None else None,
-                    "openingHour": r.get("openinghour").strftime("%H:%M") if r.get("openinghour") else None,
-                    "closingHour": r.get("closinghour").strftime("%H:%M") if r.get("closinghour") else None,
-                    "createdAt": r.get("createdat").isoformat() if r.get("createdat") else None
-                }
-                for r in (restaurant_rows or [])
-            ]
-            
-            # Count query for restaurants
-            if search:
-                count_query = """
-                    SELECT COUNT(*) AS count FROM restaurants
-                    WHERE (deleted IS NULL OR deleted = FALSE)
-                      AND (
-                        LOWER(email) LIKE $1 OR
-                        LOWER(name) LIKE $1 OR
-                        LOWER(phone) LIKE $1 OR
-                        LOWER(contact_person) LIKE $1
-                      )
-                """
-                count_params = [f"%{search.lower()}%"]
-                count_row = await fetch_one(count_query, *count_params)
-            else:
-                count_row = await fetch_one("SELECT COUNT(*) AS count FROM restaurants WHERE (deleted IS NULL OR deleted = FALSE)")
-            
-            totals["restaurants"] = count_row.get("count", 0) if count_row else 0
-
-        # Admins
-        if not user_type or user_type == "all" or user_type == "admin":
-            admin_query = """
-                SELECT
-                    id AS userId,
-                    first_name AS firstName,
-                    last_name AS lastName,
-                    email,
-                    created_at AS createdAt
-                FROM system_admins
-            """
-            params = []
-            
-            if search:
-                admin_query += """
-                    WHERE (
-                        LOWER(email) LIKE $1 OR
-                        LOWER(first_name) LIKE $1 OR
-                        LOWER(last_name) LIKE $1
-                    )
-                """
-                params.append(f"%{search.lower()}%")
-                admin_query += f" ORDER BY created_at DESC LIMIT ${len(params) + 1} OFFSET ${len(params) + 2}"
-                params.extend([limit, offset])
-            else:
-                admin_query += " ORDER BY created_at DESC LIMIT $1 OFFSET $2"
-                params = [limit, offset]
-            
-            admin_rows = await fetch_all(admin_query, *params)
-            
-            result["admins"] = [
-                {
-                    "userId": str(r["userid"]),
-                    "firstName": r.get("firstname"),
-                    "lastName": r.get("lastname"),
-                    "email": r.get("email"),
-                    "createdAt": r.get("createdat").isoformat() if r.get("createdat") else None
-                }
-                for r in (admin_rows or [])
-            ]
-            
-            # Count query for admins
-            if search:
-                count_query = """
-                    SELECT COUNT(*) AS count FROM system_admins
-                    WHERE (
-                        LOWER(email) LIKE $1 OR
-                        LOWER(first_name) LIKE $1 OR
-                        LOWER(last_name) LIKE $1
-                    )
-                """
-                count_params = [f"%{search.lower()}%"]
-                count_row = await fetch_one(count_query, *count_params)
-            else:
-                count_row = await fetch_one("SELECT COUNT(*) AS count FROM system_admins")
-            
-            totals["admins"] = count_row.get("count", 0) if count_row else 0
-
-        # Dealers
-        if not user_type or user_type == "all" or user_type == "dealer":
-            dealer_query = """
-                SELECT
-                    d.id AS userId,
-                    d.name,
-                    d.surname,
-                    d.email,
-                    d.phone,
-                    d.address,
-                    d.account_type AS accountType,
-                    d.country_id AS countryId,
-                    c.name AS countryName,
-                    d.city_id AS cityId,
-                    ci.name AS cityName,
-                    d.state_id AS stateId,
-                    s.name AS stateName,
-                    d.tax_office AS taxOffice,
-                    d.tax_number AS taxNumber,
-                    d.iban,
-                    d.resume,
-                    d.status,
-                    d.created_at AS createdAt
-                FROM dealers d
-                LEFT JOIN countries c ON c.id = d.country_id
-                LEFT JOIN cities ci ON ci.id = d.city_id
-                LEFT JOIN states s ON s.id = d.state_id
-            """
-            params = []
-            
-            if search:
-                dealer_query += """
-                    WHERE (
-                        LOWER(d.email) LIKE $1 OR
-                        LOWER(d.name) LIKE $1 OR
-                        LOWER(d.surname) LIKE $1 OR
-                        LOWER(d.phone) LIKE $1
-                    )
-                """
-                params.append(f"%{search.lower()}%")
-                dealer_query += f" ORDER BY d.created_at DESC LIMIT ${len(params) + 1} OFFSET ${len(params) + 2}"
-                params.extend([limit, offset])
-            else:
-                dealer_query += " ORDER BY d.created_at DESC LIMIT $1 OFFSET $2"
-                params = [limit, offset]
-            
-            dealer_rows = await fetch_all(dealer_query, *params)
-            
-            result["dealers"] = [
-                {
-                    "userId": str(r["userid"]),
-                    "name": r.get("name"),
-                    "surname": r.get("surname"),
-                    "email": r.get("email"),
-                    "phone": r.get("phone"),
-                    "address": r.get("address"),
-                    "accountType": r.get("accounttype"),
-                    "countryId": r.get("countryid"),
-                    "countryName": r.get("countryname"),
-                    "cityId": r.get("cityid"),
-                    "cityName": r.get("cityname"),
-                    "stateId": r.get("stateid"),
-                    "stateName": r.get("statename"),
-                    "taxOffice": r.get("taxoffice"),
-                    "taxNumber": r.get("taxnumber"),
-                    "iban": r.get("iban"),
-                    "resume": r.get("resume"),
-                    "status": r.get("status"),
-                    "createdAt": r.get("createdat").isoformat() if r.get("createdat") else None
-                }
-                for r in (dealer_rows or [])
-            ]
-            
-            # Count query for dealers
-            if search:
-                count_query = """
-                    SELECT COUNT(*) AS count FROM dealers d
-                    WHERE (
-                        LOWER(d.email) LIKE $1 OR
-                        LOWER(d.name) LIKE $1 OR
-                        LOWER(d.surname) LIKE $1 OR
-                        LOWER(d.phone) LIKE $1
-                    )
-                """
-                count_params = [f"%{search.lower()}%"]
-                count_row = await fetch_one(count_query, *count_params)
-            else:
-                count_row = await fetch_one("SELECT COUNT(*) AS count FROM dealers")
-            
-            totals["dealers"] = count_row.get("count", 0) if count_row else 0
-
-        #Support Users
-        if not user_type or user_type == "all" or user_type == "support":
-            support_query = """
-                SELECT
-                    id AS userId,
-                    first_name AS firstName,
-                    last_name AS lastName,
-                    email,
-                    phone,
-                    is_active AS isActive,
-                    access,
-                    created_at AS createdAt
-                FROM support_users
-                WHERE (deleted IS NULL OR deleted = FALSE)
-            """
-            params = []
-            
-            # Apply search filter
-            if search:
-                support_query += """
-                    AND (
-                        LOWER(email) LIKE $1 OR
-                        LOWER(first_name) LIKE $1 OR
-                        LOWER(last_name) LIKE $1 OR
-                        LOWER(phone) LIKE $1
-                    )
-                """
-                params.append(f"%{search.lower()}%")
-                support_query += f" ORDER BY created_at DESC LIMIT ${len(params) + 1} OFFSET ${len(params) + 2}"
-                params.extend([limit, offset])
-
-            else:
-                support_query += " ORDER BY created_at DESC LIMIT $1 OFFSET $2"
-                params = [limit, offset]
-            
-            support_rows = await fetch_all(support_query, *params)
-            
-            result["supports"] = [
-                {
-                    "userId": str(r["userid"]),
-                    "firstName": r.get("firstname"),
-                    "lastName": r.get("lastname"),
-                    "fullName": f"{r.get('firstname', '')} {r.get('lastname', '')}".strip(),
-                    "email": r.get("email"),
-                    "phone": r.get("phone"),
-                    "isActive": r.get("isactive"),
-                    "access": r.get("access"),
-                    "createdAt": r.get("createdat").isoformat() if r.get("createdat") else None
-                }
-                for r in (support_rows or [])
-            ]
-            
-            # --- Count query for support users ---
-            if search:
-                count_query = """
-                    SELECT COUNT(*) AS count FROM support_users
-                    WHERE (deleted IS NULL OR deleted = FALSE)
-                      AND (
-                        LOWER(email) LIKE $1 OR
-                        LOWER(first_name) LIKE $1 OR
-                        LOWER(last_name) LIKE $1 OR
-                        LOWER(phone) LIKE $1
-                      )
-                """
-                count_params = [f"%{search.lower()}%"]
-                count_row = await fetch_one(count_query, *count_params)
-            else:
-                count_row = await fetch_one("SELECT COUNT(*) AS count FROM support_users WHERE (deleted IS NULL OR deleted = FALSE)")
-            
-            totals["supports"] = count_row.get("count", 0) if count_row else 0
-
-        # Corporate (Kurumsal Kullanıcılar)
-        if not user_type or user_type == "all" or user_type == "corporate":
-            corporate_query = """
-                SELECT
-                    id AS userId,
-                    email,
-                    phone,
-                    first_name AS firstName,
-                    last_name AS lastName,
-                    is_active AS isActive,
-                    commission_rate AS commissionRate,
-                    country_id AS countryId,
-                    state_id AS stateId,
-                    city_id AS cityId,
-                    address_line1 AS addressLine1,
-                    address_line2 AS addressLine2,
-                    latitude,
-                    longitude,
-                    tax_office AS taxOffice,
-                    tax_number AS taxNumber,
-                    iban,
-                    resume,
-                    created_at AS createdAt
-                FROM corporate_users
-                WHERE (deleted IS NULL OR deleted = FALSE)
-            """
-            params = []
-            
-            if search:
-                corporate_query += """
-                    AND (
-                        LOWER(email) LIKE $1 OR
-                        LOWER(first_name) LIKE $1 OR
-                        LOWER(last_name) LIKE $1 OR
-                        LOWER(phone) LIKE $1 OR
-                    )
-                """
-                params.append(f"%{search.lower()}%")
-                corporate_query += f" ORDER BY created_at DESC LIMIT ${len(params) + 1} OFFSET ${len(params) + 2}"
-                params.extend([limit, offset])
-            else:
-                corporate_query += " ORDER BY created_at DESC LIMIT $1 OFFSET $2"
-                params = [limit, offset]
-            
-            corporate_rows = await fetch_all(corporate_query, *params)
-            
-            result["corporates"] = [
-                {
-                    "userId": str(r["userid"]),
-                    "email": r.get("email"),
-                    "name": r.get("name"),
-                    "contactPerson": r.get("contactperson"),
-                    "taxNumber": r.get("taxnumber"),
-                    "phone": r.get("phone"),
-                    "addressLine1": r.get("addressline1"),
-                    "addressLine2": r.get("addressline2"),
-                    "fullAddress": f"{r.get('addressline1') or ''} {r.get('addressline2') or ''}".strip(),
-                    "latitude": float(r["latitude"]) if r.get("latitude") is not None else None,
-                    "longitude": float(r["longitude"]) if r.get("longitude") is not None else None,
-                    "openingHour": r.get("openinghour").strftime("%H:%M") if r.get("openinghour") else None,
-                    "closingHour": r.get("closinghour").strftime("%H:%M") if r.get("closinghour") else None,
-                    "createdAt": r.get("createdat").isoformat() if r.get("createdat") else None
-                }
-                for r in (corporate_rows or [])
-            ]
-            
-            # Count query for corporate users
-            if search:
-                count_query = """
-                    SELECT COUNT(*) AS count FROM corporate_users
-                    WHERE (deleted IS NULL OR deleted = FALSE)
-                      AND (
-                        LOWER(email) LIKE $1 OR
-                        LOWER(name) LIKE $1 OR
-                        LOWER(phone) LIKE $1 OR
-                        LOWER(contact_person) LIKE $1
-                      )
-                """
-                count_params = [f"%{search.lower()}%"]
-                count_row = await fetch_one(count_query, *count_params)
-            else:
-                count_row = await fetch_one("SELECT COUNT(*) AS count FROM corporate_users WHERE (deleted IS NULL OR deleted = FALSE)")
-            
-            totals["corporates"] = count_row.get("count", 0) if count_row else 0
-
-        # Total count
-        # Bu kod kısım yerine başka kod yazıldı
-        #totals["total"] = totals["couriers"] + totals["restaurants"] + totals["admins"] + totals["dealers"] + totals["supportUsers"] 
-        
-        totals["total"] = 0
-        t_count = 0
-        for key in totals:
-            t_count += totals[key]
-        totals["total"] = t_count
+        if count_mode not in ("exact", "estimated", "none"):
+            return False, "count_mode 'exact', 'estimated' veya 'none' olmalı"
+
+        specs = [
+            spec for spec in _USER_TYPE_SPECS
+            if not user_type or user_type == "all" or user_type == spec.user_type
+        ]
+
+        type_cursors: Dict[str, Tuple[datetime, str]] = {}
+        for raw in cursors or []:
+            try:
+                ctype, created_at, uid = decode_user_cursor(raw)
+            except Exception:
+                return False, "Geçersiz cursor"
+            type_cursors[ctype] = (created_at, uid)
+
+        semaphore = asyncio.Semaphore(ADMIN_USER_QUERY_CONCURRENCY)
+
+        async def _fetch(spec: UserTypeSpec) -> Dict[str, Any]:
+            async with semaphore:
+                return await _fetch_user_type(
+                    spec, search, limit, offset, type_cursors.get(spec.user_type), count_mode
+                )
+
+        fetched = await asyncio.gather(*(_fetch(spec) for spec in specs))
+
+        result = {spec.key: [] for spec in _USER_TYPE_SPECS}
+        totals: Dict[str, Any] = {spec.key: 0 for spec in _USER_TYPE_SPECS}
+        next_cursors: Dict[str, Optional[str]] = {}
+        exact = True
+
+        for spec, data in zip(specs, fetched):
+            result[spec.key] = data["items"]
+            totals[spec.key] = data["count"]
+            next_cursors[spec.key] = data["next_cursor"]
+            exact = exact and data["exact"]
+
+        totals["total"] = (
+            None if count_mode == "none"
+            else sum(v for k, v in totals.items() if k != "total" and v)
+        )
 
         return True, {
             "users": result,
-            "totals": totals
+            "totals": totals,
+            "totalsExact": exact,
+            "nextCursors": next_cursors,
         }
 
     except Exception as e:
@@ -768,124 +647,107 @@ async def set_user_commission_rate(user_id: str, commission_rate: float, descrip
 async def get_all_users_commissions(
     limit: int = 50,
     offset: int = 0,
-    user_type: Optional[str] = None
+    user_type: Optional[str] = None,
+    cursor: Optional[str] = None
 ) -> Tuple[bool, Dict[str, Any] | str]:
     """
-    Admin tarafından tüm kullanıcıların (Corporate ve Dealer) komisyon oranlarını getirir
+    Admin tarafından tüm kullanıcıların (Corporate ve Dealer) komisyon oranlarını getirir.
+    user_directory üzerinden tek sorgu; iki rol birlikte created_at'e göre sayfalanır.
     
     Args:
         limit: Maksimum kayıt sayısı
-        offset: Offset değeri
+        offset: Offset değeri (cursor verilirse kullanılmaz)
         user_type: 'corporate', 'dealer', veya None (hepsi)
+        cursor: Önceki yanıttaki nextCursor
     
     Returns:
         Tuple[bool, Dict[str, Any] | str]: (success, data veya error message)
     """
     try:
+        roles = [user_type] if user_type in ("corporate", "dealer") else ["corporate", "dealer"]
+        page = await search_directory(roles=roles, limit=limit, offset=offset, cursor=cursor)
+
         result = {
             "corporate": [],
             "dealer": []
         }
+
+        for item in page["items"]:
+            d = item["details"]
+            if item["role"] == "corporate":
+                result["corporate"].append({
+                    "id": item["userId"],
+                    "email": item["email"],
+                    "phone": item["phone"],
+                    "firstName": d.get("first_name"),
+                    "lastName": d.get("last_name"),
+                    "isActive": d.get("is_active"),
+                    "commissionRate": item["commissionRate"],
+                    "commissionDescription": d.get("commission_description"),
+                    "countryId": d.get("country_id"),
+                    "stateId": d.get("state_id"),
+                    "cityId": d.get("city_id"),
+                    "addressLine1": d.get("address_line1"),
+                    "addressLine2": d.get("address_line2"),
+                    "createdAt": item["createdAt"]
+                })
+            else:
+                result["dealer"].append({
+                    "id": item["userId"],
+                    "name": d.get("name"),
+                    "surname": d.get("surname"),
+                    "email": item["email"],
+                    "address": d.get("address"),
+                    "accountType": d.get("account_type"),
+                    "countryId": d.get("country_id"),
+                    "cityId": d.get("city_id"),
+                    "stateId": d.get("state_id"),
+                    "taxOffice": d.get("tax_office"),
+                    "phone": item["phone"],
+                    "taxNumber": d.get("tax_number"),
+                    "iban": d.get("iban"),
+                    "resume": d.get("resume"),
+                    "status": d.get("status"),
+                    "commissionRate": item["commissionRate"],
+                    "commissionDescription": d.get("commission_description"),
+                    "createdAt": item["createdAt"]
+                })
+
+        counts = page["counts"] or {}
         totals = {
-            "corporate": 0,
-            "dealer": 0,
-            "total": 0
+            "corporate": counts.get("corporate", 0),
+            "dealer": counts.get("dealer", 0),
         }
-
-        # Corporate Users
-        if not user_type or user_type == "corporate":
-            corporate_query = """
-                SELECT 
-                    id, email, phone, first_name, last_name, is_active,
-                    commission_rate, commission_description,
-                    country_id, state_id, city_id,
-                    address_line1, address_line2, created_at
-                FROM corporate_users
-                WHERE (deleted IS NULL OR deleted = FALSE)
-                ORDER BY created_at DESC
-                LIMIT $1 OFFSET $2;
-            """
-            corporate_rows = await fetch_all(corporate_query, limit, offset)
-            
-            result["corporate"] = [
-                {
-                    "id": str(r["id"]),
-                    "email": r["email"],
-                    "phone": r["phone"],
-                    "firstName": r["first_name"],
-                    "lastName": r["last_name"],
-                    "isActive": r["is_active"],
-                    "commissionRate": float(r["commission_rate"]) if r.get("commission_rate") is not None else None,
-                    "commissionDescription": r.get("commission_description"),
-                    "countryId": int(r["country_id"]) if r.get("country_id") is not None else None,
-                    "stateId": int(r["state_id"]) if r.get("state_id") is not None else None,
-                    "cityId": int(r["city_id"]) if r.get("city_id") is not None else None,
-                    "addressLine1": r.get("address_line1"),
-                    "addressLine2": r.get("address_line2"),
-                    "createdAt": r["created_at"].isoformat() if r["created_at"] else None
-                }
-                for r in (corporate_rows or [])
-            ]
-            
-            # Count query for corporate
-            count_row = await fetch_one("""
-                SELECT COUNT(*) AS count 
-                FROM corporate_users
-                WHERE (deleted IS NULL OR deleted = FALSE);
-            """)
-            totals["corporate"] = count_row.get("count", 0) if count_row else 0
-
-        # Dealers
-        if not user_type or user_type == "dealer":
-            dealer_query = """
-                SELECT 
-                    id, name, surname, email, address, account_type,
-                    country_id, city_id, state_id,
-                    tax_office, phone, tax_number, iban, resume, status,
-                    commission_rate, commission_description,
-                    created_at
-                FROM dealers
-                ORDER BY created_at DESC
-                LIMIT $1 OFFSET $2;
-            """
-            dealer_rows = await fetch_all(dealer_query, limit, offset)
-            
-            result["dealer"] = [
-                {
-                    "id": str(r["id"]),
-                    "name": r["name"],
-                    "surname": r["surname"],
-                    "email": r["email"],
-                    "address": r.get("address"),
-                    "accountType": r.get("account_type"),
-                    "countryId": int(r["country_id"]) if r.get("country_id") is not None else None,
-                    "cityId": int(r["city_id"]) if r.get("city_id") is not None else None,
-                    "stateId": int(r["state_id"]) if r.get("state_id") is not None else None,
-                    "taxOffice": r.get("tax_office"),
-                    "phone": r.get("phone"),
-                    "taxNumber": r.get("tax_number"),
-                    "iban": r.get("iban"),
-                    "resume": r.get("resume"),
-                    "status": r.get("status"),
-                    "commissionRate": float(r["commission_rate"]) if r.get("commission_rate") is not None else None,
-                    "commissionDescription": r.get("commission_description"),
-                    "createdAt": r["created_at"].isoformat() if r["created_at"] else None
-                }
-                for r in (dealer_rows or [])
-            ]
-            
-            # Count query for dealers
-            count_row = await fetch_one("SELECT COUNT(*) AS count FROM dealers")
-            totals["dealer"] = count_row.get("count", 0) if count_row else 0
-
-        # Total count
         totals["total"] = totals["corporate"] + totals["dealer"]
 
         return True, {
             "users": result,
-            "totals": totals
+            "totals": totals,
+            "nextCursor": page["next_cursor"]
         }
 
     except Exception as e:
         return False, str(e)
 
+
+async def search_users(
+    search: Optional[str] = None,
+    roles: Optional[List[str]] = None,
+    status: Optional[str] = None,
+    include_deleted: bool = False,
+    limit: int = 50,
+    cursor: Optional[str] = None
+) -> Tuple[bool, Dict[str, Any] | str]:
+    """Tüm rollerde birleşik kullanıcı arama (user_directory)"""
+    try:
+        page = await search_directory(
+            search=search, roles=roles, status=status,
+            include_deleted=include_deleted, limit=limit, cursor=cursor
+        )
+        return True, {
+            "users": page["items"],
+            "totals": page["counts"],
+            "nextCursor": page["next_cursor"]
+        }
+    except Exception as e:
+        return False, str(e)
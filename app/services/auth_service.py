@@ -1,12 +1,23 @@
 import os
+import uuid
 import base64
+import asyncio
+import hashlib
+import logging
 from datetime import timedelta, datetime
 from typing import Optional, Dict, Any, Tuple
-from app.utils.database_async import fetch_one, execute
-from app.utils.security import hash_pwd, verify_pwd, create_jwt
+from app.utils.database_async import fetch_one, fetch_all, execute
+from app.utils.security import hash_pwd_async, verify_pwd_async, needs_rehash, create_jwt
+from app.services.token_revocation_service import ACCESS_TOKEN_TTL_MINUTES
 
+logger = logging.getLogger(__name__)
 
 REFRESH_TOKEN_TTL_DAYS = 7
+# Kullanıcı başına en fazla aktif refresh token (cihaz/oturum) sayısı
+REFRESH_TOKENS_PER_USER = int(os.getenv("REFRESH_TOKENS_PER_USER", "10"))
+# Süresi dolmuş / revoke edilmiş token'ların temizlik ayarları
+REFRESH_TOKEN_PURGE_INTERVAL = int(os.getenv("REFRESH_TOKEN_PURGE_INTERVAL", "3600"))
+REFRESH_TOKEN_PURGE_BATCH = int(os.getenv("REFRESH_TOKEN_PURGE_BATCH", "5000"))
 
 
 # === Yardımcı Fonksiyonlar ===
@@ -14,36 +25,110 @@ def _generate_refresh_token() -> str:
     return base64.b64encode(os.urandom(32)).decode("utf-8")
 
 
+def _hash_refresh_token(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
 def _refresh_expires_at() -> datetime:
     return datetime.utcnow() + timedelta(days=REFRESH_TOKEN_TTL_DAYS)
 
 
 async def _store_refresh_token(user_id: str | int, user_type: str, token: str, expires_at: datetime):
     query = """
-        INSERT INTO refresh_tokens (user_id, user_type, token, expires_at)
+        INSERT INTO refresh_tokens (user_id, user_type, token_hash, expires_at)
         VALUES ($1, $2, $3, $4);
     """
-    await execute(query, str(user_id), user_type.lower(), token, expires_at)
+    await execute(query, str(user_id), user_type.lower(), _hash_refresh_token(token), expires_at)
+
+    # Limit aşıldıysa en eski aktif token'ları revoke et
+    await execute(
+        """
+        UPDATE refresh_tokens
+        SET revoked_at = NOW()
+        WHERE id IN (
+            SELECT id FROM refresh_tokens
+            WHERE user_id = $1 AND revoked_at IS NULL
+            ORDER BY created_at DESC
+            OFFSET $2
+        );
+        """,
+        str(user_id), REFRESH_TOKENS_PER_USER,
+    )
 
 
 async def _revoke_refresh_token(token: str):
     query = """
         UPDATE refresh_tokens
         SET revoked_at = NOW()
-        WHERE token = $1 AND revoked_at IS NULL;
+        WHERE token_hash = $1 AND revoked_at IS NULL;
     """
-    await execute(query, token)
+    await execute(query, _hash_refresh_token(token))
 
 
 async def _get_valid_refresh_row(token: str) -> Optional[Dict[str, Any]]:
     query = """
-        SELECT user_id, user_type, token, expires_at, revoked_at
+        SELECT user_id, user_type, expires_at, revoked_at
         FROM refresh_tokens
-        WHERE token = $1
+        WHERE token_hash = $1
           AND revoked_at IS NULL
           AND expires_at > NOW();
     """
-    return await fetch_one(query, token)
+    return await fetch_one(query, _hash_refresh_token(token))
+
+
+async def purge_refresh_tokens() -> int:
+    """
+    Süresi dolmuş veya revoke edilmiş token'ları partiler halinde siler
+    (uzun süre kilit tutmamak için her seferinde REFRESH_TOKEN_PURGE_BATCH satır).
+    """
+    total = 0
+    while True:
+        result = await execute(
+            """
+            DELETE FROM refresh_tokens
+            WHERE id IN (
+                SELECT id FROM refresh_tokens
+                WHERE expires_at < NOW() OR revoked_at IS NOT NULL
+                LIMIT $1
+            );
+            """,
+            REFRESH_TOKEN_PURGE_BATCH,
+        )
+        deleted = int(result.split()[-1]) if result else 0
+        total += deleted
+        if deleted < REFRESH_TOKEN_PURGE_BATCH:
+            return total
+        await asyncio.sleep(0)
+
+
+async def start_periodic_refresh_token_purge(interval_seconds: int = REFRESH_TOKEN_PURGE_INTERVAL):
+    """Periyodik refresh token temizliği"""
+    while True:
+        try:
+            deleted = await purge_refresh_tokens()
+            if deleted:
+                logger.info(f"Purged {deleted} dead refresh tokens")
+        except Exception as e:
+            logger.error(f"Refresh token purge error: {e}")
+        await asyncio.sleep(interval_seconds)
+
+
+async def _verify_and_upgrade(table: str, row: Optional[Dict[str, Any]], password: str) -> bool:
+    """
+    Parolayı event loop dışında doğrular. Hash'in maliyeti BCRYPT_ROUNDS'tan farklıysa
+    (cost değiştirildiyse) parola yeni maliyetle tekrar hashlenip kaydedilir.
+    """
+    if not row or not await verify_pwd_async(password, row["password_hash"]):
+        return False
+
+    if needs_rehash(row["password_hash"]):
+        try:
+            new_hash = await hash_pwd_async(password)
+            await execute(f"UPDATE {table} SET password_hash = $1 WHERE id = $2;", new_hash, row["id"])
+        except Exception as e:
+            logger.warning(f"Password rehash failed for {table} {row['id']}: {e}")
+
+    return True
 
 
 async def _generate_tokens_net_style(user_id: int | str, email: str, roles: list[str], user_type: str):
@@ -54,8 +139,10 @@ async def _generate_tokens_net_style(user_id: int | str, email: str, roles: list
         "email": email,
         "userType": user_type.lower(),
         "role": roles,
+        "jti": uuid.uuid4().hex,
     }
-    access_token = create_jwt(claims)
+    # Kısa ömürlü access token; süresi dolunca refresh token ile yenilenir
+    access_token = create_jwt(claims, minutes=ACCESS_TOKEN_TTL_MINUTES)
     refresh_token = _generate_refresh_token()
     await _store_refresh_token(
         user_id=user_id,
@@ -74,7 +161,7 @@ async def register(first_name: str, last_name: str, email: str, phone: str, pass
     if existing:
         return None
 
-    hashed = hash_pwd(password)
+    hashed = await hash_pwd_async(password)
     row = await fetch_one(
         """
         INSERT INTO drivers (first_name, last_name, email, phone, password_hash)
@@ -96,101 +183,73 @@ async def register(first_name: str, last_name: str, email: str, phone: str, pass
 
 
 # === LOGIN ===
-async def login(email: str, password: str):
-    # Courier
-    row = await fetch_one(
-        "SELECT id, email, password_hash, deleted FROM drivers WHERE email=$1;", email
-    )
-    if row and row.get("deleted"):
-        return "banned"
-    if row and verify_pwd(password, row["password_hash"]):
-        return await _generate_tokens_net_style(
-            user_id=row["id"],
-            email=row["email"],
-            roles=["Courier"],
-            user_type="courier",
-        )
+# Tüm hesap tabloları tek sorguda (her kol kendi email index'ini kullanır).
+# priority, eski tablo-tablo deneme sırasını korur: aynı email birden fazla
+# tabloda varsa parolası tutan ilk hesap kazanır.
+_ACCOUNT_LOOKUP_SQL = """
+    SELECT * FROM (
+        (SELECT 1 AS priority, 'courier' AS user_type, id, email, password_hash,
+                COALESCE(deleted, FALSE) AS deleted, TRUE AS is_active, NULL::text AS status
+         FROM drivers WHERE email = $1)
+        UNION ALL
+        (SELECT 2, 'restaurant', id, email, password_hash, FALSE, TRUE, NULL
+         FROM restaurants WHERE email = $1 AND (deleted IS NULL OR deleted = FALSE))
+        UNION ALL
+        (SELECT 3, 'dealer', id, email, password_hash, FALSE, TRUE, status::text
+         FROM dealers WHERE email = $1)
+        UNION ALL
+        (SELECT 4, 'admin', id, email, password_hash, FALSE, TRUE, NULL
+         FROM system_admins WHERE email = $1)
+        UNION ALL
+        (SELECT 5, 'support', id, email, password_hash, COALESCE(deleted, FALSE), is_active, NULL
+         FROM support_users WHERE email = $1 AND (deleted IS NULL OR deleted = FALSE))
+        UNION ALL
+        (SELECT 6, 'user', id, email, password_hash, COALESCE(deleted, FALSE), is_active, NULL
+         FROM users WHERE email = $1)
+        UNION ALL
+        (SELECT 7, 'corporate', id, email, password_hash, COALESCE(deleted, FALSE), is_active, NULL
+         FROM corporate_users WHERE email = $1 AND (deleted IS NULL OR deleted = FALSE)
+         ORDER BY created_at DESC LIMIT 1)
+    ) accounts
+    ORDER BY priority;
+"""
+
+# user_type -> (tablo, rol)
+_ACCOUNT_TYPES = {
+    "courier": ("drivers", "Courier"),
+    "restaurant": ("restaurants", "Restaurant"),
+    "dealer": ("dealers", "Dealer"),
+    "admin": ("system_admins", "Admin"),
+    "support": ("support_users", "Support"),
+    "user": ("users", "Default"),
+    "corporate": ("corporate_users", "Corporate"),
+}
 
-    # Restaurant
-    r = await fetch_one(
-        "SELECT id, email, password_hash FROM restaurants WHERE email=$1 AND (deleted IS NULL OR deleted = FALSE);", email
-    )
-    if r and verify_pwd(password, r["password_hash"]):
-        return await _generate_tokens_net_style(
-            user_id=r["id"],
-            email=r["email"],
-            roles=["Restaurant"],
-            user_type="restaurant",
-        )
 
-    # ✅ Dealer login (doğru konum ve indent!)
-    d = await fetch_one(
-        "SELECT id, email, password_hash, status FROM dealers WHERE email=$1;", email
-    )
-    if d and verify_pwd(password, d["password_hash"]):
-        if d.get("status") != "active":
-            return "not_active"
+async def login(email: str, password: str):
+    accounts = await fetch_all(_ACCOUNT_LOOKUP_SQL, email)
 
-        return await _generate_tokens_net_style(
-            user_id=str(d["id"]),  # UUID ise string
-            email=d["email"],
-            roles=["Dealer"],
-            user_type="dealer",
-        )
+    for acc in accounts or []:
+        user_type = acc["user_type"]
+        table, role = _ACCOUNT_TYPES[user_type]
 
-    # Admin
-    a = await fetch_one(
-        "SELECT id, email, password_hash FROM system_admins WHERE email=$1;", email
-    )
-    if a and verify_pwd(password, a["password_hash"]):
-        return await _generate_tokens_net_style(
-            user_id=a["id"],
-            email=a["email"],
-            roles=["Admin"],
-            user_type="admin",
-        )
-
-    # Support (support_users table)
-    s = await fetch_one(
-        "SELECT id, email, password_hash, is_active, deleted FROM support_users WHERE email=$1 AND (deleted IS NULL OR deleted = FALSE);", email
-    )
-    if s and verify_pwd(password, s["password_hash"]):
-        if s.get("deleted") or not s.get("is_active", True):
+        # Silinmiş kurye hesabı parola kontrolünden önce engellenir
+        if user_type == "courier" and acc["deleted"]:
             return "banned"
-        return await _generate_tokens_net_style(
-            user_id=str(s["id"]),
-            email=s["email"],
-            roles=["Support"],
-            user_type="support",
-        )
 
-    # User (users table)
-    u = await fetch_one(
-        "SELECT id, email, password_hash, is_active, deleted FROM users WHERE email=$1;", email
-    )
-    if u and verify_pwd(password, u["password_hash"]):
-        if u.get("deleted") or not u.get("is_active"):
-            return "banned"
-        return await _generate_tokens_net_style(
-            user_id=str(u["id"]),
-            email=u["email"],
-            roles=["Default"],
-            user_type="user",
-        )
+        if not await _verify_and_upgrade(table, acc, password):
+            continue
 
-    # Corporate (corporate_users table)
-    # Önce silinmemiş (deleted=false) kaydı kontrol et
-    c = await fetch_one(
-        "SELECT id, email, password_hash, is_active, deleted FROM corporate_users WHERE email=$1 AND (deleted IS NULL OR deleted = FALSE) ORDER BY created_at DESC LIMIT 1;", email
-    )
-    if c and verify_pwd(password, c["password_hash"]):
-        if c.get("deleted") or not c.get("is_active"):
+        if user_type == "dealer" and acc["status"] != "active":
+            return "not_active"
+        if user_type in ("support", "user", "corporate") and (acc["deleted"] or not acc["is_active"]):
             return "banned"
+
         return await _generate_tokens_net_style(
-            user_id=str(c["id"]),
-            email=c["email"],
-            roles=["Corporate"],
-            user_type="corporate",
+            user_id=str(acc["id"]),
+            email=acc["email"],
+            roles=[role],
+            user_type=user_type,
         )
 
     return None
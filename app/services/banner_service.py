@@ -3,14 +3,24 @@ from uuid import UUID
 import uuid
 from app.utils.database_async import fetch_one, fetch_all, execute
 from app.utils.database import db_cursor
+from app.utils.config_cache import config_cache
 
-async def get_all_banners() -> Tuple[Optional[List[Dict[str, Any]]], Optional[str]]:
+CACHE_NAMESPACE = "banners"
+
+async def _load_banners() -> List[Dict[str, Any]]:
     query = """
         SELECT id, title, image_url, priority, active
         FROM banners
         ORDER BY active DESC, priority DESC, title ASC
     """
     rows = await fetch_all(query)
+    return [dict(r) for r in rows] if rows else []
+
+async def list_banners_cached() -> List[Dict[str, Any]]:
+    return await config_cache.get_or_load(CACHE_NAMESPACE, "all", _load_banners)
+
+async def get_all_banners() -> Tuple[Optional[List[Dict[str, Any]]], Optional[str]]:
+    rows = await list_banners_cached()
     if not rows:
         return None, "Banners not found"
     return rows, None
@@ -44,6 +54,7 @@ async def create_banner(
     row = await fetch_one(query, title, image_url, priority, active)
     if not row:
         return None, "Banner not created"
+    await config_cache.invalidate(CACHE_NAMESPACE)
     return row, None
 
 async def update_banner(
@@ -69,6 +80,7 @@ async def update_banner(
     row = await fetch_one(query, title, image_url, priority, active, banner_id)
     if not row:
         return None, "Banner not found"
+    await config_cache.invalidate(CACHE_NAMESPACE)
     return dict(row), None
 
 async def delete_banner(banner_id: UUID) -> Optional[str]:
@@ -80,4 +92,5 @@ async def delete_banner(banner_id: UUID) -> Optional[str]:
     row = await fetch_one(query, banner_id)
     if not row:
         return "Banner not found"
+    await config_cache.invalidate(CACHE_NAMESPACE)
     return "Banner deleted successfully"
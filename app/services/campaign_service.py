@@ -1,8 +1,10 @@
 from app.utils.database import db_cursor
+from app.utils.config_cache import config_cache
 
 TABLE = "campaigns"
+CACHE_NAMESPACE = "campaigns"
 
-async def list_campaigns():
+async def _load_campaigns():
     try:
         with db_cursor(dict_cursor=True) as cur:
             cur.execute(f"SELECT * FROM {TABLE} ORDER BY created_at DESC;")
@@ -11,6 +13,12 @@ async def list_campaigns():
         return None, str(e)
 
 
+async def list_campaigns():
+    return await config_cache.get_or_load(
+        CACHE_NAMESPACE, "all", _load_campaigns, cache_if=lambda res: res[1] is None
+    )
+
+
 async def get_campaign(id: str):
     try:
         with db_cursor(dict_cursor=True) as cur:
@@ -28,7 +36,9 @@ async def create_campaign(title, discount_rate, rule, content):
                 VALUES (%s, %s, %s, %s)
                 RETURNING *;
             """, (title, discount_rate, rule, content))
-            return cur.fetchone(), None
+            row = cur.fetchone()
+        await config_cache.invalidate(CACHE_NAMESPACE)
+        return row, None
     except Exception as e:
         return None, str(e)
 
@@ -49,7 +59,8 @@ async def update_campaign(id, data):
             row = cur.fetchone()
             if not row:
                 return False, "Record not found"
-            return True, None
+        await config_cache.invalidate(CACHE_NAMESPACE)
+        return True, None
 
     except Exception as e:
         return False, str(e)
@@ -62,6 +73,7 @@ async def delete_campaign(id: str):
             deleted = cur.fetchone()
             if not deleted:
                 return False, "Not found"
-            return True, None
+        await config_cache.invalidate(CACHE_NAMESPACE)
+        return True, None
     except Exception as e:
         return False, str(e)
@@ -1,9 +1,11 @@
 from app.utils.database import db_cursor
+from app.utils.config_cache import config_cache
 
 TABLE = "city_prices"
+CACHE_NAMESPACE = "city_prices"
 
 
-async def list_city_prices():
+async def _load_city_prices():
     try:
         with db_cursor(dict_cursor=True) as cur:
             cur.execute(f"SELECT * FROM {TABLE} ORDER BY created_at DESC;")
@@ -12,6 +14,12 @@ async def list_city_prices():
         return None, str(e)
 
 
+async def list_city_prices():
+    return await config_cache.get_or_load(
+        CACHE_NAMESPACE, "all", _load_city_prices, cache_if=lambda res: res[1] is None
+    )
+
+
 async def get_city_price(id: str):
     try:
         with db_cursor(dict_cursor=True) as cur:
@@ -36,7 +44,9 @@ async def create_city_price(route_name, country_id, state_id, city_id,
                   courier_price, minivan_price,
                   panelvan_price, kamyonet_price, kamyon_price))
 
-            return cur.fetchone(), None
+            row = cur.fetchone()
+        await config_cache.invalidate(CACHE_NAMESPACE)
+        return row, None
     except Exception as e:
         return None, str(e)
 
@@ -55,7 +65,8 @@ async def update_city_price(id: str, route_name, country_id, state_id, city_id,
             """, (route_name, country_id, state_id, city_id,
                   courier_price, minivan_price,
                   panelvan_price, kamyonet_price, kamyon_price, id))
-            return True, None
+        await config_cache.invalidate(CACHE_NAMESPACE)
+        return True, None
     except Exception as e:
         return False, str(e)
 
@@ -66,6 +77,7 @@ async def delete_city_price(id: str):
             cur.execute(f"DELETE FROM {TABLE} WHERE id=%s RETURNING id;", (id,))
             if not cur.fetchone():
                 return False, "Record not found"
-            return True, None
+        await config_cache.invalidate(CACHE_NAMESPACE)
+        return True, None
     except Exception as e:
         return False, str(e)
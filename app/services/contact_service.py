@@ -1,6 +1,6 @@
 from typing import Any, Dict, Tuple, Optional, List
 from app.utils.database_async import fetch_one, fetch_all, execute
-from app.services.mail_service import send_mail
+from app.services.job_queue_service import enqueue
 from app.utils.templates.contact_user_template import ContactMessageEmailTemplate
 from app.utils.templates.contact_admin_template import ContactAdminEmailTemplate
 import os
@@ -45,8 +45,8 @@ async def create_contact_message(
             message=message,
             sent_at=sent_at
         )
-        await send_mail(email, "Mesajınız Başarıyla Alındı 🎉", user_html)
-        logging.info("[D2] user email sent successfully")
+        await enqueue("mail.send", {"to": email, "subject": "Mesajınız Başarıyla Alındı 🎉", "html": user_html})
+        logging.info("[D2] user email queued")
 
         # --- ADMIN EMAIL ---
         admin_html = ContactAdminEmailTemplate.build(
@@ -57,8 +57,8 @@ async def create_contact_message(
             message=message,
             sent_at=sent_at
         )
-        await send_mail(ADMIN_EMAIL, f"Yeni Contact Mesajı - {subject}", admin_html)
-        logging.info("[E2] admin email sent successfully")
+        await enqueue("mail.send", {"to": ADMIN_EMAIL, "subject": f"Yeni Contact Mesajı - {subject}", "html": admin_html})
+        logging.info("[E2] admin email queued")
 
         logging.info("[F] create_contact_message COMPLETED SUCCESSFULLY")
         return result, None
@@ -1,7 +1,8 @@
 from typing import Dict, Any, List, Tuple, Optional
 from uuid import UUID
 from app.utils.database_async import fetch_one, fetch_all, execute
-from app.utils.security import hash_pwd
+from app.utils.security import hash_pwd_async
+from app.services.token_revocation_service import revoke_user_tokens
 
 
 async def create_corporate_user(data: Dict[str, Any]) -> Tuple[bool, str | Dict[str, Any]]:
@@ -15,7 +16,7 @@ async def create_corporate_user(data: Dict[str, Any]) -> Tuple[bool, str | Dict[
             return False, "Bu email adresi zaten kayıtlı"
         
         # Password hashle
-        password_hash = hash_pwd(data["password"])
+        password_hash = await hash_pwd_async(data["password"])
         
         # fullAddress desteği: adres_line1/2 yerine tek alanla giriş ve bölme
         import re
@@ -304,6 +305,7 @@ async def delete_corporate_user(user_id: str) -> Tuple[bool, str | None]:
         
         if result.endswith(" 0"):
             return False, "Kurumsal kullanıcı bulunamadı"
+        await revoke_user_tokens(user_id, "deleted")
         return True, None
     except Exception as e:
         return False, str(e)
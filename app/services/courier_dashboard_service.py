@@ -1,6 +1,28 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 from datetime import datetime, timezone
+import asyncio
+import os
+import time
 from app.utils.database_async import fetch_one
+from app.services.courier_stats_service import get_courier_stats
+from app.services.presence_service import online_seconds_by_days
+
+# Birleşik dashboard yanıt önbelleği (teslimat / çevrimiçi değişikliğinde temizlenir;
+# TTL başka worker'daki değişiklikler için üst sınırdır)
+COURIER_DASHBOARD_CACHE_TTL = float(os.getenv("COURIER_DASHBOARD_CACHE_TTL", "15"))
+
+# courier_id -> (expires_at, payload)
+_dashboard_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+# courier_id -> invalidation sayacı (hesaplama sürerken gelen invalidation'dan sonra
+# eski sonucun önbelleğe yazılmasını engeller)
+_dashboard_generation: Dict[str, int] = {}
+
+
+def invalidate_courier_dashboard(courier_id: str):
+    """Sipariş teslimi / çevrimiçi durum değişikliğinde çağrılır"""
+    key = str(courier_id)
+    _dashboard_cache.pop(key, None)
+    _dashboard_generation[key] = _dashboard_generation.get(key, 0) + 1
 
 
 def _validate_courier_id(courier_id: str) -> bool:
@@ -20,106 +42,36 @@ def _get_today_start() -> datetime:
 
 async def get_courier_earnings(courier_id: str) -> Optional[Dict[str, Any]]:
     """
-    Kurye kazanç verilerini getirir (toplam ve günlük)
+    Kurye kazanç verilerini getirir (toplam ve günlük) - courier_daily_stats'tan
     """
     if not _validate_courier_id(courier_id):
         return None
     
-    today_start = _get_today_start()
-    
-    earnings_query = """
-        SELECT 
-            COALESCE(SUM(CASE WHEN status = 'teslim_edildi' THEN amount ELSE 0 END), 0) AS total_earnings,
-            COALESCE(SUM(CASE WHEN status = 'teslim_edildi' AND updated_at >= $2 THEN amount ELSE 0 END), 0) AS daily_earnings
-        FROM orders
-        WHERE courier_id = $1
-    """
-    earnings_row = await fetch_one(earnings_query, courier_id, today_start)
-    
-    if not earnings_row:
-        return None
+    stats = await get_courier_stats(courier_id)
     
     return {
-        "total_earnings": round(float(earnings_row["total_earnings"]), 2),
-        "daily_earnings": round(float(earnings_row["daily_earnings"]), 2)
+        "total_earnings": round(stats["total_earnings"], 2),
+        "daily_earnings": round(stats["daily_earnings"], 2)
     }
 
 
 async def get_courier_distance(courier_id: str) -> Optional[Dict[str, Any]]:
     """
-    Kurye mesafe verilerini getirir (toplam ve günlük km)
+    Kurye mesafe verilerini getirir (toplam ve günlük km) - courier_daily_stats'tan
     """
     if not _validate_courier_id(courier_id):
         return None
     
-    today_start = _get_today_start()
-    
-    distance_query = """
-        SELECT 
-            COALESCE(SUM(
-                CASE 
-                    WHEN status = 'teslim_edildi' 
-                        AND pickup_lat IS NOT NULL 
-                        AND pickup_lng IS NOT NULL 
-                        AND dropoff_lat IS NOT NULL 
-                        AND dropoff_lng IS NOT NULL
-                    THEN (
-                        6371 * acos(
-                            LEAST(1.0,
-                                cos(radians(pickup_lat)) * 
-                                cos(radians(dropoff_lat)) * 
-                                cos(radians(dropoff_lng) - radians(pickup_lng)) + 
-                                sin(radians(pickup_lat)) * 
-                                sin(radians(dropoff_lat))
-                            )
-                        )
-                    )
-                    ELSE 0
-                END
-            ), 0) AS total_km,
-            COALESCE(SUM(
-                CASE 
-                    WHEN status = 'teslim_edildi' 
-                        AND updated_at >= $2
-                        AND pickup_lat IS NOT NULL 
-                        AND pickup_lng IS NOT NULL 
-                        AND dropoff_lat IS NOT NULL 
-                        AND dropoff_lng IS NOT NULL
-                    THEN (
-                        6371 * acos(
-                            LEAST(1.0,
-                                cos(radians(pickup_lat)) * 
-                                cos(radians(dropoff_lat)) * 
-                                cos(radians(dropoff_lng) - radians(pickup_lng)) + 
-                                sin(radians(pickup_lat)) * 
-                                sin(radians(dropoff_lat))
-                            )
-                        )
-                    )
-                    ELSE 0
-                END
-            ), 0) AS daily_km
-        FROM orders
-        WHERE courier_id = $1
-    """
-    distance_row = await fetch_one(distance_query, courier_id, today_start)
-    
-    if not distance_row:
-        return None
+    stats = await get_courier_stats(courier_id)
     
     return {
-        "total_km": round(float(distance_row["total_km"]), 2),
-        "daily_km": round(float(distance_row["daily_km"]), 2)
+        "total_km": round(stats["total_km"], 2),
+        "daily_km": round(stats["daily_km"], 2)
     }
 
 
-async def get_courier_package(courier_id: str) -> Optional[Dict[str, Any]]:
-    """
-    Kurye paket bilgilerini getirir (kalan gün ve faaliyet süresi)
-    """
-    if not _validate_courier_id(courier_id):
-        return None
-    
+async def _fetch_active_subscription(courier_id: str):
+    """Kuryenin aktif paket aboneliği (paket ve çalışma saati hesapları ortak kullanır)"""
     package_query = """
         SELECT 
             s.start_date,
@@ -145,8 +97,10 @@ async def get_courier_package(courier_id: str) -> Optional[Dict[str, Any]]:
         ORDER BY s.end_date DESC
         LIMIT 1
     """
-    package_row = await fetch_one(package_query, courier_id)
-    
+    return await fetch_one(package_query, courier_id)
+
+
+def _package_payload(package_row) -> Dict[str, Any]:
     if not package_row:
         return {
             "remaining_days": 0,
@@ -167,32 +121,11 @@ async def get_courier_package(courier_id: str) -> Optional[Dict[str, Any]]:
     }
 
 
-async def get_courier_work_hours(courier_id: str) -> Optional[Dict[str, Any]]:
-    """
-    Kurye çalışma saatlerini getirir (günlük ve toplam)
-    - Günlük: Bugün çevrimiçi olduğu toplam saat
-    - Toplam: Paket başlangıcından bugüne kadar çevrimiçi olduğu toplam saat
-    - Paket bitmişse her ikisi de 0 döner
-    """
-    if not _validate_courier_id(courier_id):
-        return None
-    
-    # Önce aktif paket kontrolü
-    package_query = """
-        SELECT 
-            s.start_date,
-            s.end_date
-        FROM courier_package_subscriptions s
-        WHERE s.courier_id = $1::uuid
-          AND s.is_active = TRUE
-          AND s.deleted_at IS NULL
-          AND s.start_date <= NOW()
-          AND s.end_date > NOW()
-        ORDER BY s.end_date DESC
-        LIMIT 1
-    """
-    package_row = await fetch_one(package_query, courier_id)
-    
+def _format_work_time(seconds: int) -> str:
+    return f"{seconds // 3600}:{(seconds % 3600) // 60:02d}"
+
+
+async def _work_hours_payload(courier_id: str, package_row, today_start: datetime) -> Dict[str, Any]:
     # Paket yoksa veya bitmişse sıfır döndür
     if not package_row:
         return {
@@ -200,212 +133,86 @@ async def get_courier_work_hours(courier_id: str) -> Optional[Dict[str, Any]]:
             "total_work_time": "0:00"
         }
     
-    package_start = package_row["start_date"]
-    today_start = _get_today_start()
-    
-    # Günlük çalışma saati (bugün çevrimiçi olduğu süre - bugünün başlangıcından itibaren)
-    today_work_hours_query = """
-        WITH bounds AS (
-            SELECT $1::uuid AS driver_id,
-                   $2::timestamptz AS win_start,
-                   NOW() AS win_end
-        ),
-        base_events AS (
-            SELECT dpe.at_utc, dpe.is_online
-            FROM driver_presence_events dpe, bounds b
-            WHERE dpe.driver_id = b.driver_id
-              AND dpe.at_utc >= b.win_start
-              AND dpe.at_utc < b.win_end
-        ),
-        start_state AS (
-            SELECT b.win_start AS at_utc,
-                   COALESCE((
-                     SELECT dpe.is_online
-                     FROM driver_presence_events dpe
-                     WHERE dpe.driver_id = b.driver_id
-                       AND dpe.at_utc < b.win_start
-                     ORDER BY dpe.at_utc DESC
-                     LIMIT 1
-                   ), FALSE) AS is_online
-            FROM bounds b
-        ),
-        end_cap AS (
-            SELECT b.win_end AS at_utc, FALSE AS is_online
-            FROM bounds b
-        ),
-        timeline AS (
-            SELECT * FROM base_events
-            UNION ALL
-            SELECT * FROM start_state
-            UNION ALL
-            SELECT * FROM end_cap
-        ),
-        ordered AS (
-            SELECT
-                at_utc,
-                is_online,
-                LEAD(at_utc) OVER (ORDER BY at_utc) AS next_at
-            FROM timeline
-        )
-        SELECT
-            COALESCE(
-              SUM(
-                CASE WHEN is_online AND next_at IS NOT NULL
-                     THEN EXTRACT(EPOCH FROM (next_at - at_utc))
-                     ELSE 0 END
-              ), 0
-            )::bigint AS online_seconds
-        FROM ordered;
-    """
-    today_work_hours_row = await fetch_one(today_work_hours_query, courier_id, today_start)
-    
-    # Toplam çalışma saati = Önceki günlerin toplamı + Bugünkü anlık çalışma
-    # Önceki günlerin toplamını hesapla (paket başlangıcından bugünün başlangıcına kadar)
-    previous_days_query = """
-        WITH date_range AS (
-            SELECT generate_series(
-                DATE($2::timestamptz),
-                DATE($3::timestamptz) - INTERVAL '1 day',
-                INTERVAL '1 day'
-            )::date AS work_date
-        ),
-        daily_bounds AS (
-            SELECT 
-                $1::uuid AS driver_id,
-                dr.work_date,
-                dr.work_date::timestamptz AS day_start,
-                (dr.work_date + INTERVAL '1 day')::timestamptz AS day_end
-            FROM date_range dr
-            WHERE dr.work_date < DATE($3::timestamptz)
-        ),
-        daily_events AS (
-            SELECT 
-                db.work_date,
-                dpe.at_utc,
-                dpe.is_online
-            FROM daily_bounds db
-            LEFT JOIN driver_presence_events dpe ON dpe.driver_id = db.driver_id
-                AND dpe.at_utc >= db.day_start
-                AND dpe.at_utc < db.day_end
-        ),
-        daily_start_states AS (
-            SELECT 
-                db.work_date,
-                db.day_start AS at_utc,
-                COALESCE((
-                    SELECT dpe.is_online
-                    FROM driver_presence_events dpe
-                    WHERE dpe.driver_id = db.driver_id
-                      AND dpe.at_utc < db.day_start
-                    ORDER BY dpe.at_utc DESC
-                    LIMIT 1
-                ), FALSE) AS is_online
-            FROM daily_bounds db
-        ),
-        daily_end_caps AS (
-            SELECT 
-                db.work_date,
-                db.day_end AS at_utc,
-                FALSE AS is_online
-            FROM daily_bounds db
-        ),
-        daily_timeline AS (
-            SELECT work_date, at_utc, is_online FROM daily_events
-            UNION ALL
-            SELECT work_date, at_utc, is_online FROM daily_start_states
-            UNION ALL
-            SELECT work_date, at_utc, is_online FROM daily_end_caps
-        ),
-        daily_ordered AS (
-            SELECT
-                work_date,
-                at_utc,
-                is_online,
-                LEAD(at_utc) OVER (PARTITION BY work_date ORDER BY at_utc) AS next_at
-            FROM daily_timeline
-        ),
-        daily_totals AS (
-            SELECT
-                work_date,
-                COALESCE(
-                    SUM(
-                        CASE WHEN is_online AND next_at IS NOT NULL
-                             THEN EXTRACT(EPOCH FROM (next_at - at_utc))
-                             ELSE 0 END
-                    ), 0
-                )::bigint AS daily_seconds
-            FROM daily_ordered
-            GROUP BY work_date
-        )
-        SELECT
-            COALESCE(SUM(daily_seconds), 0)::bigint AS online_seconds
-        FROM daily_totals;
-    """
-    previous_days_row = await fetch_one(previous_days_query, courier_id, package_start, today_start)
-    
-    # Önceki günlerin toplamı + Bugünkü anlık çalışma = Toplam
-    previous_seconds = int(previous_days_row["online_seconds"]) if previous_days_row and previous_days_row["online_seconds"] else 0
-    today_seconds = int(today_work_hours_row["online_seconds"]) if today_work_hours_row and today_work_hours_row["online_seconds"] else 0
-    total_online_seconds = previous_seconds + today_seconds
-    
-    # Günlük çalışma saati hesaplama (bugünkü anlık çalışma)
-    daily_work_hours = today_seconds // 3600
-    daily_work_minutes = (today_seconds % 3600) // 60
-    daily_work_time = f"{daily_work_hours}:{daily_work_minutes:02d}"
-    
-    # Toplam çalışma saati hesaplama (önceki günler + bugünkü anlık çalışma)
-    total_work_hours = total_online_seconds // 3600
-    total_work_minutes = (total_online_seconds % 3600) // 60
-    total_work_time = f"{total_work_hours}:{total_work_minutes:02d}"
+    # Toplam = paket başlangıç gününden bugüne günlük rollup + açık çevrimiçi aralık
+    online = await online_seconds_by_days(courier_id, package_row["start_date"].date(), today_start)
     
     return {
-        "daily_work_time": daily_work_time,
-        "total_work_time": total_work_time
+        "daily_work_time": _format_work_time(online["today"]),
+        "total_work_time": _format_work_time(online["total"])
     }
 
 
-async def get_courier_activities(courier_id: str) -> Optional[Dict[str, Any]]:
+async def get_courier_package(courier_id: str) -> Optional[Dict[str, Any]]:
     """
-    Kurye toplam aktivite sayısını getirir
+    Kurye paket bilgilerini getirir (kalan gün ve faaliyet süresi)
     """
     if not _validate_courier_id(courier_id):
         return None
     
-    activities_query = """
-        SELECT 
-            COUNT(CASE WHEN status = 'teslim_edildi' THEN 1 END) AS total_activities
-        FROM orders
-        WHERE courier_id = $1
+    return _package_payload(await _fetch_active_subscription(courier_id))
+
+
+async def get_courier_work_hours(courier_id: str) -> Optional[Dict[str, Any]]:
     """
-    activities_row = await fetch_one(activities_query, courier_id)
+    Kurye çalışma saatlerini getirir (günlük ve toplam)
+    - Günlük: Bugün çevrimiçi olduğu toplam saat
+    - Toplam: Paket başlangıcından bugüne kadar çevrimiçi olduğu toplam saat
+    - Paket bitmişse her ikisi de 0 döner
+    """
+    if not _validate_courier_id(courier_id):
+        return None
     
-    if not activities_row:
+    package_row = await _fetch_active_subscription(courier_id)
+    return await _work_hours_payload(courier_id, package_row, _get_today_start())
+
+
+async def get_courier_activities(courier_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Kurye toplam aktivite (teslim edilen sipariş) sayısını getirir
+    """
+    if not _validate_courier_id(courier_id):
         return None
     
+    stats = await get_courier_stats(courier_id)
+    
     return {
-        "total_activities": int(activities_row["total_activities"]) if activities_row["total_activities"] else 0
+        "total_activities": stats["total_deliveries"]
     }
 
 
 async def get_courier_dashboard(courier_id: str) -> Optional[Dict[str, Any]]:
     """
-    Kurye dashboard verilerini getirir (DEPRECATED - ayrı endpoint'ler kullanılmalı).
-    Geriye dönük uyumluluk için tutuluyor.
+    Kurye dashboard verilerini tek yanıtta getirir.
+    ID bir kez doğrulanır; "bugün" ve aktif abonelik bir kez hesaplanıp paylaşılır,
+    bağımsız sorgular eşzamanlı çalışır. Yanıt COURIER_DASHBOARD_CACHE_TTL saniye önbelleklenir.
     """
-    earnings = await get_courier_earnings(courier_id)
-    distance = await get_courier_distance(courier_id)
-    package = await get_courier_package(courier_id)
-    work_hours = await get_courier_work_hours(courier_id)
-    activities = await get_courier_activities(courier_id)
-    
-    if not all([earnings, distance, package, work_hours, activities]):
+    if not _validate_courier_id(courier_id):
         return None
     
-    return {
-        **earnings,
-        **distance,
-        **package,
+    key = str(courier_id)
+    cached = _dashboard_cache.get(key)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+    generation = _dashboard_generation.get(key, 0)
+    
+    today_start = _get_today_start()
+    stats, package_row = await asyncio.gather(
+        get_courier_stats(courier_id, today_start.date()),
+        _fetch_active_subscription(courier_id),
+    )
+    work_hours = await _work_hours_payload(courier_id, package_row, today_start)
+    
+    payload = {
+        "total_earnings": round(stats["total_earnings"], 2),
+        "daily_earnings": round(stats["daily_earnings"], 2),
+        "total_km": round(stats["total_km"], 2),
+        "daily_km": round(stats["daily_km"], 2),
+        **_package_payload(package_row),
         **work_hours,
-        **activities
+        "total_activities": stats["total_deliveries"]
     }
-
+    
+    # Hesaplama sırasında invalidation geldiyse sonucu saklama
+    if _dashboard_generation.get(key, 0) == generation:
+        _dashboard_cache[key] = (time.monotonic() + COURIER_DASHBOARD_CACHE_TTL, payload)
+    return payload
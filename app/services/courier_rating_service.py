@@ -3,6 +3,7 @@
 from typing import Optional, List, Dict, Any, Tuple
 from uuid import UUID
 from ..utils.database import db_cursor
+from ..utils.active_order_cache import active_order_cache
 
 # ==================== KURYE ATAMA SERVISLERI ====================
 
@@ -107,6 +108,9 @@ async def assign_courier_to_order(
             if cur.rowcount == 0:
                 return False, "Failed to assign courier"
             
+            active_order_cache.invalidate_order(order_id)
+            active_order_cache.invalidate(courier_id)
+            
             return True, None
             
     except Exception as e:
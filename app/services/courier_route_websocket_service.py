@@ -4,8 +4,12 @@ Kurye rota WebSocket servisi - GPS güncellemesi geldiğinde otomatik rota hesap
 from typing import Optional, Dict, Any
 from fastapi import HTTPException
 from app.utils.database_async import fetch_one
-from app.services.map_service import create_courier_route_serpapi
+from app.services.map_service import create_courier_route_serpapi, create_multi_stop_route
+from app.services.order_batching_service import remaining_trip_stops
+from app.models.map_model import Coordinate
 from app.utils.websocket_manager import websocket_manager
+from app.utils.active_order_cache import active_order_cache
+import json
 import logging
 
 logger = logging.getLogger(__name__)
@@ -13,35 +17,64 @@ logger = logging.getLogger(__name__)
 
 async def get_active_order_for_courier(courier_id: str) -> Optional[Dict[str, Any]]:
     """
-    Kuryenin aktif order'ını getirir (KURYEYE_VERILDI veya YOLDA status'unda)
+    Kuryenin aktif order'ını getirir (KURYEYE_VERILDI veya YOLDA status'unda).
+    Sipariş aktif bir seferin (courier_trips) parçasıysa sefer durakları ve
+    seferdeki siparişlerin durumları da aynı sorguda gelir.
+    Önce process içi cache'e bakılır, yoksa DB'den okunup cache'e yazılır.
     """
+    hit, cached = active_order_cache.get(courier_id)
+    if hit:
+        return cached
+
     try:
         row = await fetch_one("""
             SELECT 
-                id,
-                status,
-                pickup_lat,
-                pickup_lng,
-                dropoff_lat,
-                dropoff_lng
-            FROM orders
-            WHERE courier_id = $1::uuid
-              AND status IN ('kuryeye_verildi', 'yolda')
-            ORDER BY created_at DESC
+                o.id,
+                o.status,
+                o.pickup_lat,
+                o.pickup_lng,
+                o.dropoff_lat,
+                o.dropoff_lng,
+                t.id AS trip_id,
+                t.stops AS trip_stops,
+                (
+                    SELECT jsonb_object_agg(x.id::text, x.status::text)
+                    FROM orders x
+                    WHERE x.id = ANY(t.order_ids)
+                ) AS trip_statuses
+            FROM orders o
+            LEFT JOIN LATERAL (
+                SELECT id, stops, order_ids
+                FROM courier_trips
+                WHERE courier_id = o.courier_id
+                  AND status = 'active'
+                  AND o.id = ANY(order_ids)
+                ORDER BY created_at DESC
+                LIMIT 1
+            ) t ON TRUE
+            WHERE o.courier_id = $1::uuid
+              AND o.status IN ('kuryeye_verildi', 'yolda')
+            ORDER BY o.created_at DESC
             LIMIT 1
         """, courier_id)
         
-        if row:
-            return dict(row)
-        return None
+        order = dict(row) if row else None
+        if order and order["trip_id"]:
+            order["trip_stops"] = json.loads(order["trip_stops"])
+            order["trip_statuses"] = json.loads(order["trip_statuses"] or "{}")
+        active_order_cache.set(courier_id, order)
+        return order
     except Exception as e:
         logger.error(f"Error getting active order for courier {courier_id}: {e}")
         return None
 
 
-async def calculate_and_push_route(courier_id: str):
+async def calculate_and_push_route(courier_id: str, driver_location: Optional[Dict[str, Any]] = None):
     """
     Kurye için rota hesapla ve WebSocket ile push et
+
+    driver_location: GPS güncellemesinden gelen konum (latitude/longitude).
+    Verilirse gps_table'dan tekrar okunmaz.
     """
     try:
         # WebSocket bağlantısı var mı kontrol et
@@ -55,9 +88,19 @@ async def calculate_and_push_route(courier_id: str):
         
         order_id = str(active_order["id"])
         
+        # Çoklu sipariş seferi: kalan duraklar üzerinden tek rota
+        if active_order.get("trip_id"):
+            await _push_trip_route(courier_id, active_order, driver_location)
+            return
+        
         # Rota hesapla
         try:
-            route_data = await create_courier_route_serpapi(courier_id, order_id)
+            route_data = await create_courier_route_serpapi(
+                courier_id,
+                order_id,
+                order=active_order,
+                driver_location=driver_location,
+            )
             
             # WebSocket ile push et
             message = {
@@ -92,3 +135,42 @@ async def calculate_and_push_route(courier_id: str):
     except Exception as e:
         logger.error(f"Error in calculate_and_push_route for courier {courier_id}: {e}")
 
+
+
+async def _push_trip_route(courier_id: str, active_order: Dict[str, Any], driver_location: Optional[Dict[str, Any]]):
+    """Aktif seferin kalan duraklarından çok duraklı rota hesaplayıp push eder"""
+    trip_id = str(active_order["trip_id"])
+    stops = remaining_trip_stops(active_order["trip_stops"], active_order["trip_statuses"])
+    if not stops:
+        return
+
+    try:
+        route_data = await create_multi_stop_route(
+            courier_id,
+            [Coordinate(lat=s["lat"], lgn=s["lng"]) for s in stops],
+            driver_location=driver_location,
+        )
+        route_data["stop_orders"] = [{"order_id": s["order_id"], "kind": s["kind"]} for s in stops]
+
+        await websocket_manager.send_to_courier(courier_id, {
+            "type": "route_update",
+            "trip_id": trip_id,
+            "order_id": stops[0]["order_id"],
+            "data": route_data
+        })
+        logger.info(f"Trip route pushed to courier {courier_id} for trip {trip_id}")
+    except HTTPException as e:
+        logger.error(f"HTTP error calculating trip route for courier {courier_id}, trip {trip_id}: {e.detail}")
+        await websocket_manager.send_to_courier(courier_id, {
+            "type": "route_error",
+            "trip_id": trip_id,
+            "error": e.detail,
+            "status_code": e.status_code
+        })
+    except Exception as e:
+        logger.error(f"Error calculating trip route for courier {courier_id}, trip {trip_id}: {e}")
+        await websocket_manager.send_to_courier(courier_id, {
+            "type": "route_error",
+            "trip_id": trip_id,
+            "error": str(e)
+        })
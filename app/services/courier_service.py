@@ -1,15 +1,18 @@
 from datetime import datetime
 from typing import Optional, Tuple, Dict, Any, List
+import base64
 import json
 
 from fastapi import HTTPException, status   
 from app.models.courier_model import CourierHistoryRes, CourierHistory
 from app.models.order_model import OrderStatus
 from app.utils.database_async import fetch_one, fetch_all, execute
-from app.utils.security import hash_pwd
+from app.utils.security import hash_pwd_async
 from ..utils.database import db_cursor
-from ..utils.database_async import fetch_all,fetch_one,execute
-from ..utils.security import hash_pwd
+from ..utils.active_order_cache import active_order_cache
+from ..services.courier_dashboard_service import invalidate_courier_dashboard
+from ..services.order_batching_service import complete_trip_if_done
+from ..services.token_revocation_service import revoke_user_tokens
 from uuid import UUID
 
 VALID_STATUSES = {
@@ -40,7 +43,7 @@ async def courier_register_step1(
     if exists:
         return None, "Email or phone already registered"
 
-    pwd_hash = hash_pwd(password)
+    pwd_hash = await hash_pwd_async(password)
     row = await fetch_one(
         "INSERT INTO drivers (first_name,last_name,email,phone,password_hash) "
         "VALUES ($1,$2,$3,$4,$5) RETURNING id;",
@@ -451,7 +454,13 @@ async def update_courier_document_status(
     if all_approved:
         await execute("UPDATE drivers SET is_active = TRUE WHERE id = $1", driver_id)
     else:
-        await execute("UPDATE drivers SET is_active = FALSE WHERE id = $1", driver_id)
+        deactivated = await fetch_one(
+            "UPDATE drivers SET is_active = FALSE WHERE id = $1 AND is_active = TRUE RETURNING id",
+            driver_id
+        )
+        # Aktifken pasifleşen kuryenin mevcut access token'ları geçersiz olsun
+        if deactivated:
+            await revoke_user_tokens(driver_id, "deactivated")
 
     return None
 
@@ -465,6 +474,7 @@ async def delete_courier_user(driver_id: UUID) -> Optional[str]:
         SET deleted = TRUE, deleted_at = NOW(), is_active = FALSE
         WHERE id = $1
     """, driver_id)
+    await revoke_user_tokens(driver_id, "deleted")
 
     return None
 
@@ -555,24 +565,35 @@ async def get_dealers_by_state(state_id: int) -> List[Dict[str, Any]]:
 
 # TODO : ödemeler eklendikten sonra ödeme durumu da eklenecek
 
+def encode_history_cursor(updated_at: datetime, order_id: str) -> str:
+    raw = f"{updated_at.isoformat()}|{order_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_history_cursor(cursor: str) -> Tuple[datetime, str]:
+    updated_at, order_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+    return datetime.fromisoformat(updated_at), order_id
+
+
 async def get_courier_history(
     courier_id: UUID,
     date: Optional[str] = None,
     page: int = 1,
-    page_size: int = 25
+    page_size: int = 25,
+    cursor: Optional[str] = None
 ) -> List[CourierHistory] | Any:
 
     offset = (page - 1) * page_size
-    params = [courier_id]
+    params: List[Any] = [courier_id]
 
     # Her durumda default boş filtre
     date_filter = ""
 
-    # Tarih geldiyse filtre eklenir
+    # Tarih geldiyse filtre eklenir (aralık olarak: (courier_id, updated_at) index'i kullanılır)
     if date:
         try:
             time = datetime.strptime(date, "%Y-%m-%d").date()
-            date_filter = "AND DATE(o.updated_at) = $2"
+            date_filter = "AND o.updated_at >= $2::date AND o.updated_at < $2::date + 1"
             params.append(time)
         except ValueError:
             return CourierHistoryRes(
@@ -581,6 +602,22 @@ async def get_courier_history(
                 data=[]
             )
 
+    # Keyset: cursor verilirse offset kullanılmaz
+    keyset_filter = ""
+    if cursor:
+        try:
+            updated_at, order_id = decode_history_cursor(cursor)
+            UUID(order_id)
+        except ValueError:
+            return CourierHistoryRes(
+                success=False,
+                message="Invalid cursor.",
+                data=[]
+            )
+        params.extend([updated_at, order_id])
+        keyset_filter = f"AND (o.updated_at, o.id) < (${len(params)-1}, ${len(params)}::uuid)"
+        offset = 0
+
     # === HISTORY QUERY ===
     history_sql = f"""
     SELECT
@@ -594,14 +631,17 @@ async def get_courier_history(
     WHERE o.courier_id = $1
       AND o.status IN ('iptal', 'teslim_edildi')
       {date_filter}
-    ORDER BY o.updated_at DESC
+      {keyset_filter}
+    ORDER BY o.updated_at DESC, o.id DESC
     LIMIT ${len(params)+1} OFFSET ${len(params)+2};
     """
 
-    # Page params eklenir
-    params.extend([page_size, offset])
+    # Page params eklenir (bir fazla: sonraki sayfa var mı)
+    params.extend([page_size + 1, offset])
 
-    rows = await fetch_all(history_sql, *params)
+    rows = list(await fetch_all(history_sql, *params) or [])
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
 
     result = [
         CourierHistory(
@@ -613,12 +653,17 @@ async def get_courier_history(
             from_address=r["from_address"],
             to_address=r["to_address"]
         )
-    for r in rows] if rows else []
+    for r in rows]
+
+    next_cursor = None
+    if has_more and rows[-1]["date"]:
+        next_cursor = encode_history_cursor(rows[-1]["date"], str(rows[-1]["id"]))
 
     return CourierHistoryRes(
         success=True,
         message="Courier history fetched",
-        data=result
+        data=result,
+        next_cursor=next_cursor
     )
 
 async def change_courier_order_status(
@@ -643,4 +688,8 @@ async def change_courier_order_status(
         "UPDATE orders SET status = $1, updated_at = NOW() WHERE id = $2",
         new_status, order_id
     )
+    active_order_cache.invalidate(courier_id)
+    if new_status == OrderStatus.TESLIM_EDILDI:
+        invalidate_courier_dashboard(courier_id)
+        await complete_trip_if_done(order_id)
     return None
\ No newline at end of file
@@ -0,0 +1,201 @@
+"""
+Kurye günlük istatistikleri (courier_daily_stats).
+
+Tablo init_db'deki trigger'larla güncel tutulur:
+- orders: teslim_edildi olan sipariş -> deliveries, earnings (amount), distance_km
+- jobs: delivered olan iş -> job_earnings (driver /earnings)
+- online_seconds: set_online çevrimiçi aralığı kapatırken (driver_presence_intervals)
+  süreyi gün sınırlarından bölerek ekler
+
+Dashboard sorguları kuryenin birkaç günlük satırını toplar; siparişlere inmez.
+Gün UTC'dir (dashboard'daki "bugün" ile aynı).
+"""
+from typing import Any, Dict, Optional
+from datetime import date, datetime, timezone
+import logging
+
+from app.utils.database_async import fetch_one, execute, get_pool
+
+logger = logging.getLogger(__name__)
+
+
+def _today() -> date:
+    return datetime.now(timezone.utc).date()
+
+
+async def get_courier_stats(courier_id: str, day: Optional[date] = None) -> Dict[str, Any]:
+    """Kuryenin toplam ve verilen gün (varsayılan bugün) istatistikleri"""
+    row = await fetch_one(
+        """
+        SELECT
+            COALESCE(SUM(deliveries), 0)::bigint AS total_deliveries,
+            COALESCE(SUM(earnings), 0) AS total_earnings,
+            COALESCE(SUM(distance_km), 0) AS total_km,
+            COALESCE(SUM(job_earnings), 0) AS total_job_earnings,
+            COALESCE(SUM(online_seconds), 0)::bigint AS total_online_seconds,
+            COALESCE(SUM(deliveries) FILTER (WHERE day = $2), 0)::bigint AS daily_deliveries,
+            COALESCE(SUM(earnings) FILTER (WHERE day = $2), 0) AS daily_earnings,
+            COALESCE(SUM(distance_km) FILTER (WHERE day = $2), 0) AS daily_km,
+            COALESCE(SUM(online_seconds) FILTER (WHERE day = $2), 0)::bigint AS daily_online_seconds
+        FROM courier_daily_stats
+        WHERE courier_id = $1::uuid
+        """,
+        courier_id, day or _today(),
+    )
+    return {
+        "total_deliveries": int(row["total_deliveries"]),
+        "total_earnings": float(row["total_earnings"]),
+        "total_km": float(row["total_km"]),
+        "total_job_earnings": float(row["total_job_earnings"]),
+        "total_online_seconds": int(row["total_online_seconds"]),
+        "daily_deliveries": int(row["daily_deliveries"]),
+        "daily_earnings": float(row["daily_earnings"]),
+        "daily_km": float(row["daily_km"]),
+        "daily_online_seconds": int(row["daily_online_seconds"]),
+    }
+
+
+BACKFILL_MARKER = "courier_stats.backfill"
+
+
+async def _rebuild_one(conn, courier_id: str) -> int:
+    """
+    Tek kuryenin satırlarını kendi transaction'ında yeniden hesaplar. Kurye advisory lock'u
+    (courier_stats_add ile aynı anahtar) tutulurken o kuryenin teslimat trigger'ları bekler
+    ve hesaplamadan sonra uygulanır (çift sayım / kayıp olmaz); diğer kuryeler etkilenmez.
+    """
+    async with conn.transaction():
+        await conn.execute(
+            "SELECT pg_advisory_xact_lock(hashtext('courier_stats'), hashtext($1::text))",
+            courier_id,
+        )
+        await conn.execute("DELETE FROM courier_daily_stats WHERE courier_id = $1::uuid", courier_id)
+        result = await conn.execute(
+            """
+            WITH delivered AS (
+                SELECT courier_id,
+                       (updated_at AT TIME ZONE 'UTC')::date AS day,
+                       COUNT(*)::int AS deliveries,
+                       SUM(amount) AS earnings,
+                       SUM(order_delivery_km(pickup_lat, pickup_lng, dropoff_lat, dropoff_lng)) AS distance_km
+                FROM orders
+                WHERE status = 'teslim_edildi'
+                  AND courier_id = $1::uuid
+                GROUP BY 1, 2
+            ),
+            job_totals AS (
+                SELECT driver_id AS courier_id,
+                       (updated_at AT TIME ZONE 'UTC')::date AS day,
+                       SUM(price) AS job_earnings
+                FROM jobs
+                WHERE status = 'delivered'
+                  AND driver_id = $1::uuid
+                GROUP BY 1, 2
+            ),
+            -- Kapalı aralıklar + henüz aralığa çevrilmemiş (compaction öncesi) event çiftleri
+            first_iv AS (
+                SELECT driver_id, MIN(online_from) AS first_from
+                FROM driver_presence_intervals
+                WHERE driver_id = $1::uuid
+                GROUP BY driver_id
+            ),
+            presence AS (
+                SELECT driver_id, is_online, at_utc,
+                       LEAD(at_utc) OVER (PARTITION BY driver_id ORDER BY at_utc) AS next_at,
+                       LEAD(is_online) OVER (PARTITION BY driver_id ORDER BY at_utc) AS next_online
+                FROM driver_presence_events
+                WHERE driver_id = $1::uuid
+            ),
+            intervals AS (
+                SELECT driver_id, online_from, online_to
+                FROM driver_presence_intervals
+                WHERE online_to IS NOT NULL
+                  AND driver_id = $1::uuid
+                UNION ALL
+                SELECT p.driver_id, p.at_utc, p.next_at
+                FROM presence p
+                LEFT JOIN first_iv f ON f.driver_id = p.driver_id
+                WHERE p.is_online AND p.next_at IS NOT NULL AND NOT p.next_online
+                  AND p.next_at <= COALESCE(f.first_from, 'infinity'::timestamptz)
+            ),
+            online AS (
+                SELECT i.driver_id AS courier_id,
+                       g.d::date AS day,
+                       SUM(EXTRACT(EPOCH FROM
+                           LEAST(i.online_to, (g.d + INTERVAL '1 day') AT TIME ZONE 'UTC')
+                           - GREATEST(i.online_from, g.d AT TIME ZONE 'UTC')
+                       ))::bigint AS online_seconds
+                FROM intervals i,
+                     generate_series(
+                         (i.online_from AT TIME ZONE 'UTC')::date,
+                         (i.online_to AT TIME ZONE 'UTC')::date,
+                         INTERVAL '1 day'
+                     ) AS g(d)
+                WHERE i.online_to > i.online_from
+                GROUP BY 1, 2
+            ),
+            keys AS (
+                SELECT courier_id, day FROM delivered
+                UNION SELECT courier_id, day FROM job_totals
+                UNION SELECT courier_id, day FROM online
+            )
+            INSERT INTO courier_daily_stats
+                (courier_id, day, deliveries, earnings, distance_km, job_earnings, online_seconds, updated_at)
+            SELECT k.courier_id, k.day,
+                   COALESCE(d.deliveries, 0),
+                   COALESCE(d.earnings, 0),
+                   COALESCE(d.distance_km, 0),
+                   COALESCE(j.job_earnings, 0),
+                   COALESCE(o.online_seconds, 0),
+                   NOW()
+            FROM keys k
+            LEFT JOIN delivered d ON d.courier_id = k.courier_id AND d.day = k.day
+            LEFT JOIN job_totals j ON j.courier_id = k.courier_id AND j.day = k.day
+            LEFT JOIN online o ON o.courier_id = k.courier_id AND o.day = k.day
+            """,
+            courier_id,
+        )
+    return int(result.split()[-1]) if result else 0
+
+
+async def rebuild_courier_daily_stats(courier_id: Optional[str] = None) -> int:
+    """
+    courier_daily_stats'ı kaynak tablolardan yeniden hesaplar (tek kurye ya da tümü).
+    Tümü için kuryeler tek tek, her biri kısa bir transaction'da işlenir; tablo kilitlenmez.
+    Dönüş: yazılan satır sayısı.
+    """
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        if courier_id:
+            courier_ids = [courier_id]
+        else:
+            rows = await conn.fetch(
+                """
+                SELECT courier_id FROM orders WHERE status = 'teslim_edildi' AND courier_id IS NOT NULL
+                UNION SELECT driver_id FROM jobs WHERE status = 'delivered' AND driver_id IS NOT NULL
+                UNION SELECT driver_id FROM driver_presence_intervals
+                UNION SELECT driver_id FROM driver_presence_events
+                UNION SELECT courier_id FROM courier_daily_stats
+                """
+            )
+            courier_ids = [str(r[0]) for r in rows]
+
+        written = 0
+        for cid in courier_ids:
+            written += await _rebuild_one(conn, cid)
+
+    logger.info(f"courier_daily_stats rebuilt ({courier_id or 'all couriers'}): {written} rows")
+    return written
+
+
+async def mark_backfill_done():
+    await execute(
+        "INSERT INTO maintenance_markers (name) VALUES ($1) ON CONFLICT (name) DO NOTHING",
+        BACKFILL_MARKER,
+    )
+
+
+async def is_backfill_done() -> bool:
+    """İlk backfill tamamlandı mı (tablo boş olmasa da iş yarıda ölmüş olabilir)"""
+    row = await fetch_one("SELECT 1 FROM maintenance_markers WHERE name = $1", BACKFILL_MARKER)
+    return row is not None
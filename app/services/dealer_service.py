@@ -2,7 +2,8 @@ from typing import Dict, Any, Optional, List, Tuple
 from uuid import UUID
 from app.utils.database import db_cursor
 from app.utils.database_async import fetch_all, fetch_one
-from app.utils.security import hash_pwd  # parolayı hashlemek için
+from app.utils.security import hash_pwd_async  # parolayı hashlemek için
+from app.services.token_revocation_service import revoke_user_tokens
 
 
 # -- Yardımcı: Whitelist alanlar (UPDATE için)
@@ -24,7 +25,7 @@ async def create_dealer(data: dict) -> Dict[str, Any]:
             if exists:
                 return {"success": False, "message": "Email already registered", "data": {}}
 
-            pwd_hash = hash_pwd(data.pop("password"))
+            pwd_hash = await hash_pwd_async(data.pop("password"))
 
             cur.execute("""
                 INSERT INTO dealers (
@@ -176,6 +177,10 @@ async def update_dealer(dealer_id: UUID, fields: Dict[str, Any]) -> Dict[str, An
         if not row:
             return {"success": False, "message": "Dealer not found", "data": {}}
 
+        # Pasifleştirilen bayinin mevcut access token'ları geçersiz olsun
+        if "status" in filtered and filtered["status"] != "active":
+            await revoke_user_tokens(dealer_id, "deactivated")
+
         return {"success": True, "message": "Dealer updated", "data": {"id": str(row["id"])}}
     except Exception as e:
         return {"success": False, "message": str(e), "data": {}}
@@ -194,6 +199,8 @@ async def update_dealer_status(dealer_id: UUID, status: str) -> Dict[str, Any]:
             row = cur.fetchone()
         if not row:
             return {"success": False, "message": "Dealer not found", "data": {}}
+        if status != "active":
+            await revoke_user_tokens(dealer_id, "deactivated")
         return {"success": True, "message": "Dealer status updated", "data": {"id": str(row["id"])}}
     except Exception as e:
         return {"success": False, "message": str(e), "data": {}}
@@ -211,6 +218,7 @@ async def delete_dealer(dealer_id: UUID) -> Dict[str, Any]:
             row = cur.fetchone()
         if not row:
             return {"success": False, "message": "Dealer not found", "data": {}}
+        await revoke_user_tokens(dealer_id, "deleted")
         return {"success": True, "message": "Dealer deleted", "data": {"id": str(row["id"])}}
     except Exception as e:
         return {"success": False, "message": str(e), "data": {}}
@@ -434,11 +442,14 @@ async def get_dealer_couriers_gps(dealer_id: str) -> Tuple[bool, Optional[List[D
 async def list_carriers_by_dealer_state(
     dealer_id: UUID,
     limit: int = 50,
-    offset: int = 0
+    offset: int = 0,
+    current_location: bool = False
 ) -> Tuple[bool, List[Dict[str, Any]] | str]:
     """
     Bayi'nin şehrindeki (state_id) tüm taşıyıcıları listeler.
     Taşıyıcıların araç tipi ve ikamet adresi bilgileriyle birlikte döner.
+    current_location=True ise kayıtlı il yerine taşıyıcının şu anki konumunun
+    ili (gps_table.state_id, geo_resolver ile çözümlenmiş) kullanılır.
     """
     try:
         # Önce dealer'ın state_id'sini al
@@ -457,7 +468,8 @@ async def list_carriers_by_dealer_state(
             return False, "Dealer state_id not found"
         
         # Taşıyıcıları listele (user_type='carrier' ve aynı state_id)
-        sql = """
+        state_column = "g.state_id" if current_location else "ob.state_id"
+        sql = f"""
             SELECT
                 d.id AS carrier_id,
                 d.first_name,
@@ -480,6 +492,8 @@ async def list_carriers_by_dealer_state(
                 v.plate AS vehicle_plate,
                 v.year AS vehicle_year,
                 v.vehicle_details,
+                g.city_id AS location_city_id,
+                g.state_id AS location_state_id,
                 d.created_at,
                 d.is_active
             FROM drivers d
@@ -487,8 +501,9 @@ async def list_carriers_by_dealer_state(
             LEFT JOIN cities ci ON ci.id = d.city_id
             LEFT JOIN states s ON s.id = ob.state_id
             LEFT JOIN vehicles v ON v.driver_id = d.id
+            LEFT JOIN gps_table g ON g.driver_id = d.id
             WHERE ob.user_type = 'carrier'
-              AND ob.state_id = $1
+              AND {state_column} = $1
               AND (d.deleted IS NULL OR d.deleted = FALSE)
             ORDER BY d.created_at DESC
             LIMIT $2 OFFSET $3;
@@ -0,0 +1,150 @@
+"""
+Dispatch sıralama motoru - order watcher adaylarını tek geçişte puanlar.
+
+Skor (düşük = daha iyi):
+    pickup'a yol ETA'sı (dk)
+  + aktif sipariş sayısı * LOAD_WEIGHT
+  + (5 - ortalama puan) * RATING_WEIGHT
+  + son REJECTION_WINDOW_MINUTES içindeki red sayısı * REJECTION_WEIGHT
+
+Tüm kuryelerin özellikleri tek SQL sorgusuyla, ETA'lar tek matris çağrısıyla alınır.
+"""
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+import logging
+
+from fastapi import HTTPException
+from ..utils.database_async import fetch_one, fetch_all
+from ..services.routing_service import routing_service, haversine_m
+from ..models.map_model import Coordinate
+
+logger = logging.getLogger(__name__)
+
+ETA_WEIGHT = 1.0              # dakika başına
+LOAD_WEIGHT = 8.0             # aktif sipariş başına
+RATING_WEIGHT = 3.0           # 5 üzerinden eksik puan başına
+REJECTION_WEIGHT = 4.0        # son redler başına
+REJECTION_WINDOW_MINUTES = 120
+NEUTRAL_RATING = 4.0          # Hiç puanı olmayan kurye için
+MISSING_ETA_MINUTES = 30.0    # GPS konumu olmayan kurye için
+
+# Kuryenin "meşgul" sayıldığı sipariş durumları
+LOAD_STATUSES = ("kuryeye_istek_atildi", "kuryeye_verildi", "yolda", "konuma_geldim")
+
+
+async def get_order_pickup(order_id: UUID) -> Optional[Coordinate]:
+    """Siparişin pickup noktası (yoksa restoran konumu)"""
+    row = await fetch_one(
+        """
+        SELECT
+            COALESCE(o.pickup_lat, r.latitude)  AS lat,
+            COALESCE(o.pickup_lng, r.longitude) AS lng
+        FROM orders o
+        LEFT JOIN restaurants r ON r.id = o.restaurant_id
+        WHERE o.id = $1
+        """,
+        order_id
+    )
+    if not row or row["lat"] is None or row["lng"] is None:
+        return None
+    return Coordinate(lat=float(row["lat"]), lgn=float(row["lng"]))
+
+
+async def _load_candidate_features(courier_ids: List[UUID]) -> List[Dict[str, Any]]:
+    rows = await fetch_all(
+        """
+        WITH c AS (
+            SELECT DISTINCT unnest($1::uuid[]) AS id
+        ),
+        load AS (
+            SELECT courier_id, COUNT(*) AS active_orders
+            FROM orders
+            WHERE courier_id = ANY($1::uuid[])
+              AND status::text = ANY($2::text[])
+            GROUP BY courier_id
+        ),
+        rating AS (
+            SELECT courier_id, AVG(rating)::float AS avg_rating
+            FROM courier_ratings
+            WHERE courier_id = ANY($1::uuid[])
+            GROUP BY courier_id
+        ),
+        rejections AS (
+            SELECT courier_id, COUNT(*) AS recent_rejections
+            FROM courier_orders_log
+            WHERE courier_id = ANY($1::uuid[])
+              AND action = 'reddetti'
+              AND created_at > NOW() - make_interval(mins => $3)
+            GROUP BY courier_id
+        )
+        SELECT
+            c.id AS courier_id,
+            g.latitude,
+            g.longitude,
+            COALESCE(l.active_orders, 0) AS active_orders,
+            rt.avg_rating,
+            COALESCE(rj.recent_rejections, 0) AS recent_rejections
+        FROM c
+        LEFT JOIN gps_table g   ON g.driver_id = c.id
+        LEFT JOIN load l        ON l.courier_id = c.id
+        LEFT JOIN rating rt     ON rt.courier_id = c.id
+        LEFT JOIN rejections rj ON rj.courier_id = c.id
+        """,
+        [str(cid) for cid in courier_ids],
+        list(LOAD_STATUSES),
+        REJECTION_WINDOW_MINUTES,
+    )
+    return [dict(r) for r in rows] if rows else []
+
+
+async def rank_candidates(pickup: Optional[Coordinate], courier_ids: List[UUID]) -> List[Dict[str, Any]]:
+    """
+    Adayları skora göre sıralar (en iyi önce). Her eleman skor kırılımını içerir:
+    {courier_id, score, eta_seconds, active_orders, avg_rating, recent_rejections}
+    """
+    if not courier_ids:
+        return []
+
+    features = await _load_candidate_features(courier_ids)
+
+    # Tek matris çağrısı: GPS'i olan tüm kuryeler -> pickup
+    located = [f for f in features if f["latitude"] is not None and f["longitude"] is not None]
+    etas: Dict[str, Optional[float]] = {}
+    if pickup and located:
+        sources = [Coordinate(lat=float(f["latitude"]), lgn=float(f["longitude"])) for f in located]
+        try:
+            matrix = await routing_service.matrix(sources, [pickup])
+            for f, row in zip(located, matrix["durations"]):
+                etas[str(f["courier_id"])] = row[0]
+        except HTTPException as e:
+            # Tüm sağlayıcılar düştüyse düz çizgi tahminine geri dön
+            logger.warning(f"ETA matrix failed, using straight-line estimate: {e.detail}")
+            for f, src in zip(located, sources):
+                etas[str(f["courier_id"])] = haversine_m(src, pickup) / (25 * 1000 / 3600)
+
+    ranked = []
+    for f in features:
+        courier_id = str(f["courier_id"])
+        eta_seconds = etas.get(courier_id)
+        eta_minutes = eta_seconds / 60 if eta_seconds is not None else MISSING_ETA_MINUTES
+        rating = f["avg_rating"] if f["avg_rating"] is not None else NEUTRAL_RATING
+        active_orders = int(f["active_orders"])
+        rejections = int(f["recent_rejections"])
+
+        score = (
+            eta_minutes * ETA_WEIGHT
+            + active_orders * LOAD_WEIGHT
+            + (5 - rating) * RATING_WEIGHT
+            + rejections * REJECTION_WEIGHT
+        )
+        ranked.append({
+            "courier_id": f["courier_id"],
+            "score": round(score, 3),
+            "eta_seconds": eta_seconds,
+            "active_orders": active_orders,
+            "avg_rating": f["avg_rating"],
+            "recent_rejections": rejections,
+        })
+
+    ranked.sort(key=lambda c: c["score"])
+    return ranked
@@ -1,5 +1,6 @@
 from app.utils.database_async import fetch_one, fetch_all, execute
 from typing import Optional
+from app.services.courier_dashboard_service import invalidate_courier_dashboard
 
 #Deprecated
 # === UPSERT VEHICLE ===
@@ -113,10 +114,17 @@ async def set_online(driver_id: str, online: bool, at: Optional[str] = None):
         return {"changed": False, "inserted_event": False}
 
 
+    # Event + durum + çevrimiçi aralığı tek statement'ta:
+    # online -> açık aralık; offline -> açık aralık kapanır ve süresi günlük rollup'a eklenir.
+    # Açık aralık yoksa (aralık modelinden önce açılmış oturum) driver_status'taki son
+    # online anından başlayan kapalı aralık yazılır.
     sql = """
     WITH ts AS (
       SELECT COALESCE($3::timestamptz, NOW()) AS ts
     ),
+    prev AS (
+      SELECT online, updated_at FROM driver_status WHERE driver_id = $1::uuid
+    ),
     ins_event AS (
       INSERT INTO driver_presence_events (driver_id, is_online, at_utc)
       SELECT $1::uuid, $2, ts.ts FROM ts
@@ -129,20 +137,54 @@ async def set_online(driver_id: str, online: bool, at: Optional[str] = None):
         SET online = EXCLUDED.online,
             updated_at = EXCLUDED.updated_at
       RETURNING 1
+    ),
+    open_iv AS (
+      INSERT INTO driver_presence_intervals (driver_id, online_from)
+      SELECT $1::uuid, ts.ts FROM ts
+      WHERE $2
+      ON CONFLICT (driver_id) WHERE online_to IS NULL DO NOTHING
+      RETURNING 1
+    ),
+    close_iv AS (
+      UPDATE driver_presence_intervals i
+      SET online_to = GREATEST(ts.ts, i.online_from)
+      FROM ts
+      WHERE NOT $2
+        AND i.driver_id = $1::uuid
+        AND i.online_to IS NULL
+      RETURNING i.online_from, i.online_to
+    ),
+    legacy_iv AS (
+      INSERT INTO driver_presence_intervals (driver_id, online_from, online_to)
+      SELECT $1::uuid, prev.updated_at, ts.ts
+      FROM prev, ts
+      WHERE NOT $2
+        AND prev.online
+        AND prev.updated_at <= ts.ts
+        AND NOT EXISTS (
+          SELECT 1 FROM driver_presence_intervals
+          WHERE driver_id = $1::uuid AND online_to IS NULL
+        )
+      RETURNING online_from, online_to
+    ),
+    rollup AS (
+      SELECT courier_stats_add_online($1::uuid, c.online_from, c.online_to)
+      FROM (SELECT * FROM close_iv UNION ALL SELECT * FROM legacy_iv) c
     )
-    SELECT 1;
+    SELECT (SELECT COUNT(*) FROM rollup) AS closed;
     """
     await execute(sql, driver_id, online, at)
+    invalidate_courier_dashboard(driver_id)
     return {"changed": True, "inserted_event": True}
 
 
 # === GET EARNINGS ===
 async def earnings(driver_id: str) -> float:
+    # Teslim edilen işlerin toplamı (courier_daily_stats.job_earnings, trigger ile güncel)
     query = """
-        SELECT COALESCE(SUM(price), 0) AS total
-        FROM jobs
-        WHERE driver_id = $1
-          AND status = 'delivered';
+        SELECT COALESCE(SUM(job_earnings), 0) AS total
+        FROM courier_daily_stats
+        WHERE courier_id = $1::uuid;
     """
     row = await fetch_one(query, driver_id)
     return float(row["total"]) if row else 0.0
@@ -174,67 +216,11 @@ async def how_many_left_works_hour(driver_id: str):
         }
 
     start_date = sub["start_date"]
-    # pencere sonunu 'şu an' ile sınırla (henüz bitmediyse)
-    end_or_now_sql = "LEAST($3::timestamptz, NOW())"
     total_quota_hours = float(sub["duration_days"]) * 24.0
 
-    row = await fetch_one(f"""
-        WITH bounds AS (
-            SELECT $1::uuid AS driver_id,
-                   $2::timestamptz AS win_start,
-                   {end_or_now_sql} AS win_end
-        ),
-        base_events AS (
-            SELECT dpe.at_utc, dpe.is_online
-            FROM driver_presence_events dpe, bounds b
-            WHERE dpe.driver_id = b.driver_id
-              AND dpe.at_utc >= b.win_start
-              AND dpe.at_utc <  b.win_end
-        ),
-        start_state AS (
-            -- pencere başlamadan önceki son event => start anındaki state
-            SELECT b.win_start AS at_utc,
-                   COALESCE((
-                     SELECT dpe.is_online
-                     FROM driver_presence_events dpe
-                     WHERE dpe.driver_id = b.driver_id
-                       AND dpe.at_utc < b.win_start
-                     ORDER BY dpe.at_utc DESC
-                     LIMIT 1
-                   ), FALSE) AS is_online
-            FROM bounds b
-        ),
-        end_cap AS (
-            -- pencere sonuna sentinel (offline)
-            SELECT b.win_end AS at_utc, FALSE AS is_online
-            FROM bounds b
-        ),
-        timeline AS (
-            SELECT * FROM base_events
-            UNION ALL
-            SELECT * FROM start_state
-            UNION ALL
-            SELECT * FROM end_cap
-        ),
-        ordered AS (
-            SELECT
-                at_utc,
-                is_online,
-                LEAD(at_utc) OVER (ORDER BY at_utc) AS next_at
-            FROM timeline
-        )
-        SELECT
-            COALESCE(
-              SUM(
-                CASE WHEN is_online AND next_at IS NOT NULL
-                     THEN EXTRACT(EPOCH FROM (next_at - at_utc))
-                     ELSE 0 END
-              ), 0
-            )::bigint AS online_seconds
-        FROM ordered;
-    """, driver_id, start_date, sub["end_date"])
-
-    online_seconds = int(row["online_seconds"])
+    # Paket penceresindeki çevrimiçi aralıkların toplamı (pencere sonu 'şu an' ile sınırlı)
+    from app.services.presence_service import online_seconds_between
+    online_seconds = await online_seconds_between(driver_id, start_date, sub["end_date"])
     consumed_hours = online_seconds / 3600.0
     remaining_hours = max(0.0, total_quota_hours - consumed_hours)
 
@@ -253,11 +239,9 @@ async def how_many_left_works_hour(driver_id: str):
     }
 # === GET BANNERS ===
 async def get_banners():
-    query = """
-        SELECT title, image_url
-        FROM banners
-        WHERE active = TRUE
-        ORDER BY priority DESC;
-    """
-    rows = await fetch_all(query)
-    return [dict(r) for r in rows] if rows else []
+    # Banner önbelleğinden (config_cache) aktif olanlar
+    from app.services.banner_service import list_banners_cached
+
+    rows = await list_banners_cached()
+    active = sorted((r for r in rows if r["active"]), key=lambda r: r["priority"] or 0, reverse=True)
+    return [{"title": r["title"], "image_url": r["image_url"]} for r in active]
@@ -1,5 +1,8 @@
 from typing import Any, Dict, Optional
 from app.utils.database_async import fetch_one, execute
+from app.utils.config_cache import config_cache
+
+CACHE_NAMESPACE = "general_settings"
 
 
 # === CREATE GENERAL SETTING ===
@@ -25,16 +28,23 @@ async def create_general_setting(data: Dict[str, Any]) -> Optional[str]:
         data["map_embed_code"],
         data.get("logo_path"),
     )
+    await config_cache.invalidate(CACHE_NAMESPACE)
     return None
 
 
 # === GET GENERAL SETTING ===
-async def get_general_setting() -> Optional[Dict[str, Any]]:
+async def _load_general_setting() -> Optional[Dict[str, Any]]:
     query = "SELECT * FROM general_settings LIMIT 1;"
     row = await fetch_one(query)
     return dict(row) if row else None
 
 
+async def get_general_setting() -> Optional[Dict[str, Any]]:
+    row = await config_cache.get_or_load(CACHE_NAMESPACE, "current", _load_general_setting)
+    # Çağıran (controller) dict'e alan ekleyebilir; önbellekteki kopya değişmesin
+    return dict(row) if row else None
+
+
 # === UPDATE GENERAL SETTING ===
 async def update_general_setting(gs_id: str, fields: Dict[str, Any]) -> Optional[str]:
     if not fields:
@@ -53,4 +63,5 @@ async def update_general_setting(gs_id: str, fields: Dict[str, Any]) -> Optional
     values.append(gs_id)
 
     await execute(query, *values)
+    await config_cache.invalidate(CACHE_NAMESPACE)
     return None
@@ -0,0 +1,232 @@
+"""
+Geo referans verisi önbelleği (countries / states / cities).
+
+Bu tablolar init_db tarafından app/sql/*.sql'den doldurulur ve pratikte değişmez.
+Startup'ta bir kez belleğe alınır; liste/arama endpoint'leri DB'ye gitmez.
+
+- Kayıtlar tuple olarak, üst kayda göre gruplu ve isme göre sıralı tutulur
+- Her grup için küçük harfli isim dizisi (prefix index): önek aramaları bisect ile
+- version: yüklenen satırların içerik özeti; ETag bundan üretilir
+- reload(): tablolar elle güncellenirse (admin) yeniden yükler. Admin reload'u
+  config_versions'taki "geo" sayacını artırır; diğer worker'lar config_cache sync'i ile
+  sayacı görür ve bir sonraki erişimde yeniden yükler
+"""
+from typing import Any, Dict, List, Optional, Tuple
+from bisect import bisect_left
+import asyncio
+import hashlib
+import logging
+import re
+import sys
+
+from app.utils.database_async import fetch_all, fetch_one
+from app.utils.config_cache import config_cache
+
+logger = logging.getLogger(__name__)
+
+# (id, name, iso2, iso3, phonecode)
+CountryRow = Tuple[int, str, Optional[str], Optional[str], Optional[str]]
+# (id, name, country_id, country_code, iso2)
+StateRow = Tuple[int, str, int, Optional[str], Optional[str]]
+# (id, name, state_id, state_code, country_id, country_code, timezone, latitude, longitude)
+CityRow = Tuple[int, str, int, Optional[str], int, Optional[str], Optional[str], float, float]
+
+_NON_DIGIT = re.compile(r"\D")
+
+# config_versions sayacı (admin reload'u tüm worker'lara duyurur)
+GEO_NAMESPACE = "geo"
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value.strip()) if value else value
+
+
+class _NameIndex:
+    """Küçük harfli isme göre sıralı kayıt listesi; önek araması bisect ile"""
+
+    __slots__ = ("rows", "keys")
+
+    def __init__(self, rows: List[tuple]):
+        self.rows = sorted(rows, key=lambda r: (r[1].lower(), r[1]))
+        self.keys = [r[1].lower() for r in self.rows]
+
+    def search(self, q: Optional[str]) -> List[tuple]:
+        """
+        q yoksa tümü (isim sırası). q varsa önce isim önekiyle eşleşenler,
+        sonra ismin içinde geçenler (eski LIKE '%q%' davranışı).
+        """
+        if not q:
+            return self.rows
+
+        q = q.lower()
+        start = bisect_left(self.keys, q)
+        end = start
+        while end < len(self.keys) and self.keys[end].startswith(q):
+            end += 1
+
+        result = self.rows[start:end]
+        result.extend(
+            row for i, row in enumerate(self.rows)
+            if (i < start or i >= end) and q in self.keys[i]
+        )
+        return result
+
+
+class GeoReferenceCache:
+    def __init__(self):
+        self.version: Optional[str] = None
+        # Yükleme anındaki config_versions["geo"] değeri
+        self.config_version = 0
+        self._countries: Dict[int, CountryRow] = {}
+        self._country_list: Optional[_NameIndex] = None
+        self._states: Dict[int, StateRow] = {}
+        self._states_by_country: Dict[int, _NameIndex] = {}
+        self._cities: Dict[int, CityRow] = {}
+        self._cities_by_state: Dict[int, _NameIndex] = {}
+        self._lock = asyncio.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self.version is not None
+
+    @property
+    def stale(self) -> bool:
+        """Başka bir worker reload istedi mi (sayaç yüklemeden sonra arttı)"""
+        return config_cache.version(GEO_NAMESPACE) > self.config_version
+
+    async def ensure_loaded(self):
+        if not self.loaded or self.stale:
+            async with self._lock:
+                if not self.loaded or self.stale:
+                    await self._load()
+
+    async def reload(self):
+        async with self._lock:
+            await self._load()
+
+    async def _load(self):
+        # Sayaç veriden önce okunur: yükleme sırasında gelen reload isteği kaçmaz
+        known_version = config_cache.version(GEO_NAMESPACE)
+        version_row = await fetch_one("SELECT version FROM config_versions WHERE name = $1", GEO_NAMESPACE)
+        country_rows, state_rows, city_rows = await asyncio.gather(
+            fetch_all("SELECT id, name, iso2, iso3, phonecode FROM public.countries"),
+            fetch_all("SELECT id, name, country_id, country_code, iso2 FROM public.states"),
+            fetch_all(
+                """
+                SELECT id, name, state_id, state_code, country_id, country_code, timezone, latitude, longitude
+                FROM public.cities
+                """
+            ),
+        )
+
+        countries = {
+            int(r["id"]): (int(r["id"]), r["name"], _intern(r["iso2"]), _intern(r["iso3"]), r["phonecode"])
+            for r in country_rows or []
+        }
+        states = {
+            int(r["id"]): (int(r["id"]), r["name"], int(r["country_id"]), _intern(r["country_code"]), _intern(r["iso2"]))
+            for r in state_rows or []
+        }
+        cities = {
+            int(r["id"]): (
+                int(r["id"]), r["name"], int(r["state_id"]), _intern(r["state_code"]),
+                int(r["country_id"]), _intern(r["country_code"]), _intern(r["timezone"]),
+                float(r["latitude"]), float(r["longitude"]),
+            )
+            for r in city_rows or []
+        }
+
+        states_grouped: Dict[int, List[StateRow]] = {}
+        for row in states.values():
+            states_grouped.setdefault(row[2], []).append(row)
+        cities_grouped: Dict[int, List[CityRow]] = {}
+        for row in cities.values():
+            cities_grouped.setdefault(row[2], []).append(row)
+
+        # Satır içerikleri üzerinden (isim / kod düzeltmeleri de ETag'i değiştirir)
+        digest = hashlib.sha1()
+        for table in (countries, states, cities):
+            for key in sorted(table):
+                digest.update(repr(table[key]).encode())
+            digest.update(b";")
+
+        # Yeni yapılar hazır olunca tek seferde değiştir (okuyucular yarım veri görmez)
+        self._countries = countries
+        self._country_list = _NameIndex(
+            [r for r in countries.values() if self._phone_code(r) is not None]
+        )
+        self._states = states
+        self._states_by_country = {k: _NameIndex(v) for k, v in states_grouped.items()}
+        self._cities = cities
+        self._cities_by_state = {k: _NameIndex(v) for k, v in cities_grouped.items()}
+        self.version = digest.hexdigest()[:16]
+        self.config_version = max(known_version, int(version_row["version"]) if version_row else 0)
+
+        logger.info(
+            f"Geo reference cache loaded: {len(countries)} countries, "
+            f"{len(states)} states, {len(cities)} cities (version {self.version})"
+        )
+
+    @staticmethod
+    def _phone_code(row: CountryRow) -> Optional[int]:
+        digits = _NON_DIGIT.sub("", row[4] or "")
+        return int(digits) if digits else None
+
+    # --- Okuma ---
+
+    def list_countries(self, q: Optional[str], limit: int, offset: int) -> List[Dict[str, Any]]:
+        """Telefon koduna göre tekilleştirilmiş ülkeler (her koddan isim sırasına göre ilki)"""
+        matches = self._country_list.search(q) if self._country_list else []
+        by_code: Dict[int, CountryRow] = {}
+        for row in sorted(matches, key=lambda r: r[1]):
+            by_code.setdefault(self._phone_code(row), row)
+        ordered = [by_code[code] for code in sorted(by_code)]
+        return [
+            {"id": r[0], "name": r[1], "iso2": r[2], "iso3": r[3], "phonecode": r[4]}
+            for r in ordered[offset:offset + limit]
+        ]
+
+    def list_states(self, country_id: int, q: Optional[str], limit: int, offset: int) -> List[Dict[str, Any]]:
+        index = self._states_by_country.get(country_id)
+        rows = index.search(q)[offset:offset + limit] if index else []
+        return [
+            {"id": r[0], "name": r[1], "country_id": r[2], "country_code": r[3], "iso2": r[4]}
+            for r in rows
+        ]
+
+    def list_cities(self, state_id: int, q: Optional[str], limit: int, offset: int) -> List[Dict[str, Any]]:
+        index = self._cities_by_state.get(state_id)
+        rows = index.search(q)[offset:offset + limit] if index else []
+        return [
+            {
+                "id": r[0], "name": r[1], "state_id": r[2], "state_code": r[3],
+                "country_id": r[4], "country_code": r[5], "timezone": r[6],
+            }
+            for r in rows
+        ]
+
+    def get_country(self, country_id: int) -> Optional[Dict[str, Any]]:
+        r = self._countries.get(country_id)
+        return {"id": r[0], "name": r[1], "iso2": r[2]} if r else None
+
+    def get_state(self, state_id: int) -> Optional[Dict[str, Any]]:
+        r = self._states.get(state_id)
+        return {"id": r[0], "name": r[1], "country_id": r[2]} if r else None
+
+    def get_city(self, city_id: int) -> Optional[CityRow]:
+        return self._cities.get(city_id)
+
+    def cities(self) -> List[CityRow]:
+        return list(self._cities.values())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "countries": len(self._countries),
+            "states": len(self._states),
+            "cities": len(self._cities),
+        }
+
+
+# Global geo reference cache instance
+geo_reference_cache = GeoReferenceCache()
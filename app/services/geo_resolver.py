@@ -0,0 +1,321 @@
+"""
+Koordinat -> şehir (city_id) / il (state_id) çözümleyici.
+
+- Sınır poligonları yerel GeoJSON dosyasından (GEO_BOUNDARIES_PATH) okunur.
+  Feature properties: city_id (ilçe/şehir katmanı) veya yalnızca state_id (il katmanı).
+  Polygon ve MultiPolygon desteklenir; delikler (iç halkalar) dikkate alınır.
+- Poligonlar sınır kutularına göre GRID_CELL_DEG'lik ızgara hücrelerine dağıtılır;
+  bir nokta için yalnızca kendi hücresindeki adaylar ray-casting ile test edilir
+- Hiçbir poligon noktayı içermiyorsa (dosya yok / kapsam dışı) en yakın şehir
+  merkezine düşülür (geo_reference_cache koordinatları)
+- Sonuçlar GEO_RESOLVER_PRECISION ondalığa yuvarlanmış nokta ile LRU'da tutulur
+  (kuryeler aynı noktadan tekrar tekrar konum gönderir)
+"""
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import asyncio
+import json
+import logging
+import math
+import os
+
+from app.services.geo_reference_cache import geo_reference_cache
+
+logger = logging.getLogger(__name__)
+
+GEO_BOUNDARIES_PATH = os.getenv(
+    "GEO_BOUNDARIES_PATH",
+    os.path.join(os.path.dirname(__file__), "..", "data", "city_boundaries.geojson"),
+)
+GRID_CELL_DEG = float(os.getenv("GEO_GRID_CELL_DEG", "0.25"))
+# 4 ondalık ~ 11 m; aynı hücredeki tekrar sorgular LRU'dan döner
+GEO_RESOLVER_PRECISION = int(os.getenv("GEO_RESOLVER_PRECISION", "4"))
+GEO_RESOLVER_LRU_SIZE = int(os.getenv("GEO_RESOLVER_LRU_SIZE", "20000"))
+
+EARTH_RADIUS_KM = 6371
+KM_PER_DEG = 111.32
+# Izgarada bu kadar halkada şehir bulunamazsa tüm liste taranır
+_MAX_RINGS = 40
+
+# (city_id, lat, lng)
+_CityPoint = Tuple[int, float, float]
+# Halka: [(lng, lat), ...]
+_Ring = List[Tuple[float, float]]
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+    a = (
+        math.sin(dlat / 2) ** 2 +
+        math.cos(math.radians(lat1)) *
+        math.cos(math.radians(lat2)) *
+        math.sin(dlon / 2) ** 2
+    )
+    return EARTH_RADIUS_KM * 2 * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _cell_key(lat: float, lng: float, cell: float) -> Tuple[int, int]:
+    return int(math.floor(lat / cell)), int(math.floor(lng / cell))
+
+
+def _in_ring(lng: float, lat: float, ring: _Ring) -> bool:
+    inside = False
+    j = len(ring) - 1
+    for i in range(len(ring)):
+        xi, yi = ring[i]
+        xj, yj = ring[j]
+        if (yi > lat) != (yj > lat) and lng < (xj - xi) * (lat - yi) / (yj - yi) + xi:
+            inside = not inside
+        j = i
+    return inside
+
+
+def _ring_area(ring: _Ring) -> float:
+    return abs(sum(
+        ring[i - 1][0] * ring[i][1] - ring[i][0] * ring[i - 1][1]
+        for i in range(len(ring))
+    )) / 2
+
+
+class _CityGrid:
+    """Şehir merkezleri için sabit hücreli ızgara (en yakın komşu araması)"""
+
+    __slots__ = ("cell", "cells", "points")
+
+    def __init__(self, points: List[_CityPoint], cell_deg: float):
+        self.cell = cell_deg
+        self.points = points
+        self.cells: Dict[Tuple[int, int], List[_CityPoint]] = {}
+        for p in points:
+            self.cells.setdefault(_cell_key(p[1], p[2], cell_deg), []).append(p)
+
+    def nearest(self, lat: float, lng: float, accept: Optional[Callable[[int], bool]] = None) -> Optional[int]:
+        """En yakın şehir; accept verilirse yalnızca kabul edilen şehirler arasından"""
+        if not self.points:
+            return None
+
+        ci, cj = _cell_key(lat, lng, self.cell)
+        best_id, best_km = None, math.inf
+        for ring in range(_MAX_RINGS + 1):
+            # Bu halkadaki en yakın nokta en az (ring - 1) hücre uzaklıkta; boylam
+            # derecesi kutba doğru kısaldığı için en dar enlemdeki genişlik alınır
+            edge_lat = min(89.0, abs(lat) + (ring + 1) * self.cell)
+            min_km = max(0, ring - 1) * self.cell * KM_PER_DEG * math.cos(math.radians(edge_lat))
+            if best_id is not None and min_km > best_km:
+                return best_id
+
+            for i in range(ci - ring, ci + ring + 1):
+                for j in range(cj - ring, cj + ring + 1):
+                    if ring and ci - ring < i < ci + ring and cj - ring < j < cj + ring:
+                        continue  # iç hücreler önceki halkalarda tarandı
+                    for city_id, plat, plng in self.cells.get((i, j), ()):
+                        if accept is not None and not accept(city_id):
+                            continue
+                        km = haversine_km(lat, lng, plat, plng)
+                        if km < best_km:
+                            best_id, best_km = city_id, km
+
+        if best_id is not None:
+            return best_id
+        # Izgaradan çok uzak nokta: doğrusal tarama
+        points = [p for p in self.points if accept is None or accept(p[0])]
+        if not points:
+            return None
+        return min(points, key=lambda p: haversine_km(lat, lng, p[1], p[2]))[0]
+
+
+class _Boundary:
+    __slots__ = ("city_id", "state_id", "bbox", "polygons", "area")
+
+    def __init__(self, city_id: Optional[int], state_id: Optional[int], polygons: List[List[_Ring]]):
+        self.city_id = city_id
+        self.state_id = state_id
+        self.polygons = polygons
+        xs = [x for poly in polygons for x, _ in poly[0]]
+        ys = [y for poly in polygons for _, y in poly[0]]
+        self.bbox = (min(xs), min(ys), max(xs), max(ys))
+        self.area = sum(_ring_area(poly[0]) for poly in polygons)
+
+    def contains(self, lat: float, lng: float) -> bool:
+        min_x, min_y, max_x, max_y = self.bbox
+        if not (min_x <= lng <= max_x and min_y <= lat <= max_y):
+            return False
+        for outer, *holes in self.polygons:
+            if _in_ring(lng, lat, outer) and not any(_in_ring(lng, lat, h) for h in holes):
+                return True
+        return False
+
+
+class _BoundaryIndex:
+    """Poligonları sınır kutularının kapladığı ızgara hücrelerine dağıtan indeks"""
+
+    __slots__ = ("cell", "cells", "count")
+
+    def __init__(self, boundaries: List[_Boundary], cell_deg: float):
+        self.cell = cell_deg
+        self.count = len(boundaries)
+        self.cells: Dict[Tuple[int, int], List[_Boundary]] = {}
+        for b in boundaries:
+            min_i, min_j = _cell_key(b.bbox[1], b.bbox[0], cell_deg)
+            max_i, max_j = _cell_key(b.bbox[3], b.bbox[2], cell_deg)
+            for i in range(min_i, max_i + 1):
+                for j in range(min_j, max_j + 1):
+                    self.cells.setdefault((i, j), []).append(b)
+        # İç içe poligonlarda en küçüğü (en spesifik) önce test edilir
+        for bucket in self.cells.values():
+            bucket.sort(key=lambda b: b.area)
+
+    def find(self, lat: float, lng: float) -> Optional[_Boundary]:
+        for b in self.cells.get(_cell_key(lat, lng, self.cell), ()):
+            if b.contains(lat, lng):
+                return b
+        return None
+
+
+def _read_boundaries(path: str) -> Tuple[List[_Boundary], List[_Boundary]]:
+    """GeoJSON'dan (şehir katmanı, il katmanı) sınırlarını okur"""
+    if not os.path.exists(path):
+        return [], []
+
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+
+    cities: List[_Boundary] = []
+    states: List[_Boundary] = []
+    for feature in data.get("features", []):
+        props = feature.get("properties") or {}
+        geometry = feature.get("geometry") or {}
+        coords = geometry.get("coordinates") or []
+        if geometry.get("type") == "Polygon":
+            coords = [coords]
+        elif geometry.get("type") != "MultiPolygon":
+            continue
+
+        polygons = [
+            [[(float(x), float(y)) for x, y, *_ in ring] for ring in poly]
+            for poly in coords if poly and poly[0]
+        ]
+        if not polygons:
+            continue
+
+        city_id = props.get("city_id")
+        state_id = props.get("state_id")
+        if city_id is not None:
+            cities.append(_Boundary(int(city_id), int(state_id) if state_id is not None else None, polygons))
+        elif state_id is not None:
+            states.append(_Boundary(None, int(state_id), polygons))
+    return cities, states
+
+
+class GeoResolver:
+    def __init__(self):
+        self._centroids: Optional[_CityGrid] = None
+        self._city_index: Optional[_BoundaryIndex] = None
+        self._state_index: Optional[_BoundaryIndex] = None
+        self._geo_version: Optional[str] = None
+        self._config_version = 0
+        self._lru: "OrderedDict[Tuple[float, float], Tuple[Optional[int], Optional[int]]]" = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._lock = asyncio.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return (
+            self._centroids is not None
+            and self._geo_version == geo_reference_cache.version
+            and not geo_reference_cache.stale
+            and self._config_version == geo_reference_cache.config_version
+        )
+
+    async def ensure_loaded(self):
+        if not self.loaded:
+            async with self._lock:
+                if not self.loaded:
+                    await self._load()
+
+    async def reload(self):
+        async with self._lock:
+            await self._load()
+
+    async def _load(self):
+        await geo_reference_cache.ensure_loaded()
+        city_boundaries, state_boundaries = await asyncio.to_thread(_read_boundaries, GEO_BOUNDARIES_PATH)
+
+        self._centroids = _CityGrid(
+            [(c[0], c[7], c[8]) for c in geo_reference_cache.cities()],
+            GRID_CELL_DEG,
+        )
+        self._city_index = _BoundaryIndex(city_boundaries, GRID_CELL_DEG)
+        self._state_index = _BoundaryIndex(state_boundaries, GRID_CELL_DEG)
+        self._geo_version = geo_reference_cache.version
+        # Admin reload'u (diğer worker'larda) sınır dosyasını da yeniden okutur
+        self._config_version = geo_reference_cache.config_version
+        self._lru.clear()
+
+        logger.info(
+            f"Geo resolver loaded: {len(city_boundaries)} city boundaries, "
+            f"{len(state_boundaries)} state boundaries, {len(self._centroids.points)} centroids"
+        )
+
+    # --- Çözümleme (ensure_loaded sonrası, senkron) ---
+
+    def resolve(self, lat: float, lng: float) -> Tuple[Optional[int], Optional[int]]:
+        """(city_id, state_id). Yüklenmemişse (None, None)."""
+        if self._centroids is None:
+            return None, None
+
+        key = (round(lat, GEO_RESOLVER_PRECISION), round(lng, GEO_RESOLVER_PRECISION))
+        cached = self._lru.get(key)
+        if cached is not None:
+            self._lru.move_to_end(key)
+            self._hits += 1
+            return cached
+
+        self._misses += 1
+        result = self._resolve_uncached(key[0], key[1])
+        self._lru[key] = result
+        if len(self._lru) > GEO_RESOLVER_LRU_SIZE:
+            self._lru.popitem(last=False)
+        return result
+
+    def _resolve_uncached(self, lat: float, lng: float) -> Tuple[Optional[int], Optional[int]]:
+        boundary = self._city_index.find(lat, lng)
+        if boundary:
+            return boundary.city_id, boundary.state_id or self._state_of(boundary.city_id)
+
+        state_boundary = self._state_index.find(lat, lng)
+        if state_boundary:
+            # Şehir poligonu yok ama il biliniyor: yalnızca o ildeki merkezler arasından seç
+            state_id = state_boundary.state_id
+            city_id = self._centroids.nearest(lat, lng, accept=lambda c: self._state_of(c) == state_id)
+            return city_id, state_id
+
+        city_id = self._centroids.nearest(lat, lng)
+        return city_id, self._state_of(city_id)
+
+    @staticmethod
+    def _state_of(city_id: Optional[int]) -> Optional[int]:
+        row = geo_reference_cache.get_city(city_id) if city_id is not None else None
+        return row[2] if row else None
+
+    def resolve_city(self, lat: float, lng: float) -> Optional[int]:
+        return self.resolve(lat, lng)[0]
+
+    def resolve_state(self, lat: float, lng: float) -> Optional[int]:
+        return self.resolve(lat, lng)[1]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "cityBoundaries": self._city_index.count if self._city_index else 0,
+            "stateBoundaries": self._state_index.count if self._state_index else 0,
+            "centroids": len(self._centroids.points) if self._centroids else 0,
+            "lruSize": len(self._lru),
+            "hits": self._hits,
+            "misses": self._misses,
+        }
+
+
+# Global geo resolver instance
+geo_resolver = GeoResolver()
@@ -1,6 +1,7 @@
 from typing import Any, Dict, Tuple, Optional, List
 import uuid
 from ..utils.database_async import fetch_one, fetch_all
+from .geo_resolver import geo_resolver
 
 async def get_all_latest() -> Tuple[Optional[List[Dict[str, Any]]], Optional[str]]:
     """
@@ -15,22 +16,30 @@ async def get_all_latest() -> Tuple[Optional[List[Dict[str, Any]]], Optional[str
 async def upsert_location(driver_id: str, latitude: float, longitude: float) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
     """
     Update location from database instantly.
+    Konumun şehir / ili bellekte çözümlenip (geo_resolver) birlikte yazılır.
     """
     try:
         uuid.UUID(driver_id)
     except:
         return None, "Invalid UUID"    
+    try:
+        await geo_resolver.ensure_loaded()
+        city_id, state_id = geo_resolver.resolve(float(latitude), float(longitude))
+    except Exception:
+        city_id, state_id = None, None
     query = """
-        INSERT INTO gps_table (driver_id, latitude, longitude, updated_at)
-        VALUES ($1, $2, $3, NOW())
+        INSERT INTO gps_table (driver_id, latitude, longitude, city_id, state_id, updated_at)
+        VALUES ($1, $2, $3, $4, $5, NOW())
         ON CONFLICT (driver_id)
         DO UPDATE SET
             latitude = EXCLUDED.latitude,
             longitude = EXCLUDED.longitude,
+            city_id = EXCLUDED.city_id,
+            state_id = EXCLUDED.state_id,
             updated_at = NOW()
-        RETURNING driver_id, latitude, longitude, updated_at;
+        RETURNING driver_id, latitude, longitude, city_id, state_id, updated_at;
     """
-    row = await fetch_one(query, driver_id, latitude, longitude)
+    row = await fetch_one(query, driver_id, latitude, longitude, city_id, state_id)
     if not row:
         return None, "Location update failed"
     return row, None
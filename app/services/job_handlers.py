@@ -0,0 +1,112 @@
+"""
+Kalıcı iş kuyruğu handler'ları (job_queue_service).
+
+Handler hata fırlatırsa iş backoff ile tekrar denenir; bu yüzden handler'lar
+idempotent yazılmalıdır.
+"""
+from typing import Any, Dict
+from uuid import UUID
+import logging
+
+from app.utils.database_async import get_pool
+from app.services.job_queue_service import job_handler
+from app.services.mail_service import send_mail
+
+logger = logging.getLogger(__name__)
+
+
+@job_handler("mail.send", queue="mail", max_attempts=5)
+async def handle_mail_send(payload: Dict[str, Any]):
+    """Tekil transactional mail (destek talebi, iletişim formu vb.)"""
+    ok, info = await send_mail(payload["to"], payload["subject"], payload["html"])
+    if not ok:
+        raise RuntimeError(info)
+
+
+@job_handler("paytr.subscription_paid", queue="payments", max_attempts=8)
+async def handle_subscription_paid(payload: Dict[str, Any]):
+    """
+    Başarılı PayTR ödemesinden sonra kurye paket aboneliğini aktifleştirir.
+    Aynı callback birden fazla kez gelse de abonelik bir kez oluşur.
+    """
+    try:
+        sub_id = UUID(payload["subscription_request_id"])
+    except ValueError:
+        logger.error(f"Geçersiz abonelik talep ID: {payload['subscription_request_id']}")
+        return
+
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            row = await conn.fetchrow(
+                "SELECT * FROM courier_subscription_requests WHERE id = $1 FOR UPDATE",
+                sub_id
+            )
+            if not row:
+                # Tekrar denemek sonucu değiştirmez; logla ve işi bitir
+                logger.error(f"FATAL: Ödeme başarılı ama Request ID DB'de bulunamadı: {sub_id}")
+                return
+
+            await conn.execute(
+                """
+                INSERT INTO courier_package_subscriptions
+                    (id, courier_id, package_id, start_date, end_date, is_active)
+                VALUES ($1, $2, $3, $4, $5, TRUE)
+                ON CONFLICT (id) DO NOTHING
+                """,
+                sub_id, row["courier_id"], row["package_id"], row["start_date"], row["end_date"]
+            )
+            await conn.execute(
+                """
+                UPDATE courier_subscription_requests
+                SET payment_status = 'completed', is_active = TRUE
+                WHERE id = $1
+                """,
+                sub_id
+            )
+
+    logger.info(f"Payment processed successfully for ID: {sub_id}")
+
+
+@job_handler("order_watch.rank", queue="dispatch", max_attempts=3)
+async def handle_order_watch_rank(payload: Dict[str, Any]):
+    """
+    Sipariş izleyicisinin adaylarını dispatch skoruna göre sıralar (routing matrisi)
+    ve mevcut dalganın tekliflerini gönderir. İzleyici kapandıysa hiçbir şey yapmaz.
+    """
+    from app.services.order_watch_service import update_available_drivers
+    await update_available_drivers(UUID(payload["order_id"]))
+
+
+@job_handler("courier_stats.rebuild", queue="maintenance", max_attempts=3)
+async def handle_courier_stats_rebuild(payload: Dict[str, Any]):
+    """
+    courier_daily_stats backfill'i (ilk kurulum ya da tek kurye için düzeltme).
+    Yeniden hesaplama idempotenttir; tüm kuryeler bitince backfill tamamlandı kaydı yazılır.
+    """
+    from app.services.courier_stats_service import rebuild_courier_daily_stats, mark_backfill_done
+    courier_id = payload.get("courier_id")
+    await rebuild_courier_daily_stats(courier_id)
+    if not courier_id:
+        await mark_backfill_done()
+
+
+@job_handler("presence.compact", queue="maintenance", max_attempts=3)
+async def handle_presence_compact(payload: Dict[str, Any]):
+    """
+    Eski driver_presence_events kayıtlarını çevrimiçi aralıklarına çevirir ve siler.
+    Bitince bir sonraki günün işini kuyruğa alır (günde bir kez).
+    """
+    from datetime import datetime, timedelta, timezone
+    from app.services.job_queue_service import enqueue
+    from app.services.presence_service import (
+        compact_presence_events, next_compaction_dedupe_key, PRESENCE_COMPACT_INTERVAL_SECONDS
+    )
+
+    await compact_presence_events()
+    next_run = datetime.now(timezone.utc) + timedelta(seconds=PRESENCE_COMPACT_INTERVAL_SECONDS)
+    await enqueue(
+        "presence.compact", {},
+        delay_seconds=PRESENCE_COMPACT_INTERVAL_SECONDS,
+        dedupe_key=next_compaction_dedupe_key(next_run),
+    )
@@ -1,6 +1,6 @@
 from typing import List, Optional, Tuple
 from uuid import UUID
-from app.utils.database_async import fetch_one
+from app.services.pricing_engine import pricing_engine, PRICING_BATCH_MAX
 import math
 
 
@@ -36,42 +36,17 @@ async def get_city_price_by_template(
     template: str
 ) -> Optional[dict]:
     """
-    Şehir ID'si ve araç tipine göre city_prices tablosundan fiyat bilgisini getirir
+    Şehir ID'si ve araç tipine göre fiyat bilgisini getirir (pricing_engine belleğinden)
     """
     try:
-        query = """
-            SELECT 
-                courier_price,
-                minivan_price,
-                panelvan_price,
-                kamyonet_price,
-                kamyon_price
-            FROM city_prices
-            WHERE city_id = $1
-            LIMIT 1;
-        """
-        
-        row = await fetch_one(query, city_id)
-        
-        if not row:
+        await pricing_engine.ensure_fresh()
+        base_price = pricing_engine.city_base_price(city_id, template)
+        if base_price is None:
             return None
-        
-        # Template'e göre fiyat seç
-        price_map = {
-            "motorcycle": row.get("courier_price"),
-            "minivan": row.get("minivan_price"),
-            "panelvan": row.get("panelvan_price"),
-            "kamyonet": row.get("kamyonet_price"),
-            "kamyon": row.get("kamyon_price")
-        }
-        
-        base_price = price_map.get(template, row.get("courier_price"))
-        
         return {
-            "base_price": float(base_price) if base_price else 0.0,
+            "base_price": base_price,
             "template": template
         }
-        
     except Exception as e:
         return None
 
@@ -81,35 +56,11 @@ async def get_city_id_from_coordinates(
     lng: float
 ) -> Optional[int]:
     """
-    Koordinatlardan şehir ID'sini bulur (basit yaklaşım - en yakın şehir)
+    Koordinatlardan en yakın şehrin ID'sini bulur (pricing_engine ızgara indeksi)
     """
     try:
-        # En yakın şehri bul (basit mesafe hesaplaması ile)
-        query = """
-            SELECT id, lat, lng
-            FROM cities
-            WHERE lat IS NOT NULL AND lng IS NOT NULL
-            ORDER BY (
-                6371 * acos(
-                    LEAST(1.0,
-                        cos(radians($1)) * 
-                        cos(radians(lat)) * 
-                        cos(radians(lng) - radians($2)) + 
-                        sin(radians($1)) * 
-                        sin(radians(lat))
-                    )
-                )
-            )
-            LIMIT 1;
-        """
-        
-        row = await fetch_one(query, lat, lng)
-        
-        if row:
-            return row.get("id")
-        
-        return None
-        
+        await pricing_engine.ensure_fresh()
+        return pricing_engine.resolve_city(lat, lng)
     except Exception as e:
         return None
 
@@ -124,7 +75,7 @@ async def calculate_job_price(
     base_price: Optional[float] = None
 ) -> Tuple[Optional[float], Optional[str]]:
     """
-    Yük fiyatını hesaplar
+    Yük fiyatını hesaplar (bellek içi; veri değişmedikçe DB'ye gitmez)
     
     Args:
         vehicle_product_id: Araç ürün ID'si (yeni sistem)
@@ -139,83 +90,34 @@ async def calculate_job_price(
         (fiyat, hata_mesajı)
     """
     try:
-        # 1. Template belirleme
-        template = vehicle_template
-        
-        if vehicle_product_id and not template:
-            # Vehicle product'tan template çek
-            from app.services.vehicle_product_service import get_vehicle_product
-            product, error = await get_vehicle_product(vehicle_product_id)
-            if error or not product:
-                return None, f"Araç ürünü bulunamadı: {error}"
-            template = product.get("productTemplate")
-        
-        if not template:
-            template = "motorcycle"  # Default
-        
-        # 2. Base price belirleme
-        if base_price is None:
-            # City prices'tan fiyat çek
-            if not city_id and pickup_coords:
-                # Koordinatlardan şehir bul
-                city_id = await get_city_id_from_coordinates(
-                    pickup_coords[0],
-                    pickup_coords[1]
-                )
-            
-            if city_id:
-                city_price = await get_city_price_by_template(city_id, template)
-                if city_price:
-                    base_price = city_price["base_price"]
-                else:
-                    # Varsayılan fiyatlar (city_prices bulunamazsa)
-                    default_prices = {
-                        "motorcycle": 50.0,
-                        "minivan": 150.0,
-                        "panelvan": 200.0,
-                        "kamyonet": 300.0,
-                        "kamyon": 500.0
-                    }
-                    base_price = default_prices.get(template, 50.0)
-            else:
-                # Şehir bulunamazsa varsayılan fiyat
-                default_prices = {
-                    "motorcycle": 50.0,
-                    "minivan": 150.0,
-                    "panelvan": 200.0,
-                    "kamyonet": 300.0,
-                    "kamyon": 500.0
-                }
-                base_price = default_prices.get(template, 50.0)
-        
-        # 3. Mesafe hesaplama (eğer koordinatlar varsa)
-        distance_km = 0.0
-        km_price = 0.0
-        
-        if pickup_coords and dropoff_coords and len(pickup_coords) >= 2 and len(dropoff_coords) >= 2:
-            distance_km = calculate_distance_km(
-                pickup_coords[0],
-                pickup_coords[1],
-                dropoff_coords[0],
-                dropoff_coords[1]
-            )
-            
-            # KM başına fiyat (basit hesaplama - carrier_types tablosundan da çekilebilir)
-            # Şimdilik template'e göre sabit değerler
-            km_price_map = {
-                "motorcycle": 2.0,
-                "minivan": 5.0,
-                "panelvan": 6.0,
-                "kamyonet": 8.0,
-                "kamyon": 10.0
-            }
-            km_price = km_price_map.get(template, 2.0)
-        
-        # 4. Toplam fiyat hesaplama
-        total = base_price + (distance_km * km_price) + extra_services_total
-        
-        return round(total, 2), None
+        await pricing_engine.ensure_fresh()
+
+        template, error = await pricing_engine.resolve_template(vehicle_product_id, vehicle_template)
+        if error:
+            return None, error
+
+        quote = pricing_engine.quote(
+            template,
+            pickup_coords=pickup_coords,
+            dropoff_coords=dropoff_coords,
+            city_id=city_id,
+            extra_services_total=extra_services_total or 0.0,
+            base_price=base_price,
+        )
+        return quote["price"], None
         
     except Exception as e:
         return None, str(e)
 
+
+async def calculate_job_prices(items: List[dict]) -> Tuple[Optional[List[dict]], Optional[str]]:
+    """
+    Birden fazla alış/teslimat çifti için toplu teklif (adres formu önizlemesi).
+    Öğe alanları calculate_job_price parametreleriyle aynıdır.
+    """
+    try:
+        if len(items) > PRICING_BATCH_MAX:
+            return None, f"En fazla {PRICING_BATCH_MAX} teklif tek seferde hesaplanabilir"
+        return await pricing_engine.quote_many(items), None
+    except Exception as e:
+        return None, str(e)
@@ -0,0 +1,250 @@
+"""
+Kalıcı iş kuyruğu (Postgres, FOR UPDATE SKIP LOCKED) - yan etkileri request'ten ayırır.
+
+Kullanım:
+    @job_handler("mail.send", queue="mail", max_attempts=5)
+    async def _send(payload): ...
+
+    await enqueue("mail.send", {"to": ..., "subject": ..., "html": ...})
+
+- Her kuyruğun kendi eşzamanlılık sınırı vardır (JOB_QUEUE_CONCURRENCY, örn. "mail=4,payments=2")
+- Hata alan iş üstel backoff ile tekrar denenir; max_attempts sonunda 'dead' olur (dead-letter)
+- Worker aynı process'te (main.on_startup) veya ayrı process olarak (python -m app.worker) çalışır
+- Metrikler: job_queue_stats() (process içi sayaçlar + kuyruk bazlı DB durumları)
+"""
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from dataclasses import dataclass
+import asyncio
+import json
+import logging
+import os
+import socket
+
+from app.utils.database_async import fetch_one, fetch_all, execute
+
+logger = logging.getLogger(__name__)
+
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1"))
+JOB_RETRY_BASE_SECONDS = int(os.getenv("JOB_RETRY_BASE_SECONDS", "10"))
+JOB_DEFAULT_CONCURRENCY = int(os.getenv("JOB_DEFAULT_CONCURRENCY", "2"))
+# 'running' durumunda bu kadar kalan iş (worker çöktü) tekrar kuyruğa alınır
+JOB_STALE_LOCK_MINUTES = int(os.getenv("JOB_STALE_LOCK_MINUTES", "10"))
+
+
+def _parse_concurrency(raw: str) -> Dict[str, int]:
+    """'mail=4,payments=2' -> {'mail': 4, 'payments': 2}"""
+    result = {}
+    for part in raw.split(","):
+        if "=" in part:
+            name, value = part.split("=", 1)
+            result[name.strip()] = int(value)
+    return result
+
+
+JOB_QUEUE_CONCURRENCY = _parse_concurrency(os.getenv("JOB_QUEUE_CONCURRENCY", "mail=4,payments=2"))
+
+
+@dataclass
+class JobHandler:
+    kind: str
+    queue: str
+    max_attempts: int
+    func: Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+_handlers: Dict[str, JobHandler] = {}
+
+# kind -> {"succeeded", "retried", "dead"} ; queue -> in_flight
+_metrics: Dict[str, Dict[str, int]] = {}
+_in_flight: Dict[str, int] = {}
+
+
+def job_handler(kind: str, queue: str = "default", max_attempts: int = 5):
+    """İş tipi için handler kaydeder"""
+    def decorator(func):
+        _handlers[kind] = JobHandler(kind, queue, max_attempts, func)
+        return func
+    return decorator
+
+
+def _count(kind: str, key: str):
+    bucket = _metrics.setdefault(kind, {"succeeded": 0, "retried": 0, "dead": 0})
+    bucket[key] += 1
+
+
+async def enqueue(
+    kind: str,
+    payload: Dict[str, Any],
+    delay_seconds: float = 0,
+    dedupe_key: Optional[str] = None,
+) -> Optional[int]:
+    """
+    İşi kuyruğa yazar ve id döner. dedupe_key verilirse aynı anahtarla bekleyen ya da
+    çalışan bir iş varken ikinci kez eklenmez (örn. PayTR callback tekrarları) ve None döner.
+    Biten (done) veya ölen (dead) işin anahtarı tekrar kullanılabilir.
+    """
+    if kind not in _handlers:
+        from app.services import job_handlers  # noqa: F401 - handler kayıtları
+    handler = _handlers.get(kind)
+    if handler is None:
+        raise ValueError(f"Unknown job kind: {kind}")
+
+    row = await fetch_one(
+        """
+        INSERT INTO background_jobs (queue, kind, payload, max_attempts, run_at, dedupe_key)
+        VALUES ($1, $2, $3::jsonb, $4, NOW() + make_interval(secs => $5), $6)
+        ON CONFLICT (dedupe_key) WHERE status IN ('queued','running') DO NOTHING
+        RETURNING id;
+        """,
+        handler.queue, kind, json.dumps(payload, default=str),
+        handler.max_attempts, float(delay_seconds), dedupe_key,
+    )
+    return row["id"] if row else None
+
+
+async def _claim(queue: str, limit: int, worker_id: str) -> List[Dict[str, Any]]:
+    rows = await fetch_all(
+        """
+        UPDATE background_jobs
+        SET status = 'running', attempts = attempts + 1, locked_at = NOW(), locked_by = $3
+        WHERE id IN (
+            SELECT id FROM background_jobs
+            WHERE queue = $1
+              AND (
+                    (status = 'queued' AND run_at <= NOW())
+                 OR (status = 'running' AND locked_at < NOW() - make_interval(mins => $4))
+              )
+            ORDER BY run_at, id
+            LIMIT $2
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING id, kind, payload, attempts, max_attempts;
+        """,
+        queue, limit, worker_id, JOB_STALE_LOCK_MINUTES,
+    )
+    return [dict(r) for r in rows] if rows else []
+
+
+async def _run_job(queue: str, job: Dict[str, Any]):
+    kind = job["kind"]
+    handler = _handlers.get(kind)
+    try:
+        if handler is None:
+            raise RuntimeError(f"No handler registered for {kind}")
+        await handler.func(json.loads(job["payload"]))
+        await execute(
+            "UPDATE background_jobs SET status = 'done', finished_at = NOW(), last_error = NULL WHERE id = $1;",
+            job["id"],
+        )
+        _count(kind, "succeeded")
+    except Exception as e:
+        dead = job["attempts"] >= job["max_attempts"]
+        logger.warning(f"Job {job['id']} ({kind}) failed on attempt {job['attempts']}: {e}")
+        await execute(
+            """
+            UPDATE background_jobs
+            SET status = $2,
+                run_at = NOW() + make_interval(secs => $3 * power(2, attempts - 1)),
+                finished_at = CASE WHEN $2 = 'dead' THEN NOW() ELSE NULL END,
+                last_error = $4
+            WHERE id = $1;
+            """,
+            job["id"], "dead" if dead else "queued", JOB_RETRY_BASE_SECONDS, str(e)[:1000],
+        )
+        _count(kind, "dead" if dead else "retried")
+    finally:
+        _in_flight[queue] -= 1
+
+
+async def _run_queue(queue: str, concurrency: int, worker_id: str, stop: asyncio.Event):
+    _in_flight.setdefault(queue, 0)
+    tasks = set()
+    while not stop.is_set():
+        free = concurrency - _in_flight[queue]
+        claimed = []
+        if free > 0:
+            try:
+                claimed = await _claim(queue, free, worker_id)
+            except Exception as e:
+                logger.error(f"Job queue '{queue}' claim error: {e}")
+
+        for job in claimed:
+            _in_flight[queue] += 1
+            task = asyncio.create_task(_run_job(queue, job))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        # Kuyrukta iş varken ve yer açıkken beklemeden devam et
+        if not claimed or _in_flight[queue] >= concurrency:
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=JOB_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def run_worker(queues: Optional[List[str]] = None, stop: Optional[asyncio.Event] = None):
+    """
+    Kayıtlı handler'ların kuyruklarını işler. queues verilmezse tüm kuyruklar.
+    stop event'i set edilince eldeki işler bitirilip çıkılır.
+    """
+    from app.services import job_handlers  # noqa: F401 - handler kayıtları
+
+    stop = stop or asyncio.Event()
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    names = queues or sorted({h.queue for h in _handlers.values()})
+    logger.info(f"Job worker {worker_id} started for queues: {names}")
+
+    await asyncio.gather(
+        _maintenance(stop),
+        *(
+            _run_queue(name, JOB_QUEUE_CONCURRENCY.get(name, JOB_DEFAULT_CONCURRENCY), worker_id, stop)
+            for name in names
+        ),
+    )
+
+
+async def _maintenance(stop: asyncio.Event, interval_seconds: int = 3600):
+    while not stop.is_set():
+        try:
+            await purge_finished_jobs()
+        except Exception as e:
+            logger.error(f"Job queue maintenance error: {e}")
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=interval_seconds)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def job_queue_stats() -> Dict[str, Any]:
+    rows = await fetch_all(
+        """
+        SELECT queue, status, COUNT(*) AS cnt, MIN(run_at) FILTER (WHERE status = 'queued') AS oldest
+        FROM background_jobs
+        WHERE status <> 'done'
+        GROUP BY queue, status;
+        """
+    )
+    queues: Dict[str, Dict[str, Any]] = {}
+    for r in rows or []:
+        q = queues.setdefault(r["queue"], {})
+        q[r["status"]] = int(r["cnt"])
+        if r["oldest"] is not None:
+            q["oldest_queued_at"] = r["oldest"]
+
+    return {
+        "queues": queues,
+        "in_flight": dict(_in_flight),
+        "handlers": {k: {"queue": h.queue, "max_attempts": h.max_attempts} for k, h in _handlers.items()},
+        "processed": _metrics,
+    }
+
+
+async def purge_finished_jobs(older_than_days: int = 7):
+    """Tamamlanmış işleri sil (dead-letter kayıtları inceleme için kalır)"""
+    await execute(
+        "DELETE FROM background_jobs WHERE status = 'done' AND finished_at < NOW() - make_interval(days => $1);",
+        older_than_days,
+    )
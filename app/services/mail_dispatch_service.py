@@ -0,0 +1,197 @@
+"""
+Mail dispatch - toplu mailler için outbox (mail_outbox) + arka plan gönderici.
+
+- enqueue_bulk: alıcıları tek INSERT ile outbox'a yazar, hemen job_id döner
+- Dispatcher: bekleyen satırları FOR UPDATE SKIP LOCKED ile alır (birden fazla
+  worker aynı maili iki kez göndermez), Resend batch API ile 100'erli gönderir
+- HTML bir kez mail_jobs.html'de saklanır; outbox satırları ona referans verir
+- Batch hepsi-ya-hiçbiridir: 4xx (örn. tek geçersiz adres) alınırsa batch alıcı bazında
+  tekrar gönderilir; alıcı bazında 4xx kalıcı hatadır ('failed'), tekrar denenmez
+- Diğer hatalarda üstel backoff ile tekrar dener, MAIL_MAX_ATTEMPTS sonunda 'failed'
+- İlerleme: get_job_progress(job_id)
+"""
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+import asyncio
+import logging
+import os
+
+from app.utils.database_async import fetch_one, fetch_all, execute
+from app.services.mail_service import send_batch, RESEND_BATCH_SIZE, MAIL_CONCURRENCY
+
+logger = logging.getLogger(__name__)
+
+MAIL_MAX_ATTEMPTS = int(os.getenv("MAIL_MAX_ATTEMPTS", "5"))
+MAIL_RETRY_BASE_SECONDS = int(os.getenv("MAIL_RETRY_BASE_SECONDS", "30"))
+MAIL_DISPATCH_INTERVAL = float(os.getenv("MAIL_DISPATCH_INTERVAL", "2"))
+# 'sending' durumunda bu kadar kalan satır (worker çöktü) tekrar alınır
+MAIL_STALE_LOCK_MINUTES = 5
+
+
+async def enqueue_bulk(
+    emails: List[str],
+    subject: str,
+    html: str,
+    user_type: Optional[str] = None,
+    notification_id: Optional[int] = None,
+) -> str:
+    """Alıcıları outbox'a yazar ve job_id döner (gönderim arka planda)"""
+    job = await fetch_one(
+        """
+        INSERT INTO mail_jobs (subject, user_type, total, notification_id, html)
+        VALUES ($1, $2, $3, $4, $5)
+        RETURNING id;
+        """,
+        subject, user_type, len(emails), notification_id, html
+    )
+    job_id = job["id"]
+
+    await execute(
+        """
+        INSERT INTO mail_outbox (job_id, to_email, subject)
+        SELECT $1, e, $3 FROM unnest($2::text[]) AS e;
+        """,
+        job_id, emails, subject
+    )
+    return str(job_id)
+
+
+async def get_job_progress(job_id: str) -> Optional[Dict[str, Any]]:
+    try:
+        UUID(job_id)
+    except ValueError:
+        return None
+
+    job = await fetch_one(
+        "SELECT id, subject, user_type, total, notification_id, created_at FROM mail_jobs WHERE id = $1;",
+        job_id
+    )
+    if not job:
+        return None
+
+    rows = await fetch_all(
+        "SELECT status, COUNT(*) AS cnt FROM mail_outbox WHERE job_id = $1 GROUP BY status;",
+        job_id
+    )
+    counts = {r["status"]: int(r["cnt"]) for r in rows or []}
+    sent = counts.get("sent", 0)
+    failed = counts.get("failed", 0)
+    total = int(job["total"])
+
+    return {
+        "job_id": str(job["id"]),
+        "subject": job["subject"],
+        "user_type": job["user_type"],
+        "notification_id": job["notification_id"],
+        "total": total,
+        "sent": sent,
+        "failed": failed,
+        "pending": total - sent - failed,
+        "done": sent + failed >= total,
+        "created_at": job["created_at"],
+    }
+
+
+async def _claim_batch(limit: int) -> List[Dict[str, Any]]:
+    rows = await fetch_all(
+        """
+        WITH claimed AS (
+            UPDATE mail_outbox
+            SET status = 'sending', attempts = attempts + 1, locked_at = NOW()
+            WHERE id IN (
+                SELECT id FROM mail_outbox
+                WHERE (status = 'pending' AND next_attempt_at <= NOW())
+                   OR (status = 'sending' AND locked_at < NOW() - make_interval(mins => $2))
+                ORDER BY id
+                LIMIT $1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING id, job_id, to_email, subject, html, attempts
+        )
+        SELECT c.id, c.to_email, c.subject, COALESCE(c.html, j.html) AS html, c.attempts
+        FROM claimed c
+        LEFT JOIN mail_jobs j ON j.id = c.job_id
+        ORDER BY c.id;
+        """,
+        limit, MAIL_STALE_LOCK_MINUTES
+    )
+    return [dict(r) for r in rows] if rows else []
+
+
+def _is_rejected(status_code: Optional[int]) -> bool:
+    """İçerik / alıcı kaynaklı 4xx (tekrar denemek sonucu değiştirmez); 429 hariç"""
+    return status_code is not None and 400 <= status_code < 500 and status_code != 429
+
+
+async def _mark_sent(ids: List[int]):
+    await execute(
+        "UPDATE mail_outbox SET status = 'sent', sent_at = NOW(), last_error = NULL WHERE id = ANY($1::bigint[]);",
+        ids
+    )
+
+
+async def _mark_failed(ids: List[int], info: str, permanent: bool = False):
+    # Deneme hakkı bitenler (veya kalıcı hata) 'failed', diğerleri backoff ile 'pending'
+    await execute(
+        """
+        UPDATE mail_outbox
+        SET status = CASE WHEN $5 OR attempts >= $2 THEN 'failed' ELSE 'pending' END,
+            next_attempt_at = NOW() + make_interval(secs => $3 * power(2, attempts - 1)),
+            last_error = $4
+        WHERE id = ANY($1::bigint[]);
+        """,
+        ids, MAIL_MAX_ATTEMPTS, MAIL_RETRY_BASE_SECONDS, info[:500], permanent
+    )
+
+
+def _message(m: Dict[str, Any]) -> Dict[str, str]:
+    return {"to": m["to_email"], "subject": m["subject"], "html": m["html"]}
+
+
+async def _send_one(m: Dict[str, Any]):
+    ok, info, status_code = await send_batch([_message(m)])
+    if ok:
+        await _mark_sent([m["id"]])
+    else:
+        await _mark_failed([m["id"]], info, permanent=_is_rejected(status_code))
+
+
+async def _send_claimed(batch: List[Dict[str, Any]]):
+    ok, info, status_code = await send_batch([_message(m) for m in batch])
+    ids = [m["id"] for m in batch]
+
+    if ok:
+        await _mark_sent(ids)
+        return
+
+    logger.warning(f"[MAIL-WARN] Batch of {len(batch)} failed: {info}")
+    if _is_rejected(status_code) and len(batch) > 1:
+        # Tek bir hatalı alıcı tüm batch'i düşürmesin: alıcı bazında gönder
+        await asyncio.gather(*(_send_one(m) for m in batch))
+        return
+
+    await _mark_failed(ids, info, permanent=_is_rejected(status_code))
+
+
+async def dispatch_once() -> int:
+    """Bekleyen mailleri (en fazla MAIL_CONCURRENCY batch) gönderir, gönderilen sayıyı döner"""
+    claimed = await _claim_batch(RESEND_BATCH_SIZE * MAIL_CONCURRENCY)
+    if not claimed:
+        return 0
+
+    batches = [claimed[i:i + RESEND_BATCH_SIZE] for i in range(0, len(claimed), RESEND_BATCH_SIZE)]
+    await asyncio.gather(*(_send_claimed(b) for b in batches))
+    return len(claimed)
+
+
+async def start_mail_dispatcher(interval_seconds: float = MAIL_DISPATCH_INTERVAL):
+    """Outbox'ı sürekli boşaltan arka plan döngüsü"""
+    while True:
+        try:
+            sent = await dispatch_once()
+            if sent:
+                # Kuyruk doluysa beklemeden devam et
+                continue
+        except Exception as e:
+            logger.error(f"Mail dispatcher error: {e}")
+        await asyncio.sleep(interval_seconds)
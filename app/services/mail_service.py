@@ -1,13 +1,44 @@
 import os
+import asyncio
 import logging
+from typing import List, Dict, Optional
 import httpx
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 from app.utils.database_async import fetch_all  # asyncpg tabanlı
 
 # Environment
 MAIL_FROM = os.getenv("MAIL_FROM", "Yuksi Destek <support@yuksi.dev>")
 RESEND_API_KEY = os.getenv("RESEND_API_KEY")
+RESEND_API_URL = os.getenv("RESEND_API_URL", "https://api.resend.com")
+# Aynı anda Resend'e gidebilecek en fazla istek
+MAIL_CONCURRENCY = int(os.getenv("MAIL_CONCURRENCY", "8"))
+# Resend batch API tek çağrıda en fazla 100 mail kabul eder
+RESEND_BATCH_SIZE = 100
+
+_client: Optional[httpx.AsyncClient] = None
+_semaphore = asyncio.Semaphore(MAIL_CONCURRENCY)
+
+
+def _get_client() -> httpx.AsyncClient:
+    """Paylaşılan HTTP client (keep-alive, her mailde yeni TLS handshake yok)"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            base_url=RESEND_API_URL,
+            timeout=15,
+            limits=httpx.Limits(max_connections=MAIL_CONCURRENCY, max_keepalive_connections=MAIL_CONCURRENCY),
+            headers={
+                "Authorization": f"Bearer {RESEND_API_KEY}",
+                "Content-Type": "application/json",
+            },
+        )
+    return _client
+
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
 
 
 # === BASE MAIL SENDER ===
@@ -16,19 +47,12 @@ async def send_mail(to: str, subject: str, html_body: str) -> tuple[bool, str]:
     ✅ Tek mail gönderimi (Resend API kullanır)
     """
     try:
-        logging.info("[MAIL-A] send_mail STARTED (Resend API)")
-        logging.info(f"[MAIL-A1] to={to}, subject={subject}, from={MAIL_FROM}")
+        logging.info(f"[MAIL-A] send_mail to={to}, subject={subject}, from={MAIL_FROM}")
 
         if not RESEND_API_KEY:
             logging.error("[MAIL-ERR] RESEND_API_KEY not set")
             return False, "RESEND_API_KEY missing"
 
-        msg = MIMEMultipart("alternative")
-        msg["Subject"] = subject
-        msg["From"] = MAIL_FROM
-        msg["To"] = to
-        msg.attach(MIMEText(html_body, "html"))
-
         payload = {
             "from": MAIL_FROM,
             "to": [to],
@@ -36,15 +60,8 @@ async def send_mail(to: str, subject: str, html_body: str) -> tuple[bool, str]:
             "html": html_body,
         }
 
-        async with httpx.AsyncClient(timeout=15) as client:
-            r = await client.post(
-                "https://api.resend.com/emails",
-                json=payload,
-                headers={
-                    "Authorization": f"Bearer {RESEND_API_KEY}",
-                    "Content-Type": "application/json",
-                },
-            )
+        async with _semaphore:
+            r = await _get_client().post("/emails", json=payload)
 
         if r.status_code == 200:
             logging.info("[MAIL-C] Resend accepted message ✅")
@@ -58,6 +75,42 @@ async def send_mail(to: str, subject: str, html_body: str) -> tuple[bool, str]:
         return False, str(e)
 
 
+async def send_batch(messages: List[Dict[str, str]]) -> tuple[bool, str, Optional[int]]:
+    """
+    Resend batch API ile tek çağrıda en fazla RESEND_BATCH_SIZE mail.
+    messages: [{"to": ..., "subject": ..., "html": ...}]
+    Batch API'de gönderim hepsi-ya-hiçbiri şeklindedir.
+    Dönüş: (ok, bilgi, HTTP durum kodu; istek gitmediyse None)
+    """
+    if not messages:
+        return True, "Boş batch", None
+    if len(messages) > RESEND_BATCH_SIZE:
+        return False, f"Batch en fazla {RESEND_BATCH_SIZE} mail içerebilir", None
+
+    try:
+        if not RESEND_API_KEY:
+            logging.error("[MAIL-ERR] RESEND_API_KEY not set")
+            return False, "RESEND_API_KEY missing", None
+
+        payload = [
+            {"from": MAIL_FROM, "to": [m["to"]], "subject": m["subject"], "html": m["html"]}
+            for m in messages
+        ]
+
+        async with _semaphore:
+            r = await _get_client().post("/emails/batch", json=payload)
+
+        if r.status_code == 200:
+            logging.info(f"[MAIL-C] Resend accepted batch of {len(messages)} ✅")
+            return True, "Batch gönderildi", r.status_code
+        logging.error(f"[MAIL-ERR] Resend batch error {r.status_code}: {r.text}")
+        return False, f"Resend error {r.status_code}: {r.text}", r.status_code
+
+    except Exception as e:
+        logging.exception("[MAIL-ERR] send_batch FAILED")
+        return False, str(e), None
+
+
 # === TEK KİŞİLİK GÖNDERİ ===
 async def send_single_mail(email: str, subject: str, message: str) -> tuple[bool, str]:
     """
@@ -85,14 +138,11 @@ async def send_bulk_mail(user_type: str, subject: str, message: str) -> tuple[bo
         if not rows:
             return False, "Gönderilecek kullanıcı bulunamadı"
 
-        # Toplu gönderim (asenkron sırayla)
-        for r in rows:
-            email = r["email"]
-            ok, msg = await send_mail(email, subject, message)
-            if not ok:
-                logging.warning(f"[MAIL-WARN] Mail gönderilemedi: {email} ({msg})")
+        # Outbox'a yaz, gönderimi dispatcher yapar
+        from app.services.mail_dispatch_service import enqueue_bulk
+        job_id = await enqueue_bulk([r["email"] for r in rows], subject, message)
 
-        return True, "Toplu mail gönderildi"
+        return True, f"Toplu mail kuyruğa alındı (job: {job_id})"
 
     except Exception as e:
         logging.exception("[MAIL-ERR] send_bulk_mail FAILED")
@@ -2,9 +2,13 @@ import uuid
 from typing import Any, Dict, List, Optional
 from fastapi import HTTPException
 from app.utils.database_async import fetch_one, fetch_all, execute
+from app.utils.websocket_manager import websocket_manager
 from ..models.message_model import ChatResponse, MessageResponse
 from ..helpers.chat_message import _find_existing_chat, _ensure_participant
 
+# Sohbet listesindeki son mesaj önizlemesinin uzunluğu
+CHAT_PREVIEW_LENGTH = 200
+
 
 async def create_chat(sender_id: str, sender_type: str, receiver_id: str, receiver_type: str) -> ChatResponse:
 
@@ -31,6 +35,17 @@ async def create_chat(sender_id: str, sender_type: str, receiver_id: str, receiv
     await _ensure_participant(chat_id, sender_id, sender_type)
     await _ensure_participant(chat_id, receiver_id, receiver_type)
 
+    # Sohbet listesi satırları (her iki taraf için)
+    await execute(
+        """
+        INSERT INTO chat_user_state (chat_id, user_id, user_type, peer_id, peer_type)
+        VALUES ($1::uuid, $2::uuid, $3, $4::uuid, $5),
+               ($1::uuid, $4::uuid, $5, $2::uuid, $3)
+        ON CONFLICT (user_id, user_type, chat_id) DO NOTHING
+        """,
+        chat_id, sender_id, sender_type, str(receiver_id), receiver_type
+    )
+
     return ChatResponse(
         chat_id=chat_id,
         participants=[str(sender_id), str(receiver_id)],
@@ -44,144 +59,222 @@ async def send_message(
     sender_type: str,
     content: str
 ) -> MessageResponse:
-    # 0) Chat exists and is 1-1 chat
-    existing_chat = await fetch_one(
+    """
+    Mesajı tek transactional statement ile kaydeder: chat/katılımcı kontrolü,
+    alıcı tespiti, messages + chat_messages insert, chats.updated_at ve
+    chat_user_state güncellemesi. Ardından alıcının açık WebSocket'lerine push
+    edilir; push başarılıysa delivered_at set edilir. Push edilemeyen mesajlar
+    /undelivered (polling) ile alınmaya devam eder.
+    """
+    row = await fetch_one(
         """
-        SELECT id, is_group
-        FROM chats
-        WHERE id = $1::uuid
+        WITH chat AS (
+            SELECT id, is_group FROM chats WHERE id = $1::uuid
+        ), sender AS (
+            SELECT 1 FROM chat_participants
+            WHERE chat_id = $1::uuid AND user_id = $2::uuid AND user_type = $3
+            LIMIT 1
+        ), receiver AS (
+            SELECT user_id, user_type FROM chat_participants
+            WHERE chat_id = $1::uuid AND NOT (user_id = $2::uuid AND user_type = $3)
+            ORDER BY joined_at
+            LIMIT 1
+        ), target AS (
+            SELECT r.user_id, r.user_type
+            FROM chat c, sender s, receiver r
+            WHERE c.is_group = FALSE
+        ), msg AS (
+            INSERT INTO messages (sender_id, sender_type, receiver_id, receiver_type, content)
+            SELECT $2::uuid, $3, t.user_id, t.user_type, $4 FROM target t
+            RETURNING id, sender_type, receiver_id, receiver_type, content, sent_at, delivered_at, read_at
+        ), link AS (
+            INSERT INTO chat_messages (chat_id, message_id, sent_at)
+            SELECT $1::uuid, m.id, m.sent_at FROM msg m
+            ON CONFLICT (chat_id, message_id) DO NOTHING
+        ), bump AS (
+            UPDATE chats SET updated_at = m.sent_at FROM msg m WHERE chats.id = $1::uuid
+        ), state AS (
+            INSERT INTO chat_user_state (
+                chat_id, user_id, user_type, peer_id, peer_type,
+                last_message_id, last_message_preview, last_sender_type, last_message_at,
+                unread_count, updated_at
+            )
+            SELECT $1::uuid, v.user_id, v.user_type, v.peer_id, v.peer_type,
+                   m.id, LEFT($4, $5), $3, m.sent_at, v.unread, m.sent_at
+            FROM msg m
+            CROSS JOIN LATERAL (
+                VALUES ($2::uuid, $3::text, m.receiver_id, m.receiver_type, 0),
+                       (m.receiver_id, m.receiver_type, $2::uuid, $3::text, 1)
+            ) AS v(user_id, user_type, peer_id, peer_type, unread)
+            ON CONFLICT (user_id, user_type, chat_id) DO UPDATE SET
+                last_message_id = EXCLUDED.last_message_id,
+                last_message_preview = EXCLUDED.last_message_preview,
+                last_sender_type = EXCLUDED.last_sender_type,
+                last_message_at = EXCLUDED.last_message_at,
+                unread_count = chat_user_state.unread_count + EXCLUDED.unread_count,
+                updated_at = EXCLUDED.updated_at
+        )
+        SELECT
+            (SELECT is_group FROM chat) AS is_group,
+            EXISTS (SELECT 1 FROM sender) AS is_member,
+            EXISTS (SELECT 1 FROM receiver) AS has_receiver,
+            m.*
+        FROM (SELECT 1) AS one
+        LEFT JOIN msg m ON TRUE
         """,
-        chat_id
+        chat_id, sender_id, sender_type, content, CHAT_PREVIEW_LENGTH
     )
-    if not existing_chat:
+
+    if row["is_group"] is None:
         raise HTTPException(status_code=404, detail="Sohbet bulunamadı")
-    if existing_chat["is_group"]:
+    if row["is_group"]:
         raise HTTPException(status_code=400, detail="Grup sohbetinde tekil alıcı gereklidir")
-
-    # 1) Sender belongs to this chat?
-    sender_in = await fetch_one(
-        """
-        SELECT 1
-        FROM chat_participants
-        WHERE chat_id = $1::uuid
-          AND user_id = $2::uuid
-          AND user_type = $3
-        LIMIT 1
-        """,
-        chat_id, sender_id, sender_type
-    )
-    if not sender_in:
+    if not row["is_member"]:
         raise HTTPException(status_code=403, detail="Gönderen bu sohbetin katılımcısı değil")
-
-    # 2) Infer receiver as 'the other participant'
-    receiver = await fetch_one(
-        """
-        SELECT user_id, user_type
-        FROM chat_participants
-        WHERE chat_id = $1::uuid
-          AND NOT (user_id = $2::uuid AND user_type = $3)
-        LIMIT 1
-        """,
-        chat_id, sender_id, sender_type
-    )
-    if not receiver:
+    if not row["has_receiver"]:
         raise HTTPException(status_code=400, detail="Alıcı bulunamadı (sohbette karşı taraf yok)")
+    if not row["id"]:
+        raise HTTPException(status_code=500, detail="Mesaj gönderilemedi")
 
-    receiver_id = str(receiver["user_id"])
-    receiver_type = receiver["user_type"]
+    message_id = str(row["id"])
+    delivered_at = await _push_to_receiver(chat_id, sender_id, row)
 
-    # 3) Insert into messages
-    msg = await fetch_one(
-        """
-        INSERT INTO messages (sender_id, sender_type, receiver_id, receiver_type, content)
-        VALUES ($1::uuid, $2, $3::uuid, $4, $5)
-        RETURNING id, sender_type, content, sent_at, delivered_at, read_at
-        """,
-        sender_id, sender_type, receiver_id, receiver_type, content
+    return MessageResponse(
+        message_id=message_id,
+        sender_type=row["sender_type"],
+        content=row["content"],
+        sent_at=str(row["sent_at"]),
+        delivered_at=str(delivered_at) if delivered_at else None,
+        read_at=str(row["read_at"]) if row["read_at"] else None
     )
-    if not msg:
-        raise HTTPException(status_code=500, detail="Mesaj gönderilemedi")
 
-    message_id = str(msg["id"])
 
-    # 4) Relate it to chat
-    await execute(
-        """
-        INSERT INTO chat_messages (chat_id, message_id)
-        VALUES ($1::uuid, $2::uuid)
-        ON CONFLICT (chat_id, message_id) DO NOTHING
-        """,
-        chat_id, message_id
-    )
+async def _push_to_receiver(chat_id: str, sender_id: str, msg: Dict[str, Any]):
+    """Alıcının açık WebSocket'i varsa mesajı push eder ve delivered_at döner"""
+    receiver_id = str(msg["receiver_id"])
+    if not websocket_manager.has_connection(receiver_id):
+        return None
 
-    # 5) Bump chat.updated_at
-    await execute(
-        "UPDATE chats SET updated_at = NOW() WHERE id = $1::uuid",
-        chat_id
-    )
+    sent = await websocket_manager.send_to_courier(receiver_id, {
+        "type": "chat_message",
+        "chat_id": str(chat_id),
+        "data": {
+            "message_id": str(msg["id"]),
+            "sender_id": str(sender_id),
+            "sender_type": msg["sender_type"],
+            "receiver_id": receiver_id,
+            "receiver_type": msg["receiver_type"],
+            "content": msg["content"],
+            "sent_at": str(msg["sent_at"]),
+        },
+    })
+    if not sent:
+        return None
 
-    return MessageResponse(
-        message_id=message_id,
-        sender_type=msg["sender_type"],
-        content=msg["content"],
-        sent_at=str(msg["sent_at"]),
-        delivered_at=str(msg["delivered_at"]) if msg["delivered_at"] else None,
-        read_at=str(msg["read_at"]) if msg["read_at"] else None
+    row = await fetch_one(
+        """
+        UPDATE messages SET delivered_at = NOW()
+        WHERE id = $1::uuid AND delivered_at IS NULL
+        RETURNING delivered_at
+        """,
+        str(msg["id"])
     )
+    return row["delivered_at"] if row else None
 
 
 async def get_chats_for_user(user_id: str, user_type: str) -> List[Dict[str, Any]]:
+    """Sohbet listesi: chat_user_state üzerinden tek index'li sorgu (son mesaj + okunmamış sayısı)"""
     rows = await fetch_all(
         """
-        SELECT
-            c.id AS chat_id,
-            c.created_at,
-            c.updated_at,
-            ARRAY_AGG(cp.user_id::text || ':' || cp.user_type ORDER BY cp.joined_at) AS participants
-        FROM chats c
-        JOIN chat_participants cp ON cp.chat_id = c.id
-        WHERE c.id IN (
-            SELECT chat_id FROM chat_participants
-            WHERE user_id = $1::uuid AND user_type = $2
-        )
-        GROUP BY c.id
-        ORDER BY c.updated_at DESC, c.created_at DESC
+        SELECT chat_id, peer_id, peer_type, last_message_id, last_message_preview,
+               last_sender_type, last_message_at, unread_count, created_at, updated_at
+        FROM chat_user_state
+        WHERE user_id = $1::uuid AND user_type = $2
+        ORDER BY updated_at DESC
         """,
         user_id, user_type
     )
 
+    me = f"{user_id}:{user_type}"
     return [
         {
             "chat_id": str(r["chat_id"]),
-            "participants": list(r["participants"]),
+            "participants": [me, f"{r['peer_id']}:{r['peer_type']}"] if r["peer_id"] else [me],
             "created_at": str(r["created_at"]),
             "updated_at": str(r["updated_at"]),
+            "last_message": {
+                "message_id": str(r["last_message_id"]),
+                "preview": r["last_message_preview"],
+                "sender_type": r["last_sender_type"],
+                "sent_at": str(r["last_message_at"]),
+            } if r["last_message_id"] else None,
+            "unread_count": r["unread_count"],
         }
         for r in rows
     ]
 
-async def get_chat_history(chat_id: str, user_id: str, user_type: str,
-                           limit: int = 50,
-                           ) -> List[Dict[str, Any]]:
-    await fetch_one("""
-        SELECT 1 FROM chat_participants
-        WHERE chat_id = $1::uuid AND user_id = $2::uuid AND user_type = $3
-        LIMIT 1
-    """, chat_id, user_id, user_type) or HTTPException(403, "Bu sohbetin katılımcısı değilsin")
-
-    base = """
-      SELECT m.id, m.sender_id, m.sender_type, m.receiver_id, m.receiver_type,
-             m.content, m.sent_at, m.delivered_at, m.read_at
-      FROM chat_messages cm
-      JOIN messages m ON m.id = cm.message_id
-      WHERE cm.chat_id = $1::uuid
+async def get_chat_history(
+    chat_id: str,
+    user_id: str,
+    user_type: str,
+    limit: int = 50,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+) -> Dict[str, Any]:
     """
-    
-    sql = base + " ORDER BY m.sent_at ASC LIMIT $2"
-    args = (chat_id, limit,)
+    Keyset sayfalı sohbet geçmişi (chat_id, sent_at) index'i üzerinden.
+    - cursor yok: en yeni `limit` mesaj
+    - before: verilen mesajdan eski mesajlar (yukarı kaydırma)
+    - after: verilen mesajdan yeni mesajlar (yeni gelenler)
+    Mesajlar her zaman eskiden yeniye sıralı döner.
+    """
+    if before and after:
+        raise HTTPException(status_code=400, detail="before ve after birlikte kullanılamaz")
+
+    cursor = after or before
+    newer = after is not None
+    # Katılım kontrolü aynı sorguda; satır yoksa ayrıca kontrol edilir
+    rows = await fetch_all(
+        f"""
+        WITH cur AS (
+            SELECT sent_at, message_id FROM chat_messages
+            WHERE chat_id = $1::uuid AND message_id = $5::uuid
+        )
+        SELECT m.id, m.sender_id, m.sender_type, m.receiver_id, m.receiver_type,
+               m.content, m.sent_at, m.delivered_at, m.read_at
+        FROM chat_messages cm
+        JOIN messages m ON m.id = cm.message_id
+        WHERE cm.chat_id = $1::uuid
+          AND EXISTS (
+              SELECT 1 FROM chat_participants
+              WHERE chat_id = $1::uuid AND user_id = $2::uuid AND user_type = $3
+          )
+          AND (
+              $5::uuid IS NULL
+              OR (cm.sent_at, cm.message_id) {">" if newer else "<"} (SELECT sent_at, message_id FROM cur)
+          )
+        ORDER BY cm.sent_at {"ASC" if newer else "DESC"}, cm.message_id {"ASC" if newer else "DESC"}
+        LIMIT $4
+        """,
+        chat_id, user_id, user_type, limit + 1, cursor
+    )
+
+    if not rows:
+        member = await fetch_one("""
+            SELECT 1 FROM chat_participants
+            WHERE chat_id = $1::uuid AND user_id = $2::uuid AND user_type = $3
+            LIMIT 1
+        """, chat_id, user_id, user_type)
+        if not member:
+            raise HTTPException(status_code=403, detail="Bu sohbetin katılımcısı değilsin")
 
-    rows = await fetch_all(sql, *args)
-    return [{
+    rows = list(rows or [])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if not newer:
+        rows.reverse()
+
+    messages = [{
         "message_id": str(r["id"]),
         "sender_id": str(r["sender_id"]),
         "sender_type": r["sender_type"],
@@ -193,6 +286,13 @@ async def get_chat_history(chat_id: str, user_id: str, user_type: str,
         "read_at": str(r["read_at"]) if r["read_at"] else None,
     } for r in rows]
 
+    return {
+        "messages": messages,
+        "has_more": has_more,
+        "before": messages[0]["message_id"] if messages else None,
+        "after": messages[-1]["message_id"] if messages else None,
+    }
+
 async def get_undelivered_messages(user_id: str, user_type: str) -> List[Dict[str, Any]]:
     """
     Bu kullanıcıya adreslenmiş ve delivered_at IS NULL olan mesajları
@@ -270,6 +370,14 @@ async def mark_messages_read(user_id: str, user_type: str, chat_id: str) -> Dict
         user_id, user_type_norm, chat_id
     )
     print(rows)
+    await execute(
+        """
+        UPDATE chat_user_state
+        SET unread_count = 0
+        WHERE user_id = $1::uuid AND lower(user_type) = $2 AND chat_id = $3::uuid AND unread_count <> 0
+        """,
+        user_id, user_type_norm, chat_id
+    )
     updated_ids = [str(r["id"]) for r in rows] if rows else []
     return {"updated_count": len(updated_ids), "message_ids": updated_ids}
 
@@ -1,9 +1,30 @@
 from typing import List, Dict, Any, Optional, Tuple
+from datetime import datetime
+import base64
 from app.utils.database_async import fetch_one, fetch_all, execute
 from app.services.mail_service import send_mail
+from app.services.mail_dispatch_service import enqueue_bulk
 from app.utils.templates.notification_template import NotificationEmailTemplate
 
 
+# Kullanıcının gördüğü kitle anahtarları (notification_counters.audience)
+def _audiences_for(role: str, email: Optional[str]) -> List[str]:
+    if role == "admin":
+        return ["*"]
+    if role in ("courier", "restaurant"):
+        keys = [f"type:{role}", "type:all"]
+        if email:
+            keys.append(f"email:{email}")
+        return keys
+    return []
+
+
+def _role_of(claims: Dict[str, Any]) -> str:
+    roles = claims.get("role") or claims.get("roles") or []
+    role = roles[0] if isinstance(roles, list) and roles else roles
+    return (role or "").lower()
+
+
 # === YARDIMCI: Notification Kaydet ===
 async def _save(
     ntype: str,
@@ -12,10 +33,20 @@ async def _save(
     target_email: Optional[str],
     user_type: Optional[str]
 ) -> int:
+    # Kayıt + kitle sayaçları tek sorguda (okunmamış sayısı bu sayaçlardan hesaplanır)
     query = """
-        INSERT INTO notifications (type, target_email, user_type, subject, message)
-        VALUES ($1, $2, $3, $4, $5)
-        RETURNING id;
+        WITH n AS (
+            INSERT INTO notifications (type, target_email, user_type, subject, message)
+            VALUES ($1, $2, $3, $4, $5)
+            RETURNING id
+        ), c AS (
+            INSERT INTO notification_counters (audience, total)
+            SELECT a, 1
+            FROM n, unnest(ARRAY['*', CASE WHEN $2::text IS NOT NULL THEN 'email:' || $2 ELSE 'type:' || $3 END]) AS a
+            WHERE a IS NOT NULL
+            ON CONFLICT (audience) DO UPDATE SET total = notification_counters.total + 1
+        )
+        SELECT id FROM n;
     """
     row = await fetch_one(query, ntype, target_email, user_type, subject, message)
     return int(row["id"]) if row else 0
@@ -32,7 +63,11 @@ async def send_single(email: str, subject: str, message: str) -> Tuple[bool, str
 
 
 # === TOPLU BİLDİRİM GÖNDER ===
-async def send_bulk(user_type: str, subject: str, message: str) -> Tuple[bool, str, Optional[int]]:
+async def send_bulk(user_type: str, subject: str, message: str) -> Tuple[bool, str, Optional[int], Optional[str]]:
+    """
+    Alıcıları mail outbox'ına yazar ve hemen döner; gönderimi mail dispatcher yapar.
+    Dönüş: (ok, info, notification_id, job_id)
+    """
     html = NotificationEmailTemplate.build(subject, message)
 
     if user_type == "courier":
@@ -42,46 +77,172 @@ async def send_bulk(user_type: str, subject: str, message: str) -> Tuple[bool, s
     elif user_type == "all":
         query = "SELECT email FROM drivers UNION SELECT email FROM restaurants;"
     else:
-        return False, "Geçersiz user_type", None
+        return False, "Geçersiz user_type", None, None
 
     rows = await fetch_all(query)
     if not rows:
-        return False, "Gönderilecek kullanıcı bulunamadı", None
-
-    for r in rows:
-        await send_mail(r["email"], subject, html)
+        return False, "Gönderilecek kullanıcı bulunamadı", None, None
 
     notif_id = await _save("bulk", subject, message, target_email=None, user_type=user_type)
-    return True, "Toplu bildirim gönderildi", notif_id
+    job_id = await enqueue_bulk(
+        [r["email"] for r in rows], subject, html,
+        user_type=user_type, notification_id=notif_id,
+    )
+    return True, "Toplu bildirim kuyruğa alındı", notif_id, job_id
 
 
-# === BİLDİRİMLERİ LİSTELE ===
-async def list_notifications_for_user(claims: Dict[str, Any]) -> List[Dict[str, Any]]:
+# === BİLDİRİMLERİ LİSTELE (INBOX) ===
+INBOX_MAX_LIMIT = 200
+
+
+def encode_inbox_cursor(created_at: datetime, notification_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{notification_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_inbox_cursor(cursor: str) -> Tuple[datetime, int]:
+    created_at, notification_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+    return datetime.fromisoformat(created_at), int(notification_id)
+
+
+async def get_inbox(
+    claims: Dict[str, Any],
+    limit: int = 50,
+    before: Optional[Tuple[datetime, int]] = None,
+) -> Dict[str, Any]:
+    """
+    Keyset sayfalı bildirim kutusu (en yeni önce). Her bildirim için kullanıcının
+    okuma durumu (is_read/read_at) döner. next_cursor bir sonraki sayfanın (created_at, id)
+    konumudur; cursor'daki bildirim silinse de sayfalama devam eder.
+    Broadcast'ler tek kayıttır; okuma durumu notification_reads'te kullanıcı bazlıdır.
+    Kurye / restoran kutusu kendi tipine ek olarak 'all' broadcast'lerini de içerir.
+    """
+    role = _role_of(claims)
     email = claims.get("email")
-    roles = claims.get("role") or claims.get("roles") or []
-    role = (roles[0] if isinstance(roles, list) and roles else roles).lower()
+    user_id = claims.get("userId") or claims.get("sub")
+    limit = max(1, min(int(limit), INBOX_MAX_LIMIT))
+
+    # Ortak parametreler: $1 cursor zamanı, $2 cursor id, $3 limit, $4 user_id
+    before_at, before_id = before or (None, None)
+    params: List[Any] = [before_at, before_id, limit + 1, user_id]
 
     if role == "admin":
-        query = "SELECT * FROM notifications ORDER BY created_at DESC;"
-        rows = await fetch_all(query)
-    elif role == "courier":
-        query = """
-            SELECT * FROM notifications
-            WHERE user_type = 'courier' OR target_email = $1
-            ORDER BY created_at DESC;
+        source = """
+            SELECT * FROM notifications n
+            WHERE ($1::timestamp IS NULL OR (n.created_at, n.id) < ($1, $2::int))
+            ORDER BY n.created_at DESC, n.id DESC
+            LIMIT $3
         """
-        rows = await fetch_all(query, email)
-    elif role == "restaurant":
-        query = """
-            SELECT * FROM notifications
-            WHERE user_type = 'restaurant' OR target_email = $1
-            ORDER BY created_at DESC;
+    elif role in ("courier", "restaurant"):
+        # İki dal da kendi (user_type / target_email, created_at) index'ini kullanır
+        source = """
+            (SELECT * FROM notifications n
+             WHERE n.user_type = ANY($5::text[])
+               AND ($1::timestamp IS NULL OR (n.created_at, n.id) < ($1, $2::int))
+             ORDER BY n.created_at DESC, n.id DESC
+             LIMIT $3)
+            UNION ALL
+            (SELECT * FROM notifications n
+             WHERE n.target_email = $6
+               AND ($1::timestamp IS NULL OR (n.created_at, n.id) < ($1, $2::int))
+             ORDER BY n.created_at DESC, n.id DESC
+             LIMIT $3)
         """
-        rows = await fetch_all(query, email)
+        params.extend([[role, "all"], email])
     else:
-        return []
+        return {"items": [], "next_cursor": None, "unread_count": 0}
+
+    rows = await fetch_all(
+        f"""
+        SELECT s.*, r.read_at, (r.read_at IS NOT NULL) AS is_read
+        FROM ({source}) s
+        LEFT JOIN notification_reads r ON r.notification_id = s.id AND r.user_id = $4
+        ORDER BY s.created_at DESC, s.id DESC
+        LIMIT $3
+        """,
+        *params,
+    )
+    items = [dict(r) for r in rows] if rows else []
+    has_more = len(items) > limit
+    items = items[:limit]
+
+    next_cursor = None
+    if has_more and items[-1]["created_at"]:
+        next_cursor = encode_inbox_cursor(items[-1]["created_at"], items[-1]["id"])
+
+    return {
+        "items": items,
+        "next_cursor": next_cursor,
+        "unread_count": await get_unread_count(claims),
+    }
+
+
+async def list_notifications_for_user(
+    claims: Dict[str, Any],
+    limit: int = 50,
+    before: Optional[Tuple[datetime, int]] = None,
+) -> List[Dict[str, Any]]:
+    """Inbox'ın sadece kayıtları; her kaydın cursor'u sonraki sayfa için before olarak verilir"""
+    inbox = await get_inbox(claims, limit, before)
+    for item in inbox["items"]:
+        item["cursor"] = encode_inbox_cursor(item["created_at"], item["id"]) if item["created_at"] else None
+    return inbox["items"]
+
+
+async def get_unread_count(claims: Dict[str, Any]) -> int:
+    """Okunmamış = kullanıcının kitle sayaçlarının toplamı - okuduklarının sayısı"""
+    audiences = _audiences_for(_role_of(claims), claims.get("email"))
+    if not audiences:
+        return 0
+    user_id = claims.get("userId") or claims.get("sub")
+
+    row = await fetch_one(
+        """
+        SELECT
+            COALESCE((SELECT SUM(total) FROM notification_counters WHERE audience = ANY($1::text[])), 0)
+          - COALESCE((SELECT read_count FROM notification_read_counts WHERE user_id = $2), 0) AS unread
+        """,
+        audiences, user_id,
+    )
+    return max(int(row["unread"]), 0) if row else 0
 
-    return [dict(r) for r in rows] if rows else []
+
+async def mark_as_read(claims: Dict[str, Any], notification_ids: Optional[List[int]] = None) -> int:
+    """
+    Bildirimleri okundu işaretler (ids verilmezse kullanıcının gördüğü tümü).
+    Yeni okunanların sayısı kadar okuma sayacı artırılır; tekrar okuma sayılmaz.
+    """
+    role = _role_of(claims)
+    audiences = _audiences_for(role, claims.get("email"))
+    if not audiences:
+        return 0
+    user_id = claims.get("userId") or claims.get("sub")
+
+    row = await fetch_one(
+        """
+        WITH ins AS (
+            INSERT INTO notification_reads (user_id, notification_id)
+            SELECT $1, n.id
+            FROM notifications n
+            WHERE ($2::int[] IS NULL OR n.id = ANY($2::int[]))
+              AND (
+                    $3
+                 OR n.user_type = ANY($4::text[])
+                 OR n.target_email = $5
+              )
+            ON CONFLICT DO NOTHING
+            RETURNING 1
+        ), cnt AS (
+            INSERT INTO notification_read_counts (user_id, read_count)
+            SELECT $1, COUNT(*) FROM ins HAVING COUNT(*) > 0
+            ON CONFLICT (user_id) DO UPDATE
+                SET read_count = notification_read_counts.read_count + EXCLUDED.read_count
+        )
+        SELECT COUNT(*) AS marked FROM ins;
+        """,
+        user_id, notification_ids, role == "admin", [role, "all"], claims.get("email"),
+    )
+    return int(row["marked"]) if row else 0
 
 
 # === BİLDİRİM SİL ===
@@ -104,7 +265,28 @@ async def delete_notification(
         if current_role != "admin" and notif_user_type != current_role:
             return False, "Bu bildirimi silme yetkiniz yok"
 
-        await execute("DELETE FROM notifications WHERE id = $1;", notification_id)
+        # Silme + sayaç düzeltmeleri tek sorguda
+        await execute(
+            """
+            WITH d AS (
+                DELETE FROM notifications WHERE id = $1
+                RETURNING id, target_email, user_type
+            ), readers AS (
+                UPDATE notification_read_counts c
+                SET read_count = c.read_count - 1
+                FROM notification_reads r
+                WHERE r.notification_id = $1 AND r.user_id = c.user_id
+            )
+            UPDATE notification_counters c
+            SET total = c.total - 1
+            FROM d
+            WHERE c.audience IN (
+                '*',
+                CASE WHEN d.target_email IS NOT NULL THEN 'email:' || d.target_email ELSE 'type:' || d.user_type END
+            );
+            """,
+            notification_id
+        )
         return True, "Bildirim silindi"
 
     except Exception as e:
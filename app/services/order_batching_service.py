@@ -0,0 +1,395 @@
+"""
+Çoklu sipariş (batch) motoru - uyumlu havuz siparişlerini tek kurye seferinde toplar.
+
+Uyumluluk:
+- Aynı restoran VEYA pickup noktaları PICKUP_RADIUS_M içinde
+- Pickup -> dropoff yönleri (bearing) arasındaki fark MAX_BEARING_DIFF_DEG içinde
+
+Durak sırası, her siparişin pickup'ı dropoff'undan önce gelecek şekilde tüm geçerli
+sıralamalar denenerek (batch başına en fazla MAX_BATCH_SIZE sipariş) tek matris çağrısı
+üzerinden seçilir.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+import asyncio
+import json
+import math
+import logging
+
+from fastapi import HTTPException, status
+from ..utils.database_async import fetch_one, fetch_all, execute, get_pool
+from ..utils.active_order_cache import active_order_cache
+from ..services.routing_service import routing_service, haversine_m, OfflineProvider, OFFLINE_ROUTING_MODE
+from ..services import order_service
+from ..models.map_model import Coordinate
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCH_SIZE = 3
+PICKUP_RADIUS_M = 1500
+MAX_BEARING_DIFF_DEG = 45
+CANDIDATE_POOL_LIMIT = 200
+MAX_BATCH_OFFERS = 20
+MATRIX_CONCURRENCY = 4
+
+TRIPS_TABLE = "courier_trips"
+
+# Sağlayıcının rota bulamadığı (null) matris hücreleri için tahmin
+_estimator = OfflineProvider(mode=OFFLINE_ROUTING_MODE)
+
+
+# === Geometri yardımcıları ===
+def _bearing(a: Coordinate, b: Coordinate) -> float:
+    """a -> b yönü (derece, 0-360)"""
+    lat1, lat2 = math.radians(a.lat), math.radians(b.lat)
+    dlng = math.radians(b.lgn - a.lgn)
+    x = math.sin(dlng) * math.cos(lat2)
+    y = math.cos(lat1) * math.sin(lat2) - math.sin(lat1) * math.cos(lat2) * math.cos(dlng)
+    return (math.degrees(math.atan2(x, y)) + 360) % 360
+
+
+def _bearing_diff(b1: float, b2: float) -> float:
+    diff = abs(b1 - b2) % 360
+    return 360 - diff if diff > 180 else diff
+
+
+def _pickup(order: Dict[str, Any]) -> Coordinate:
+    return Coordinate(lat=float(order["pickup_lat"]), lgn=float(order["pickup_lng"]))
+
+
+def _dropoff(order: Dict[str, Any]) -> Coordinate:
+    return Coordinate(lat=float(order["dropoff_lat"]), lgn=float(order["dropoff_lng"]))
+
+
+def _compatible(a: Dict[str, Any], b: Dict[str, Any]) -> bool:
+    same_restaurant = a["restaurant_id"] == b["restaurant_id"]
+    if not same_restaurant and haversine_m(_pickup(a), _pickup(b)) > PICKUP_RADIUS_M:
+        return False
+    return _bearing_diff(a["bearing"], b["bearing"]) <= MAX_BEARING_DIFF_DEG
+
+
+# === Havuz siparişlerini grupla ===
+async def _load_open_pool_orders(driver_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    rows = await fetch_all(
+        """
+        SELECT
+            o.id AS order_id,
+            o.code AS order_code,
+            o.restaurant_id,
+            o.pickup_lat, o.pickup_lng,
+            o.dropoff_lat, o.dropoff_lng,
+            o.delivery_address,
+            o.amount,
+            r.name AS restaurant_name
+        FROM pool_orders p
+        JOIN orders o ON o.id = p.order_id
+        LEFT JOIN restaurants r ON r.id = o.restaurant_id
+        JOIN order_watchers ow ON ow.order_id = p.order_id
+        WHERE ow.closed = FALSE
+          AND o.courier_id IS NULL
+          AND o.pickup_lat IS NOT NULL AND o.pickup_lng IS NOT NULL
+          AND o.dropoff_lat IS NOT NULL AND o.dropoff_lng IS NOT NULL
+          AND ($1::uuid IS NULL OR NOT ($1::uuid = ANY(COALESCE(ow.rejected_drivers, ARRAY[]::uuid[]))))
+          AND ($1::uuid IS NULL OR $1::uuid = ANY(COALESCE(ow.offered_drivers, ARRAY[]::uuid[])))
+        ORDER BY p.created_at ASC
+        LIMIT $2
+        """,
+        driver_id,
+        CANDIDATE_POOL_LIMIT,
+    )
+    orders = []
+    for row in rows or []:
+        order = dict(row)
+        order["bearing"] = _bearing(_pickup(order), _dropoff(order))
+        orders.append(order)
+    return orders
+
+
+def group_orders(orders: List[Dict[str, Any]], max_size: int = MAX_BATCH_SIZE) -> List[List[Dict[str, Any]]]:
+    """
+    Greedy gruplama: en eski siparişten başlayarak, gruptaki tüm siparişlerle uyumlu
+    olanları ekler. Sadece 2+ siparişli gruplar döner.
+    """
+    used = set()
+    batches = []
+    for seed in orders:
+        if seed["order_id"] in used:
+            continue
+        group = [seed]
+        for other in orders:
+            if len(group) >= max_size:
+                break
+            if other["order_id"] in used or other is seed:
+                continue
+            if all(_compatible(member, other) for member in group):
+                group.append(other)
+        if len(group) > 1:
+            used.update(o["order_id"] for o in group)
+            batches.append(group)
+    return batches
+
+
+# === Durak sırası optimizasyonu ===
+def _valid_sequences(n_orders: int):
+    """Her sipariş i için pickup (2i) dropoff'tan (2i+1) önce gelen tüm sıralamalar"""
+    def walk(seq, picked, dropped):
+        if len(seq) == 2 * n_orders:
+            yield list(seq)
+            return
+        for i in range(n_orders):
+            if i not in picked:
+                picked.add(i); seq.append(2 * i)
+                yield from walk(seq, picked, dropped)
+                seq.pop(); picked.discard(i)
+            elif i not in dropped:
+                dropped.add(i); seq.append(2 * i + 1)
+                yield from walk(seq, picked, dropped)
+                seq.pop(); dropped.discard(i)
+    yield from walk([], set(), set())
+
+
+async def optimize_stop_sequence(
+    orders: List[Dict[str, Any]],
+    start: Optional[Coordinate] = None,
+) -> Tuple[List[Dict[str, Any]], float, float]:
+    """
+    En kısa süreli durak sırasını döner: (stops, duration_seconds, distance_meters).
+    Tüm noktalar arası süreler tek matris çağrısıyla alınır; null hücreler offline
+    tahminle doldurulur. Sıra bulunamazsa stops boş döner.
+    """
+    points: List[Coordinate] = []
+    for order in orders:
+        points.append(_pickup(order))
+        points.append(_dropoff(order))
+    all_points = ([start] if start else []) + points
+    offset = 1 if start else 0
+
+    matrix = await routing_service.matrix(all_points, all_points)
+    durations = matrix["durations"]
+    distances = matrix["distances"]
+
+    def cell(table, i, j):
+        value = table[i][j] if table else None
+        if value is not None:
+            return value
+        distance = _estimator.leg_distance(all_points[i], all_points[j])
+        return distance / _estimator.speed_ms if table is durations else distance
+
+    best_seq, best_duration, best_distance = None, float("inf"), 0.0
+    for seq in _valid_sequences(len(orders)):
+        prev = 0 if start else None
+        total, dist = 0.0, 0.0
+        for stop in seq:
+            idx = stop + offset
+            if prev is not None:
+                total += cell(durations, prev, idx)
+                dist += cell(distances, prev, idx)
+            prev = idx
+        if total < best_duration:
+            best_seq, best_duration, best_distance = seq, total, dist
+
+    stops = []
+    for stop in best_seq or []:
+        order = orders[stop // 2]
+        point = points[stop]
+        stops.append({
+            "order_id": str(order["order_id"]),
+            "kind": "pickup" if stop % 2 == 0 else "dropoff",
+            "lat": point.lat,
+            "lng": point.lgn,
+        })
+    return stops, best_duration, best_distance
+
+
+# === Kurye için batch teklifleri ===
+async def get_batch_offers_for_courier(driver_id: str) -> List[Dict[str, Any]]:
+    try:
+        UUID(driver_id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Bilinmeyen sürücü ID")
+
+    location = await fetch_one(
+        "SELECT latitude, longitude FROM gps_table WHERE driver_id = $1",
+        driver_id
+    )
+    start = Coordinate(lat=float(location["latitude"]), lgn=float(location["longitude"])) if location else None
+
+    orders = await _load_open_pool_orders(driver_id)
+    # En eski siparişlerden oluşan ilk gruplar; matris çağrıları sınırlı eşzamanlılıkla
+    groups = group_orders(orders)[:MAX_BATCH_OFFERS]
+    semaphore = asyncio.Semaphore(MATRIX_CONCURRENCY)
+
+    async def _optimize(group):
+        async with semaphore:
+            return await optimize_stop_sequence(group, start)
+
+    sequences = await asyncio.gather(*(_optimize(group) for group in groups))
+    offers = []
+    for group, (stops, duration, distance) in zip(groups, sequences):
+        # Durak sırası çıkmayan grup teklif edilmez
+        if not stops:
+            continue
+        offers.append({
+            "order_ids": [str(o["order_id"]) for o in group],
+            "order_codes": [o["order_code"] for o in group],
+            "restaurant_names": sorted({o["restaurant_name"] or "" for o in group}),
+            "total_amount": float(sum(o["amount"] for o in group)),
+            "stops": stops,
+            "duration": duration,
+            "distance": distance,
+        })
+
+    # En kısa sürede bitecek seferler önce
+    offers.sort(key=lambda b: b["duration"])
+    return offers
+
+
+async def accept_batch(courier_id: str, order_ids: List[UUID]) -> Dict[str, Any]:
+    """
+    Batch'i kurye adına kabul eder: siparişler ve sefer (courier_trips) tek transaction'da
+    yazılır. Siparişlerden biri artık alınamıyorsa (kapandı, başka kuryede, teklif edilmedi)
+    hiçbiri kabul edilmez ve 409 döner.
+    """
+    if len(order_ids) < 2 or len(order_ids) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Bir sefer 2-{MAX_BATCH_SIZE} sipariş içermeli"
+        )
+
+    open_orders = {str(o["order_id"]): o for o in await _load_open_pool_orders(courier_id)}
+    group = [open_orders.get(str(oid)) for oid in order_ids]
+    if any(o is None for o in group):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Siparişlerden biri artık havuzda değil"
+        )
+    if not all(_compatible(a, b) for i, a in enumerate(group) for b in group[i + 1:]):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Siparişler aynı sefere uygun değil"
+        )
+
+    error = await order_service.check_courier_can_accept(courier_id)
+    if error:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=error)
+
+    # Durak sırası transaction dışında (matris çağrısı kilit tutmasın)
+    location = await fetch_one(
+        "SELECT latitude, longitude FROM gps_table WHERE driver_id = $1",
+        courier_id
+    )
+    start = Coordinate(lat=float(location["latitude"]), lgn=float(location["longitude"])) if location else None
+    stops, duration, distance = await optimize_stop_sequence(group, start)
+    if not stops:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Sefer için rota hesaplanamadı, lütfen tekrar deneyin"
+        )
+    ids = [str(o["order_id"]) for o in group]
+
+    # Tüm siparişler tek transaction'da kabul edilir: biri alınamazsa hiçbiri alınmaz
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            rows = await conn.fetch(
+                """
+                SELECT o.id, o.courier_id, ow.closed,
+                       $2::uuid = ANY(COALESCE(ow.offered_drivers, ARRAY[]::uuid[])) AS offered,
+                       $2::uuid = ANY(COALESCE(ow.rejected_drivers, ARRAY[]::uuid[])) AS rejected
+                FROM orders o
+                JOIN pool_orders p ON p.order_id = o.id
+                JOIN order_watchers ow ON ow.order_id = o.id
+                WHERE o.id = ANY($1::uuid[])
+                FOR UPDATE OF o, ow
+                """,
+                ids, courier_id
+            )
+            available = [
+                r for r in rows
+                if not r["closed"] and r["offered"] and not r["rejected"]
+                and (r["courier_id"] is None or str(r["courier_id"]) == courier_id)
+            ]
+            if len(available) != len(ids):
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="Siparişlerden biri artık alınamıyor; sefer oluşturulmadı"
+                )
+
+            await conn.execute(
+                """
+                UPDATE orders
+                SET courier_id = $2, status = 'kuryeye_verildi', updated_at = NOW()
+                WHERE id = ANY($1::uuid[])
+                """,
+                ids, courier_id
+            )
+            await conn.execute(
+                """
+                INSERT INTO courier_orders_log (courier_id, order_id, action)
+                SELECT $1, unnest($2::uuid[]), 'kabul_etti'
+                ON CONFLICT (courier_id, order_id) DO NOTHING
+                """,
+                courier_id, ids
+            )
+            await conn.execute(
+                "UPDATE order_watchers SET closed = true WHERE order_id = ANY($1::uuid[])",
+                ids
+            )
+            row = await conn.fetchrow(
+                f"""
+                INSERT INTO {TRIPS_TABLE} (courier_id, order_ids, stops, status)
+                VALUES ($1, $2::uuid[], $3::jsonb, 'active')
+                RETURNING id, created_at
+                """,
+                courier_id,
+                ids,
+                json.dumps(stops),
+            )
+
+    # Rota pipeline'ı seferi görsün
+    active_order_cache.invalidate(courier_id)
+    for order_id in ids:
+        active_order_cache.invalidate_order(order_id)
+
+    return {
+        "trip_id": str(row["id"]),
+        "order_ids": ids,
+        "stops": stops,
+        "duration": duration,
+        "distance": distance,
+        "created_at": row["created_at"],
+    }
+
+
+async def complete_trip_if_done(order_id: Any):
+    """Seferdeki tüm siparişler bittiyse seferi kapat"""
+    await execute(
+        f"""
+        UPDATE {TRIPS_TABLE} t
+        SET status = 'completed', updated_at = NOW()
+        WHERE t.status = 'active'
+          AND $1::uuid = ANY(t.order_ids)
+          AND NOT EXISTS (
+              SELECT 1 FROM orders o
+              WHERE o.id = ANY(t.order_ids)
+                AND o.status NOT IN ('teslim_edildi', 'iptal')
+          )
+        """,
+        str(order_id)
+    )
+
+
+def remaining_trip_stops(stops: List[Dict[str, Any]], order_statuses: Dict[str, str]) -> List[Dict[str, Any]]:
+    """
+    Henüz tamamlanmamış duraklar:
+    - pickup: sipariş hâlâ 'kuryeye_verildi' (yola çıkılmadı)
+    - dropoff: sipariş 'kuryeye_verildi', 'yolda' veya 'konuma_geldim' (teslim edilmedi)
+    """
+    remaining = []
+    for stop in stops:
+        order_status = order_statuses.get(stop["order_id"])
+        if stop["kind"] == "pickup" and order_status == "kuryeye_verildi":
+            remaining.append(stop)
+        elif stop["kind"] == "dropoff" and order_status in ("kuryeye_verildi", "yolda", "konuma_geldim"):
+            remaining.append(stop)
+    return remaining
@@ -1,11 +1,14 @@
 from typing import Optional, List, Dict, Any, Tuple
 import random
 import string
+import base64
 from datetime import datetime
 import uuid
 from app.utils.database import db_cursor
 from app.utils.database_async import fetch_one, fetch_all, execute
-from app.services.order_watch_service import tick_watch, add_rejection, delete, create_watch, update_available_drivers, close
+from app.services.order_watch_service import tick_watch, add_rejection, delete, create_watch, schedule_ranking, close
+from app.utils.active_order_cache import active_order_cache
+from app.services.courier_dashboard_service import invalidate_courier_dashboard
 
 
 # === Kod Üretimi ===
@@ -146,6 +149,7 @@ async def update_order(order_id: str, restaurant_id: str, **kwargs) -> Tuple[boo
                 WHERE id = ${i};
             """
             await execute(query, *values)
+            active_order_cache.invalidate_order(order_id)
 
         # Ürünler güncelleniyorsa
         if "items" in kwargs and kwargs["items"]:
@@ -184,6 +188,7 @@ async def delete_order(order_id: str, restaurant_id: str) -> Tuple[bool, Optiona
         
         # Sipariş izleyicisini sil
         await delete(uuid.UUID(order_id))
+        active_order_cache.invalidate_order(order_id)
 
         return True, None
     except Exception as e:
@@ -521,24 +526,22 @@ async def reject_order_by_courier(courier_id: str, order_id: str) -> Tuple[bool,
             """,
             order_id
         )
+        active_order_cache.invalidate(courier_id)
+        active_order_cache.invalidate_order(order_id)
 
-        # Sipariş izleyicisini güncelle
-        await update_available_drivers(uuid.UUID(order_id))
+        # Sipariş izleyicisini güncelle: boşalan yere mevcut sıradaki aday girer,
+        # aday listesi arka planda yeniden sıralanır
         await add_rejection(uuid.UUID(order_id), uuid.UUID(courier_id))
         await tick_watch(uuid.UUID(order_id))
+        await schedule_ranking(uuid.UUID(order_id))
         
         return True, None
 
     except Exception as e:
         return False, str(e)
     
-async def accept_order_by_courier(courier_id: str, order_id: str) -> Tuple[bool, Optional[str]]:
-    try:
-        uuid.UUID(courier_id)
-        uuid.UUID(order_id)
-    except:
-        return False, "Hatalı UUID"
-    
+async def check_courier_can_accept(courier_id: str) -> Optional[str]:
+    """Kurye sipariş kabul edebilir mi (çevrimiçi + belgeler onaylı); değilse hata mesajı"""
     # Kuryenin çevrimiçi olup olmadığını kontrol et
     online_check = await fetch_one("""
         SELECT online
@@ -547,7 +550,7 @@ async def accept_order_by_courier(courier_id: str, order_id: str) -> Tuple[bool,
     """, courier_id)
     
     if not online_check or not online_check.get("online", False):
-        return False, "Çevrimdışı olduğunuz için sipariş kabul edemezsiniz. Lütfen çevrimiçi olun."
+        return "Çevrimdışı olduğunuz için sipariş kabul edemezsiniz. Lütfen çevrimiçi olun."
     
     # Belgelerin onaylanmış olması gerekiyor
     doc_check = await fetch_one("""
@@ -563,10 +566,23 @@ async def accept_order_by_courier(courier_id: str, order_id: str) -> Tuple[bool,
         approved = doc_check.get("approved_docs", 0) or 0
         
         if total == 0:
-            return False, "Belgeleriniz yüklenmemiş. Lütfen belgelerinizi yükleyin."
+            return "Belgeleriniz yüklenmemiş. Lütfen belgelerinizi yükleyin."
         
         if approved != total:
-            return False, "Tüm belgeleriniz onaylanmadan sipariş alamazsınız. Lütfen belgelerinizin onaylanmasını bekleyin."
+            return "Tüm belgeleriniz onaylanmadan sipariş alamazsınız. Lütfen belgelerinizin onaylanmasını bekleyin."
+    return None
+
+
+async def accept_order_by_courier(courier_id: str, order_id: str) -> Tuple[bool, Optional[str]]:
+    try:
+        uuid.UUID(courier_id)
+        uuid.UUID(order_id)
+    except:
+        return False, "Hatalı UUID"
+    
+    error = await check_courier_can_accept(courier_id)
+    if error:
+        return False, error
     
     try:
         order = await fetch_one(
@@ -577,15 +593,19 @@ async def accept_order_by_courier(courier_id: str, order_id: str) -> Tuple[bool,
             order = await fetch_one(
                 """
                 SELECT 
-                    p.order_id 
+                    p.order_id,
+                    $2::uuid = ANY(COALESCE(ow.offered_drivers, ARRAY[]::uuid[])) AS offered
                 FROM pool_orders p
                 LEFT JOIN order_watchers ow ON ow.order_id = p.order_id 
                 WHERE p.order_id=$1 AND ow.closed = FALSE;
                 """,
-                order_id
+                order_id, courier_id
             )
             if not order:
                 return False, "Sipariş bulunamadı veya zaten bir kurye tarafından kabul edildi"
+            # Teklif dalgaları: sadece siparişin teklif edildiği kuryeler kabul edebilir
+            if not order["offered"]:
+                return False, "Bu sipariş size teklif edilmedi"
 
         assigned_courier = await fetch_one(
             """SELECT courier_id FROM orders WHERE id = $1;
@@ -630,6 +650,9 @@ async def accept_order_by_courier(courier_id: str, order_id: str) -> Tuple[bool,
             order_id
         )
 
+        # Rota pipeline'ı bir sonraki okumada aktif siparişi (sefer bilgisiyle) yeniden yükler
+        active_order_cache.invalidate(courier_id)
+
         # Sipariş izleyicisini güncelle
         await close(uuid.UUID(order_id))
 
@@ -639,51 +662,97 @@ async def accept_order_by_courier(courier_id: str, order_id: str) -> Tuple[bool,
         return False, str(e)
     
 
+def encode_orders_log_cursor(created_at: datetime, log_id: str) -> str:
+    raw = f"{created_at.isoformat()}|{log_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_orders_log_cursor(cursor: str) -> Tuple[datetime, str]:
+    created_at, log_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+    return datetime.fromisoformat(created_at), log_id
+
+
 async def get_courier_orders_log(
     courier_id: str,
     limit: int = 50,
-    offset: int = 0
-) -> Tuple[List[Dict[str, Any]], int]:
+    offset: int = 0,
+    cursor: Optional[str] = None
+) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    ({"logs", "total_count", "next_cursor"}, error). Sayfalama (courier_id, created_at, id)
+    index'i üzerinden keyset ile yapılır; cursor verilirse offset kullanılmaz.
+    total_count courier_orders_log_counts sayacından okunur.
+    """
+    empty = {"logs": [], "total_count": 0, "next_cursor": None}
     try:
         uuid.UUID(courier_id)
     except Exception:
-        return [], 0
+        return empty, None
 
     offset_value = max(0, int(offset or 0))
     limit_value = int(limit or 50)
     if limit_value <= 0 or limit_value > 100:
         limit_value = 50
 
+    # Bozuk cursor sessizce boş sayfa olarak dönmez
+    params: List[Any] = [courier_id]
+    keyset = ""
+    if cursor:
+        try:
+            created_at, log_id = decode_orders_log_cursor(cursor)
+            uuid.UUID(log_id)
+        except ValueError:
+            return None, "Geçersiz cursor"
+        params.extend([created_at, log_id])
+        keyset = "AND (col.created_at, col.id) < ($2, $3::uuid)"
+        offset_value = 0
+    params.extend([limit_value + 1, offset_value])
+
     try:
-        rows = await fetch_all("""
+
+        rows = await fetch_all(f"""
+            WITH page AS (
+                SELECT col.id, col.order_id, col.action, col.created_at
+                FROM courier_orders_log AS col
+                WHERE col.courier_id = $1
+                  {keyset}
+                ORDER BY col.created_at DESC NULLS LAST, col.id DESC
+                LIMIT ${len(params) - 1} OFFSET ${len(params)}
+            )
             SELECT 
-                col.id,
-                col.order_id,
-                col.action,
-                col.created_at,
+                page.id,
+                page.order_id,
+                page.action,
+                page.created_at,
                 o.code   AS order_code,
                 o.status AS order_status,
                 o.type   AS order_type,
                 o.amount AS order_amount,
-                r.name   AS restaurant_name,
-                COUNT(*) OVER() AS total_count
-            FROM courier_orders_log AS col
-            LEFT JOIN orders      AS o ON o.id = col.order_id
+                r.name   AS restaurant_name
+            FROM page
+            LEFT JOIN orders      AS o ON o.id = page.order_id
             LEFT JOIN restaurants AS r ON r.id = o.restaurant_id
-            WHERE col.courier_id = $1
-            ORDER BY col.created_at DESC NULLS LAST
-            LIMIT $2 OFFSET $3
-        """, courier_id, limit_value, offset_value)
+            ORDER BY page.created_at DESC NULLS LAST, page.id DESC
+        """, *params)
 
         logs = [dict(row) for row in rows] if rows else []
-        total_count = int(rows[0]["total_count"]) if rows else 0
-        for item in logs:
-            item.pop("total_count", None)
+        has_more = len(logs) > limit_value
+        logs = logs[:limit_value]
 
-        return logs, total_count
+        next_cursor = None
+        if has_more and logs[-1]["created_at"]:
+            next_cursor = encode_orders_log_cursor(logs[-1]["created_at"], str(logs[-1]["id"]))
+
+        count_row = await fetch_one(
+            "SELECT total FROM courier_orders_log_counts WHERE courier_id = $1",
+            courier_id
+        )
+        total_count = int(count_row["total"]) if count_row else 0
+
+        return {"logs": logs, "total_count": total_count, "next_cursor": next_cursor}, None
 
     except Exception:
-        return [], 0
+        return empty, None
     
 async def mark_order_as_delivered_by_courier(
     courier_id: str,
@@ -710,6 +779,7 @@ async def mark_order_as_delivered_by_courier(
             """,
             order_id
         )
+        active_order_cache.invalidate(courier_id)
 
         return True, None
 
@@ -738,6 +808,7 @@ async def mark_order_as_courier_at_location(courier_id: str, order_id: str) -> T
             """,
             order_id
         )
+        active_order_cache.invalidate(courier_id)
 
         return True, None
 
@@ -770,6 +841,12 @@ async def mark_order_as_courier_delivered_order(
             """,
             order_id
         )
+        active_order_cache.invalidate(courier_id)
+        invalidate_courier_dashboard(courier_id)
+
+        # Seferdeki son sipariş teslim edildiyse seferi kapat
+        from app.services.order_batching_service import complete_trip_if_done
+        await complete_trip_if_done(order_id)
 
         return True, None
 
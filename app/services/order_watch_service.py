@@ -1,27 +1,24 @@
 from uuid import UUID
+import asyncio
+import logging
 
 from fastapi import HTTPException
-from ..utils.database_async import fetch_one, fetch_all, execute
+from ..utils.database_async import fetch_one, fetch_all, execute, get_pool
+from ..utils.websocket_manager import websocket_manager
 from ..models.order_watch_model import OrderWatch
 from ..services.pool_service import try_push_to_pool
 from ..services.restaurant_service import get_nearby_couriers
+from ..services.dispatch_ranking_service import rank_candidates, get_order_pickup
 
-TABLE = "order_watchers"
-
-async def create_watch(order_id: UUID):
-    restaurant_row = await fetch_one(
-        "SELECT restaurant_id FROM orders WHERE id = $1",
-        order_id
-    )
+logger = logging.getLogger(__name__)
 
-    if not restaurant_row:
-        raise HTTPException(
-            status_code=404,
-            detail="Order not found"
-        )
+TABLE = "order_watchers"
 
-    restaurant_id = restaurant_row["restaurant_id"]
+# Teklifler dalgalar halinde: her dalgada sıradaki WAVE_SIZE aday eklenir
+WAVE_SIZE = 3
+WAVE_TIMEOUT_SECONDS = 45
 
+async def _eligible_driver_ids(restaurant_id: UUID) -> list[UUID]:
     # === Restoranın kendi kuryeleri (online ve aktif) ===
     restaurant_drivers_rows = await fetch_all(
         """
@@ -36,65 +33,81 @@ async def create_watch(order_id: UUID):
         """,
         restaurant_id
     )
-
     restaurant_drivers = [row["driver_id"] for row in restaurant_drivers_rows]
 
     # === 10 km içindeki kuryeler (zaten online ve aktif filtreli) ===
     nearby_rows = await get_nearby_couriers(restaurant_id)
-
     nearby_driver_ids = [row["courier_id"] for row in nearby_rows]
 
     # === Tek liste: sadece uygun sürücüler ===
-    drivers = list(set(restaurant_drivers + nearby_driver_ids))
+    return list(set(restaurant_drivers + nearby_driver_ids))
+
+
+async def _ranked_driver_ids(order_id: UUID, restaurant_id: UUID) -> list[UUID]:
+    """Uygun kuryeleri dispatch skoruna göre sıralı döner (en iyi önce)"""
+    drivers = await _eligible_driver_ids(restaurant_id)
+    pickup = await get_order_pickup(order_id)
+    ranked = await rank_candidates(pickup, drivers)
+    return [c["courier_id"] for c in ranked]
+
+
+async def create_watch(order_id: UUID):
+    """
+    İzleyici satırını hemen yazar; aday sıralaması (routing matrisi) ve ilk dalga
+    teklifleri arka plan işinde yapılır (order_watch.rank). Sıralanana kadar
+    avalible_drivers NULL kalır.
+    """
+    restaurant_row = await fetch_one(
+        "SELECT restaurant_id FROM orders WHERE id = $1",
+        order_id
+    )
+
+    if not restaurant_row:
+        raise HTTPException(
+            status_code=404,
+            detail="Order not found"
+        )
 
     await execute(
         f"""
         INSERT INTO {TABLE} 
-        (order_id, restaurant_id, avalible_drivers, rejected_drivers, last_check, closed)
-        VALUES ($1, $2, $3, ARRAY[]::uuid[], NOW(), false)
+        (order_id, restaurant_id, avalible_drivers, rejected_drivers, offered_drivers,
+         offer_wave, wave_started_at, last_check, closed)
+        VALUES ($1, $2, NULL, ARRAY[]::uuid[], ARRAY[]::uuid[], 0, NOW(), NOW(), false)
         """,
         order_id,
-        restaurant_id,
-        drivers
+        restaurant_row["restaurant_id"]
     )
 
-async def update_available_drivers(order_id: UUID):
-    row = await fetch_one(
-        "SELECT restaurant_id FROM orders WHERE id = $1",
-        order_id
-    )
-    if not row:
-        return
+    await schedule_ranking(order_id)
 
-    restaurant_id = row["restaurant_id"]
 
-    # Restoran online kuryeleri
-    restaurant_drivers_rows = await fetch_all(
-        """
-        SELECT d.id AS driver_id
-        FROM restaurant_couriers rc
-        JOIN drivers d ON d.id = rc.courier_id
-        JOIN driver_status ds ON ds.driver_id = d.id
-        WHERE rc.restaurant_id = $1
-          AND d.is_active = true
-          AND d.deleted = false
-          AND COALESCE(ds.online, false) = true
-        """,
-        restaurant_id
+async def schedule_ranking(order_id: UUID):
+    """Aday sıralamasını kuyruğa alır (bekleyen sıralama varsa yenisi eklenmez)"""
+    from app.services.job_queue_service import enqueue
+    await enqueue(
+        "order_watch.rank",
+        {"order_id": str(order_id)},
+        dedupe_key=f"order_watch.rank:{order_id}",
     )
-    restaurant_driver_ids = [r["driver_id"] for r in restaurant_drivers_rows]
 
-    # Çevredeki online+aktif kuryeler (10 km)
-    nearby_rows = await get_nearby_couriers(restaurant_id)
-    nearby_driver_ids = [r["courier_id"] for r in nearby_rows]
 
-    # Final liste
-    drivers = list(set(restaurant_driver_ids + nearby_driver_ids))
+async def update_available_drivers(order_id: UUID):
+    """
+    Adayları yeniden sıralar ve mevcut dalgada açılan yerlere teklif gönderir
+    (order_watch.rank işi çalıştırır).
+    """
+    watch = await get_watch(order_id)
+    if not watch or watch.closed:
+        return
+
+    drivers = await _ranked_driver_ids(order_id, watch.restaurant_id)
 
     await execute(
         f"""
         UPDATE {TABLE}
         SET avalible_drivers = $2,
+            exhausted = false,
             last_check = NOW()
         WHERE order_id = $1 AND closed = false
         """,
@@ -102,6 +115,8 @@ async def update_available_drivers(order_id: UUID):
         drivers
     )
 
+    await offer_current_wave(order_id)
+
 
 
 async def add_rejection(order_id: UUID, driver_id: UUID):
@@ -129,11 +144,142 @@ async def compute_final_candidates(order_id: UUID) -> list[UUID]:
     row = await get_watch(order_id)
     if not row:
         return []
+    return _remaining_candidates(row)
+
+
+def _remaining_candidates(watch: OrderWatch) -> list[UUID]:
+    """Reddetmemiş adaylar, sıralama korunarak"""
+    rejected = set(watch.rejected_drivers or [])
+    return [d for d in (watch.avalible_drivers or []) if d not in rejected]
+
+
+def _wave_candidates(watch: OrderWatch) -> list[UUID]:
+    """Şu ana kadarki dalgalarda teklif edilmesi gereken adaylar (ilk WAVE_SIZE * (dalga+1))"""
+    return _remaining_candidates(watch)[: WAVE_SIZE * (watch.offer_wave + 1)]
+
+
+async def get_offered_drivers(order_id: UUID) -> list[UUID]:
+    """Siparişin şu an teklif edildiği (reddetmemiş) kuryeler"""
+    watch = await get_watch(order_id)
+    if not watch or watch.closed:
+        return []
+    return _wave_candidates(watch)
+
+
+async def offer_current_wave(order_id: UUID):
+    """Mevcut dalgada olup henüz teklif almamış kuryelere teklif gönderir"""
+    watch = await get_watch(order_id)
+    if not watch or watch.closed:
+        return
+
+    already = set(watch.offered_drivers or [])
+    new_offers = [d for d in _wave_candidates(watch) if d not in already]
+    if not new_offers:
+        return
+
+    await execute(
+        f"""
+        UPDATE {TABLE}
+        SET offered_drivers = COALESCE(offered_drivers, ARRAY[]::uuid[]) || $2::uuid[]
+        WHERE order_id = $1
+        """,
+        order_id,
+        new_offers
+    )
 
-    avail = set(row.avalible_drivers or [])
-    rejected = set(row.rejected_drivers or [])
+    for driver_id in new_offers:
+        await websocket_manager.send_to_courier(str(driver_id), {
+            "type": "order_offer",
+            "order_id": str(order_id),
+            "wave": watch.offer_wave,
+        })
 
-    return list(avail - rejected)
+
+async def advance_wave(order_id: UUID):
+    """Bir sonraki dalgaya geç ve yeni adaylara teklif gönder"""
+    await execute(
+        f"""
+        UPDATE {TABLE}
+        SET offer_wave = offer_wave + 1,
+            wave_started_at = NOW(),
+            last_check = NOW()
+        WHERE order_id = $1 AND closed = false
+        """,
+        order_id
+    )
+    await offer_current_wave(order_id)
+
+
+async def advance_expired_waves(batch_size: int = 100):
+    """
+    Süresi dolan dalgaları ilerletir (periyodik çağrılır).
+    Satırlar FOR UPDATE SKIP LOCKED ile alınır ve dalga aynı transaction'da ilerletilir;
+    birden fazla worker aynı dalgayı iki kez ilerletemez. Teklif edilecek aday kalmadıysa
+    izleyici exhausted işaretlenir (tekrar seçilmez) ve sipariş havuza atılmaya çalışılır.
+    """
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            rows = await conn.fetch(
+                f"""
+                SELECT *
+                FROM {TABLE}
+                WHERE closed = false
+                  AND exhausted = false
+                  AND avalible_drivers IS NOT NULL
+                  AND wave_started_at < NOW() - make_interval(secs => $1)
+                ORDER BY wave_started_at
+                LIMIT $2
+                FOR UPDATE SKIP LOCKED
+                """,
+                WAVE_TIMEOUT_SECONDS, batch_size
+            )
+            advanced, exhausted = [], []
+            for row in rows or []:
+                watch = OrderWatch(**row)
+                if len(_remaining_candidates(watch)) > len(_wave_candidates(watch)):
+                    advanced.append(watch.order_id)
+                else:
+                    exhausted.append(watch.order_id)
+
+            if advanced:
+                await conn.execute(
+                    f"""
+                    UPDATE {TABLE}
+                    SET offer_wave = offer_wave + 1,
+                        wave_started_at = NOW(),
+                        last_check = NOW()
+                    WHERE order_id = ANY($1::uuid[])
+                    """,
+                    advanced
+                )
+            if exhausted:
+                await conn.execute(
+                    f"""
+                    UPDATE {TABLE}
+                    SET exhausted = true,
+                        last_check = NOW()
+                    WHERE order_id = ANY($1::uuid[])
+                    """,
+                    exhausted
+                )
+
+    # Teklifler / havuz transaction dışında (WebSocket gönderimi kilit tutmasın)
+    for order_id in advanced:
+        await offer_current_wave(order_id)
+    for order_id in exhausted:
+        if await try_push_to_pool(order_id):
+            await close(order_id)
+
+
+async def start_periodic_wave_check(interval_seconds: int = 15):
+    """Dalga zaman aşımlarını periyodik kontrol eder"""
+    while True:
+        try:
+            await asyncio.sleep(interval_seconds)
+            await advance_expired_waves()
+        except Exception as e:
+            logger.error(f"Error in periodic wave check: {e}")
 
 async def open(order_id: UUID):
     await execute(
@@ -157,11 +303,18 @@ async def tick_watch(order_id: UUID):
     watch = await get_watch(order_id)
     if not watch or watch.closed:
         return
+    if watch.avalible_drivers is None:
+        # Sıralama işi henüz çalışmadı; teklifleri o gönderecek
+        return
 
-    candidates = await compute_final_candidates(order_id)
+    candidates = _remaining_candidates(watch)
 
     if len(candidates) == 0:
         pushed = await try_push_to_pool(order_id)
         if not pushed:
             return
-        await close(order_id)
\ No newline at end of file
+        await close(order_id)
+        return
+
+    # Red sonrası aynı dalgada boşalan yere sıradaki aday girer
+    await offer_current_wave(order_id)
\ No newline at end of file
@@ -3,6 +3,7 @@ from typing import Optional
 from fastapi import HTTPException, status
 from ..models.pool_model import PoolPushReq, PoolOrderRes
 from ..utils.database_async import fetch_all, fetch_one, execute
+from ..utils.active_order_cache import active_order_cache
 
 TABLE_NAME = "pool_orders"
 
@@ -188,6 +189,7 @@ async def get_pool_orders(driver_id: str, page: int = 1, size: int = 50):
             JOIN order_watchers ow ON ow.order_id = p.order_id
             WHERE ow.closed = FALSE
             AND NOT ($3 = ANY(COALESCE(ow.rejected_drivers, ARRAY[]::uuid[])))
+            AND $3 = ANY(COALESCE(ow.offered_drivers, ARRAY[]::uuid[]))
             LIMIT $1 OFFSET $2
         """
         
@@ -228,6 +230,7 @@ async def get_pool_orders(driver_id: str, page: int = 1, size: int = 50):
             JOIN order_watchers ow ON ow.order_id = p.order_id
             WHERE ow.closed = FALSE
             AND NOT ($3 = ANY(COALESCE(ow.rejected_drivers, ARRAY[]::uuid[])))
+            AND $3 = ANY(COALESCE(ow.offered_drivers, ARRAY[]::uuid[]))
             ORDER BY distance ASC
             LIMIT $1 OFFSET $2
         """
@@ -381,6 +384,7 @@ async def push_to_pool(req: PoolPushReq, restaurant_id: str):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Havuza gönderilirken bir hata oluştu"
         )
+    active_order_cache.invalidate_order(req.order_id)
     
     data = dict(row)
     data["order_id"] = str(data["order_id"])
@@ -526,4 +530,5 @@ async def try_push_to_pool(order_id: UUID):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to push order to pool"
         )
+    active_order_cache.invalidate_order(order_id)
     return True
\ No newline at end of file
@@ -0,0 +1,145 @@
+"""
+Kurye çevrimiçi aralıkları (driver_presence_intervals).
+
+- set_online (driver_service) aralığı açar / kapatır; kapanan aralığın süresi
+  aynı statement'ta courier_daily_stats.online_seconds'a gün gün eklenir
+- Çalışma süresi sorguları aralıklar üzerinde basit aralık toplamıdır;
+  gün bazlı toplamlar courier_daily_stats'tan, açık aralık NOW()'a kadar sayılır
+- compact_presence_events: model öncesi driver_presence_events kayıtlarını
+  aralıklara çevirir ve PRESENCE_EVENT_RETENTION_DAYS'ten eski event'leri siler
+"""
+from typing import Any, Dict, Optional
+from datetime import date, datetime, timedelta, timezone
+import logging
+import os
+
+from app.utils.database_async import fetch_one, get_pool
+
+logger = logging.getLogger(__name__)
+
+PRESENCE_EVENT_RETENTION_DAYS = int(os.getenv("PRESENCE_EVENT_RETENTION_DAYS", "30"))
+PRESENCE_COMPACT_INTERVAL_SECONDS = int(os.getenv("PRESENCE_COMPACT_INTERVAL_SECONDS", "86400"))
+
+
+async def online_seconds_between(driver_id: str, win_start: datetime, win_end: datetime) -> int:
+    """[win_start, min(win_end, NOW())) penceresinde çevrimiçi geçen süre (saniye). Açık aralık NOW()'a kadar."""
+    row = await fetch_one(
+        """
+        WITH bounds AS (
+            SELECT $2::timestamptz AS win_start, LEAST($3::timestamptz, NOW()) AS win_end
+        )
+        SELECT COALESCE(SUM(EXTRACT(EPOCH FROM
+                   LEAST(COALESCE(i.online_to, NOW()), b.win_end) - GREATEST(i.online_from, b.win_start)
+               )), 0)::bigint AS online_seconds
+        FROM driver_presence_intervals i, bounds b
+        WHERE i.driver_id = $1::uuid
+          AND i.online_from < b.win_end
+          AND (i.online_to IS NULL OR i.online_to > b.win_start)
+        """,
+        driver_id, win_start, win_end,
+    )
+    return int(row["online_seconds"]) if row else 0
+
+
+async def online_seconds_by_days(driver_id: str, first_day: date, today_start: datetime) -> Dict[str, int]:
+    """
+    Günlük rollup + açık aralık:
+    {"today": bugün çevrimiçi saniye, "total": first_day'den bugüne (bugün dahil) toplam}
+    """
+    row = await fetch_one(
+        """
+        WITH closed AS (
+            SELECT
+                COALESCE(SUM(online_seconds) FILTER (WHERE day = $3::date), 0)::bigint AS today,
+                COALESCE(SUM(online_seconds), 0)::bigint AS total
+            FROM courier_daily_stats
+            WHERE courier_id = $1::uuid
+              AND day >= $2::date
+              AND day <= $3::date
+        ),
+        open_iv AS (
+            SELECT COALESCE(EXTRACT(EPOCH FROM NOW() - GREATEST(online_from, $4::timestamptz)), 0)::bigint AS today,
+                   COALESCE(EXTRACT(EPOCH FROM NOW() - GREATEST(online_from, $2::date::timestamp AT TIME ZONE 'UTC')), 0)::bigint AS total
+            FROM driver_presence_intervals
+            WHERE driver_id = $1::uuid AND online_to IS NULL
+        )
+        SELECT c.today + COALESCE(GREATEST(o.today, 0), 0) AS today,
+               c.total + COALESCE(GREATEST(o.total, 0), 0) AS total
+        FROM closed c
+        LEFT JOIN open_iv o ON TRUE
+        """,
+        driver_id, first_day, today_start.date(), today_start,
+    )
+    return {
+        "today": int(row["today"]) if row else 0,
+        "total": int(row["total"]) if row else 0,
+    }
+
+
+async def compact_presence_events(retention_days: int = PRESENCE_EVENT_RETENTION_DAYS) -> Dict[str, Any]:
+    """
+    1) Kuryenin ilk aralığından önceki event çiftlerini (online -> offline) kapalı aralığa çevirir
+    2) Şu an online olup açık aralığı olmayan kuryelere driver_status'tan açık aralık açar
+    3) Saklama süresinden eski event'leri siler (hepsi artık aralıklarla temsil ediliyor)
+    Aralık eklemek courier_daily_stats'ı değiştirmez (bu süreler zaten rollup'ta).
+    İdempotenttir.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            converted = await conn.execute(
+                """
+                WITH first_iv AS (
+                    SELECT driver_id, MIN(online_from) AS first_from
+                    FROM driver_presence_intervals
+                    GROUP BY driver_id
+                ),
+                ordered AS (
+                    SELECT e.driver_id, e.is_online, e.at_utc,
+                           LEAD(e.at_utc) OVER w AS next_at,
+                           LEAD(e.is_online) OVER w AS next_online
+                    FROM driver_presence_events e
+                    WINDOW w AS (PARTITION BY e.driver_id ORDER BY e.at_utc)
+                )
+                INSERT INTO driver_presence_intervals (driver_id, online_from, online_to)
+                SELECT o.driver_id, o.at_utc, o.next_at
+                FROM ordered o
+                LEFT JOIN first_iv f ON f.driver_id = o.driver_id
+                WHERE o.is_online
+                  AND o.next_at IS NOT NULL
+                  AND NOT o.next_online
+                  AND o.next_at <= COALESCE(f.first_from, 'infinity'::timestamptz)
+                """
+            )
+            opened = await conn.execute(
+                """
+                INSERT INTO driver_presence_intervals (driver_id, online_from)
+                SELECT ds.driver_id, ds.updated_at
+                FROM driver_status ds
+                WHERE ds.online
+                  AND NOT EXISTS (
+                      SELECT 1 FROM driver_presence_intervals i
+                      WHERE i.driver_id = ds.driver_id AND i.online_to IS NULL
+                  )
+                ON CONFLICT (driver_id) WHERE online_to IS NULL DO NOTHING
+                """
+            )
+            deleted = await conn.execute(
+                "DELETE FROM driver_presence_events WHERE at_utc < $1",
+                cutoff,
+            )
+
+    result = {
+        "converted": int(converted.split()[-1]),
+        "opened": int(opened.split()[-1]),
+        "deleted": int(deleted.split()[-1]),
+    }
+    logger.info(f"Presence events compacted: {result}")
+    return result
+
+
+def next_compaction_dedupe_key(now: Optional[datetime] = None) -> str:
+    """Günde bir compaction işi (job queue dedupe anahtarı)"""
+    now = now or datetime.now(timezone.utc)
+    return f"presence.compact:{now.date().isoformat()}"
@@ -0,0 +1,222 @@
+"""
+Bellek içi fiyatlama motoru (job_price_service.calculate_job_price).
+
+Teklif hesaplamak için gereken her şey bellekte tutulur; sıcak yolda DB'ye gidilmez:
+- Koordinat -> şehir: geo_resolver (sınır poligonları, yoksa en yakın şehir merkezi)
+- city_prices satırları city_id -> (courier, minivan, panelvan, kamyonet, kamyon)
+- vehicle_products id -> product_template
+
+Senkronizasyon: city_price_service / vehicle_product_service yazmaları config_cache
+namespace versiyonunu artırır (diğer worker'lar sync döngüsüyle görür). Motor her
+teklifte versiyonları karşılaştırır; değiştiyse tabloları bir kez yeniden yükler.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import logging
+import os
+import time
+
+from app.utils.database_async import fetch_all
+from app.utils.config_cache import config_cache
+from app.services.geo_resolver import geo_resolver, haversine_km
+
+logger = logging.getLogger(__name__)
+
+# Versiyon sinyali kaçsa bile veriler en fazla bu kadar saniye eskir
+PRICING_ENGINE_MAX_AGE = float(os.getenv("PRICING_ENGINE_MAX_AGE", "300"))
+PRICING_BATCH_MAX = int(os.getenv("PRICING_BATCH_MAX", "100"))
+
+CITY_PRICES_NAMESPACE = "city_prices"
+VEHICLE_PRODUCTS_NAMESPACE = "vehicle_products"
+
+TEMPLATES = ("motorcycle", "minivan", "panelvan", "kamyonet", "kamyon")
+
+# city_prices bulunamazsa kullanılan varsayılan taban fiyatlar
+DEFAULT_BASE_PRICES = {
+    "motorcycle": 50.0,
+    "minivan": 150.0,
+    "panelvan": 200.0,
+    "kamyonet": 300.0,
+    "kamyon": 500.0,
+}
+
+# KM başına fiyat (şimdilik template'e göre sabit)
+KM_PRICES = {
+    "motorcycle": 2.0,
+    "minivan": 5.0,
+    "panelvan": 6.0,
+    "kamyonet": 8.0,
+    "kamyon": 10.0,
+}
+
+
+class PricingEngine:
+    def __init__(self):
+        # city_id -> template sırasına göre fiyatlar
+        self._city_prices: Dict[int, Tuple[Optional[float], ...]] = {}
+        self._product_templates: Dict[str, str] = {}
+        self._versions: Tuple[int, int] = (-1, -1)
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def _current_versions(self) -> Tuple[int, int]:
+        return (
+            config_cache.version(CITY_PRICES_NAMESPACE),
+            config_cache.version(VEHICLE_PRODUCTS_NAMESPACE),
+        )
+
+    def _is_fresh(self) -> bool:
+        return (
+            self._versions == self._current_versions()
+            and geo_resolver.loaded
+            and time.monotonic() - self._loaded_at < PRICING_ENGINE_MAX_AGE
+        )
+
+    async def ensure_fresh(self):
+        """Veriler güncelse hiçbir şey yapmaz; yazma sinyali geldiyse yeniden yükler"""
+        if self._is_fresh():
+            return
+        async with self._lock:
+            if not self._is_fresh():
+                await self._load()
+
+    async def _load(self):
+        await geo_resolver.ensure_loaded()
+        versions = self._current_versions()
+
+        price_rows, product_rows = await asyncio.gather(
+            fetch_all(
+                """
+                SELECT city_id, courier_price, minivan_price, panelvan_price,
+                       kamyonet_price, kamyon_price
+                FROM city_prices
+                ORDER BY created_at DESC
+                """
+            ),
+            fetch_all("SELECT id, product_template FROM vehicle_products"),
+        )
+
+        city_prices: Dict[int, Tuple[Optional[float], ...]] = {}
+        for r in price_rows or []:
+            # Aynı şehir için birden fazla kayıt varsa en yenisi geçerli
+            city_prices.setdefault(int(r["city_id"]), tuple(
+                float(r[col]) if r[col] is not None else None
+                for col in ("courier_price", "minivan_price", "panelvan_price",
+                            "kamyonet_price", "kamyon_price")
+            ))
+        product_templates = {str(r["id"]): r["product_template"] for r in product_rows or []}
+
+        self._city_prices = city_prices
+        self._product_templates = product_templates
+        self._versions = versions
+        self._loaded_at = time.monotonic()
+        logger.info(
+            f"Pricing engine loaded: {len(city_prices)} city prices, "
+            f"{len(product_templates)} vehicle products"
+        )
+
+    # --- Bellek içi sorgular (ensure_fresh sonrası) ---
+
+    def resolve_city(self, lat: float, lng: float) -> Optional[int]:
+        return geo_resolver.resolve_city(lat, lng)
+
+    def city_base_price(self, city_id: int, template: str) -> Optional[float]:
+        prices = self._city_prices.get(city_id)
+        if not prices:
+            return None
+        index = TEMPLATES.index(template) if template in TEMPLATES else 0
+        return prices[index] or 0.0
+
+    def template_for(self, vehicle_product_id: Any) -> Optional[str]:
+        return self._product_templates.get(str(vehicle_product_id))
+
+    def quote(
+        self,
+        template: str,
+        pickup_coords: Optional[List[float]] = None,
+        dropoff_coords: Optional[List[float]] = None,
+        city_id: Optional[int] = None,
+        extra_services_total: float = 0.0,
+        base_price: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """Tek teklif; DB'ye gitmez"""
+        if base_price is None:
+            if not city_id and pickup_coords and len(pickup_coords) >= 2:
+                city_id = self.resolve_city(pickup_coords[0], pickup_coords[1])
+            if city_id:
+                base_price = self.city_base_price(city_id, template)
+            if base_price is None:
+                base_price = DEFAULT_BASE_PRICES.get(template, 50.0)
+
+        distance_km = 0.0
+        km_price = 0.0
+        if pickup_coords and dropoff_coords and len(pickup_coords) >= 2 and len(dropoff_coords) >= 2:
+            distance_km = round(haversine_km(
+                pickup_coords[0], pickup_coords[1], dropoff_coords[0], dropoff_coords[1]
+            ), 2)
+            km_price = KM_PRICES.get(template, 2.0)
+
+        total = base_price + (distance_km * km_price) + (extra_services_total or 0.0)
+        return {
+            "price": round(total, 2),
+            "basePrice": base_price,
+            "distanceKm": distance_km,
+            "kmPrice": km_price,
+            "cityId": city_id,
+            "template": template,
+        }
+
+    async def resolve_template(
+        self,
+        vehicle_product_id: Any = None,
+        vehicle_template: Optional[str] = None,
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """(template, hata). Ürün bellekte yoksa (henüz senkronize olmamış) DB'ye bakılır."""
+        template = vehicle_template
+        if vehicle_product_id and not template:
+            template = self.template_for(vehicle_product_id)
+            if not template:
+                from app.services.vehicle_product_service import get_vehicle_product
+                product, error = await get_vehicle_product(vehicle_product_id)
+                if error or not product:
+                    return None, f"Araç ürünü bulunamadı: {error}"
+                template = product.get("productTemplate")
+        return template or "motorcycle", None
+
+    async def quote_many(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Toplu teklif. Her öğe: vehicle_product_id, vehicle_template, pickup_coords,
+        dropoff_coords, city_id, extra_services_total, base_price (hepsi opsiyonel).
+        Öğe bazında hata döner; bir öğenin hatası diğerlerini etkilemez.
+        """
+        await self.ensure_fresh()
+        results = []
+        for item in items:
+            template, error = await self.resolve_template(
+                item.get("vehicle_product_id"), item.get("vehicle_template")
+            )
+            if error:
+                results.append({"price": None, "error": error})
+                continue
+            quote = self.quote(
+                template,
+                pickup_coords=item.get("pickup_coords"),
+                dropoff_coords=item.get("dropoff_coords"),
+                city_id=item.get("city_id"),
+                extra_services_total=item.get("extra_services_total") or 0.0,
+                base_price=item.get("base_price"),
+            )
+            quote["error"] = None
+            results.append(quote)
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "cityPrices": len(self._city_prices),
+            "vehicleProducts": len(self._product_templates),
+            "versions": list(self._versions),
+        }
+
+
+# Global pricing engine instance
+pricing_engine = PricingEngine()
@@ -1,7 +1,8 @@
 from typing import Optional, Tuple, List, Dict, Any
 from datetime import time
 from app.utils.database_async import fetch_one, fetch_all, execute
-from app.utils.security import hash_pwd
+from app.utils.security import hash_pwd_async
+from app.services.token_revocation_service import revoke_user_tokens
 
 
 
@@ -36,7 +37,7 @@ async def restaurant_register(
             except Exception as e:
                 print(f"[WARN] {table} lookup failed: {e}")
 
-        pwd_hash = hash_pwd(password)
+        pwd_hash = await hash_pwd_async(password)
 
         row = await fetch_one(
             """
@@ -410,6 +411,7 @@ async def admin_delete_restaurant(restaurant_id: str) -> Tuple[bool, Optional[st
         if result.endswith(" 0"):
             return False, "Restaurant not found"
         
+        await revoke_user_tokens(restaurant_id, "deleted")
         return True, None
     except Exception as e:
         return False, str(e)
@@ -0,0 +1,648 @@
+"""
+Rota sağlayıcı soyutlaması.
+
+- OsrmProvider     : OSRM (self-hosted URL, OSRM_BASE_URL)
+- SerpApiProvider  : SerpAPI Google Maps Directions
+- OfflineProvider  : Ağ kullanmayan deterministik düz çizgi / grid sağlayıcı (load-test için)
+
+route()  : Çok duraklı rota (leg polyline'ları birleştirilir)
+matrix() : N kaynak x M hedef süre/mesafe matrisi (gerçek sağlayıcı hücreleri cache'lenir)
+
+Her sağlayıcının kendi timeout'u ve circuit breaker'ı vardır. Bir sağlayıcı hata
+verirse (veya breaker açıksa) sıradaki sağlayıcıya düşülür.
+
+Env:
+    ROUTING_PROVIDERS   : Sıra (virgülle), örn. "osrm,serpapi,offline"
+    OSRM_BASE_URL       : Self-hosted OSRM adresi
+    OSRM_TIMEOUT / SERPAPI_TIMEOUT : Saniye cinsinden sağlayıcı timeout'ları
+    SERPAPI_CONCURRENCY : Eşzamanlı SerpAPI leg isteği sınırı
+    OFFLINE_ROUTING_MODE: "straight" (haversine) veya "grid" (manhattan)
+    ROUTING_MATRIX_CACHE_TTL: Matris hücre cache süresi (saniye)
+"""
+import os
+import math
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+from fastapi import HTTPException
+
+from app.utils import polyline
+from app.utils.config import get_serpapi_key
+from ..models.map_model import Coordinate
+
+logger = logging.getLogger(__name__)
+
+# Environment
+ROUTING_PROVIDERS = os.getenv("ROUTING_PROVIDERS", "osrm,serpapi,offline")
+OSRM_BASE_URL = os.getenv("OSRM_BASE_URL", "http://router.project-osrm.org").rstrip("/")
+OSRM_TIMEOUT = float(os.getenv("OSRM_TIMEOUT", "5"))
+SERPAPI_TIMEOUT = float(os.getenv("SERPAPI_TIMEOUT", "10"))
+# Aynı anda SerpAPI'ye gidebilecek en fazla leg isteği (her istek ücretli)
+SERPAPI_CONCURRENCY = int(os.getenv("SERPAPI_CONCURRENCY", "4"))
+OFFLINE_ROUTING_MODE = os.getenv("OFFLINE_ROUTING_MODE", "straight").lower()
+ROUTING_MATRIX_CACHE_TTL = float(os.getenv("ROUTING_MATRIX_CACHE_TTL", "120"))
+
+SERPAPI_URL = "https://serpapi.com/search"
+EARTH_RADIUS_M = 6371000.0
+
+
+class RoutingError(Exception):
+    """Sağlayıcı rota üretemediğinde fırlatılır (bir sonraki sağlayıcıya geçilir)"""
+
+
+class RoutingNotSupported(RoutingError):
+    """Sağlayıcı istenen işlemi desteklemiyor (breaker'a hata olarak yazılmaz)"""
+
+
+# === CIRCUIT BREAKER ===
+class CircuitBreaker:
+    """
+    Basit circuit breaker:
+    - closed   : istekler geçer
+    - open     : art arda failure_threshold hata sonrası reset_timeout boyunca istek geçmez
+    - half_open: süre dolunca tek deneme yapılır, başarılıysa kapanır
+      (deneme sürerken diğer istekler geçmez; yanıtsız kalan deneme reset_timeout sonra düşer)
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probe_started_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "open":
+            return False
+        now = time.monotonic()
+        if self.probe_started_at is not None and now - self.probe_started_at < self.reset_timeout:
+            return False
+        self.probe_started_at = now
+        return True
+
+    def release(self):
+        """Sonuçsuz biten denemeyi bırakır (örn. işlem desteklenmiyor)"""
+        self.probe_started_at = None
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probe_started_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        self.probe_started_at = None
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+# === SAĞLAYICILAR ===
+class RoutingProvider:
+    """
+    Tüm sağlayıcılar route() ile aynı formatta sonuç döner:
+    {
+        "distance": metre, "duration": saniye,
+        "polyline": str | None, "steps": list | None,
+        "legs": [{"distance", "duration", "polyline"}]
+    }
+    """
+    name = "base"
+    # Sonuçları matris cache'ine yazılır mı (tahmini sağlayıcılar yazılmaz)
+    cacheable = True
+
+    def __init__(self, timeout: float, breaker: Optional[CircuitBreaker] = None):
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker()
+
+    async def route(self, points: List[Coordinate]) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    async def matrix(self, sources: List[Coordinate], destinations: List[Coordinate]) -> Dict[str, Any]:
+        """
+        {"durations": [[saniye]], "distances": [[metre]]} döner (satır = kaynak, sütun = hedef).
+        Ulaşılamayan hücreler None olabilir.
+        """
+        raise RoutingNotSupported(f"{self.name} does not support matrix requests")
+
+
+class OsrmProvider(RoutingProvider):
+    name = "osrm"
+
+    def __init__(self, base_url: str, timeout: float, breaker: Optional[CircuitBreaker] = None):
+        super().__init__(timeout, breaker)
+        self.base_url = base_url
+
+    async def route(self, points: List[Coordinate]) -> Dict[str, Any]:
+        coords = ";".join(f"{p.lgn},{p.lat}" for p in points)
+        url = f"{self.base_url}/route/v1/driving/{coords}"
+        params = {"overview": "full", "geometries": "polyline"}
+
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            response = await client.get(url, params=params)
+
+        if response.status_code != 200:
+            raise RoutingError(f"OSRM status {response.status_code}")
+
+        data = response.json()
+        if data.get("code") not in (None, "Ok") or not data.get("routes"):
+            raise RoutingError(f"OSRM error: {data.get('message') or data.get('code')}")
+
+        route = data["routes"][0]
+        return {
+            "distance": route["distance"],
+            "duration": route["duration"],
+            "polyline": route.get("geometry"),
+            "steps": None,
+            "legs": [
+                {"distance": leg.get("distance", 0), "duration": leg.get("duration", 0), "polyline": None}
+                for leg in route.get("legs", [])
+            ],
+        }
+
+    async def matrix(self, sources: List[Coordinate], destinations: List[Coordinate]) -> Dict[str, Any]:
+        points = list(sources) + list(destinations)
+        coords = ";".join(f"{p.lgn},{p.lat}" for p in points)
+        url = f"{self.base_url}/table/v1/driving/{coords}"
+        params = {
+            "sources": ";".join(str(i) for i in range(len(sources))),
+            "destinations": ";".join(str(len(sources) + j) for j in range(len(destinations))),
+            "annotations": "duration,distance",
+        }
+
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            response = await client.get(url, params=params)
+
+        if response.status_code != 200:
+            raise RoutingError(f"OSRM table status {response.status_code}")
+
+        data = response.json()
+        if data.get("code") not in (None, "Ok") or "durations" not in data:
+            raise RoutingError(f"OSRM table error: {data.get('message') or data.get('code')}")
+
+        return {"durations": data["durations"], "distances": data.get("distances")}
+
+
+class SerpApiProvider(RoutingProvider):
+    """SerpAPI waypoint desteklemediği için her ardışık nokta çifti ayrı bir leg olarak istenir"""
+    name = "serpapi"
+
+    def __init__(self, timeout: float, breaker: Optional[CircuitBreaker] = None):
+        super().__init__(timeout, breaker)
+        self._semaphore = asyncio.Semaphore(SERPAPI_CONCURRENCY)
+
+    async def _fetch_leg(self, client: httpx.AsyncClient, api_key: str, start: Coordinate, end: Coordinate, leg_no: int):
+        params = {
+            "engine": "google_maps_directions",
+            "api_key": api_key,
+            "start_coords": f"{start.lat},{start.lgn}",
+            "end_coords": f"{end.lat},{end.lgn}",
+        }
+        async with self._semaphore:
+            response = await client.get(SERPAPI_URL, params=params)
+
+        # Detaylı hata kontrolü
+        if response.status_code != 200:
+            try:
+                error_msg = response.json().get("error", response.text[:500])
+            except Exception:
+                error_msg = response.text[:500]
+            raise RoutingError(
+                f"SerpAPI request failed (leg{leg_no}): Status {response.status_code}, Error: {error_msg}"
+            )
+
+        data = response.json()
+        if "error" in data:
+            raise RoutingError(f"SerpAPI error (leg{leg_no}): {data.get('error', 'Unknown error')}")
+
+        distance, duration, steps, poly = _parse_serpapi_directions(data)
+        if distance is None:
+            raise RoutingError(f"No directions found in SerpAPI response (leg{leg_no})")
+        return distance, duration, steps, poly
+
+    async def route(self, points: List[Coordinate]) -> Dict[str, Any]:
+        try:
+            api_key = get_serpapi_key()
+        except RuntimeError as e:
+            raise RoutingError(str(e))
+
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            results = await asyncio.gather(*[
+                self._fetch_leg(client, api_key, points[i], points[i + 1], i + 1)
+                for i in range(len(points) - 1)
+            ])
+
+        legs = []
+        all_steps = []
+        for distance, duration, steps, poly in results:
+            legs.append({"distance": distance, "duration": duration, "polyline": poly})
+            all_steps.extend(steps or [])
+
+        polylines = [leg["polyline"] for leg in legs if leg["polyline"]]
+        return {
+            "distance": sum(leg["distance"] for leg in legs),
+            "duration": sum(leg["duration"] for leg in legs),
+            "polyline": polyline.concat(polylines) if polylines else None,
+            "steps": all_steps or None,
+            "legs": legs,
+        }
+
+
+class OfflineProvider(RoutingProvider):
+    """
+    Ağ kullanmayan deterministik sağlayıcı. Mesafe düz çizgi (haversine) veya
+    grid (manhattan) olarak hesaplanır, detour katsayısı ve sabit hız uygulanır.
+    """
+    name = "offline"
+    cacheable = False
+
+    def __init__(
+        self,
+        mode: str = "straight",
+        detour_factor: float = 1.3,
+        speed_kmh: float = 25.0,
+        timeout: float = 1.0,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        super().__init__(timeout, breaker)
+        self.mode = mode
+        self.detour_factor = detour_factor
+        self.speed_ms = speed_kmh * 1000 / 3600
+
+    def leg_distance(self, start: Coordinate, end: Coordinate) -> float:
+        if self.mode == "grid":
+            mid = Coordinate(lat=start.lat, lgn=end.lgn)
+            return haversine_m(start, mid) + haversine_m(mid, end)
+        return haversine_m(start, end) * self.detour_factor
+
+    async def route(self, points: List[Coordinate]) -> Dict[str, Any]:
+        legs = []
+        steps = []
+        for i in range(len(points) - 1):
+            start, end = points[i], points[i + 1]
+            distance = self.leg_distance(start, end)
+            duration = distance / self.speed_ms
+            leg_points = [(start.lat, start.lgn)]
+            if self.mode == "grid":
+                leg_points.append((start.lat, end.lgn))
+            leg_points.append((end.lat, end.lgn))
+            legs.append({"distance": distance, "duration": duration, "polyline": polyline.encode(leg_points)})
+            steps.append({"instruction": f"Leg {i + 1}", "distance": distance, "duration": duration})
+
+        path = [(points[0].lat, points[0].lgn)]
+        for i in range(1, len(points)):
+            if self.mode == "grid":
+                path.append((points[i - 1].lat, points[i].lgn))
+            path.append((points[i].lat, points[i].lgn))
+
+        return {
+            "distance": sum(leg["distance"] for leg in legs),
+            "duration": sum(leg["duration"] for leg in legs),
+            "polyline": polyline.encode(path),
+            "steps": steps,
+            "legs": legs,
+        }
+
+    async def matrix(self, sources: List[Coordinate], destinations: List[Coordinate]) -> Dict[str, Any]:
+        distances = [[self.leg_distance(src, dst) for dst in destinations] for src in sources]
+        durations = [[d / self.speed_ms for d in row] for row in distances]
+        return {"durations": durations, "distances": distances}
+
+
+def haversine_m(a: Coordinate, b: Coordinate) -> float:
+    """İki nokta arası büyük daire mesafesi (metre)"""
+    lat1, lat2 = math.radians(a.lat), math.radians(b.lat)
+    dlat = lat2 - lat1
+    dlng = math.radians(b.lgn - a.lgn)
+    h = math.sin(dlat / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(h)))
+
+
+# === MATRIX HÜCRE CACHE ===
+class MatrixCellCache:
+    """
+    (kaynak, hedef) -> (süre, mesafe) LRU cache. Koordinatlar ~11 m'ye yuvarlanır,
+    böylece aynı noktadan gelen tekrar sorgular ağa gitmez.
+    """
+
+    def __init__(self, ttl_seconds: float = 120.0, max_size: int = 50000, precision: int = 4):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self.precision = precision
+        self._cells: "OrderedDict[Tuple, Tuple[float, Any, Any]]" = OrderedDict()
+
+    def _key(self, src: Coordinate, dst: Coordinate) -> Tuple:
+        p = self.precision
+        return (round(src.lat, p), round(src.lgn, p), round(dst.lat, p), round(dst.lgn, p))
+
+    def get(self, src: Coordinate, dst: Coordinate) -> Optional[Tuple[Any, Any]]:
+        key = self._key(src, dst)
+        cell = self._cells.get(key)
+        if cell is None:
+            return None
+        expires_at, duration, distance = cell
+        if expires_at < time.monotonic():
+            del self._cells[key]
+            return None
+        self._cells.move_to_end(key)
+        return duration, distance
+
+    def set(self, src: Coordinate, dst: Coordinate, duration: Any, distance: Any):
+        key = self._key(src, dst)
+        self._cells[key] = (time.monotonic() + self.ttl_seconds, duration, distance)
+        self._cells.move_to_end(key)
+        while len(self._cells) > self.max_size:
+            self._cells.popitem(last=False)
+
+    def clear(self):
+        self._cells.clear()
+
+
+# === ROUTING SERVICE (fallback zinciri) ===
+class RoutingService:
+    def __init__(self, providers: List[RoutingProvider], matrix_cache: Optional[MatrixCellCache] = None):
+        self.providers = providers
+        self.matrix_cache = matrix_cache or MatrixCellCache()
+
+    def _ordered(self, prefer: Optional[str]) -> List[RoutingProvider]:
+        if not prefer:
+            return list(self.providers)
+        preferred = [p for p in self.providers if p.name == prefer]
+        return preferred + [p for p in self.providers if p.name != prefer]
+
+    async def route(self, points: List[Coordinate], prefer: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Noktalar (en az 2) arasında rota hesaplar. prefer verilirse o sağlayıcı önce denenir.
+        Tüm sağlayıcılar başarısız olursa HTTPException(500) fırlatır.
+        """
+        if len(points) < 2:
+            raise HTTPException(status_code=400, detail="At least two points are required for a route")
+        return await self._call("route", prefer, points)
+
+    async def matrix(
+        self,
+        sources: List[Coordinate],
+        destinations: List[Coordinate],
+        prefer: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Kaynak x hedef süre/mesafe matrisi. Cache'te olmayan hücreler için tek bir
+        sağlayıcı çağrısı yapılır (sadece eksik hücresi olan kaynak satırları istenir).
+        """
+        if not sources or not destinations:
+            return {"durations": [], "distances": [], "provider": None}
+
+        durations: List[List[Any]] = [[None] * len(destinations) for _ in sources]
+        distances: List[List[Any]] = [[None] * len(destinations) for _ in sources]
+        missing_rows = []
+        for i, src in enumerate(sources):
+            row_complete = True
+            for j, dst in enumerate(destinations):
+                cell = self.matrix_cache.get(src, dst)
+                if cell is None:
+                    row_complete = False
+                    continue
+                durations[i][j], distances[i][j] = cell
+            if not row_complete:
+                missing_rows.append(i)
+
+        provider_name = "cache"
+        if missing_rows:
+            data = await self._call("matrix", prefer, [sources[i] for i in missing_rows], destinations)
+            provider_name = data["provider"]
+            # Offline tahminler gerçek hücre gibi cache'lenmez; sağlayıcı düzelince hemen gerçek değer gelir
+            cacheable = next((p.cacheable for p in self.providers if p.name == provider_name), False)
+            sub_distances = data.get("distances") or [[None] * len(destinations) for _ in missing_rows]
+            for row_no, i in enumerate(missing_rows):
+                for j, dst in enumerate(destinations):
+                    duration = data["durations"][row_no][j]
+                    distance = sub_distances[row_no][j]
+                    durations[i][j], distances[i][j] = duration, distance
+                    if cacheable and duration is not None:
+                        self.matrix_cache.set(sources[i], dst, duration, distance)
+
+        return {"durations": durations, "distances": distances, "provider": provider_name}
+
+    async def _call(self, method: str, prefer: Optional[str], *args) -> Dict[str, Any]:
+        """Sağlayıcıları sırayla dener (breaker + timeout); ilk başarılı sonucu döner"""
+        errors = []
+        for provider in self._ordered(prefer):
+            if not provider.breaker.allow():
+                errors.append(f"{provider.name}: circuit open")
+                continue
+            try:
+                result = await asyncio.wait_for(getattr(provider, method)(*args), timeout=provider.timeout)
+            except RoutingNotSupported as e:
+                provider.breaker.release()
+                errors.append(f"{provider.name}: {e}")
+                continue
+            except asyncio.TimeoutError:
+                provider.breaker.record_failure()
+                errors.append(f"{provider.name}: timeout after {provider.timeout}s")
+                logger.warning(f"Routing provider {provider.name} timed out")
+                continue
+            except (RoutingError, httpx.HTTPError, KeyError, IndexError, TypeError, ValueError) as e:
+                provider.breaker.record_failure()
+                errors.append(f"{provider.name}: {e}")
+                logger.warning(f"Routing provider {provider.name} failed: {e}")
+                continue
+
+            provider.breaker.record_success()
+            result["provider"] = provider.name
+            return result
+
+        raise HTTPException(status_code=500, detail=f"All routing providers failed: {'; '.join(errors)}")
+
+    def status(self) -> List[Dict[str, Any]]:
+        """Sağlayıcıların breaker durumları (health/debug için)"""
+        return [
+            {"provider": p.name, "state": p.breaker.state, "failures": p.breaker.failures, "timeout": p.timeout}
+            for p in self.providers
+        ]
+
+
+def build_routing_service(provider_names: Optional[str] = None) -> RoutingService:
+    """ROUTING_PROVIDERS sırasına göre sağlayıcı zincirini kurar"""
+    factories = {
+        "osrm": lambda: OsrmProvider(OSRM_BASE_URL, timeout=OSRM_TIMEOUT),
+        "serpapi": lambda: SerpApiProvider(timeout=SERPAPI_TIMEOUT),
+        "offline": lambda: OfflineProvider(mode=OFFLINE_ROUTING_MODE),
+    }
+    providers = []
+    for name in (provider_names or ROUTING_PROVIDERS).split(","):
+        name = name.strip().lower()
+        if not name:
+            continue
+        if name not in factories:
+            logger.warning(f"Unknown routing provider ignored: {name}")
+            continue
+        providers.append(factories[name]())
+
+    if not providers:
+        providers.append(factories["offline"]())
+    return RoutingService(providers, MatrixCellCache(ttl_seconds=ROUTING_MATRIX_CACHE_TTL))
+
+
+# === SerpAPI response parse ===
+def _parse_serpapi_directions(data: Dict[str, Any]):
+    """SerpAPI response'unu parse eder - SerpAPI'nin gerçek response yapısını kullanır"""
+    distance = 0
+    duration = 0
+    steps = []
+    polyline = None
+    
+    # SerpAPI Google Maps Directions response yapısı:
+    # { "directions": [...], "durations": [...], "places_info": {...} }
+    
+    # Format 1: directions key'i ile (SerpAPI'nin standart formatı)
+    if "directions" in data and data["directions"]:
+        directions = data["directions"]
+        
+        # Directions bir liste olabilir
+        if isinstance(directions, list) and len(directions) > 0:
+            # Her direction objesi için
+            for direction in directions:
+                # Direction içinde routes olabilir
+                if "routes" in direction:
+                    routes = direction["routes"]
+                    if isinstance(routes, list) and len(routes) > 0:
+                        route_data = routes[0]
+                    else:
+                        route_data = routes
+                    
+                    # Legs'leri işle
+                    if "legs" in route_data:
+                        for leg in route_data["legs"]:
+                            if "distance" in leg:
+                                dist_obj = leg["distance"]
+                                if isinstance(dist_obj, dict) and "value" in dist_obj:
+                                    distance += dist_obj["value"]
+                                elif isinstance(dist_obj, (int, float)):
+                                    distance += dist_obj
+                            
+                            if "duration" in leg:
+                                dur_obj = leg["duration"]
+                                if isinstance(dur_obj, dict) and "value" in dur_obj:
+                                    duration += dur_obj["value"]
+                                elif isinstance(dur_obj, (int, float)):
+                                    duration += dur_obj
+                            
+                            if "steps" in leg:
+                                for step in leg["steps"]:
+                                    step_info = {
+                                        "instruction": step.get("html_instructions", step.get("instruction", step.get("text", ""))),
+                                        "distance": step.get("distance", {}).get("value", 0) if isinstance(step.get("distance"), dict) else step.get("distance", 0),
+                                        "duration": step.get("duration", {}).get("value", 0) if isinstance(step.get("duration"), dict) else step.get("duration", 0),
+                                    }
+                                    steps.append(step_info)
+                    
+                    # Polyline'ı al
+                    if "overview_polyline" in route_data:
+                        polyline_obj = route_data["overview_polyline"]
+                        if isinstance(polyline_obj, dict):
+                            polyline = polyline_obj.get("points", "")
+                        else:
+                            polyline = str(polyline_obj)
+                    
+                    # Alternatif: polyline direkt route_data'da olabilir
+                    if not polyline and "polyline" in route_data:
+                        polyline = route_data["polyline"]
+                else:
+                    # Direction direkt distance ve duration içeriyor (SerpAPI'nin gerçek formatı)
+                    # { "distance": 289, "duration": 267, "trips": [...] }
+                    if "distance" in direction:
+                        dist_val = direction["distance"]
+                        if isinstance(dist_val, (int, float)):
+                            distance += dist_val
+                        elif isinstance(dist_val, dict) and "value" in dist_val:
+                            distance += dist_val["value"]
+                    
+                    if "duration" in direction:
+                        dur_val = direction["duration"]
+                        if isinstance(dur_val, (int, float)):
+                            duration += dur_val
+                        elif isinstance(dur_val, dict) and "value" in dur_val:
+                            duration += dur_val["value"]
+                    
+                    # Steps ve Polyline için trips içine bak (SerpAPI'nin gerçek formatı)
+                    if "trips" in direction and isinstance(direction["trips"], list):
+                        for trip in direction["trips"]:
+                            # SerpAPI'de steps "details" key'i içinde geliyor
+                            if "details" in trip and isinstance(trip["details"], list):
+                                for detail in trip["details"]:
+                                    step_info = {
+                                        "instruction": detail.get("title", detail.get("instruction", detail.get("text", ""))),
+                                        "action": detail.get("action", ""),  # straight, turn-left, turn-right, etc.
+                                        "distance": detail.get("distance", 0) if isinstance(detail.get("distance"), (int, float)) else detail.get("distance", {}).get("value", 0),
+                                        "duration": detail.get("duration", 0) if isinstance(detail.get("duration"), (int, float)) else detail.get("duration", {}).get("value", 0),
+                                        "formatted_distance": detail.get("formatted_distance", ""),
+                                        "formatted_duration": detail.get("formatted_duration", ""),
+                                        "icon": detail.get("icon", "")
+                                    }
+                                    steps.append(step_info)
+                            
+                            # Alternatif: Eğer details yoksa steps key'ine bak
+                            elif "steps" in trip and isinstance(trip["steps"], list):
+                                for step in trip["steps"]:
+                                    step_info = {
+                                        "instruction": step.get("html_instructions", step.get("instruction", step.get("text", step.get("title", "")))),
+                                        "distance": step.get("distance", 0) if isinstance(step.get("distance"), (int, float)) else step.get("distance", {}).get("value", 0),
+                                        "duration": step.get("duration", 0) if isinstance(step.get("duration"), (int, float)) else step.get("duration", {}).get("value", 0),
+                                    }
+                                    steps.append(step_info)
+                            
+                            # Polyline trip içinde olabilir
+                            if not polyline:
+                                if "polyline" in trip:
+                                    polyline = trip["polyline"] if isinstance(trip["polyline"], str) else trip["polyline"].get("points", "")
+                                elif "overview_polyline" in trip:
+                                    poly_obj = trip["overview_polyline"]
+                                    polyline = poly_obj if isinstance(poly_obj, str) else poly_obj.get("points", "")
+                                elif "route" in trip and isinstance(trip["route"], dict):
+                                    if "polyline" in trip["route"]:
+                                        polyline = trip["route"]["polyline"] if isinstance(trip["route"]["polyline"], str) else trip["route"]["polyline"].get("points", "")
+                                    elif "overview_polyline" in trip["route"]:
+                                        poly_obj = trip["route"]["overview_polyline"]
+                                        polyline = poly_obj if isinstance(poly_obj, str) else poly_obj.get("points", "")
+                    
+                    # Alternatif: direction içinde direkt polyline
+                    if not polyline and "polyline" in direction:
+                        polyline = direction["polyline"] if isinstance(direction["polyline"], str) else direction["polyline"].get("points", "")
+                    elif not polyline and "overview_polyline" in direction:
+                        poly_obj = direction["overview_polyline"]
+                        polyline = poly_obj if isinstance(poly_obj, str) else poly_obj.get("points", "")
+    
+    # Format 2: durations key'i ile (SerpAPI'de de var)
+    if duration == 0 and "durations" in data:
+        durations = data["durations"]
+        if isinstance(durations, list) and len(durations) > 0:
+            # İlk duration'ı al (toplam süre)
+            dur_obj = durations[0]
+            if isinstance(dur_obj, dict):
+                duration = dur_obj.get("value", 0)
+            elif isinstance(dur_obj, (int, float)):
+                duration = dur_obj
+    
+    # Eğer hiçbir format çalışmazsa None döndür
+    if distance == 0 and duration == 0:
+        return None, None, None, None
+    
+    return distance, duration, steps, polyline
+
+
+# Global routing service instance
+routing_service = build_routing_service()
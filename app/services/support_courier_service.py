@@ -6,10 +6,14 @@ from app.utils.database_async import fetch_one, fetch_all
 async def get_support_couriers(
     limit: int = 50,
     offset: int = 0,
-    search: Optional[str] = None
+    search: Optional[str] = None,
+    state_id: Optional[int] = None,
+    city_id: Optional[int] = None
 ) -> Tuple[bool, List[Dict[str, Any]] | str]:
     """
     Çağrı merkezi için tüm kuryeleri listeler (Modül 1)
+    state_id / city_id: kuryenin şu anki konumunun bulunduğu il / şehir
+    (gps_table'a konum güncellemesinde geo_resolver ile yazılır)
     """
     try:
         filters = []
@@ -32,6 +36,17 @@ async def get_support_couriers(
             params.append(f"%{search.lower()}%")
             i += 1
         
+        # Güncel konuma göre il / şehir filtresi
+        if state_id is not None:
+            filters.append(f"g.state_id = ${i}")
+            params.append(state_id)
+            i += 1
+        
+        if city_id is not None:
+            filters.append(f"g.city_id = ${i}")
+            params.append(city_id)
+            i += 1
+        
         where_clause = f"WHERE {' AND '.join(filters)}" if filters else ""
         params.extend([limit, offset])
         
@@ -59,6 +74,8 @@ async def get_support_couriers(
             ob.step,
             g.latitude,
             g.longitude,
+            g.city_id AS location_city_id,
+            g.state_id AS location_state_id,
             g.updated_at AS location_updated_at
         FROM drivers d
         LEFT JOIN driver_onboarding ob ON ob.driver_id = d.id
@@ -104,6 +121,8 @@ async def get_support_couriers(
                 "location": {
                     "latitude": float(row_dict["latitude"]) if row_dict.get("latitude") else None,
                     "longitude": float(row_dict["longitude"]) if row_dict.get("longitude") else None,
+                    "cityId": row_dict.get("location_city_id"),
+                    "stateId": row_dict.get("location_state_id"),
                     "updatedAt": row_dict["location_updated_at"].isoformat() if row_dict.get("location_updated_at") else None
                 } if row_dict.get("latitude") or row_dict.get("longitude") else None
             })
@@ -353,76 +372,12 @@ async def get_support_courier_stats(
         if not courier_check:
             return False, "Kurye bulunamadı."
         
-        # Teslim edilen paket sayısı
-        delivered_count_query = """
-        SELECT COUNT(*) as count
-        FROM orders
-        WHERE courier_id = $1 AND status = 'teslim_edildi';
-        """
-        delivered_row = await fetch_one(delivered_count_query, courier_id)
-        delivered_count = delivered_row["count"] if delivered_row else 0
-        
-        # Toplam mesafe (km)
-        total_distance_query = """
-        SELECT COALESCE(SUM(
-            CASE 
-                WHEN status = 'teslim_edildi' 
-                    AND pickup_lat IS NOT NULL 
-                    AND pickup_lng IS NOT NULL 
-                    AND dropoff_lat IS NOT NULL 
-                    AND dropoff_lng IS NOT NULL
-                THEN (
-                    6371 * acos(
-                        LEAST(1.0,
-                            cos(radians(pickup_lat)) * 
-                            cos(radians(dropoff_lat)) * 
-                            cos(radians(dropoff_lng) - radians(pickup_lng)) + 
-                            sin(radians(pickup_lat)) * 
-                            sin(radians(dropoff_lat))
-                        )
-                    )
-                )
-                ELSE 0
-            END
-        ), 0) AS total_km
-        FROM orders
-        WHERE courier_id = $1;
-        """
-        distance_row = await fetch_one(total_distance_query, courier_id)
-        total_km = round(float(distance_row["total_km"]), 2) if distance_row and distance_row.get("total_km") else 0.0
-        
-        # Günlük mesafe (bugün)
-        from datetime import datetime, timezone
-        today_start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
-        
-        daily_distance_query = """
-        SELECT COALESCE(SUM(
-            CASE 
-                WHEN status = 'teslim_edildi' 
-                    AND updated_at >= $2
-                    AND pickup_lat IS NOT NULL 
-                    AND pickup_lng IS NOT NULL 
-                    AND dropoff_lat IS NOT NULL 
-                    AND dropoff_lng IS NOT NULL
-                THEN (
-                    6371 * acos(
-                        LEAST(1.0,
-                            cos(radians(pickup_lat)) * 
-                            cos(radians(dropoff_lat)) * 
-                            cos(radians(dropoff_lng) - radians(pickup_lng)) + 
-                            sin(radians(pickup_lat)) * 
-                            sin(radians(dropoff_lat))
-                        )
-                    )
-                )
-                ELSE 0
-            END
-        ), 0) AS daily_km
-        FROM orders
-        WHERE courier_id = $1;
-        """
-        daily_distance_row = await fetch_one(daily_distance_query, courier_id, today_start)
-        daily_km = round(float(daily_distance_row["daily_km"]), 2) if daily_distance_row and daily_distance_row.get("daily_km") else 0.0
+        # Teslim edilen paket sayısı ve mesafeler (courier_daily_stats)
+        from app.services.courier_stats_service import get_courier_stats
+        stats = await get_courier_stats(courier_id)
+        delivered_count = stats["total_deliveries"]
+        total_km = round(stats["total_km"], 2)
+        daily_km = round(stats["daily_km"], 2)
         
         # Paket bilgileri (subscription)
         package_query = """
@@ -471,15 +426,13 @@ async def get_support_courier_stats(
                 "activityHours": activity_hours
             }
         
-        # Mola durumu (son online/offline event)
+        # Mola durumu (driver_status: son online/offline değişikliği)
         break_status_query = """
         SELECT 
-            is_online,
-            at_utc
-        FROM driver_presence_events
-        WHERE driver_id = $1
-        ORDER BY at_utc DESC
-        LIMIT 1;
+            online AS is_online,
+            updated_at AS at_utc
+        FROM driver_status
+        WHERE driver_id = $1;
         """
         break_row = await fetch_one(break_status_query, courier_id)
         
@@ -1,5 +1,17 @@
 from typing import Dict, Any, Tuple, Optional, List
 from app.utils.database_async import fetch_one, fetch_all, execute
+from app.utils.config_cache import config_cache
+
+# check_support_module önbelleği (support paneli her sayfada onlarca istek atar).
+# Kayıtlar config_cache'te tutulur: support_user_id -> erişilebilir modüller (aktif değilse boş küme).
+# Değişiklikte config_versions sayacı artar, diğer worker'lar sync döngüsünde görür.
+CACHE_NAMESPACE = "support_access"
+
+
+async def invalidate_support_access(support_user_id: str):
+    """Yetki / aktiflik / silinme değişikliklerinde çağrılır (tüm worker'larda geçersiz olur)"""
+    await config_cache.invalidate(CACHE_NAMESPACE)
+
 
 async def update_support_permissions(
     support_user_id: str,
@@ -43,6 +55,8 @@ async def update_support_permissions(
         
         if not row:
             return False, "Yetkiler güncellenemedi."
+
+        await invalidate_support_access(support_user_id)
         
         # Response formatla
         row_dict = dict(row) if not isinstance(row, dict) else row
@@ -116,7 +130,8 @@ async def check_support_module(
     module_number: int
 ) -> bool:
     """
-    Support kullanıcısının belirli bir modüle erişim yetkisi var mı kontrol eder
+    Support kullanıcısının belirli bir modüle erişim yetkisi var mı kontrol eder.
+    Sonuç config_cache'te tutulur; yetki güncellemeleri tüm worker'larda önbelleği temizler.
     
     Args:
         support_user_id: Support kullanıcı ID'si
@@ -125,22 +140,25 @@ async def check_support_module(
     Returns:
         bool: Yetki varsa True, yoksa False
     """
-    try:
-        row = await fetch_one(
-            "SELECT access FROM support_users WHERE id = $1 AND is_active = TRUE AND (deleted IS NULL OR deleted = FALSE);",
-            support_user_id
-        )
-        
+    async def _load_modules() -> Optional[frozenset]:
+        try:
+            row = await fetch_one(
+                "SELECT access FROM support_users WHERE id = $1 AND is_active = TRUE AND (deleted IS NULL OR deleted = FALSE);",
+                support_user_id
+            )
+        except Exception:
+            return None
+
         if not row:
-            return False
-        
+            return frozenset()
         row_dict = dict(row) if not isinstance(row, dict) else row
-        access_list = list(row_dict.get("access", [])) if row_dict.get("access") else []
-        
-        return module_number in access_list
-        
-    except Exception:
-        return False
+        return frozenset(row_dict.get("access") or [])
+
+    modules = await config_cache.get_or_load(
+        CACHE_NAMESPACE, str(support_user_id), _load_modules,
+        cache_if=lambda value: value is not None,
+    )
+    return modules is not None and module_number in modules
 
 
 async def get_all_support_permissions(
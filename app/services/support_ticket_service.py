@@ -3,6 +3,7 @@ from datetime import datetime
 from typing import Tuple
 import os
 from app.services.mail_service import send_mail
+from app.services.job_queue_service import enqueue
 from app.utils.templates.support_reply_template import build_support_reply_email
 try:
     from app.utils.templates.support_new_template import build_support_new_ticket_email
@@ -27,7 +28,8 @@ async def create_ticket(restaurant_id, email, restaurant_name, subject, message)
         html = build_support_new_ticket_email(restaurant_name, email, subject, message, new_id)
         for addr in [x.strip() for x in ADMIN_NOTIFY_EMAILS.split(",") if x.strip()]:
             try:
-                await send_mail(addr, f"Yeni Destek Talebi #{new_id}", html)
+                # Kalıcı kuyruk: gönderilemezse worker tekrar dener
+                await enqueue("mail.send", {"to": addr, "subject": f"Yeni Destek Talebi #{new_id}", "html": html})
             except Exception:
                 pass
 
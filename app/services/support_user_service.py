@@ -1,6 +1,8 @@
 from typing import Dict, Any, Tuple, Optional, List
 from app.utils.database_async import fetch_one, execute
-from app.utils.security import hash_pwd
+from app.utils.security import hash_pwd_async
+from app.services.token_revocation_service import revoke_user_tokens
+from app.services.support_permission_service import invalidate_support_access
 
 async def create_support_user(
     first_name: str,
@@ -41,7 +43,7 @@ async def create_support_user(
             access = [m for m in access if 1 <= m <= 7]
         
         # Password hash
-        password_hash = hash_pwd(password)
+        password_hash = await hash_pwd_async(password)
         
         # DB'ye kayıt
         query = """
@@ -126,6 +128,8 @@ async def delete_support_user(
         if result.endswith(" 0"):
             return False, "Support kullanıcısı bulunamadı."
         
+        await invalidate_support_access(support_user_id)
+        await revoke_user_tokens(support_user_id, "deleted")
         return True, None
         
     except Exception as e:
@@ -234,6 +238,10 @@ async def update_support_user(
         
         if not row:
             return False, "Support kullanıcısı güncellenemedi."
+
+        await invalidate_support_access(support_user_id)
+        if is_active is False:
+            await revoke_user_tokens(support_user_id, "deactivated")
         
         # Response formatla
         row_dict = dict(row) if not isinstance(row, dict) else row
@@ -0,0 +1,150 @@
+"""
+Access token iptal listesi - auth kontrolleri DB'ye gitmeden ban / silme / logout'u uygular.
+
+- Kalıcı kaynak: token_revocations tablosu (worker'lar arası paylaşım)
+- Her worker tabloyu REVOCATION_SYNC_INTERVAL saniyede bir artımlı okur (id > son id),
+  böylece bir ban diğer worker'larda da birkaç saniye içinde geçerli olur.
+- Kullanıcı bazlı kayıt: revoked_at'ten önceki saniyelerde üretilmiş (iat) tüm access token'lar
+  geçersiz. JWT iat tam saniye olduğundan revoked_at da tam saniyeye yuvarlanır.
+- iat içermeyen token'lar her zaman geçersizdir.
+- Token bazlı kayıt (jti): tek bir access token geçersiz (logout).
+- Kayıtlar en fazla access token ömrü kadar tutulur; sonrasında eski token'lar zaten expire olur.
+"""
+from typing import Any, Dict, Optional
+from datetime import datetime, timedelta, timezone
+import asyncio
+import logging
+import os
+
+from app.utils.database_async import fetch_all, execute
+
+logger = logging.getLogger(__name__)
+
+ACCESS_TOKEN_TTL_MINUTES = int(os.getenv("ACCESS_TOKEN_TTL_MINUTES", "15"))
+REVOCATION_SYNC_INTERVAL = float(os.getenv("REVOCATION_SYNC_INTERVAL", "5"))
+
+
+class RevocationList:
+    """Process içi iptal kümesi (user_id -> revoked_at (tam saniye), jti -> exp)"""
+
+    def __init__(self):
+        self._users: Dict[str, int] = {}
+        self._tokens: Dict[str, float] = {}
+        self.last_id = 0
+
+    def revoke_user(self, user_id: str, revoked_at: float):
+        user_id = str(user_id)
+        self._users[user_id] = max(int(revoked_at), self._users.get(user_id, 0))
+
+    def revoke_token(self, jti: str, expires_at: float):
+        self._tokens[jti] = expires_at
+
+    def is_revoked(self, payload: Dict[str, Any]) -> bool:
+        jti = payload.get("jti")
+        if jti and jti in self._tokens:
+            return True
+
+        # iat olmayan (eski) token'lar iptal kaydının ömründen bağımsız olarak geçersiz
+        iat = payload.get("iat")
+        if iat is None:
+            return True
+
+        user_id = payload.get("sub") or payload.get("userId")
+        revoked_at = self._users.get(str(user_id)) if user_id else None
+        if revoked_at is None:
+            return False
+        # Aynı saniyede iptal sonrası yeniden giriş yapan kullanıcının token'ı geçerli kalır
+        return int(iat) < revoked_at
+
+    def prune(self):
+        """Ömrü dolmuş kayıtları at"""
+        now = datetime.now(timezone.utc).timestamp()
+        horizon = now - ACCESS_TOKEN_TTL_MINUTES * 60
+        self._users = {u: t for u, t in self._users.items() if t > horizon}
+        self._tokens = {j: e for j, e in self._tokens.items() if e > now}
+
+    def stats(self) -> Dict[str, Any]:
+        return {"users": len(self._users), "tokens": len(self._tokens), "last_id": self.last_id}
+
+
+# Global revocation list instance
+revocation_list = RevocationList()
+
+
+async def sync_revocations():
+    """token_revocations tablosundaki yeni kayıtları belleğe al"""
+    rows = await fetch_all(
+        """
+        SELECT id, user_id, jti, revoked_at, expires_at
+        FROM token_revocations
+        WHERE id > $1 AND expires_at > NOW()
+        ORDER BY id
+        """,
+        revocation_list.last_id,
+    )
+    for row in rows or []:
+        if row["jti"]:
+            revocation_list.revoke_token(row["jti"], row["expires_at"].timestamp())
+        else:
+            revocation_list.revoke_user(str(row["user_id"]), row["revoked_at"].timestamp())
+        revocation_list.last_id = max(revocation_list.last_id, row["id"])
+    revocation_list.prune()
+
+
+async def revoke_user_tokens(user_id: Any, reason: Optional[str] = None):
+    """
+    Kullanıcının tüm access token'larını iptal eder ve refresh token'larını revoke eder.
+    Ban / silme / pasifleştirme sonrası çağrılır.
+    """
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    await execute(
+        """
+        INSERT INTO token_revocations (user_id, reason, revoked_at, expires_at)
+        VALUES ($1, $2, $3, $4)
+        """,
+        str(user_id), reason, now, now + timedelta(minutes=ACCESS_TOKEN_TTL_MINUTES),
+    )
+    await execute(
+        "UPDATE refresh_tokens SET revoked_at = NOW() WHERE user_id = $1 AND revoked_at IS NULL",
+        str(user_id),
+    )
+    # Bu worker'da hemen geçerli olsun; diğerleri sync ile alır
+    revocation_list.revoke_user(str(user_id), now.timestamp())
+
+
+async def revoke_access_token(payload: Dict[str, Any]):
+    """Tek bir access token'ı (jti) expire olana kadar iptal eder (logout)"""
+    jti = payload.get("jti")
+    exp = payload.get("exp")
+    if not jti or not exp:
+        return
+
+    expires_at = datetime.fromtimestamp(float(exp), tz=timezone.utc)
+    await execute(
+        """
+        INSERT INTO token_revocations (user_id, jti, reason, expires_at)
+        VALUES ($1, $2, 'logout', $3)
+        """,
+        payload.get("sub"), jti, expires_at,
+    )
+    revocation_list.revoke_token(jti, float(exp))
+
+
+async def purge_revocations():
+    """Ömrü dolmuş kayıtları tablodan sil"""
+    await execute("DELETE FROM token_revocations WHERE expires_at < NOW()")
+
+
+async def start_periodic_revocation_sync(interval_seconds: float = REVOCATION_SYNC_INTERVAL):
+    """Periyodik olarak iptal listesini senkronize et"""
+    ticks = 0
+    while True:
+        try:
+            await sync_revocations()
+            ticks += 1
+            # Tablo temizliği ~10 dakikada bir yeterli
+            if ticks % max(int(600 / interval_seconds), 1) == 0:
+                await purge_revocations()
+        except Exception as e:
+            logger.error(f"Revocation sync error: {e}")
+        await asyncio.sleep(interval_seconds)
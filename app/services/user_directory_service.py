@@ -0,0 +1,111 @@
+"""
+Admin kullanıcı dizini (user_directory) - tüm rollerde tek indexli arama.
+
+user_directory tablosu rol tablolarındaki trigger'larla güncel tutulur (init_db):
+name/email/phone/status/created_at normalize edilmiştir, details satırın kendisidir
+(password_hash hariç). Arama search_text üzerindeki trigram index'ini kullanır;
+sayfalama tüm roller için tek cursor ile (created_at DESC, user_id DESC) yapılır.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime
+import base64
+import json
+
+from app.utils.database_async import fetch_all
+
+DIRECTORY_ROLES = ("courier", "restaurant", "admin", "dealer", "support", "corporate")
+
+
+def encode_directory_cursor(created_at: datetime, user_id: str) -> str:
+    raw = f"{created_at.isoformat()}|{user_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_directory_cursor(cursor: str) -> Tuple[datetime, str]:
+    created_at, user_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+    return datetime.fromisoformat(created_at), user_id
+
+
+async def search_directory(
+    search: Optional[str] = None,
+    roles: Optional[List[str]] = None,
+    status: Optional[str] = None,
+    include_deleted: bool = False,
+    limit: int = 50,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    with_counts: bool = True,
+) -> Dict[str, Any]:
+    """
+    Rol bağımsız kullanıcı arama. Dönüş:
+    {"items": [...], "next_cursor": str | None, "counts": {rol: sayı} | None}
+    cursor verilirse offset kullanılmaz.
+    """
+    conditions = ["role = ANY($1::text[])"]
+    params: List[Any] = [list(roles or DIRECTORY_ROLES)]
+
+    if not include_deleted:
+        conditions.append("NOT is_deleted")
+    if status:
+        params.append(status)
+        conditions.append(f"status = ${len(params)}")
+    if search:
+        params.append(f"%{search.lower()}%")
+        conditions.append(f"search_text LIKE ${len(params)}")
+
+    count_where = " AND ".join(conditions)
+    count_params = list(params)
+
+    if cursor:
+        created_at, user_id = decode_directory_cursor(cursor)
+        params.extend([created_at, user_id])
+        conditions.append(f"(created_at, user_id) < (${len(params) - 1}, ${len(params)}::uuid)")
+        offset = 0
+
+    params.extend([limit + 1, offset])
+    rows = await fetch_all(
+        f"""
+        SELECT user_id, role, name, email, phone, status, is_deleted,
+               commission_rate, created_at, details
+        FROM user_directory
+        WHERE {" AND ".join(conditions)}
+        ORDER BY created_at DESC, user_id DESC
+        LIMIT ${len(params) - 1} OFFSET ${len(params)}
+        """,
+        *params,
+    )
+    rows = list(rows or [])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    counts = None
+    if with_counts:
+        count_rows = await fetch_all(
+            f"SELECT role, COUNT(*) AS cnt FROM user_directory WHERE {count_where} GROUP BY role",
+            *count_params,
+        )
+        counts = {r["role"]: int(r["cnt"]) for r in count_rows or []}
+
+    next_cursor = None
+    if has_more and rows[-1]["created_at"]:
+        next_cursor = encode_directory_cursor(rows[-1]["created_at"], str(rows[-1]["user_id"]))
+
+    return {
+        "items": [
+            {
+                "userId": str(r["user_id"]),
+                "role": r["role"],
+                "name": r["name"],
+                "email": r["email"],
+                "phone": r["phone"],
+                "status": r["status"],
+                "deleted": r["is_deleted"],
+                "commissionRate": float(r["commission_rate"]) if r["commission_rate"] is not None else None,
+                "createdAt": r["created_at"].isoformat() if r["created_at"] else None,
+                "details": json.loads(r["details"]) if isinstance(r["details"], str) else r["details"],
+            }
+            for r in rows
+        ],
+        "next_cursor": next_cursor,
+        "counts": counts,
+    }
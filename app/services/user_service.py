@@ -1,7 +1,7 @@
 from typing import Optional, Dict, Any, Tuple
 from app.utils.database_async import fetch_one, execute
-from app.utils.security import hash_pwd, verify_pwd
-from app.services.auth_service import _generate_tokens_net_style
+from app.utils.security import hash_pwd_async
+from app.services.auth_service import _generate_tokens_net_style, _verify_and_upgrade
 
 
 async def register_user(
@@ -32,7 +32,7 @@ async def register_user(
     role_id = role["id"]
 
     # Password hashle
-    password_hash = hash_pwd(password)
+    password_hash = await hash_pwd_async(password)
 
     # User oluştur
     user_row = await fetch_one(
@@ -81,7 +81,7 @@ async def login_user(email: str, password: str) -> Optional[Dict[str, Any]]:
         return "banned"
 
     # Password kontrolü
-    if not verify_pwd(password, user["password_hash"]):
+    if not await _verify_and_upgrade("users", user, password):
         return None
 
     # Token oluştur
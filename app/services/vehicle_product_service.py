@@ -1,9 +1,12 @@
 from typing import Dict, Any, List, Tuple, Optional
 from uuid import UUID
 from app.utils.database_async import fetch_one, fetch_all, execute
+from app.utils.config_cache import config_cache
 import json
 from datetime import datetime
 
+CACHE_NAMESPACE = "vehicle_products"
+
 
 # === HELPER: Otomatik productCode oluşturma ===
 async def _generate_product_code(template: str, features: List[str]) -> str:
@@ -160,6 +163,7 @@ async def create_vehicle_product(data: Dict[str, Any]) -> Tuple[Optional[UUID],
                 opt["label"]
             )
         
+        await config_cache.invalidate(CACHE_NAMESPACE)
         return product_id, None
         
     except Exception as e:
@@ -171,7 +175,19 @@ async def list_vehicle_products(
     template: Optional[str] = None,
     is_active: Optional[bool] = None
 ) -> Tuple[Optional[List[Dict[str, Any]]], Optional[str]]:
-    """Araç ürünlerini listele"""
+    """Araç ürünlerini listele (config_cache üzerinden)"""
+    return await config_cache.get_or_load(
+        CACHE_NAMESPACE,
+        (template, is_active),
+        lambda: _load_vehicle_products(template, is_active),
+        cache_if=lambda res: res[1] is None,
+    )
+
+
+async def _load_vehicle_products(
+    template: Optional[str],
+    is_active: Optional[bool]
+) -> Tuple[Optional[List[Dict[str, Any]]], Optional[str]]:
     try:
         filters = []
         params = []
@@ -375,6 +391,7 @@ async def update_vehicle_product(
                     opt["label"]
                 )
         
+        await config_cache.invalidate(CACHE_NAMESPACE)
         return True, None
         
     except Exception as e:
@@ -403,6 +420,7 @@ async def delete_vehicle_product(product_id: UUID) -> Tuple[bool, Optional[str]]
         if "0" in result:
             return False, "Araç ürünü bulunamadı"
         
+        await config_cache.invalidate(CACHE_NAMESPACE)
         return True, None
         
     except Exception as e:
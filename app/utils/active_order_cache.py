@@ -0,0 +1,77 @@
+"""
+Kurye -> aktif sipariş önbelleği (GPS -> rota pipeline'ı için)
+"""
+from typing import Dict, Any, Optional, Tuple
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Rota hesaplanan (aktif) sipariş durumları
+ACTIVE_ORDER_STATUSES = ("kuryeye_verildi", "yolda")
+
+
+class ActiveOrderCache:
+    """
+    Kuryenin aktif siparişini (id, status, pickup/dropoff koordinatları) process içinde tutar.
+
+    - Kabul/atama sırasında doldurulur, durum değişikliklerinde invalidate edilir.
+    - "Aktif sipariş yok" sonucu da saklanır (negatif cache), böylece her GPS
+      ping'inde tekrar sorgu atılmaz.
+    - TTL, başka bir worker'dan gelen ve bu process'in göremediği değişiklikler
+      için üst sınırdır.
+    """
+
+    def __init__(self, ttl_seconds: float = 30.0):
+        self.ttl_seconds = ttl_seconds
+        # courier_id -> (expires_at, order dict veya None)
+        self._entries: Dict[str, Tuple[float, Optional[Dict[str, Any]]]] = {}
+        # order_id -> courier_id (sipariş bazlı invalidation için)
+        self._order_index: Dict[str, str] = {}
+
+    def get(self, courier_id: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """(hit, order) döner. hit=False ise DB'den okunmalı."""
+        entry = self._entries.get(str(courier_id))
+        if entry is None:
+            return False, None
+
+        expires_at, order = entry
+        if expires_at < time.monotonic():
+            self.invalidate(courier_id)
+            return False, None
+        return True, order
+
+    def set(self, courier_id: str, order: Optional[Dict[str, Any]]):
+        """Kuryenin aktif siparişini kaydet (None = aktif sipariş yok)"""
+        courier_id = str(courier_id)
+        self.invalidate(courier_id)
+
+        if order is not None:
+            if order.get("status") not in ACTIVE_ORDER_STATUSES:
+                order = None
+            else:
+                order = dict(order)
+                self._order_index[str(order["id"])] = courier_id
+
+        self._entries[courier_id] = (time.monotonic() + self.ttl_seconds, order)
+
+    def invalidate(self, courier_id: str):
+        """Kuryenin cache kaydını sil"""
+        entry = self._entries.pop(str(courier_id), None)
+        if entry and entry[1] is not None:
+            self._order_index.pop(str(entry[1]["id"]), None)
+
+    def invalidate_order(self, order_id: str):
+        """Siparişi aktif olarak tutan kuryenin kaydını sil"""
+        courier_id = self._order_index.pop(str(order_id), None)
+        if courier_id is not None:
+            self._entries.pop(courier_id, None)
+            logger.debug(f"Active order cache invalidated for order {order_id}")
+
+    def clear(self):
+        self._entries.clear()
+        self._order_index.clear()
+
+
+# Global active order cache instance
+active_order_cache = ActiveOrderCache()
@@ -0,0 +1,143 @@
+"""
+Admin tarafından yönetilen konfigürasyon verileri için versiyonlu önbellek
+(banner, kampanya, genel ayarlar, şehir fiyatları, araç ürünleri, support yetkileri).
+
+- Okuma: get_or_load(namespace, key, loader) -> önbellekteki değer namespace'in
+  güncel versiyonuyla üretildiyse döner, değilse loader çağrılır (read-through)
+- Yazma: servisler create/update/delete sonrası invalidate(namespace) çağırır;
+  config_versions tablosundaki sayaç artar ve yerel önbellek hemen geçersiz olur
+- Diğer worker'lar sayaçları CONFIG_CACHE_SYNC_INTERVAL saniyede bir okur
+  (tek küçük sorgu); değişen namespace'in kayıtları kendiliğinden eskir
+- etag(namespace, key): versiyondan türetilir; route'lar If-None-Match ile 304 döner
+"""
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+import asyncio
+import logging
+import os
+import time
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.utils.database_async import fetch_all, fetch_one
+from app.utils.http_cache import make_etag, etag_matches, cached_json_response
+
+logger = logging.getLogger(__name__)
+
+CONFIG_CACHE_SYNC_INTERVAL = float(os.getenv("CONFIG_CACHE_SYNC_INTERVAL", "2"))
+# Sync döngüsü çalışmıyorsa (örn. ayrı worker process) kayıtlar en fazla bu kadar yaşar
+CONFIG_CACHE_MAX_AGE = float(os.getenv("CONFIG_CACHE_MAX_AGE", "60"))
+
+
+class ConfigCache:
+    def __init__(self):
+        self._versions: Dict[str, int] = {}
+        # (namespace, key) -> (version, loaded_at, value)
+        self._entries: Dict[Tuple[str, Hashable], Tuple[int, float, Any]] = {}
+        self._hits = 0
+        self._misses = 0
+
+    def version(self, namespace: str) -> int:
+        return self._versions.get(namespace, 0)
+
+    async def get_or_load(
+        self,
+        namespace: str,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        cache_if: Callable[[Any], bool] = lambda value: True,
+    ) -> Any:
+        """
+        Önbellekten döner ya da loader'ı çağırıp saklar.
+        cache_if False dönerse (örn. hata sonucu) değer saklanmaz.
+        """
+        version = self.version(namespace)
+        entry = self._entries.get((namespace, key))
+        if entry and entry[0] == version and time.monotonic() - entry[1] < CONFIG_CACHE_MAX_AGE:
+            self._hits += 1
+            return entry[2]
+
+        self._misses += 1
+        value = await loader()
+        if cache_if(value):
+            self._entries[(namespace, key)] = (version, time.monotonic(), value)
+        return value
+
+    async def invalidate(self, namespace: str):
+        """Yazma sonrası: sayacı artır (tüm worker'lar için) ve yerel kayıtları düşür"""
+        try:
+            row = await fetch_one(
+                """
+                INSERT INTO config_versions (name, version, updated_at)
+                VALUES ($1, 1, NOW())
+                ON CONFLICT (name) DO UPDATE
+                    SET version = config_versions.version + 1, updated_at = NOW()
+                RETURNING version
+                """,
+                namespace,
+            )
+            self._versions[namespace] = int(row["version"])
+        except Exception as e:
+            # Sayaç yazılamazsa en azından bu worker'da geçersiz kıl
+            logger.error(f"Config version bump failed for {namespace}: {e}")
+            self._versions[namespace] = self.version(namespace) + 1
+        self._drop(namespace)
+
+    def _drop(self, namespace: str):
+        for entry_key in [k for k in self._entries if k[0] == namespace]:
+            self._entries.pop(entry_key, None)
+
+    async def sync(self):
+        rows = await fetch_all("SELECT name, version FROM config_versions")
+        for row in rows or []:
+            name, version = row["name"], int(row["version"])
+            if self._versions.get(name) != version:
+                self._versions[name] = version
+                self._drop(name)
+
+    def etag(self, namespace: str, key: Hashable = "") -> str:
+        return make_etag(namespace, self.version(namespace), key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "versions": dict(self._versions),
+            "entries": len(self._entries),
+            "hits": self._hits,
+            "misses": self._misses,
+        }
+
+
+# Global config cache instance
+config_cache = ConfigCache()
+
+
+async def config_response(
+    request: Request,
+    namespace: str,
+    producer: Callable[[], Awaitable[Dict[str, Any]]],
+    key: Hashable = "",
+    private: bool = True,
+) -> Response:
+    """
+    Controller yanıtını ETag ile döner. İstemcinin ETag'i güncel versiyonla eşleşirse
+    controller hiç çağrılmadan 304 döner. Başarısız yanıtlara ETag eklenmez.
+    """
+    etag = config_cache.etag(namespace, key)
+    if etag_matches(request, etag):
+        return cached_json_response(request, None, etag, private=private)
+
+    content = await producer()
+    if isinstance(content, dict) and content.get("success") is False:
+        return JSONResponse(content=jsonable_encoder(content))
+    return cached_json_response(request, content, etag, private=private)
+
+
+async def start_config_cache_sync(interval_seconds: float = CONFIG_CACHE_SYNC_INTERVAL):
+    """Periyodik olarak config versiyonlarını senkronize et"""
+    while True:
+        try:
+            await config_cache.sync()
+        except Exception as e:
+            logger.error(f"Config cache sync error: {e}")
+        await asyncio.sleep(interval_seconds)
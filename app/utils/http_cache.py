@@ -0,0 +1,46 @@
+"""
+HTTP önbellek yardımcıları (ETag / If-None-Match / Cache-Control).
+
+Veri değişmediği sürece aynı ETag döner; istemci If-None-Match ile gelirse
+gövde gönderilmeden 304 döner.
+"""
+from typing import Any
+import hashlib
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+
+def make_etag(*parts: Any) -> str:
+    """Verilen parçalardan (versiyon, sorgu parametreleri vb.) zayıf ETag üretir"""
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # W/ öneki karşılaştırmada yok sayılır
+    candidates = {c.strip().removeprefix("W/") for c in header.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+
+def cached_json_response(
+    request: Request,
+    content: Any,
+    etag: str,
+    max_age: int = 0,
+    private: bool = False,
+) -> Response:
+    """ETag eşleşirse 304, aksi halde ETag + Cache-Control başlıklı JSON döner"""
+    scope = "private" if private else "public"
+    cache_control = f"{scope}, max-age={max_age}" if max_age else f"{scope}, no-cache"
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=jsonable_encoder(content), headers=headers)
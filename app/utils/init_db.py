@@ -388,6 +388,25 @@ CREATE TABLE IF NOT EXISTS refresh_tokens (
   created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
 );
 
+-- Konfigürasyon önbelleği versiyon sayaçları (config_cache; banner, kampanya, ayarlar...)
+CREATE TABLE IF NOT EXISTS config_versions (
+    name TEXT PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 1,
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Access token iptal kayıtları (jti NULL ise kullanıcının o ana kadarki tüm token'ları)
+CREATE TABLE IF NOT EXISTS token_revocations (
+  id BIGSERIAL PRIMARY KEY,
+  user_id UUID,
+  jti TEXT,
+  reason TEXT,
+  revoked_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  expires_at TIMESTAMPTZ NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_token_revocations_expires ON token_revocations(expires_at);
+
 CREATE TABLE IF NOT EXISTS contact_messages (
     id SERIAL PRIMARY KEY,
     name TEXT NOT NULL,
@@ -525,6 +544,113 @@ CREATE TABLE IF NOT EXISTS notifications (
     created_at TIMESTAMP DEFAULT NOW()
 );
 
+-- Bildirim kutusu: keyset sayfalama index'leri
+CREATE INDEX IF NOT EXISTS idx_notifications_user_type_created
+    ON notifications (user_type, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_notifications_target_email_created
+    ON notifications (target_email, created_at DESC, id DESC)
+    WHERE target_email IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_notifications_created
+    ON notifications (created_at DESC, id DESC);
+
+-- Kullanıcı bazlı okuma durumu (broadcast bildirim tek kayıt, okuma kişi başı)
+CREATE TABLE IF NOT EXISTS notification_reads (
+    user_id UUID NOT NULL,
+    notification_id INT NOT NULL REFERENCES notifications(id) ON DELETE CASCADE,
+    read_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (user_id, notification_id)
+);
+CREATE INDEX IF NOT EXISTS idx_notification_reads_notification
+    ON notification_reads (notification_id);
+
+-- Okunmamış sayısı için sayaçlar:
+-- audience: '*' (tümü), 'type:<user_type>', 'email:<target_email>'
+CREATE TABLE IF NOT EXISTS notification_counters (
+    audience TEXT PRIMARY KEY,
+    total BIGINT NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS notification_read_counts (
+    user_id UUID PRIMARY KEY,
+    read_count BIGINT NOT NULL DEFAULT 0
+);
+
+-- Sayaçları mevcut bildirimlerden bir kez doldur
+INSERT INTO notification_counters (audience, total)
+SELECT audience, COUNT(*)
+FROM (
+    SELECT '*' AS audience FROM notifications
+    UNION ALL
+    SELECT CASE WHEN target_email IS NOT NULL THEN 'email:' || target_email ELSE 'type:' || user_type END
+    FROM notifications
+) a
+WHERE audience IS NOT NULL
+  AND NOT EXISTS (SELECT 1 FROM notification_counters)
+GROUP BY audience
+ON CONFLICT (audience) DO NOTHING;
+
+-- Toplu mail işleri ve outbox (mail_dispatch_service)
+CREATE TABLE IF NOT EXISTS mail_jobs (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    subject TEXT NOT NULL,
+    user_type TEXT,
+    total INT NOT NULL DEFAULT 0,
+    notification_id INT,
+    html TEXT,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Toplu mailde HTML bir kez mail_jobs.html'de tutulur; outbox satırı sadece kendine özel HTML taşır
+CREATE TABLE IF NOT EXISTS mail_outbox (
+    id BIGSERIAL PRIMARY KEY,
+    job_id UUID REFERENCES mail_jobs(id) ON DELETE CASCADE,
+    to_email TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    html TEXT,
+    status TEXT NOT NULL DEFAULT 'pending' CHECK (status IN ('pending','sending','sent','failed')),
+    attempts INT NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    locked_at TIMESTAMPTZ,
+    last_error TEXT,
+    sent_at TIMESTAMPTZ,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+ALTER TABLE mail_jobs ADD COLUMN IF NOT EXISTS html TEXT;
+ALTER TABLE mail_outbox ALTER COLUMN html DROP NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_mail_outbox_pending
+    ON mail_outbox (next_attempt_at) WHERE status IN ('pending','sending');
+CREATE INDEX IF NOT EXISTS idx_mail_outbox_job_status
+    ON mail_outbox (job_id, status);
+
+-- Kalıcı iş kuyruğu (job_queue_service): dead = deneme hakkı biten iş (dead-letter)
+CREATE TABLE IF NOT EXISTS background_jobs (
+    id BIGSERIAL PRIMARY KEY,
+    queue TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    payload JSONB NOT NULL DEFAULT '{}'::jsonb,
+    status TEXT NOT NULL DEFAULT 'queued' CHECK (status IN ('queued','running','done','dead')),
+    attempts INT NOT NULL DEFAULT 0,
+    max_attempts INT NOT NULL DEFAULT 5,
+    run_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    locked_at TIMESTAMPTZ,
+    locked_by TEXT,
+    last_error TEXT,
+    dedupe_key TEXT,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    finished_at TIMESTAMPTZ
+);
+
+-- dedupe_key sadece bekleyen / çalışan işler arasında tekildir; done/dead iş anahtarı bırakır
+ALTER TABLE background_jobs DROP CONSTRAINT IF EXISTS background_jobs_dedupe_key_key;
+CREATE UNIQUE INDEX IF NOT EXISTS uq_background_jobs_dedupe_active
+    ON background_jobs (dedupe_key) WHERE status IN ('queued','running');
+
+CREATE INDEX IF NOT EXISTS idx_background_jobs_ready
+    ON background_jobs (queue, run_at) WHERE status IN ('queued','running');
+CREATE INDEX IF NOT EXISTS idx_background_jobs_finished
+    ON background_jobs (finished_at) WHERE status = 'done';
+
 CREATE TABLE IF NOT EXISTS carrier_types (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
     name TEXT NOT NULL,
@@ -740,6 +866,81 @@ CREATE TABLE IF NOT EXISTS chat_messages (
     UNIQUE(chat_id, message_id)
 );
 
+-- Sohbet geçmişi keyset sayfalama: gönderim zamanı chat_messages'a da yazılır
+ALTER TABLE chat_messages
+    ADD COLUMN IF NOT EXISTS sent_at TIMESTAMPTZ;
+UPDATE chat_messages cm
+SET sent_at = m.sent_at
+FROM messages m
+WHERE m.id = cm.message_id AND cm.sent_at IS NULL;
+CREATE INDEX IF NOT EXISTS idx_chat_messages_chat_sent
+    ON chat_messages (chat_id, sent_at DESC, message_id DESC);
+CREATE INDEX IF NOT EXISTS idx_messages_receiver_undelivered
+    ON messages (receiver_id)
+    WHERE delivered_at IS NULL;
+
+-- Kullanıcı bazlı sohbet listesi (son mesaj önizlemesi + okunmamış sayısı), send_message ile güncellenir
+CREATE TABLE IF NOT EXISTS chat_user_state (
+    chat_id UUID NOT NULL REFERENCES chats(id) ON DELETE CASCADE,
+    user_id UUID NOT NULL,
+    user_type TEXT NOT NULL,
+    peer_id UUID,
+    peer_type TEXT,
+    last_message_id UUID,
+    last_message_preview TEXT,
+    last_sender_type TEXT,
+    last_message_at TIMESTAMPTZ,
+    unread_count INT NOT NULL DEFAULT 0,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (user_id, user_type, chat_id)
+);
+CREATE INDEX IF NOT EXISTS idx_chat_user_state_user_updated
+    ON chat_user_state (user_id, user_type, updated_at DESC);
+
+-- Mevcut sohbetler için bir kez doldur
+INSERT INTO chat_user_state (
+    chat_id, user_id, user_type, peer_id, peer_type,
+    last_message_id, last_message_preview, last_sender_type, last_message_at,
+    unread_count, created_at, updated_at
+)
+SELECT
+    cp.chat_id, cp.user_id, cp.user_type, peer.user_id, peer.user_type,
+    lm.id, LEFT(lm.content, 200), lm.sender_type, lm.sent_at,
+    (
+        SELECT COUNT(*)
+        FROM chat_messages cm2
+        JOIN messages m2 ON m2.id = cm2.message_id
+        WHERE cm2.chat_id = cp.chat_id
+          AND m2.receiver_id = cp.user_id
+          AND lower(m2.receiver_type) = lower(cp.user_type)
+          AND m2.read_at IS NULL
+    ),
+    c.created_at, COALESCE(c.updated_at, c.created_at)
+FROM chat_participants cp
+JOIN chats c ON c.id = cp.chat_id
+LEFT JOIN LATERAL (
+    SELECT p.user_id, p.user_type
+    FROM chat_participants p
+    WHERE p.chat_id = cp.chat_id
+      AND NOT (p.user_id = cp.user_id AND p.user_type = cp.user_type)
+    ORDER BY p.joined_at
+    LIMIT 1
+) peer ON TRUE
+LEFT JOIN LATERAL (
+    SELECT m.id, m.content, m.sender_type, m.sent_at
+    FROM chat_messages cm
+    JOIN messages m ON m.id = cm.message_id
+    WHERE cm.chat_id = cp.chat_id
+    ORDER BY m.sent_at DESC
+    LIMIT 1
+) lm ON TRUE
+WHERE NOT EXISTS (
+    SELECT 1 FROM chat_user_state s
+    WHERE s.user_id = cp.user_id AND s.user_type = cp.user_type AND s.chat_id = cp.chat_id
+)
+ON CONFLICT (user_id, user_type, chat_id) DO NOTHING;
+
 -- Restaurant jobs desteği için restaurant_id kolonu (mevcut tablolar için)
 ALTER TABLE admin_jobs
     ADD COLUMN IF NOT EXISTS restaurant_id UUID REFERENCES restaurants(id) ON DELETE CASCADE;
@@ -861,6 +1062,11 @@ CREATE TABLE IF NOT EXISTS gps_table (
     updated_at TIMESTAMPTZ DEFAULT NOW()
 );
 CREATE INDEX IF NOT EXISTS idx_gps_updated_at ON gps_table(updated_at DESC);
+-- Konumun çözümlenmiş şehir / ili (geo_resolver, her konum güncellemesinde yazılır)
+ALTER TABLE gps_table ADD COLUMN IF NOT EXISTS city_id BIGINT;
+ALTER TABLE gps_table ADD COLUMN IF NOT EXISTS state_id BIGINT;
+CREATE INDEX IF NOT EXISTS idx_gps_state_id ON gps_table(state_id);
+CREATE INDEX IF NOT EXISTS idx_gps_city_id ON gps_table(city_id);
 
 -- Restoran Menü tablosu --
 CREATE TABLE IF NOT EXISTS restaurant_menus (
@@ -890,6 +1096,13 @@ CREATE TABLE IF NOT EXISTS order_watchers (
     closed BOOLEAN DEFAULT false
 );
 
+-- Dalga halinde teklif (avalible_drivers dispatch skoruna göre sıralı tutulur)
+ALTER TABLE order_watchers ADD COLUMN IF NOT EXISTS offered_drivers UUID[] DEFAULT ARRAY[]::UUID[];
+ALTER TABLE order_watchers ADD COLUMN IF NOT EXISTS offer_wave INT DEFAULT 0;
+ALTER TABLE order_watchers ADD COLUMN IF NOT EXISTS wave_started_at TIMESTAMPTZ DEFAULT NOW();
+-- Tüm adaylara teklif gitti ve son dalganın süresi doldu (periyodik kontrol tekrar seçmez)
+ALTER TABLE order_watchers ADD COLUMN IF NOT EXISTS exhausted BOOLEAN NOT NULL DEFAULT false;
+
 -- Aktif izlemeleri hızlı almak için
 CREATE INDEX IF NOT EXISTS idx_order_watchers_closed
     ON order_watchers (closed);
@@ -898,6 +1111,22 @@ CREATE INDEX IF NOT EXISTS idx_order_watchers_closed
 CREATE INDEX IF NOT EXISTS idx_order_watchers_restaurant_closed
     ON order_watchers (restaurant_id, closed);
 
+-- Çoklu sipariş seferleri (batch): durak sırası {order_id, kind, lat, lng} listesi
+CREATE TABLE IF NOT EXISTS courier_trips (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    courier_id UUID NOT NULL REFERENCES drivers(id) ON DELETE CASCADE,
+    order_ids UUID[] NOT NULL,
+    stops JSONB NOT NULL DEFAULT '[]'::jsonb,
+    status TEXT NOT NULL DEFAULT 'active' CHECK (status IN ('active','completed','cancelled')),
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_courier_trips_courier_status
+    ON courier_trips (courier_id, status);
+CREATE INDEX IF NOT EXISTS idx_courier_trips_order_ids
+    ON courier_trips USING GIN (order_ids);
+
 -- ============================
 -- Roles & Users tabloları
 -- ============================
@@ -969,6 +1198,14 @@ ALTER TABLE dealers ADD COLUMN IF NOT EXISTS commission_description TEXT;
 ALTER TABLE dealers ADD COLUMN IF NOT EXISTS latitude DECIMAL(9,6);
 ALTER TABLE dealers ADD COLUMN IF NOT EXISTS longitude DECIMAL(9,6);
 
+-- Admin kullanıcı dizini: tip bazlı keyset sayfalama (created_at DESC, id DESC)
+CREATE INDEX IF NOT EXISTS idx_drivers_created_id ON drivers (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_restaurants_created_id ON restaurants (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_system_admins_created_id ON system_admins (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_dealers_created_id ON dealers (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_support_users_created_id ON support_users (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_corporate_users_created_id ON corporate_users (created_at DESC, id DESC);
+
 -- Corporate Users email unique constraint'i kaldır (eğer varsa)
 DO $$
 BEGIN
@@ -1006,6 +1243,18 @@ CREATE INDEX IF NOT EXISTS idx_dealer_restaurants_dealer_id ON dealer_restaurant
 CREATE INDEX IF NOT EXISTS idx_dealer_restaurants_restaurant_id ON dealer_restaurants(restaurant_id);
 CREATE INDEX IF NOT EXISTS idx_refresh_tokens_token ON refresh_tokens(token);
 CREATE INDEX IF NOT EXISTS idx_refresh_tokens_user ON refresh_tokens(user_id, user_type);
+
+-- Refresh token'lar düz metin değil sha256 hash olarak saklanır
+ALTER TABLE refresh_tokens ADD COLUMN IF NOT EXISTS token_hash TEXT;
+ALTER TABLE refresh_tokens ALTER COLUMN token DROP NOT NULL;
+UPDATE refresh_tokens
+SET token_hash = encode(sha256(convert_to(token, 'UTF8')), 'hex'), token = NULL
+WHERE token_hash IS NULL AND token IS NOT NULL;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_refresh_tokens_token_hash ON refresh_tokens(token_hash);
+-- Arka plan temizliği ve kullanıcı başına limit için
+CREATE INDEX IF NOT EXISTS idx_refresh_tokens_expires ON refresh_tokens(expires_at);
+CREATE INDEX IF NOT EXISTS idx_refresh_tokens_user_active
+    ON refresh_tokens(user_id, created_at DESC) WHERE revoked_at IS NULL;
 CREATE INDEX IF NOT EXISTS ix_banners_active ON banners(active);
 CREATE INDEX IF NOT EXISTS ix_banners_priority ON banners(priority DESC);
 CREATE INDEX IF NOT EXISTS idx_presence_driver_time ON driver_presence_events (driver_id, at_utc);
@@ -1028,6 +1277,317 @@ ALTER TABLE drivers ADD COLUMN IF NOT EXISTS company_number TEXT;
 
 -- Vehicles tablosuna vehicle_details JSONB kolonu
 ALTER TABLE vehicles ADD COLUMN IF NOT EXISTS vehicle_details JSONB DEFAULT '{}';
+
+-- Admin kullanıcı dizini (user_directory): tüm rol tabloları tek tabloda, trigger ile güncel tutulur.
+-- name/email/phone/status normalize; details = satırın kendisi (password_hash hariç)
+CREATE TABLE IF NOT EXISTS user_directory (
+    user_id UUID NOT NULL,
+    role TEXT NOT NULL,             -- courier, restaurant, admin, dealer, support, corporate
+    name TEXT,
+    email TEXT,
+    phone TEXT,
+    status TEXT,                    -- active, inactive, deleted (dealer: kendi status değeri)
+    is_deleted BOOLEAN NOT NULL DEFAULT FALSE,
+    commission_rate DECIMAL(5,2),
+    created_at TIMESTAMPTZ,
+    search_text TEXT NOT NULL DEFAULT '',
+    details JSONB NOT NULL DEFAULT '{}',
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (role, user_id)
+);
+CREATE INDEX IF NOT EXISTS idx_user_directory_created
+    ON user_directory (created_at DESC, user_id DESC);
+CREATE INDEX IF NOT EXISTS idx_user_directory_role_created
+    ON user_directory (role, created_at DESC, user_id DESC);
+
+-- Trigram arama index'i (pg_trgm kurulamazsa arama index'siz çalışır)
+DO $$
+BEGIN
+    CREATE EXTENSION IF NOT EXISTS pg_trgm;
+EXCEPTION WHEN OTHERS THEN
+    RAISE NOTICE 'pg_trgm extension could not be created: %', SQLERRM;
+END $$;
+
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm') THEN
+        EXECUTE 'CREATE INDEX IF NOT EXISTS idx_user_directory_search_trgm
+                 ON user_directory USING GIN (search_text gin_trgm_ops)';
+    END IF;
+END $$;
+
+CREATE OR REPLACE FUNCTION user_directory_upsert(p_role TEXT, j JSONB) RETURNS VOID AS $$
+DECLARE
+    v_name TEXT;
+    v_deleted BOOLEAN;
+    v_status TEXT;
+BEGIN
+    v_name := CASE p_role
+        WHEN 'restaurant' THEN j->>'name'
+        WHEN 'dealer' THEN concat_ws(' ', j->>'name', j->>'surname')
+        ELSE concat_ws(' ', j->>'first_name', j->>'last_name')
+    END;
+    v_deleted := COALESCE((j->>'deleted')::BOOLEAN, FALSE);
+    v_status := CASE
+        WHEN v_deleted THEN 'deleted'
+        WHEN p_role = 'dealer' THEN j->>'status'
+        WHEN j ? 'is_active' THEN CASE WHEN COALESCE((j->>'is_active')::BOOLEAN, FALSE) THEN 'active' ELSE 'inactive' END
+        ELSE 'active'
+    END;
+
+    INSERT INTO user_directory (
+        user_id, role, name, email, phone, status, is_deleted,
+        commission_rate, created_at, search_text, details, updated_at
+    )
+    VALUES (
+        (j->>'id')::UUID, p_role, v_name, j->>'email', j->>'phone', v_status, v_deleted,
+        (j->>'commission_rate')::DECIMAL, (j->>'created_at')::TIMESTAMPTZ,
+        lower(concat_ws(' ', v_name, j->>'email', j->>'phone', j->>'contact_person')),
+        j - 'password_hash', NOW()
+    )
+    ON CONFLICT (role, user_id) DO UPDATE SET
+        name = EXCLUDED.name,
+        email = EXCLUDED.email,
+        phone = EXCLUDED.phone,
+        status = EXCLUDED.status,
+        is_deleted = EXCLUDED.is_deleted,
+        commission_rate = EXCLUDED.commission_rate,
+        created_at = EXCLUDED.created_at,
+        search_text = EXCLUDED.search_text,
+        details = EXCLUDED.details,
+        updated_at = NOW();
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION user_directory_sync() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        DELETE FROM user_directory WHERE role = TG_ARGV[0] AND user_id = OLD.id;
+        RETURN OLD;
+    END IF;
+    PERFORM user_directory_upsert(TG_ARGV[0], to_jsonb(NEW));
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_user_directory_drivers ON drivers;
+CREATE TRIGGER trg_user_directory_drivers AFTER INSERT OR UPDATE OR DELETE ON drivers
+    FOR EACH ROW EXECUTE FUNCTION user_directory_sync('courier');
+DROP TRIGGER IF EXISTS trg_user_directory_restaurants ON restaurants;
+CREATE TRIGGER trg_user_directory_restaurants AFTER INSERT OR UPDATE OR DELETE ON restaurants
+    FOR EACH ROW EXECUTE FUNCTION user_directory_sync('restaurant');
+DROP TRIGGER IF EXISTS trg_user_directory_system_admins ON system_admins;
+CREATE TRIGGER trg_user_directory_system_admins AFTER INSERT OR UPDATE OR DELETE ON system_admins
+    FOR EACH ROW EXECUTE FUNCTION user_directory_sync('admin');
+DROP TRIGGER IF EXISTS trg_user_directory_dealers ON dealers;
+CREATE TRIGGER trg_user_directory_dealers AFTER INSERT OR UPDATE OR DELETE ON dealers
+    FOR EACH ROW EXECUTE FUNCTION user_directory_sync('dealer');
+DROP TRIGGER IF EXISTS trg_user_directory_support_users ON support_users;
+CREATE TRIGGER trg_user_directory_support_users AFTER INSERT OR UPDATE OR DELETE ON support_users
+    FOR EACH ROW EXECUTE FUNCTION user_directory_sync('support');
+DROP TRIGGER IF EXISTS trg_user_directory_corporate_users ON corporate_users;
+CREATE TRIGGER trg_user_directory_corporate_users AFTER INSERT OR UPDATE OR DELETE ON corporate_users
+    FOR EACH ROW EXECUTE FUNCTION user_directory_sync('corporate');
+
+-- Dizinde olmayan kayıtları doldur (ilk kurulum; sonrasında trigger'lar günceller)
+SELECT user_directory_upsert('courier', to_jsonb(t)) FROM drivers t
+WHERE NOT EXISTS (SELECT 1 FROM user_directory u WHERE u.role = 'courier' AND u.user_id = t.id);
+SELECT user_directory_upsert('restaurant', to_jsonb(t)) FROM restaurants t
+WHERE NOT EXISTS (SELECT 1 FROM user_directory u WHERE u.role = 'restaurant' AND u.user_id = t.id);
+SELECT user_directory_upsert('admin', to_jsonb(t)) FROM system_admins t
+WHERE NOT EXISTS (SELECT 1 FROM user_directory u WHERE u.role = 'admin' AND u.user_id = t.id);
+SELECT user_directory_upsert('dealer', to_jsonb(t)) FROM dealers t
+WHERE NOT EXISTS (SELECT 1 FROM user_directory u WHERE u.role = 'dealer' AND u.user_id = t.id);
+SELECT user_directory_upsert('support', to_jsonb(t)) FROM support_users t
+WHERE NOT EXISTS (SELECT 1 FROM user_directory u WHERE u.role = 'support' AND u.user_id = t.id);
+SELECT user_directory_upsert('corporate', to_jsonb(t)) FROM corporate_users t
+WHERE NOT EXISTS (SELECT 1 FROM user_directory u WHERE u.role = 'corporate' AND u.user_id = t.id);
+
+-- =============================================
+-- Kurye günlük istatistikleri (dashboard rollup)
+-- Teslim edilen siparişler (orders) ve teslim edilen işler (jobs) trigger'larla,
+-- çevrimiçi süre set_online'da aralık kapanırken (driver_presence_intervals) güncellenir.
+-- Gün UTC'dir. Geçmiş veri courier_stats.rebuild işiyle doldurulur.
+-- =============================================
+CREATE TABLE IF NOT EXISTS courier_daily_stats (
+    courier_id UUID NOT NULL,
+    day DATE NOT NULL,
+    deliveries INT NOT NULL DEFAULT 0,
+    earnings NUMERIC(14,2) NOT NULL DEFAULT 0,
+    distance_km NUMERIC(14,3) NOT NULL DEFAULT 0,
+    job_earnings NUMERIC(14,2) NOT NULL DEFAULT 0,
+    online_seconds BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (courier_id, day)
+);
+
+-- Tek seferlik bakım işlerinin tamamlanma kayıtları (örn. courier_stats.backfill)
+CREATE TABLE IF NOT EXISTS maintenance_markers (
+    name TEXT PRIMARY KEY,
+    completed_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Alış -> teslimat kuş uçuşu mesafe (dashboard sorgularıyla aynı formül)
+CREATE OR REPLACE FUNCTION order_delivery_km(
+    p_pickup_lat NUMERIC, p_pickup_lng NUMERIC, p_dropoff_lat NUMERIC, p_dropoff_lng NUMERIC
+) RETURNS NUMERIC AS $$
+    SELECT CASE
+        WHEN p_pickup_lat IS NULL OR p_pickup_lng IS NULL
+          OR p_dropoff_lat IS NULL OR p_dropoff_lng IS NULL THEN 0
+        ELSE (6371 * acos(LEAST(1.0,
+            cos(radians(p_pickup_lat)) * cos(radians(p_dropoff_lat)) *
+            cos(radians(p_dropoff_lng) - radians(p_pickup_lng)) +
+            sin(radians(p_pickup_lat)) * sin(radians(p_dropoff_lat))
+        )))::numeric
+    END
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Kurye başına paylaşımlı advisory lock: yeniden hesaplama (courier_stats_service) aynı
+-- anahtarı exclusive alır, böylece sadece o kuryenin trigger'ları kısa süre bekler.
+CREATE OR REPLACE FUNCTION courier_stats_add(
+    p_courier UUID, p_day DATE, p_deliveries INT, p_earnings NUMERIC,
+    p_km NUMERIC, p_job_earnings NUMERIC, p_online_seconds BIGINT
+) RETURNS VOID AS $$
+    SELECT pg_advisory_xact_lock_shared(hashtext('courier_stats'), hashtext(p_courier::text));
+    INSERT INTO courier_daily_stats AS s
+        (courier_id, day, deliveries, earnings, distance_km, job_earnings, online_seconds, updated_at)
+    VALUES (p_courier, p_day, p_deliveries, COALESCE(p_earnings, 0), COALESCE(p_km, 0),
+            COALESCE(p_job_earnings, 0), p_online_seconds, NOW())
+    ON CONFLICT (courier_id, day) DO UPDATE SET
+        deliveries = s.deliveries + EXCLUDED.deliveries,
+        earnings = s.earnings + EXCLUDED.earnings,
+        distance_km = s.distance_km + EXCLUDED.distance_km,
+        job_earnings = s.job_earnings + EXCLUDED.job_earnings,
+        online_seconds = s.online_seconds + EXCLUDED.online_seconds,
+        updated_at = NOW();
+$$ LANGUAGE sql;
+
+-- Sipariş: teslim_edildi katkısı eski satırdan çıkarılır, yeni satıra eklenir
+CREATE OR REPLACE FUNCTION courier_stats_order_sync() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.status = 'teslim_edildi' AND OLD.courier_id IS NOT NULL THEN
+        PERFORM courier_stats_add(
+            OLD.courier_id, (OLD.updated_at AT TIME ZONE 'UTC')::date, -1, -OLD.amount,
+            -order_delivery_km(OLD.pickup_lat, OLD.pickup_lng, OLD.dropoff_lat, OLD.dropoff_lng), 0, 0
+        );
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.status = 'teslim_edildi' AND NEW.courier_id IS NOT NULL THEN
+        PERFORM courier_stats_add(
+            NEW.courier_id, (NEW.updated_at AT TIME ZONE 'UTC')::date, 1, NEW.amount,
+            order_delivery_km(NEW.pickup_lat, NEW.pickup_lng, NEW.dropoff_lat, NEW.dropoff_lng), 0, 0
+        );
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_courier_stats_orders ON orders;
+CREATE TRIGGER trg_courier_stats_orders
+    AFTER INSERT OR DELETE OR UPDATE OF status, courier_id, amount, updated_at,
+        pickup_lat, pickup_lng, dropoff_lat, dropoff_lng ON orders
+    FOR EACH ROW EXECUTE FUNCTION courier_stats_order_sync();
+
+-- Eski jobs akışı (driver /earnings)
+CREATE OR REPLACE FUNCTION courier_stats_job_sync() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.status = 'delivered' AND OLD.driver_id IS NOT NULL THEN
+        PERFORM courier_stats_add(OLD.driver_id, (OLD.updated_at AT TIME ZONE 'UTC')::date, 0, 0, 0, -OLD.price, 0);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.status = 'delivered' AND NEW.driver_id IS NOT NULL THEN
+        PERFORM courier_stats_add(NEW.driver_id, (NEW.updated_at AT TIME ZONE 'UTC')::date, 0, 0, 0, NEW.price, 0);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_courier_stats_jobs ON jobs;
+CREATE TRIGGER trg_courier_stats_jobs
+    AFTER INSERT OR DELETE OR UPDATE OF status, driver_id, price, updated_at ON jobs
+    FOR EACH ROW EXECUTE FUNCTION courier_stats_job_sync();
+
+-- Çevrimiçi aralığı gün sınırlarından bölerek ekler
+CREATE OR REPLACE FUNCTION courier_stats_add_online(
+    p_courier UUID, p_from TIMESTAMPTZ, p_to TIMESTAMPTZ
+) RETURNS VOID AS $$
+    SELECT courier_stats_add(
+        p_courier, g.d::date, 0, 0, 0, 0,
+        EXTRACT(EPOCH FROM
+            LEAST(p_to, (g.d + INTERVAL '1 day') AT TIME ZONE 'UTC')
+            - GREATEST(p_from, g.d AT TIME ZONE 'UTC')
+        )::bigint
+    )
+    FROM generate_series(
+        (p_from AT TIME ZONE 'UTC')::date,
+        (p_to AT TIME ZONE 'UTC')::date,
+        INTERVAL '1 day'
+    ) AS g(d)
+    WHERE p_to > p_from;
+$$ LANGUAGE sql;
+
+-- =============================================
+-- Çevrimiçi aralıkları (online_from, online_to). set_online tarafından tutulur:
+-- online -> açık aralık, offline -> aralık kapanır ve süre courier_daily_stats'a eklenir.
+-- Kurye başına en fazla bir açık aralık (online_to IS NULL) olabilir.
+-- Eski driver_presence_events kayıtları presence.compact işiyle aralıklara çevrilir.
+-- =============================================
+CREATE TABLE IF NOT EXISTS driver_presence_intervals (
+    id BIGSERIAL PRIMARY KEY,
+    driver_id UUID NOT NULL REFERENCES drivers(id) ON DELETE CASCADE,
+    online_from TIMESTAMPTZ NOT NULL,
+    online_to TIMESTAMPTZ,
+    CHECK (online_to IS NULL OR online_to >= online_from)
+);
+CREATE INDEX IF NOT EXISTS idx_presence_intervals_driver_from
+    ON driver_presence_intervals (driver_id, online_from);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_presence_intervals_open
+    ON driver_presence_intervals (driver_id) WHERE online_to IS NULL;
+
+-- Aralık modeline geçildi; event trigger'ı artık kullanılmıyor
+DROP TRIGGER IF EXISTS trg_courier_stats_presence ON driver_presence_events;
+DROP FUNCTION IF EXISTS courier_stats_presence_sync();
+
+-- =============================================
+-- Kurye sipariş logu / geçmiş sayfalama: (courier_id, zaman DESC, id DESC) keyset index'leri.
+-- Log toplamı courier_orders_log_counts'tan okunur (trigger ile güncel; COUNT(*) OVER() yok).
+-- =============================================
+CREATE INDEX IF NOT EXISTS idx_courier_orders_log_courier_created
+    ON courier_orders_log (courier_id, created_at DESC NULLS LAST, id DESC) INCLUDE (order_id, action);
+CREATE INDEX IF NOT EXISTS idx_orders_courier_history
+    ON orders (courier_id, updated_at DESC, id DESC)
+    WHERE status IN ('iptal', 'teslim_edildi');
+
+CREATE TABLE IF NOT EXISTS courier_orders_log_counts (
+    courier_id UUID PRIMARY KEY,
+    total BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE OR REPLACE FUNCTION courier_orders_log_count_sync() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.courier_id IS NOT NULL THEN
+        UPDATE courier_orders_log_counts SET total = total - 1 WHERE courier_id = OLD.courier_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.courier_id IS NOT NULL THEN
+        INSERT INTO courier_orders_log_counts (courier_id, total)
+        VALUES (NEW.courier_id, 1)
+        ON CONFLICT (courier_id) DO UPDATE SET total = courier_orders_log_counts.total + 1;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_courier_orders_log_count ON courier_orders_log;
+CREATE TRIGGER trg_courier_orders_log_count
+    AFTER INSERT OR DELETE OR UPDATE OF courier_id ON courier_orders_log
+    FOR EACH ROW EXECUTE FUNCTION courier_orders_log_count_sync();
+
+-- Sayaçları mevcut loglardan bir kez doldur
+INSERT INTO courier_orders_log_counts (courier_id, total)
+SELECT courier_id, COUNT(*)
+FROM courier_orders_log
+WHERE courier_id IS NOT NULL
+  AND NOT EXISTS (SELECT 1 FROM courier_orders_log_counts)
+GROUP BY courier_id
+ON CONFLICT (courier_id) DO NOTHING;
 """
 
 # SQL dump dosyaları burada beklenir: app/sql/10_countries.sql vb.
@@ -0,0 +1,70 @@
+"""
+Google encoded polyline yardımcıları (precision 5 - OSRM / Google varsayılanı)
+"""
+from typing import List, Tuple
+
+
+def _encode_value(value: int) -> str:
+    value = ~(value << 1) if value < 0 else (value << 1)
+    chunks = []
+    while value >= 0x20:
+        chunks.append(chr((0x20 | (value & 0x1f)) + 63))
+        value >>= 5
+    chunks.append(chr(value + 63))
+    return "".join(chunks)
+
+
+def encode(points: List[Tuple[float, float]], precision: int = 5) -> str:
+    """(lat, lng) listesini encoded polyline'a çevirir"""
+    factor = 10 ** precision
+    result = []
+    prev_lat = prev_lng = 0
+    for lat, lng in points:
+        lat_i = int(round(lat * factor))
+        lng_i = int(round(lng * factor))
+        result.append(_encode_value(lat_i - prev_lat))
+        result.append(_encode_value(lng_i - prev_lng))
+        prev_lat, prev_lng = lat_i, lng_i
+    return "".join(result)
+
+
+def decode(encoded: str, precision: int = 5) -> List[Tuple[float, float]]:
+    """Encoded polyline'ı (lat, lng) listesine çevirir"""
+    factor = 10 ** precision
+    points = []
+    index = lat = lng = 0
+    length = len(encoded)
+
+    while index < length:
+        deltas = []
+        for _ in range(2):
+            shift = result = 0
+            while True:
+                b = ord(encoded[index]) - 63
+                index += 1
+                result |= (b & 0x1f) << shift
+                shift += 5
+                if b < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else (result >> 1))
+        lat += deltas[0]
+        lng += deltas[1]
+        points.append((lat / factor, lng / factor))
+
+    return points
+
+
+def concat(encoded_list: List[str], precision: int = 5) -> str:
+    """
+    Birden fazla leg polyline'ını tek polyline'da birleştirir.
+    Bir leg'in başlangıcı önceki leg'in bitişiyle aynıysa tekrar eklenmez.
+    """
+    points: List[Tuple[float, float]] = []
+    for encoded in encoded_list:
+        if not encoded:
+            continue
+        leg_points = decode(encoded, precision)
+        if points and leg_points and leg_points[0] == points[-1]:
+            leg_points = leg_points[1:]
+        points.extend(leg_points)
+    return encode(points, precision)
@@ -1,19 +1,103 @@
+import os
+import asyncio
 import datetime
+import logging
+from concurrent.futures import ThreadPoolExecutor
 import bcrypt
 from jose import jwt, JWTError
 from fastapi import HTTPException, status
 from .config import JWT_SECRET_KEY, JWT_ALGORITHM
+from .token_cache import verified_token_cache
+
+logger = logging.getLogger(__name__)
+
+# bcrypt maliyeti (log2 round). Değişirse eski hash'ler login sırasında yenilenir.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# bcrypt için ayrılmış thread sayısı (bcrypt hesaplarken GIL'i bırakır)
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+# Kuyrukta bekleyebilecek en fazla iş; aşılırsa 503 döner (login fırtınasında back-pressure)
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "256"))
+
 
 def hash_pwd(pwd: str) -> str:
-    return bcrypt.hashpw(pwd.encode(), bcrypt.gensalt()).decode()
+    return bcrypt.hashpw(pwd.encode(), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode()
 
 def verify_pwd(pwd: str, hashed: str) -> bool:
     return bcrypt.checkpw(pwd.encode(), hashed.encode())
 
-def create_jwt(data: dict, days:int=30) -> str:
+def needs_rehash(hashed: str) -> bool:
+    """Hash'in maliyeti BCRYPT_ROUNDS'tan farklıysa True ($2b$12$... -> 12)"""
+    try:
+        return int(hashed.split("$")[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError, AttributeError):
+        return True
+
+
+class PasswordHasher:
+    """
+    bcrypt işlemlerini event loop dışında, boyutu sınırlı bir thread havuzunda çalıştırır.
+    Bekleyen iş sayısı (queue depth) stats() ile izlenebilir.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+
+    async def _run(self, fn, *args):
+        if self._pending >= self.max_pending:
+            self._rejected += 1
+            logger.warning(f"Password hash queue full ({self._pending} pending)")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Sunucu şu anda yoğun, lütfen tekrar deneyin",
+            )
+
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, fn, *args)
+        finally:
+            self._pending -= 1
+            self._completed += 1
+
+    async def hash(self, pwd: str) -> str:
+        return await self._run(hash_pwd, pwd)
+
+    async def verify(self, pwd: str, hashed: str) -> bool:
+        return await self._run(verify_pwd, pwd, hashed)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queue_depth": max(self._pending - self.workers, 0),
+            "in_flight": self._pending,
+            "max_pending": self.max_pending,
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "rounds": BCRYPT_ROUNDS,
+        }
+
+
+# Global password hasher instance
+password_hasher = PasswordHasher(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING)
+
+
+async def hash_pwd_async(pwd: str) -> str:
+    return await password_hasher.hash(pwd)
+
+async def verify_pwd_async(pwd: str, hashed: str) -> bool:
+    return await password_hasher.verify(pwd, hashed)
+
+
+def create_jwt(data: dict, days:int=30, minutes: int | None = None) -> str:
     to_encode = data.copy()
-    expire = datetime.datetime.utcnow() + datetime.timedelta(days=days)
-    to_encode.update({"exp": expire})
+    now = datetime.datetime.utcnow()
+    lifetime = datetime.timedelta(minutes=minutes) if minutes is not None else datetime.timedelta(days=days)
+    to_encode.update({"exp": now + lifetime, "iat": now})
     return jwt.encode(to_encode, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
 
 def decode_jwt(token: str) -> dict:
@@ -25,3 +109,13 @@ def decode_jwt(token: str) -> dict:
             detail="Invalid credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
+
+def decode_jwt_cached(token: str) -> dict:
+    """decode_jwt + doğrulanmış token önbelleği (exp geçene kadar tekrar doğrulanmaz)"""
+    payload = verified_token_cache.get(token)
+    if payload is not None:
+        return payload
+
+    payload = decode_jwt(token)
+    verified_token_cache.set(token, payload)
+    return payload
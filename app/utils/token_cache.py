@@ -0,0 +1,69 @@
+"""
+Doğrulanmış JWT önbelleği - auth dependency'lerinde her istekte HMAC doğrulama + JSON parse yapılmaz
+"""
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+import hashlib
+import os
+import time
+
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+
+
+class VerifiedTokenCache:
+    """
+    sha256(token) -> (exp, payload) LRU önbelleği.
+
+    - Token'ın kendisi saklanmaz, sadece hash'i anahtar olur.
+    - Kayıt, token'ın `exp` zamanı geçince kendiliğinden geçersiz sayılır.
+    - Boyut max_size ile sınırlıdır; en eski kullanılan kayıt düşer.
+    """
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        exp, payload = entry
+        if exp <= time.time():
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        # Çağıran payload'ı değiştirirse cache bozulmasın
+        return dict(payload)
+
+    def set(self, token: str, payload: Dict[str, Any]):
+        exp = payload.get("exp")
+        if not isinstance(exp, (int, float)):
+            return
+
+        key = self._key(token)
+        self._entries[key] = (float(exp), dict(payload))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"size": len(self._entries), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
+
+
+# Global verified token cache instance
+verified_token_cache = VerifiedTokenCache(TOKEN_CACHE_SIZE)
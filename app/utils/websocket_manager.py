@@ -3,6 +3,7 @@ WebSocket bağlantılarını yönetmek için manager
 """
 from typing import Dict, Set
 from fastapi import WebSocket
+from fastapi.encoders import jsonable_encoder
 import json
 import logging
 
@@ -43,7 +44,8 @@ class WebSocketManager:
             return False
         
         disconnected = set()
-        message_str = json.dumps(message)
+        # Rota verisi pydantic modeller (Coordinate) içerebilir
+        message_str = json.dumps(jsonable_encoder(message))
         
         for websocket in self.active_connections[courier_id]:
             try:
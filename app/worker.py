@@ -0,0 +1,30 @@
+"""
+Kalıcı iş kuyruğu worker'ı - API'den ayrı process olarak çalıştırmak için.
+
+    python -m app.worker                 # tüm kuyruklar
+    python -m app.worker mail payments   # sadece verilen kuyruklar
+
+API process'inde worker'ı kapatmak için JOB_WORKER_IN_PROCESS=false.
+"""
+import asyncio
+import logging
+import signal
+import sys
+
+from app.services.job_queue_service import run_worker
+
+
+async def _main(queues):
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            pass
+    await run_worker(queues or None, stop)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    asyncio.run(_main(sys.argv[1:]))